@@ -22,6 +22,10 @@ app, scheduler = setup_app_core(app)
 # Register the blueprint
 app.register_blueprint(whatsapp_flow_bp)
 
+# Parse and validate the Flow private key once, before the first data-exchange request
+from services.flow_crypto import init_flow_crypto
+init_flow_crypto()
+
 # Setup basic routes
 setup_routes(app)
 
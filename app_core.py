@@ -21,6 +21,7 @@ from services.calendar_service import CalendarService
 from models.trainer import TrainerModel
 from models.client import ClientModel
 from models.booking import BookingModel
+from utils.keyset_pagination import iter_rows
 from utils.logger import log_info, log_error
 from utils.rate_limiter import RateLimiter
 from utils.input_sanitizer import InputSanitizer
@@ -165,12 +166,13 @@ def setup_scheduled_tasks(scheduler, scheduler_service, invitation_reminder_serv
         """Check and update subscription statuses"""
         try:
             log_info("Checking subscription statuses")
-            active_subs = supabase.table('trainer_subscriptions').select('*').eq(
-                'status', 'active'
-            ).execute()
+            active_subs = iter_rows(
+                lambda: supabase.table('trainer_subscriptions').select('*').eq('status', 'active'),
+                prefetch=True
+            )
 
             expired_count = 0
-            for sub in (active_subs.data or []):
+            for sub in active_subs:
                 if sub.get('end_date'):
                     end_date = datetime.fromisoformat(sub['end_date'])
                     if end_date < datetime.now(pytz.timezone(Config.TIMEZONE)):
@@ -19,6 +19,20 @@ class Config:
     PHONE_NUMBER_ID = os.environ.get('PHONE_NUMBER_ID', '671257819413918')
     WHATSAPP_BUSINESS_ACCOUNT_ID = os.environ.get('WHATSAPP_BUSINESS_ACCOUNT_ID', '1381649546261678')  # Actual Business Account ID
     WHATSAPP_FLOW_PRIVATE_KEY = os.environ.get('WHATSAPP_FLOW_PRIVATE_KEY')  # For flow encryption
+    WHATSAPP_FLOW_PRIVATE_KEY_PATH = os.environ.get('WHATSAPP_FLOW_PRIVATE_KEY_PATH')  # PEM file, takes precedence (rotatable)
+    FLOW_KEY_RELOAD_SECONDS = float(os.environ.get('FLOW_KEY_RELOAD_SECONDS', '30'))
+
+    # Outbound Graph API HTTP transport (shared keep-alive pool)
+    WHATSAPP_HTTP_POOL_SIZE = int(os.environ.get('WHATSAPP_HTTP_POOL_SIZE', '20'))
+    WHATSAPP_HTTP_CONNECT_TIMEOUT = float(os.environ.get('WHATSAPP_HTTP_CONNECT_TIMEOUT', '3.05'))
+    WHATSAPP_HTTP_READ_TIMEOUT = float(os.environ.get('WHATSAPP_HTTP_READ_TIMEOUT', '10'))
+    WHATSAPP_HTTP_MAX_RETRIES = int(os.environ.get('WHATSAPP_HTTP_MAX_RETRIES', '3'))
+    WHATSAPP_HTTP_BACKOFF_SECONDS = float(os.environ.get('WHATSAPP_HTTP_BACKOFF_SECONDS', '0.5'))
+
+    # Bulk sends: Cloud API throughput is 80 msg/s per business number by default (1000 when upgraded)
+    WHATSAPP_SEND_RATE_PER_SECOND = float(os.environ.get('WHATSAPP_SEND_RATE_PER_SECOND', '80'))
+    WHATSAPP_BULK_CONCURRENCY = int(os.environ.get('WHATSAPP_BULK_CONCURRENCY', '16'))
+    WHATSAPP_BULK_MAX_ATTEMPTS = int(os.environ.get('WHATSAPP_BULK_MAX_ATTEMPTS', '3'))
 
     # WhatsApp Flow IDs
     TRAINER_ADD_CLIENT_FLOW_ID = os.environ.get('TRAINER_ADD_CLIENT_FLOW_ID', '2245969039161775')  # Trainer add-client flow
@@ -28,6 +42,26 @@ class Config:
     ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY')
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
     AI_MODEL = os.environ.get('AI_MODEL', 'claude-sonnet-4-20250514')
+
+    # Shared Anthropic client (services/ai_gateway.py)
+    AI_HTTP_POOL_SIZE = int(os.environ.get('AI_HTTP_POOL_SIZE', '20'))
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', '8'))
+    AI_CONNECT_TIMEOUT = float(os.environ.get('AI_CONNECT_TIMEOUT', '5'))
+    AI_READ_TIMEOUT = float(os.environ.get('AI_READ_TIMEOUT', '30'))
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES', '2'))
+    AI_BACKOFF_SECONDS = float(os.environ.get('AI_BACKOFF_SECONDS', '0.5'))
+    AI_QUEUE_TIMEOUT = float(os.environ.get('AI_QUEUE_TIMEOUT', '30'))
+
+    # Local intent classifier ahead of Claude (services/ai_intent/core/local_classifier.py)
+    INTENT_LOCAL_CLASSIFIER_ENABLED = os.environ.get('INTENT_LOCAL_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+    INTENT_LOCAL_MIN_CONFIDENCE = float(os.environ.get('INTENT_LOCAL_MIN_CONFIDENCE', '0.75'))
+    INTENT_LOCAL_MIN_SIMILARITY = float(os.environ.get('INTENT_LOCAL_MIN_SIMILARITY', '0.5'))
+    INTENT_LOCAL_MAX_WORDS = int(os.environ.get('INTENT_LOCAL_MAX_WORDS', '12'))
+
+    # Cache of Claude intent results for repeated messages (services/ai_intent/core/intent_cache.py)
+    INTENT_CACHE_ENABLED = os.environ.get('INTENT_CACHE_ENABLED', 'true').lower() == 'true'
+    INTENT_CACHE_MAX_SIZE = int(os.environ.get('INTENT_CACHE_MAX_SIZE', '5000'))
+    INTENT_CACHE_TTL_SECONDS = int(os.environ.get('INTENT_CACHE_TTL_SECONDS', '3600'))
     
     # PayFast config
     PAYFAST_MERCHANT_ID = os.environ.get('PAYFAST_MERCHANT_ID')
@@ -54,6 +88,44 @@ class Config:
     ENABLE_RATE_LIMITING = os.environ.get('ENABLE_RATE_LIMITING', 'true').lower() == 'true'
     ENABLE_WEB_DASHBOARD = os.environ.get('ENABLE_WEB_DASHBOARD', 'true').lower() == 'true'
     ENABLE_SOCIAL_MEDIA = os.environ.get('ENABLE_SOCIAL_MEDIA', 'false').lower() == 'true'
+
+    # Webhook ingestion queue
+    WEBHOOK_ASYNC_ENABLED = os.environ.get('WEBHOOK_ASYNC_ENABLED', 'true').lower() == 'true'
+    WEBHOOK_WORKERS = int(os.environ.get('WEBHOOK_WORKERS', '4'))
+    WEBHOOK_QUEUE_SIZE = int(os.environ.get('WEBHOOK_QUEUE_SIZE', '1000'))  # Per worker
+    WEBHOOK_JOURNAL_PATH = os.environ.get('WEBHOOK_JOURNAL_PATH', '/tmp/refiloe/webhook_journal.jsonl')
+
+    # In-process caches
+    IDENTITY_CACHE_TTL_SECONDS = int(os.environ.get('IDENTITY_CACHE_TTL_SECONDS', '60'))
+    IDENTITY_CACHE_MAX_SIZE = int(os.environ.get('IDENTITY_CACHE_MAX_SIZE', '10000'))
+    STREAK_CACHE_TTL_SECONDS = int(os.environ.get('STREAK_CACHE_TTL_SECONDS', '300'))
+    STREAK_CACHE_MAX_SIZE = int(os.environ.get('STREAK_CACHE_MAX_SIZE', '20000'))
+    LEADERBOARD_SNAPSHOT_TTL_SECONDS = int(os.environ.get('LEADERBOARD_SNAPSHOT_TTL_SECONDS', '600'))
+    LEADERBOARD_SNAPSHOT_MAX_SIZE = int(os.environ.get('LEADERBOARD_SNAPSHOT_MAX_SIZE', '500'))
+    LEADERBOARD_REFRESH_MINUTES = int(os.environ.get('LEADERBOARD_REFRESH_MINUTES', '5'))
+    # Recompute every habit_daily_progress read from habit_logs and log differences
+    HABIT_PROGRESS_VERIFY = os.environ.get('HABIT_PROGRESS_VERIFY', 'false').lower() == 'true'
+    DASHBOARD_TOKEN_CACHE_TTL_SECONDS = int(os.environ.get('DASHBOARD_TOKEN_CACHE_TTL_SECONDS', '300'))
+    DASHBOARD_TOKEN_CACHE_MAX_SIZE = int(os.environ.get('DASHBOARD_TOKEN_CACHE_MAX_SIZE', '5000'))
+    DASHBOARD_TOKEN_USAGE_FLUSH_SECONDS = float(os.environ.get('DASHBOARD_TOKEN_USAGE_FLUSH_SECONDS', '30'))
+    DASHBOARD_RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('DASHBOARD_RESPONSE_CACHE_TTL_SECONDS', '60'))
+    DASHBOARD_RESPONSE_CACHE_MAX_SIZE = int(os.environ.get('DASHBOARD_RESPONSE_CACHE_MAX_SIZE', '2000'))
+    # 'memory' (single process), 'sqlite' (shared by all workers on the host) or 'none'
+    TASK_CACHE_BACKEND = os.environ.get('TASK_CACHE_BACKEND', 'memory')
+    TASK_CACHE_SQLITE_PATH = os.environ.get('TASK_CACHE_SQLITE_PATH', '/tmp/refiloe/task_state.db')
+    TASK_CACHE_TTL_SECONDS = int(os.environ.get('TASK_CACHE_TTL_SECONDS', '300'))
+
+    # Message deduplication: 'memory' (batched writes to processed_messages) or 'supabase'
+    DEDUP_BACKEND = os.environ.get('DEDUP_BACKEND', 'memory')
+    DEDUP_ID_WINDOW_SECONDS = int(os.environ.get('DEDUP_ID_WINDOW_SECONDS', '86400'))
+    DEDUP_PRELOAD_MINUTES = int(os.environ.get('DEDUP_PRELOAD_MINUTES', '60'))
+    DEDUP_FLUSH_BATCH_SIZE = int(os.environ.get('DEDUP_FLUSH_BATCH_SIZE', '100'))
+    DEDUP_FLUSH_INTERVAL_SECONDS = float(os.environ.get('DEDUP_FLUSH_INTERVAL_SECONDS', '1.0'))
+
+    # WhatsApp Flow data-exchange sessions: 'memory' (single process) or 'sqlite' (shared by all workers)
+    FLOW_SESSION_BACKEND = os.environ.get('FLOW_SESSION_BACKEND', 'memory')
+    FLOW_SESSION_SQLITE_PATH = os.environ.get('FLOW_SESSION_SQLITE_PATH', '/tmp/refiloe/flow_sessions.db')
+    FLOW_SESSION_TTL_SECONDS = int(os.environ.get('FLOW_SESSION_TTL_SECONDS', '7200'))
     
     # Email settings
     SMTP_SERVER = os.environ.get('SMTP_SERVER', 'smtp.gmail.com')
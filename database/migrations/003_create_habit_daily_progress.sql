@@ -0,0 +1,94 @@
+-- Create habit_daily_progress table
+-- One row per client, habit and day holding the day's summed completed_value
+-- and log count. A trigger on habit_logs keeps it in step, so the aggregate
+-- changes in the same transaction as the log row that LoggingService.log_habit
+-- inserts, and "today's progress" for a habit is a single-row read.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS habit_daily_progress (
+    id BIGSERIAL PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    habit_id TEXT NOT NULL,
+    log_date DATE NOT NULL,
+    completed_total NUMERIC NOT NULL DEFAULT 0,
+    log_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+    -- One row per client, habit and day; also serves client/day lookups
+    CONSTRAINT unique_habit_daily_progress
+        UNIQUE (client_id, log_date, habit_id)
+);
+
+-- The daily reminder job reads every client's row for one day
+CREATE INDEX IF NOT EXISTS idx_habit_daily_progress_log_date
+    ON habit_daily_progress(log_date);
+
+-- Add (or remove, with negative values) logs to a day's row
+CREATE OR REPLACE FUNCTION apply_habit_daily_progress(
+    p_client_id TEXT,
+    p_habit_id TEXT,
+    p_log_date DATE,
+    p_value NUMERIC,
+    p_count INTEGER
+) RETURNS VOID AS $$
+BEGIN
+    INSERT INTO habit_daily_progress (client_id, habit_id, log_date, completed_total, log_count)
+    VALUES (p_client_id, p_habit_id, p_log_date, p_value, p_count)
+    ON CONFLICT (client_id, log_date, habit_id) DO UPDATE
+        SET completed_total = habit_daily_progress.completed_total + EXCLUDED.completed_total,
+            log_count = habit_daily_progress.log_count + EXCLUDED.log_count,
+            updated_at = NOW();
+
+    IF p_count < 0 THEN
+        DELETE FROM habit_daily_progress
+        WHERE client_id = p_client_id
+          AND log_date = p_log_date
+          AND habit_id = p_habit_id
+          AND log_count <= 0;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION habit_logs_daily_progress() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_habit_daily_progress(
+            OLD.client_id::TEXT, OLD.habit_id::TEXT, OLD.log_date::DATE,
+            -COALESCE(OLD.completed_value, 0), -1
+        );
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_habit_daily_progress(
+            NEW.client_id::TEXT, NEW.habit_id::TEXT, NEW.log_date::DATE,
+            COALESCE(NEW.completed_value, 0), 1
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rebuild from the existing logs; the lock holds off log writes until the
+-- trigger is in place, and the rebuild makes re-running this file safe
+LOCK TABLE habit_logs IN SHARE ROW EXCLUSIVE MODE;
+
+TRUNCATE habit_daily_progress;
+
+INSERT INTO habit_daily_progress (client_id, habit_id, log_date, completed_total, log_count)
+SELECT client_id::TEXT, habit_id::TEXT, log_date::DATE, SUM(COALESCE(completed_value, 0)), COUNT(*)
+FROM habit_logs
+GROUP BY client_id, habit_id, log_date::DATE;
+
+DROP TRIGGER IF EXISTS trg_habit_logs_daily_progress ON habit_logs;
+
+CREATE TRIGGER trg_habit_logs_daily_progress
+    AFTER INSERT OR DELETE OR UPDATE OF client_id, habit_id, log_date, completed_value
+    ON habit_logs
+    FOR EACH ROW EXECUTE FUNCTION habit_logs_daily_progress();
+
+COMMIT;
+
+-- Add comment to table
+COMMENT ON TABLE habit_daily_progress IS 'Per client, habit and day totals of habit_logs, maintained by trg_habit_logs_daily_progress';
+COMMENT ON COLUMN habit_daily_progress.completed_total IS 'Sum of completed_value over the day''s logs';
+COMMENT ON COLUMN habit_daily_progress.log_count IS 'Number of logs for the day';
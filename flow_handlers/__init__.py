@@ -10,6 +10,11 @@ from .flow_data_exchange import (
     get_all_sessions,
     cleanup_old_sessions
 )
+from .session_store import (
+    MemoryFlowSessionStore,
+    SharedFlowSessionStore,
+    get_flow_session_store
+)
 
 __all__ = [
     'handle_flow_data_exchange',
@@ -17,5 +22,8 @@ __all__ = [
     'get_session_info',
     'delete_session',
     'get_all_sessions',
-    'cleanup_old_sessions'
+    'cleanup_old_sessions',
+    'MemoryFlowSessionStore',
+    'SharedFlowSessionStore',
+    'get_flow_session_store'
 ]
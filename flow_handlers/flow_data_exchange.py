@@ -10,49 +10,32 @@ Note: This handler does NOT handle encryption/decryption - that is done in the w
 
 import json
 import logging
-from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 
+from .session_store import get_flow_session_store
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# In-memory storage for flow sessions
-# In production, consider using Redis or another persistent store
-flow_sessions: Dict[str, Dict[str, Any]] = {}  # Stores data by flow_token
-session_timestamps: Dict[str, datetime] = {}  # Track when sessions were created
-
 
 def cleanup_old_sessions(max_age_hours: int = 2) -> int:
     """
-    Remove sessions older than the specified age.
+    Remove expired sessions.
+
+    Sessions expire FLOW_SESSION_TTL_SECONDS after their last update (2 hours
+    by default); the store only visits sessions that have expired.
 
     Args:
-        max_age_hours: Maximum age of sessions in hours (default: 2)
+        max_age_hours: Kept for backwards compatibility; the lifetime is configured on the store
 
     Returns:
         Number of sessions cleaned up
     """
     try:
-        current_time = datetime.now()
-        cutoff_time = current_time - timedelta(hours=max_age_hours)
-
-        # Find expired sessions
-        expired_tokens = [
-            token for token, timestamp in session_timestamps.items()
-            if timestamp < cutoff_time
-        ]
-
-        # Remove expired sessions
-        cleanup_count = 0
-        for token in expired_tokens:
-            if token in flow_sessions:
-                del flow_sessions[token]
-                cleanup_count += 1
-            if token in session_timestamps:
-                del session_timestamps[token]
+        cleanup_count = get_flow_session_store().purge_expired()
 
         if cleanup_count > 0:
-            logger.info(f"Cleaned up {cleanup_count} expired flow sessions (older than {max_age_hours} hours)")
+            logger.info(f"Cleaned up {cleanup_count} expired flow sessions")
 
         return cleanup_count
 
@@ -85,6 +68,7 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
     try:
         # Cleanup old sessions at the start of each request
         cleanup_old_sessions()
+        sessions = get_flow_session_store()
 
         # Extract action from decrypted data
         action = decrypted_data.get('action', '').lower()
@@ -107,8 +91,7 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
 
         elif action == 'init':
             # Initialize new flow session
-            flow_sessions[flow_token] = {}
-            session_timestamps[flow_token] = datetime.now()
+            sessions.create(flow_token)
             logger.info(f"=== INIT HANDLER START === token: {flow_token}")
 
             # For client onboarding, retrieve trainer data
@@ -158,26 +141,16 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
             }
 
         elif action == 'data_exchange':
-            # Get existing session or create new one
-            if flow_token not in flow_sessions:
-                flow_sessions[flow_token] = {}
-                session_timestamps[flow_token] = datetime.now()
-                logger.info(f"Created new session during data_exchange: {flow_token}")
+            # Merge incoming data with existing session data (creates the session if needed)
+            session_data = sessions.update(flow_token, flow_data)
 
-            # Update session with incoming data
             if flow_data:
-                # Merge incoming data with existing session data
-                flow_sessions[flow_token].update(flow_data)
-
                 # Log what data was received
                 logger.info(f"Received data for session {flow_token}: {json.dumps(flow_data, indent=2)}")
-                logger.info(f"Current session data: {json.dumps(flow_sessions[flow_token], indent=2)}")
+                logger.info(f"Current session data: {json.dumps(session_data, indent=2)}")
             else:
                 logger.info(f"No data in data_exchange request for session {flow_token}")
 
-            # Update timestamp
-            session_timestamps[flow_token] = datetime.now()
-
             # Check if this is a pricing calculation request from HEALTH_NOTES screen
             if screen == "HEALTH_NOTES" and flow_data.get("operation") == "calculate_pricing":
                 logger.info(f"Processing pricing calculation from HEALTH_NOTES screen for session {flow_token}")
@@ -205,7 +178,7 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
                 flow_data["calculated_price"] = calculated_price
 
                 # Update session with calculated price
-                flow_sessions[flow_token]["calculated_price"] = calculated_price
+                sessions.update(flow_token, {"calculated_price": calculated_price})
 
                 # Return navigation response to CONFIRMATION screen
                 response = {
@@ -226,12 +199,6 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
             # Handle pricing calculation from HEALTH_NOTES screen
             logger.info(f"Processing calculate_pricing action for session {flow_token}")
 
-            # Get existing session or create new one
-            if flow_token not in flow_sessions:
-                flow_sessions[flow_token] = {}
-                session_timestamps[flow_token] = datetime.now()
-                logger.info(f"Created new session during calculate_pricing: {flow_token}")
-
             # Merge all incoming data into session first
             all_data = {}
 
@@ -244,9 +211,8 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
             if flow_data:
                 all_data.update(flow_data)
 
-            # Store in session
-            flow_sessions[flow_token].update(all_data)
-            session_timestamps[flow_token] = datetime.now()
+            # Store in session (creates the session if needed)
+            sessions.update(flow_token, all_data)
 
             # Extract pricing fields
             pricing_choice = all_data.get('pricing_choice', '')
@@ -278,7 +244,7 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
             all_data['calculated_price'] = calculated_price
 
             # Update session with calculated price
-            flow_sessions[flow_token]['calculated_price'] = calculated_price
+            sessions.update(flow_token, {'calculated_price': calculated_price})
 
             # Return response navigating to CONFIRMATION screen with all data including calculated_price
             response = {
@@ -294,19 +260,10 @@ def handle_flow_data_exchange(decrypted_data: Dict[str, Any], flow_token: str) -
         else:
             # Any other action (like "navigate", "BACK", etc.)
             # Treat as data_exchange - store any data that came with it
-            if flow_token not in flow_sessions:
-                flow_sessions[flow_token] = {}
-                session_timestamps[flow_token] = datetime.now()
-                logger.info(f"Created new session during action '{action}': {flow_token}")
-
-            # Store any data that came with the request
+            sessions.update(flow_token, flow_data)
             if flow_data:
-                flow_sessions[flow_token].update(flow_data)
                 logger.info(f"Stored data for action '{action}' in session {flow_token}: {json.dumps(flow_data, indent=2)}")
 
-            # Update timestamp
-            session_timestamps[flow_token] = datetime.now()
-
             logger.info(f"Processed action '{action}' for session {flow_token}")
 
             return {
@@ -336,11 +293,11 @@ def get_collected_data(flow_token: str) -> Optional[Dict[str, Any]]:
         Dictionary containing all collected data, or None if session doesn't exist
     """
     try:
-        if flow_token not in flow_sessions:
+        data = get_flow_session_store().get(flow_token)
+        if data is None:
             logger.warning(f"Attempted to retrieve data for non-existent session: {flow_token}")
             return None
 
-        data = flow_sessions[flow_token]
         logger.info(f"Retrieved data for session {flow_token}: {len(data)} fields")
         return data
 
@@ -360,14 +317,15 @@ def get_session_info(flow_token: str) -> Optional[Dict[str, Any]]:
         Dictionary containing session info, or None if session doesn't exist
     """
     try:
-        if flow_token not in flow_sessions:
+        info = get_flow_session_store().get_info(flow_token)
+        if info is None:
             return None
 
         return {
             'flow_token': flow_token,
-            'created_at': session_timestamps.get(flow_token),
-            'data_fields': list(flow_sessions[flow_token].keys()),
-            'field_count': len(flow_sessions[flow_token])
+            'created_at': info['created_at'],
+            'data_fields': info['data_fields'],
+            'field_count': len(info['data_fields'])
         }
 
     except Exception as e:
@@ -386,14 +344,10 @@ def delete_session(flow_token: str) -> bool:
         True if session was deleted, False if it didn't exist
     """
     try:
-        if flow_token not in flow_sessions:
+        if not get_flow_session_store().delete(flow_token):
             logger.warning(f"Attempted to delete non-existent session: {flow_token}")
             return False
 
-        del flow_sessions[flow_token]
-        if flow_token in session_timestamps:
-            del session_timestamps[flow_token]
-
         logger.info(f"Deleted flow session: {flow_token}")
         return True
 
@@ -411,7 +365,7 @@ def get_all_sessions() -> Dict[str, Dict[str, Any]]:
     """
     try:
         all_sessions = {}
-        for token in flow_sessions.keys():
+        for token in get_flow_session_store().tokens():
             all_sessions[token] = get_session_info(token)
 
         logger.info(f"Retrieved info for {len(all_sessions)} active sessions")
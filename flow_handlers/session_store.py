@@ -0,0 +1,204 @@
+"""
+WhatsApp Flow Session Store
+
+Keeps the form data collected across data-exchange requests, keyed by
+flow_token. Sessions expire a fixed time after their last update.
+
+Backends:
+- MemoryFlowSessionStore: single process. Expiry is driven by a min-heap of
+  deadlines, so cleanup only touches sessions that have actually expired.
+- SharedFlowSessionStore: SQLite/WAL file shared by every worker on the host,
+  so a request can land on any process. Expiry uses the indexed expires_at
+  column.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 2 * 60 * 60
+
+
+def _new_session() -> Dict[str, Any]:
+    return {'data': {}, 'created_at': datetime.now().isoformat()}
+
+
+class MemoryFlowSessionStore:
+    """In-process session store with heap-based TTL expiry"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._expires_at: Dict[str, float] = {}
+        # (deadline, token); stale entries left behind by touches are skipped on pop
+        self._heap: List[tuple] = []
+
+    def _touch(self, flow_token: str, now: float):
+        deadline = now + self.ttl_seconds
+        self._expires_at[flow_token] = deadline
+        heapq.heappush(self._heap, (deadline, flow_token))
+
+        # Every touch leaves a stale heap entry behind; rebuild once they dominate
+        if len(self._heap) > 2 * len(self._expires_at) + 64:
+            self._heap = [(expires, token) for token, expires in self._expires_at.items()]
+            heapq.heapify(self._heap)
+
+    def _live(self, flow_token: str, now: float) -> Optional[Dict[str, Any]]:
+        expires = self._expires_at.get(flow_token)
+        if expires is None or expires <= now:
+            return None
+        return self._sessions.get(flow_token)
+
+    def create(self, flow_token: str) -> Dict[str, Any]:
+        """Start (or restart) a session with no data"""
+        with self._lock:
+            session = _new_session()
+            self._sessions[flow_token] = session
+            self._touch(flow_token, self._clock())
+            return dict(session['data'])
+
+    def update(self, flow_token: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Merge data into a session (creating it if needed) and return the merged data"""
+        with self._lock:
+            now = self._clock()
+            session = self._live(flow_token, now)
+            if session is None:
+                session = _new_session()
+                self._sessions[flow_token] = session
+                logger.info(f"Created new flow session: {flow_token}")
+            session['data'].update(data or {})
+            self._touch(flow_token, now)
+            return dict(session['data'])
+
+    def get(self, flow_token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._live(flow_token, self._clock())
+            return dict(session['data']) if session else None
+
+    def get_info(self, flow_token: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            session = self._live(flow_token, self._clock())
+            if session is None:
+                return None
+            return {'created_at': session['created_at'], 'data_fields': list(session['data'].keys())}
+
+    def delete(self, flow_token: str) -> bool:
+        with self._lock:
+            existed = self._live(flow_token, self._clock()) is not None
+            self._sessions.pop(flow_token, None)
+            self._expires_at.pop(flow_token, None)
+            return existed
+
+    def tokens(self) -> List[str]:
+        with self._lock:
+            now = self._clock()
+            return [token for token, expires in self._expires_at.items() if expires > now]
+
+    def purge_expired(self) -> int:
+        """Drop expired sessions. Cost is proportional to the number expired, not the total"""
+        with self._lock:
+            now = self._clock()
+            purged = 0
+            while self._heap and self._heap[0][0] <= now:
+                deadline, token = heapq.heappop(self._heap)
+                if self._expires_at.get(token) == deadline:
+                    del self._expires_at[token]
+                    self._sessions.pop(token, None)
+                    purged += 1
+            return purged
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'backend': 'memory', 'sessions': len(self._expires_at), 'heap_entries': len(self._heap)}
+
+
+class SharedFlowSessionStore:
+    """Session store shared between worker processes through SQLite/WAL"""
+
+    def __init__(self, path: str, ttl_seconds: float = DEFAULT_TTL_SECONDS, purge_interval: float = 60):
+        from utils.shared_kv_store import SQLiteKVStore
+        self._store = SQLiteKVStore(path, table='flow_sessions')
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    def create(self, flow_token: str) -> Dict[str, Any]:
+        self._store.set(flow_token, _new_session(), ttl_seconds=self.ttl_seconds)
+        return {}
+
+    def update(self, flow_token: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        def merge(session):
+            if session is None:
+                session = _new_session()
+                logger.info(f"Created new flow session: {flow_token}")
+            session['data'].update(data or {})
+            return session
+
+        return dict(self._store.update(flow_token, merge, ttl_seconds=self.ttl_seconds)['data'])
+
+    def get(self, flow_token: str) -> Optional[Dict[str, Any]]:
+        session = self._store.get(flow_token)
+        return session['data'] if session else None
+
+    def get_info(self, flow_token: str) -> Optional[Dict[str, Any]]:
+        session = self._store.get(flow_token)
+        if session is None:
+            return None
+        return {'created_at': session['created_at'], 'data_fields': list(session['data'].keys())}
+
+    def delete(self, flow_token: str) -> bool:
+        return self._store.delete(flow_token)
+
+    def tokens(self) -> List[str]:
+        return self._store.keys()
+
+    def purge_expired(self) -> int:
+        """Delete expired rows, at most once per purge_interval (reads already ignore them)"""
+        now = time.monotonic()
+        if now - self._last_purge < self.purge_interval:
+            return 0
+        self._last_purge = now
+        return self._store.purge_expired()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self._store.get_stats()
+
+
+_session_store = None
+_session_store_lock = threading.Lock()
+
+
+def get_flow_session_store():
+    """Get (or lazily create) the process-wide flow session store"""
+    global _session_store
+
+    if _session_store is None:
+        with _session_store_lock:
+            if _session_store is None:
+                from config import Config
+
+                backend = getattr(Config, 'FLOW_SESSION_BACKEND', 'memory')
+                ttl = getattr(Config, 'FLOW_SESSION_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+                if backend == 'sqlite':
+                    try:
+                        _session_store = SharedFlowSessionStore(Config.FLOW_SESSION_SQLITE_PATH, ttl_seconds=ttl)
+                    except Exception as e:
+                        logger.error(f"Could not open shared flow session store, using memory: {str(e)}")
+                if _session_store is None:
+                    _session_store = MemoryFlowSessionStore(ttl_seconds=ttl)
+
+                logger.info(f"Flow session store initialised ({_session_store.get_stats()['backend']})")
+
+    return _session_store
+
+
+def set_flow_session_store(store):
+    """Replace the process-wide store (tests, or wiring a custom backend)"""
+    global _session_store
+    _session_store = store
@@ -2,8 +2,15 @@
 Dashboard Routes
 Web dashboard for relationship management
 """
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for
-from services.dashboard import DashboardService, DashboardTokenManager
+from functools import wraps
+from flask import Blueprint, Response, render_template, request, jsonify, redirect, url_for, make_response, stream_with_context
+from services.dashboard import DashboardService, DashboardTokenManager, TraineeProgressLoader, get_response_cache
+from services.helpers.export_stream import csv_chunks
+from services.habits.daily_progress import get_daily_progress_store
+from services.habits.leaderboard_service import DAY_SUM, get_leaderboard_service
+from services.habits.log_cube import CUBE_CLIENT_BATCH, CUBE_PAGE_SIZE, HabitLogCube
+from services.habits.streak_engine import get_streak_engine
+from utils.keyset_pagination import fetch_all
 from utils.logger import log_info, log_error
 import os
 
@@ -12,14 +19,63 @@ dashboard_bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 # Initialize services (will be set by app)
 dashboard_service = None
 token_manager = None
+response_cache = None
+
+# Headers copied onto responses served from the cache
+CACHED_HEADERS = ('Content-Type', 'Content-Disposition')
 
 def init_dashboard_services(supabase_client):
     """Initialize dashboard services"""
-    global dashboard_service, token_manager
+    global dashboard_service, token_manager, response_cache
     dashboard_service = DashboardService(supabase_client)
     token_manager = DashboardTokenManager(supabase_client)
+    response_cache = get_response_cache(supabase_client)
+
+def cached_response(record_use=True):
+    """
+    Serve a view from the per-user response cache with ETag/Last-Modified validators
+    
+    The token is validated before the cache is consulted; invalid tokens,
+    non-200 and streamed responses go through the view uncached. A browser revalidating
+    with an ETag that still matches gets a 304 without the page being rebuilt.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(user_id, token, **kwargs):
+            if response_cache is None:
+                return view(user_id, token, **kwargs)
+            
+            token_data = token_manager.validate_token(token, user_id, record_use=record_use)
+            if not token_data:
+                return view(user_id, token, **kwargs)
+            
+            key = (user_id, token_data.get('purpose'), request.endpoint,
+                   tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            stamp = response_cache.get_stamp(user_id, token_data['role'])
+            entry = response_cache.get(key, stamp)
+            
+            if entry is None:
+                response = make_response(view(user_id, token, **kwargs))
+                if response.status_code != 200 or response.is_streamed or response.direct_passthrough:
+                    return response
+                headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                entry = response_cache.store(key, stamp, response.get_data(), headers)
+            
+            if entry.etag in request.if_none_match:
+                response = make_response('', 304)
+            else:
+                response = make_response(entry.body, 200, entry.headers)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.stamp
+            # Per-user pages: the browser may keep them but must revalidate each time
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        
+        return wrapper
+    return decorator
 
 @dashboard_bp.route('/<user_id>/<token>')
+@cached_response()
 def dashboard_view(user_id, token):
     """Main dashboard view"""
     try:
@@ -67,26 +123,15 @@ def dashboard_view(user_id, token):
                              error="An error occurred loading the dashboard"), 500
 
 @dashboard_bp.route('/api/<user_id>/<token>/relationships')
+@cached_response(record_use=False)
 def api_get_relationships(user_id, token):
     """API endpoint to get relationships (for AJAX)"""
     try:
-        # Validate token (but don't mark as used for API calls)
-        import hashlib
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        
-        # Check if token exists and is valid (but don't consume it)
-        from datetime import datetime
-        result = dashboard_service.db.table('dashboard_tokens').select('*').eq(
-            'token_hash', token_hash
-        ).eq('user_id', user_id).gt(
-            'expires_at', datetime.now().isoformat()
-        ).execute()
-        
-        if not result.data:
+        # Validate token (but don't record use for API calls)
+        token_data = token_manager.validate_token(token, user_id, record_use=False)
+        if not token_data:
             return jsonify({'error': 'Invalid token'}), 403
         
-        token_data = result.data[0]
-        
         # Get relationships
         status = request.args.get('status', 'active')
         relationships = dashboard_service.get_relationships(user_id, token_data['role'], status)
@@ -100,6 +145,7 @@ def api_get_relationships(user_id, token):
 
 
 @dashboard_bp.route('/habits/<user_id>/<token>')
+@cached_response()
 def trainer_habits_view(user_id, token):
     """Trainer habits dashboard view"""
     try:
@@ -148,6 +194,7 @@ def trainer_habits_view(user_id, token):
 
 
 @dashboard_bp.route('/progress/<user_id>/<token>/<trainee_id>')
+@cached_response()
 def trainee_progress_view(user_id, token, trainee_id):
     """Trainee progress dashboard view - enhanced version matching client dashboard"""
     try:
@@ -185,6 +232,10 @@ def trainee_progress_view(user_id, token, trainee_id):
         
         habits = []
         if assignments_result.data:
+            streaks = get_streak_engine(dashboard_service.db).get_client_streaks(trainee_id)
+            month_cube = None
+            if view_type == 'monthly' and selected_month and selected_year:
+                month_cube = load_client_month_cube(dashboard_service.db, trainee_id, selected_year, selected_month)
             for assignment in assignments_result.data:
                 habit_data = assignment.get('fitness_habits')
                 if habit_data:
@@ -198,7 +249,7 @@ def trainee_progress_view(user_id, token, trainee_id):
                     if view_type == 'monthly' and selected_month and selected_year:
                         habit_progress = calculate_habit_progress_for_month(
                             dashboard_service.db, habit_data['habit_id'], trainee_id, 
-                            selected_year, selected_month
+                            selected_year, selected_month, cube=month_cube
                         )
                     elif view_type == 'daily' and selected_date:
                         habit_progress = calculate_habit_progress_for_date(
@@ -212,7 +263,7 @@ def trainee_progress_view(user_id, token, trainee_id):
                     habit_data.update(habit_progress)
                     
                     # Calculate streak
-                    streak = calculate_habit_streak(dashboard_service.db, habit_data['habit_id'], trainee_id)
+                    streak = streaks.get(habit_data['habit_id'], 0)
                     habit_data['streak_days'] = streak
                     
                     habits.append(habit_data)
@@ -241,6 +292,7 @@ def trainee_progress_view(user_id, token, trainee_id):
 
 
 @dashboard_bp.route('/trainee-habits/<user_id>/<token>/<trainee_id>')
+@cached_response()
 def trainee_habits_view(user_id, token, trainee_id):
     """Trainee habits dashboard view - shows only habits assigned by this trainer"""
     try:
@@ -313,12 +365,8 @@ def calculate_habit_progress(db, habit_id, client_id):
     today = datetime.now().date()
     current_month_start = today.replace(day=1)
     
-    # Get today's logs
-    daily_logs = db.table('habit_logs').select('completed_value').eq(
-        'habit_id', habit_id
-    ).eq('client_id', client_id).eq('log_date', today.isoformat()).execute()
-    
-    daily_completed = sum(float(log['completed_value']) for log in daily_logs.data) if daily_logs.data else 0
+    # Today's total
+    daily_completed, daily_logs_count = get_daily_progress_store(db).get_habit_day(client_id, habit_id, today)
     
     # Get this month's logs
     monthly_logs = db.table('habit_logs').select('completed_value').eq(
@@ -354,7 +402,6 @@ def calculate_habit_progress(db, habit_id, client_id):
     monthly_completion_rate = min(100, monthly_progress_percent)
     
     # Count logs
-    daily_logs_count = len(daily_logs.data) if daily_logs.data else 0
     monthly_logs_count = len(monthly_logs.data) if monthly_logs.data else 0
     
     return {
@@ -377,46 +424,15 @@ def calculate_habit_progress(db, habit_id, client_id):
 
 def calculate_habit_streak(db, habit_id, client_id):
     """Calculate current habit streak (consecutive days with logs)"""
-    from datetime import datetime, timedelta
-    
-    # Get the most recent log date for this habit and client
-    recent_log = db.table('habit_logs').select('log_date').eq(
-        'habit_id', habit_id
-    ).eq('client_id', client_id).order('log_date', desc=True).limit(1).execute()
-    
-    if not recent_log.data:
-        return 0
-    
-    # Start from the most recent log date
-    most_recent_date = datetime.strptime(recent_log.data[0]['log_date'], '%Y-%m-%d').date()
-    streak = 0
-    current_date = most_recent_date
-    
-    # Check backwards from most recent log date to find consecutive days with logs
-    for i in range(365):  # Check up to 1 year back
-        logs = db.table('habit_logs').select('id').eq(
-            'habit_id', habit_id
-        ).eq('client_id', client_id).eq('log_date', current_date.isoformat()).execute()
-        
-        if logs.data:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    return streak
+    return get_streak_engine(db).get_streak(client_id, habit_id)
 
 
 def calculate_habit_progress_for_date(db, habit_id, client_id, target_date):
     """Calculate habit progress for a specific date"""
     from datetime import datetime
     
-    # Get logs for the specific date
-    daily_logs = db.table('habit_logs').select('completed_value').eq(
-        'habit_id', habit_id
-    ).eq('client_id', client_id).eq('log_date', target_date).execute()
-    
-    daily_completed = sum(float(log['completed_value']) for log in daily_logs.data) if daily_logs.data else 0
+    # The day's total
+    daily_completed, daily_logs_count = get_daily_progress_store(db).get_habit_day(client_id, habit_id, target_date)
     
     # Get habit target
     habit_result = db.table('fitness_habits').select('target_value, frequency').eq('habit_id', habit_id).execute()
@@ -438,7 +454,7 @@ def calculate_habit_progress_for_date(db, habit_id, client_id, target_date):
         'daily_exceeded': daily_exceeded,
         'daily_progress_percent': daily_progress_percent,
         'daily_completion_rate': min(100, daily_progress_percent),
-        'daily_logs_count': len(daily_logs.data) if daily_logs.data else 0,
+        'daily_logs_count': daily_logs_count,
         'monthly_completed': 0,  # Not applicable for daily view
         'monthly_target': 0,
         'monthly_progress_percent': 0,
@@ -447,24 +463,30 @@ def calculate_habit_progress_for_date(db, habit_id, client_id, target_date):
     }
 
 
-def calculate_habit_progress_for_month(db, habit_id, client_id, year, month):
-    """Calculate habit progress for a specific month"""
+def load_client_month_cube(db, client_id, year, month, habit_ids=None):
+    """Load a client's logs for a specific month in one read"""
+    import calendar
+    
+    days_in_month = calendar.monthrange(int(year), int(month))[1]
+    return HabitLogCube.load(
+        db, [client_id], f"{year}-{month.zfill(2)}-01", f"{year}-{month.zfill(2)}-{days_in_month:02d}", habit_ids=habit_ids
+    )
+
+
+def calculate_habit_progress_for_month(db, habit_id, client_id, year, month, cube=None):
+    """Calculate habit progress for a specific month (from `cube` if the month's logs are already loaded)"""
     from datetime import datetime
     import calendar
     
-    # Create date range for the month
-    year_int = int(year)
-    month_int = int(month)
-    month_start = f"{year}-{month.zfill(2)}-01"
-    days_in_month = calendar.monthrange(year_int, month_int)[1]
-    month_end = f"{year}-{month.zfill(2)}-{days_in_month:02d}"
+    # Days in the month
+    days_in_month = calendar.monthrange(int(year), int(month))[1]
     
     # Get logs for the specific month
-    monthly_logs = db.table('habit_logs').select('completed_value').eq(
-        'habit_id', habit_id
-    ).eq('client_id', client_id).gte('log_date', month_start).lte('log_date', month_end).execute()
+    if cube is None:
+        cube = load_client_month_cube(db, client_id, year, month, habit_ids=[habit_id])
     
-    monthly_completed = sum(float(log['completed_value']) for log in monthly_logs.data) if monthly_logs.data else 0
+    monthly_completed = cube.total(client_id, habit_id)
+    monthly_logs_count = cube.log_count(client_id, habit_id)
     
     # Get habit target
     habit_result = db.table('fitness_habits').select('target_value, frequency').eq('habit_id', habit_id).execute()
@@ -487,7 +509,7 @@ def calculate_habit_progress_for_month(db, habit_id, client_id, year, month):
         'monthly_exceeded': monthly_exceeded,
         'monthly_progress_percent': monthly_progress_percent,
         'monthly_completion_rate': min(100, monthly_progress_percent),
-        'monthly_logs_count': len(monthly_logs.data) if monthly_logs.data else 0,
+        'monthly_logs_count': monthly_logs_count,
         'daily_completed': 0,  # Not applicable for monthly view
         'daily_target': daily_target,  # Keep for reference
         'daily_progress_percent': 0,
@@ -498,185 +520,17 @@ def calculate_habit_progress_for_month(db, habit_id, client_id, year, month):
 
 def calculate_client_leaderboard_for_month(db, client_id, year, month):
     """Calculate leaderboard for clients based on habit progress for a specific month"""
-    from datetime import datetime
-    import calendar
-    
-    # Create date range for the month
-    year_int = int(year)
-    month_int = int(month)
-    month_start = f"{year}-{month.zfill(2)}-01"
-    days_in_month = calendar.monthrange(year_int, month_int)[1]
-    month_end = f"{year}-{month.zfill(2)}-{days_in_month:02d}"
-    
-    # Get all clients with habit assignments
-    clients_result = db.table('trainee_habit_assignments').select(
-        'client_id'
-    ).eq('is_active', True).execute()
-    
-    if not clients_result.data:
-        return []
-    
-    # Get unique client IDs
-    client_ids = list(set(assignment['client_id'] for assignment in clients_result.data))
-    
-    # Get client names separately
-    clients_info = {}
-    if client_ids:
-        clients_names_result = db.table('clients').select('client_id, name').in_('client_id', client_ids).execute()
-        if clients_names_result.data:
-            clients_info = {client['client_id']: client['name'] for client in clients_names_result.data}
-    
-    client_stats = {}
+    from datetime import date
     
-    # Calculate stats for each client
-    for assignment in clients_result.data:
-        client_id_iter = assignment['client_id']
-        client_name = clients_info.get(client_id_iter, 'Unknown')
-        
-        if client_id_iter not in client_stats:
-            client_stats[client_id_iter] = {
-                'client_id': client_id_iter,
-                'name': client_name,
-                'total_progress': 0,
-                'habit_count': 0,
-                'total_streak': 0,
-                'trainer_ids': set()
-            }
-        
-        # Get habit assignments for this client
-        habit_assignments = db.table('trainee_habit_assignments').select(
-            'habit_id, trainer_id'
-        ).eq('client_id', client_id_iter).eq('is_active', True).execute()
-        
-        for habit_assignment in habit_assignments.data:
-            habit_id = habit_assignment['habit_id']
-            trainer_id = habit_assignment['trainer_id']
-            
-            client_stats[client_id_iter]['trainer_ids'].add(trainer_id)
-            client_stats[client_id_iter]['habit_count'] += 1
-            
-            # Calculate progress for this habit for the specific month
-            progress = calculate_habit_progress_for_month(db, habit_id, client_id_iter, year, month)
-            client_stats[client_id_iter]['total_progress'] += progress.get('monthly_progress_percent', 0)
-            
-            # Calculate streak for this habit
-            streak = calculate_habit_streak(db, habit_id, client_id_iter)
-            client_stats[client_id_iter]['total_streak'] += streak
-    
-    # Calculate average progress and prepare leaderboard
-    leaderboard = []
-    for client_data in client_stats.values():
-        if client_data['habit_count'] > 0:
-            avg_progress = client_data['total_progress'] / client_data['habit_count']
-            trainer_ids = list(client_data['trainer_ids'])
-            
-            leaderboard.append({
-                'client_id': client_data['client_id'],
-                'name': client_data['name'],
-                'progress': round(avg_progress, 1),
-                'habit_count': client_data['habit_count'],
-                'total_streak': client_data['total_streak'],
-                'trainer_ids': trainer_ids,
-                'is_current_user': client_data['client_id'] == client_id
-            })
-    
-    # Sort by progress (descending)
-    leaderboard.sort(key=lambda x: x['progress'], reverse=True)
-    
-    # Add ranking
-    for i, entry in enumerate(leaderboard):
-        entry['rank'] = i + 1
-    
-    # Ensure current user is in top 10 or add them
-    current_user_entry = next((entry for entry in leaderboard if entry['is_current_user']), None)
-    top_10 = leaderboard[:10]
-    
-    if current_user_entry and current_user_entry not in top_10:
-        top_10.append(current_user_entry)
-    
-    return top_10
-
-
-def get_client_last_activity(db, client_id):
-    """Get the most recent activity date for a client"""
-    from datetime import datetime
-    
-    # Get the most recent habit log for this client
-    recent_log = db.table('habit_logs').select('log_date').eq(
-        'client_id', client_id
-    ).order('log_date', desc=True).limit(1).execute()
-    
-    if recent_log.data:
-        log_date = recent_log.data[0]['log_date']
-        # Convert to readable format
-        try:
-            date_obj = datetime.strptime(log_date, '%Y-%m-%d')
-            return date_obj.strftime('%b %d')  # e.g., "Nov 06"
-        except:
-            return log_date
-    
-    return "No activity"
+    month_start = date(int(year), int(month), 1)
+    return get_leaderboard_service(db).get_global_leaderboard(
+        client_id, 'monthly', month_start, aggregate=DAY_SUM
+    )
 
 
 def get_trainer_trainees_with_progress(db, trainer_id):
     """Get trainer's trainees with their progress data"""
-    from datetime import datetime
-    
-    # Get trainer's trainees
-    trainees_result = db.table('trainer_client_list').select(
-        'client_id'
-    ).eq('trainer_id', trainer_id).eq('connection_status', 'active').execute()
-    
-    if not trainees_result.data:
-        return []
-    
-    trainees = []
-    for trainee_data in trainees_result.data:
-        client_id = trainee_data['client_id']
-        
-        # Get client info separately
-        client_result = db.table('clients').select('name, whatsapp, email').eq('client_id', client_id).execute()
-        client_info = client_result.data[0] if client_result.data else {}
-        
-        if client_info:
-            # Get habit assignments count
-            assignments_result = db.table('trainee_habit_assignments').select(
-                'habit_id'
-            ).eq('client_id', client_id).eq('trainer_id', trainer_id).eq('is_active', True).execute()
-            
-            habit_count = len(assignments_result.data) if assignments_result.data else 0
-            
-            # Calculate overall progress
-            total_progress = 0
-            total_streak = 0
-            
-            if assignments_result.data:
-                for assignment in assignments_result.data:
-                    habit_id = assignment['habit_id']
-                    
-                    # Calculate progress
-                    progress = calculate_habit_progress(db, habit_id, client_id)
-                    total_progress += progress.get('monthly_progress_percent', 0)
-                    
-                    # Calculate streak
-                    streak = calculate_habit_streak(db, habit_id, client_id)
-                    total_streak += streak
-            
-            avg_progress = total_progress / habit_count if habit_count > 0 else 0
-            
-            trainees.append({
-                'client_id': client_id,
-                'name': client_info.get('name', 'Unknown'),
-                'phone': client_info.get('whatsapp', ''),
-                'whatsapp': client_info.get('whatsapp', ''),
-                'email': client_info.get('email', ''),
-                'habit_count': habit_count,
-                'avg_progress': round(avg_progress, 1),
-                'total_streak': total_streak,
-                'last_activity': get_client_last_activity(db, client_id)
-            })
-    
-    return trainees
+    return TraineeProgressLoader(db).load(trainer_id)
 
 def calculate_trainer_stats(db, trainer_id, trainees):
     """Calculate comprehensive trainer statistics"""
@@ -705,18 +559,30 @@ def calculate_trainer_stats(db, trainer_id, trainees):
     
     # Get habit IDs for this trainer's assignments
     trainer_habit_ids = [a.get('habit_id') for a in (assignments_result.data or []) if a.get('is_active', False)]
-    
-    # Daily habit log statistics (only for trainer's assigned habits)
-    daily_logs = []
-    if trainer_habit_ids:
-        daily_logs_result = db.table('habit_logs').select('*').eq('log_date', str(today)).in_('habit_id', trainer_habit_ids).execute()
-        daily_logs = daily_logs_result.data if daily_logs_result.data else []
-    
-    # Monthly habit log statistics (only for trainer's assigned habits)
-    monthly_logs = []
-    if trainer_habit_ids:
-        monthly_logs_result = db.table('habit_logs').select('*').gte('log_date', str(month_start)).lte('log_date', str(today)).in_('habit_id', trainer_habit_ids).execute()
-        monthly_logs = monthly_logs_result.data if monthly_logs_result.data else []
+    client_ids = [t.get('client_id') for t in trainees]
+    
+    # This month's logs for the trainer's assigned habits, read once (today is a slice of it)
+    if trainer_habit_ids and client_ids:
+        cube = HabitLogCube.load(db, client_ids, month_start, today, habit_ids=trainer_habit_ids)
+    else:
+        cube = HabitLogCube(month_start, today)
+    
+    # Active assignments for every trainee, one paged read per batch of clients
+    assignments_by_client = {}
+    for start in range(0, len(client_ids), CUBE_CLIENT_BATCH):
+        batch = client_ids[start:start + CUBE_CLIENT_BATCH]
+        client_assignments = fetch_all(lambda: db.table('trainee_habit_assignments').select('*').in_(
+            'client_id', batch
+        ).eq('is_active', True), page_size=CUBE_PAGE_SIZE)
+        for assignment in client_assignments:
+            assignments_by_client.setdefault(assignment['client_id'], []).append(assignment)
+    
+    # Targets for every assigned habit
+    habit_targets = {}
+    assigned_habit_ids = list({a['habit_id'] for client_assignments in assignments_by_client.values() for a in client_assignments})
+    if assigned_habit_ids:
+        targets_result = db.table('fitness_habits').select('habit_id, target_value').in_('habit_id', assigned_habit_ids).execute()
+        habit_targets = {h['habit_id']: float(h.get('target_value') or 0) for h in targets_result.data or []}
     
     # Calculate per-trainee progress statistics
     trainee_daily_progress = []
@@ -724,13 +590,10 @@ def calculate_trainer_stats(db, trainer_id, trainees):
     
     for trainee in trainees:
         client_id = trainee.get('client_id')
-        # Get assignments for this specific client (same as in get_trainer_trainees_with_progress)
-        client_assignments_result = db.table('trainee_habit_assignments').select('*').eq('client_id', client_id).eq('is_active', True).execute()
-        client_assignments = client_assignments_result.data if client_assignments_result.data else []
+        client_assignments = assignments_by_client.get(client_id, [])
         
         # Daily progress for this trainee
-        client_daily_logs = [log for log in daily_logs if log.get('client_id') == client_id]
-        daily_stats = calculate_completion_stats(client_daily_logs, client_assignments, db)
+        daily_stats = calculate_completion_stats(cube, client_id, client_assignments, habit_targets, start=today)
         
         trainee_daily_progress.append({
             'name': trainee.get('name', 'Unknown'),
@@ -743,8 +606,7 @@ def calculate_trainer_stats(db, trainer_id, trainees):
         })
         
         # Monthly progress for this trainee
-        client_monthly_logs = [log for log in monthly_logs if log.get('client_id') == client_id]
-        monthly_stats = calculate_completion_stats(client_monthly_logs, client_assignments, db)
+        monthly_stats = calculate_completion_stats(cube, client_id, client_assignments, habit_targets)
         
         trainee_monthly_progress.append({
             'name': trainee.get('name', 'Unknown'),
@@ -760,12 +622,9 @@ def calculate_trainer_stats(db, trainer_id, trainees):
     client_habit_breakdown = {}
     for trainee in trainees:
         client_id = trainee.get('client_id')
-        # Get assignments for this specific client
-        client_assignments_result = db.table('trainee_habit_assignments').select('*').eq('client_id', client_id).eq('is_active', True).execute()
-        client_assignments = client_assignments_result.data if client_assignments_result.data else []
         client_habit_breakdown[client_id] = {
             'name': trainee.get('name', 'Unknown'),
-            'assigned_habits': len(client_assignments),
+            'assigned_habits': len(assignments_by_client.get(client_id, [])),
             'progress': trainee.get('avg_progress', 0),
             'streak': trainee.get('total_streak', 0)
         }
@@ -821,7 +680,7 @@ def calculate_trainer_stats(db, trainer_id, trainees):
     }
 
 
-def calculate_completion_stats(logs, assignments, db):
+def calculate_completion_stats(cube, client_id, assignments, habit_targets, start=None, end=None):
     """Calculate habit completion statistics based on actual target values"""
     if not assignments:
         return {'completed': 0, 'partial': 0, 'not_started': 0, 'target_met': 0}
@@ -835,30 +694,23 @@ def calculate_completion_stats(logs, assignments, db):
     target_met = 0
     
     for habit_id in habit_ids:
-        habit_logs = [log for log in logs if log.get('habit_id') == habit_id]
+        if not cube.log_count(client_id, habit_id, start, end) or habit_id not in habit_targets:
+            # No logs, or habit not found
+            not_started += 1
+            continue
+        
+        target_value = habit_targets[habit_id]
+        max_completed = cube.best_value(client_id, habit_id, start, end)
         
-        if not habit_logs:
+        if max_completed == 0:
             not_started += 1
+        elif max_completed >= target_value:
+            # Target met or exceeded
+            completed += 1
+            target_met += 1
         else:
-            # Get the habit's target value from fitness_habits table
-            habit_result = db.table('fitness_habits').select('target_value, unit').eq('habit_id', habit_id).execute()
-            
-            if habit_result.data:
-                target_value = float(habit_result.data[0].get('target_value', 0))
-                max_completed = max((float(log.get('completed_value', 0)) for log in habit_logs), default=0)
-                
-                if max_completed == 0:
-                    not_started += 1
-                elif max_completed >= target_value:
-                    # Target met or exceeded
-                    completed += 1
-                    target_met += 1
-                else:
-                    # Some progress but target not met
-                    partial += 1
-            else:
-                # Habit not found, treat as not started
-                not_started += 1
+            # Some progress but target not met
+            partial += 1
     
     return {
         'completed': completed,
@@ -877,6 +729,7 @@ def get_trainee_habits_with_progress(db, trainer_id, trainee_id):
     
     habits = []
     if assignments_result.data:
+        streaks = get_streak_engine(db).get_client_streaks(trainee_id)
         for assignment in assignments_result.data:
             habit_data = assignment.get('fitness_habits')
             if habit_data:
@@ -889,7 +742,7 @@ def get_trainee_habits_with_progress(db, trainer_id, trainee_id):
                 habit_data.update(habit_progress)
                 
                 # Calculate streak
-                streak = calculate_habit_streak(db, habit_data['habit_id'], trainee_id)
+                streak = streaks.get(habit_data['habit_id'], 0)
                 habit_data['streak_days'] = streak
                 
                 habits.append(habit_data)
@@ -899,60 +752,7 @@ def get_trainee_habits_with_progress(db, trainer_id, trainee_id):
 
 def calculate_trainer_leaderboard(db, trainer_id, current_trainee_id):
     """Calculate leaderboard for trainer's trainees"""
-    # Get all trainees of this trainer
-    trainees_result = db.table('trainer_client_list').select(
-        'client_id, clients(name)'
-    ).eq('trainer_id', trainer_id).eq('is_active', True).execute()
-    
-    if not trainees_result.data:
-        return []
-    
-    leaderboard = []
-    
-    for trainee_data in trainees_result.data:
-        client_id = trainee_data['client_id']
-        client_name = trainee_data.get('clients', {}).get('name', 'Unknown') if trainee_data.get('clients') else 'Unknown'
-        
-        # Get habit assignments for this trainee from this trainer
-        assignments_result = db.table('trainee_habit_assignments').select(
-            'habit_id'
-        ).eq('client_id', client_id).eq('trainer_id', trainer_id).eq('is_active', True).execute()
-        
-        habit_count = len(assignments_result.data) if assignments_result.data else 0
-        total_progress = 0
-        total_streak = 0
-        
-        if assignments_result.data:
-            for assignment in assignments_result.data:
-                habit_id = assignment['habit_id']
-                
-                # Calculate progress
-                progress = calculate_habit_progress(db, habit_id, client_id)
-                total_progress += progress.get('monthly_progress_percent', 0)
-                
-                # Calculate streak
-                streak = calculate_habit_streak(db, habit_id, client_id)
-                total_streak += streak
-        
-        avg_progress = total_progress / habit_count if habit_count > 0 else 0
-        
-        leaderboard.append({
-            'client_id': client_id,
-            'name': client_name,
-            'progress': round(avg_progress, 1),
-            'habit_count': habit_count,
-            'total_streak': total_streak,
-            'is_current_trainee': client_id == current_trainee_id
-        })
-    
-    # Sort by progress (descending)
-    leaderboard.sort(key=lambda x: x['progress'], reverse=True)
-    
-    # Add ranking
-    for i, entry in enumerate(leaderboard):
-        entry['rank'] = i + 1
-    
-    return leaderboard
+    return get_leaderboard_service(db).get_trainer_leaderboard(trainer_id, current_trainee_id)
 
 
 def calculate_trainee_detailed_stats(db, trainer_id, trainee_id):
@@ -979,16 +779,14 @@ def calculate_trainee_detailed_stats(db, trainer_id, trainee_id):
     longest_streak = 0
     
     today = datetime.now().date()
+    streaks = get_streak_engine(db).get_client_streaks(trainee_id)
+    today_totals = get_daily_progress_store(db).get_day(trainee_id, today)
     
     for assignment in assignments_result.data:
         habit_id = assignment['habit_id']
         
         # Check if completed today
-        today_logs = db.table('habit_logs').select('completed_value').eq(
-            'habit_id', habit_id
-        ).eq('client_id', trainee_id).eq('log_date', today.isoformat()).execute()
-        
-        if today_logs.data and any(float(log['completed_value']) > 0 for log in today_logs.data):
+        if today_totals.get(habit_id, (0, 0))[0] > 0:
             completed_today += 1
         
         # Calculate progress
@@ -996,7 +794,7 @@ def calculate_trainee_detailed_stats(db, trainer_id, trainee_id):
         total_progress += progress.get('monthly_progress_percent', 0)
         
         # Calculate streak
-        streak = calculate_habit_streak(db, habit_id, trainee_id)
+        streak = streaks.get(habit_id, 0)
         longest_streak = max(longest_streak, streak)
     
     completion_rate = (total_progress / total_habits) if total_habits > 0 else 0
@@ -1017,100 +815,11 @@ def calculate_trainee_detailed_stats(db, trainer_id, trainee_id):
 
 def calculate_client_leaderboard(db, client_id):
     """Calculate leaderboard for clients based on habit progress"""
-    from datetime import datetime
-    
-    current_month = datetime.now().strftime('%Y-%m')
-    
-    # Get all clients with habit assignments
-    clients_result = db.table('trainee_habit_assignments').select(
-        'client_id'
-    ).eq('is_active', True).execute()
-    
-    if not clients_result.data:
-        return []
-    
-    # Get unique client IDs
-    client_ids = list(set(assignment['client_id'] for assignment in clients_result.data))
-    
-    # Get client names separately
-    clients_info = {}
-    if client_ids:
-        clients_names_result = db.table('clients').select('client_id, name').in_('client_id', client_ids).execute()
-        if clients_names_result.data:
-            clients_info = {client['client_id']: client['name'] for client in clients_names_result.data}
-    
-    client_stats = {}
-    
-    # Calculate stats for each client
-    for assignment in clients_result.data:
-        client_id_iter = assignment['client_id']
-        client_name = clients_info.get(client_id_iter, 'Unknown')
-        
-        if client_id_iter not in client_stats:
-            client_stats[client_id_iter] = {
-                'client_id': client_id_iter,
-                'name': client_name,
-                'total_progress': 0,
-                'habit_count': 0,
-                'total_streak': 0,
-                'trainer_ids': set()
-            }
-        
-        # Get habit assignments for this client
-        habit_assignments = db.table('trainee_habit_assignments').select(
-            'habit_id, trainer_id'
-        ).eq('client_id', client_id_iter).eq('is_active', True).execute()
-        
-        for habit_assignment in habit_assignments.data:
-            habit_id = habit_assignment['habit_id']
-            trainer_id = habit_assignment['trainer_id']
-            
-            client_stats[client_id_iter]['trainer_ids'].add(trainer_id)
-            client_stats[client_id_iter]['habit_count'] += 1
-            
-            # Calculate progress for this habit this month
-            progress = calculate_habit_progress(db, habit_id, client_id_iter)
-            client_stats[client_id_iter]['total_progress'] += progress.get('monthly_progress_percent', 0)
-            
-            # Calculate streak for this habit
-            streak = calculate_habit_streak(db, habit_id, client_id_iter)
-            client_stats[client_id_iter]['total_streak'] += streak
-    
-    # Calculate average progress and prepare leaderboard
-    leaderboard = []
-    for client_data in client_stats.values():
-        if client_data['habit_count'] > 0:
-            avg_progress = client_data['total_progress'] / client_data['habit_count']
-            trainer_ids = list(client_data['trainer_ids'])
-            
-            leaderboard.append({
-                'client_id': client_data['client_id'],
-                'name': client_data['name'],
-                'progress': round(avg_progress, 1),
-                'habit_count': client_data['habit_count'],
-                'total_streak': client_data['total_streak'],
-                'trainer_ids': trainer_ids,
-                'is_current_user': client_data['client_id'] == client_id
-            })
-    
-    # Sort by progress (descending)
-    leaderboard.sort(key=lambda x: x['progress'], reverse=True)
-    
-    # Add ranking
-    for i, entry in enumerate(leaderboard):
-        entry['rank'] = i + 1
-    
-    # Ensure current user is in top 10 or add them
-    current_user_entry = next((entry for entry in leaderboard if entry['is_current_user']), None)
-    top_10 = leaderboard[:10]
-    
-    if current_user_entry and current_user_entry not in top_10:
-        top_10.append(current_user_entry)
-    
-    return top_10
+    return get_leaderboard_service(db).get_global_leaderboard(client_id, 'monthly', aggregate=DAY_SUM)
 
 
 @dashboard_bp.route('/client-habits/<user_id>/<token>')
+@cached_response()
 def client_habits_view(user_id, token):
     """Client habits dashboard view with progress tracking and leaderboard"""
     try:
@@ -1149,6 +858,10 @@ def client_habits_view(user_id, token):
                 if trainers_result.data:
                     trainers_info = {trainer['trainer_id']: trainer['name'] for trainer in trainers_result.data}
             
+            streaks = get_streak_engine(dashboard_service.db).get_client_streaks(user_id)
+            month_cube = None
+            if view_type == 'monthly' and selected_month and selected_year:
+                month_cube = load_client_month_cube(dashboard_service.db, user_id, selected_year, selected_month)
             for assignment in assignments_result.data:
                 habit_data = assignment.get('fitness_habits')
                 if habit_data:
@@ -1163,7 +876,7 @@ def client_habits_view(user_id, token):
                     if view_type == 'monthly' and selected_month and selected_year:
                         habit_progress = calculate_habit_progress_for_month(
                             dashboard_service.db, habit_data['habit_id'], user_id, 
-                            selected_year, selected_month
+                            selected_year, selected_month, cube=month_cube
                         )
                     elif view_type == 'daily' and selected_date:
                         habit_progress = calculate_habit_progress_for_date(
@@ -1177,7 +890,7 @@ def client_habits_view(user_id, token):
                     habit_data.update(habit_progress)
                     
                     # Calculate streak
-                    streak = calculate_habit_streak(dashboard_service.db, habit_data['habit_id'], user_id)
+                    streak = streaks.get(habit_data['habit_id'], 0)
                     habit_data['streak_days'] = streak
                     
                     habits.append(habit_data)
@@ -1205,6 +918,7 @@ def client_habits_view(user_id, token):
 
 
 @dashboard_bp.route('/trainer/<user_id>/<token>')
+@cached_response()
 def trainer_main_dashboard(user_id, token):
     """Main trainer dashboard with trainee list and management"""
     try:
@@ -1238,6 +952,7 @@ def trainer_main_dashboard(user_id, token):
 
 
 @dashboard_bp.route('/trainer/<user_id>/<token>/trainee/<trainee_id>')
+@cached_response()
 def trainer_trainee_detail(user_id, token, trainee_id):
     """Detailed view of specific trainee's progress"""
     try:
@@ -1287,63 +1002,20 @@ def trainer_trainee_detail(user_id, token, trainee_id):
 def api_export_csv(user_id, token):
     """API endpoint to export relationships as CSV"""
     try:
-        # Validate token
-        import hashlib
-        token_hash = hashlib.sha256(token.encode()).hexdigest()
-        
-        from datetime import datetime
-        result = dashboard_service.db.table('dashboard_tokens').select('*').eq(
-            'token_hash', token_hash
-        ).eq('user_id', user_id).gt(
-            'expires_at', datetime.now().isoformat()
-        ).execute()
-        
-        if not result.data:
+        # Validate token (but don't record use for API calls)
+        token_data = token_manager.validate_token(token, user_id, record_use=False)
+        if not token_data:
             return jsonify({'error': 'Invalid token'}), 403
         
-        token_data = result.data[0]
+        # Stream the CSV as rows are read rather than building it in memory
+        header, rows = dashboard_service.get_relationship_export(user_id, token_data['role'])
+        filename = f'{token_data["role"]}_{user_id}_relationships.csv'
         
-        # Get relationships
-        relationships = dashboard_service.get_relationships(user_id, token_data['role'])
-        
-        # Generate CSV
-        import csv
-        import io
-        from flask import make_response
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        if token_data['role'] == 'trainer':
-            writer.writerow(['Name', 'Client ID', 'Phone', 'Email', 'Goals', 'Experience', 'Connected Date'])
-        else:
-            writer.writerow(['Name', 'Trainer ID', 'Phone', 'Email', 'Specialization', 'Experience', 'City', 'Connected Date'])
-        
-        # Write data
-        for rel in relationships:
-            if token_data['role'] == 'trainer':
-                writer.writerow([
-                    rel['name'], rel['id'], rel['phone'], rel['email'],
-                    rel['additional_info'].get('goals', ''),
-                    rel['additional_info'].get('experience', ''),
-                    rel['connected_date']
-                ])
-            else:
-                writer.writerow([
-                    rel['name'], rel['id'], rel['phone'], rel['email'],
-                    rel['additional_info'].get('specialization', ''),
-                    rel['additional_info'].get('experience', ''),
-                    rel['additional_info'].get('city', ''),
-                    rel['connected_date']
-                ])
-        
-        # Create response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename={token_data["role"]}_{user_id}_relationships.csv'
-        
-        return response
+        return Response(
+            stream_with_context(csv_chunks(header, rows)),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
         
     except Exception as e:
         log_error(f"Export CSV error: {str(e)}")
@@ -1402,149 +1074,22 @@ def calculate_proper_leaderboard(db, current_user_id, view_type='daily', selecte
     """Calculate proper leaderboard based on actual habit logs and assignments"""
     try:
         from datetime import datetime, date
-        import calendar
         
-        # Determine date range based on view type
+        # Determine the period based on view type
         if view_type == 'daily':
             if selected_date:
                 target_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
             else:
                 target_date = date.today()
-            date_filter = target_date
-            date_range = (target_date, target_date)
         else:  # monthly
+            view_type = 'monthly'
             if selected_month and selected_year:
-                year_int = int(selected_year)
-                month_int = int(selected_month)
+                target_date = date(int(selected_year), int(selected_month), 1)
             else:
-                now = datetime.now()
-                year_int = now.year
-                month_int = now.month
-            
-            # Get first and last day of month
-            first_day = date(year_int, month_int, 1)
-            last_day = date(year_int, month_int, calendar.monthrange(year_int, month_int)[1])
-            date_range = (first_day, last_day)
-        
-        # Get all active habit assignments with client and habit info
-        assignments_query = db.table('trainee_habit_assignments').select(
-            'client_id, habit_id, fitness_habits(habit_name, target_value, unit, frequency)'
-        ).eq('is_active', True).execute()
-        
-        if not assignments_query.data:
-            return []
-        
-        # Get all client names
-        client_ids = list(set(assignment['client_id'] for assignment in assignments_query.data))
-        clients_query = db.table('clients').select('client_id, name').in_('client_id', client_ids).execute()
-        clients_info = {client['client_id']: client['name'] for client in clients_query.data} if clients_query.data else {}
+                target_date = date.today()
         
-        # Get habit logs for the date range
-        if view_type == 'daily':
-            logs_query = db.table('habit_logs').select(
-                'client_id, habit_id, completed_value, log_date'
-            ).eq('log_date', date_range[0].isoformat()).execute()
-        else:  # monthly
-            logs_query = db.table('habit_logs').select(
-                'client_id, habit_id, completed_value, log_date'
-            ).gte('log_date', date_range[0].isoformat()).lte('log_date', date_range[1].isoformat()).execute()
-        
-        # Process logs to get latest entry per habit per day (in case of multiple entries)
-        processed_logs = {}
-        for log in logs_query.data if logs_query.data else []:
-            key = f"{log['client_id']}_{log['habit_id']}_{log['log_date']}"
-            if key not in processed_logs:
-                processed_logs[key] = log
-            # Keep the one with higher completed_value if multiple entries same day
-            elif float(log['completed_value']) > float(processed_logs[key]['completed_value']):
-                processed_logs[key] = log
-        
-        # Calculate stats for each client
-        client_stats = {}
-        
-        for assignment in assignments_query.data:
-            client_id = assignment['client_id']
-            habit_id = assignment['habit_id']
-            habit_info = assignment.get('fitness_habits', {})
-            
-            if not habit_info:
-                continue
-                
-            if client_id not in client_stats:
-                client_stats[client_id] = {
-                    'client_id': client_id,
-                    'name': clients_info.get(client_id, 'Unknown'),
-                    'total_progress': 0,
-                    'habit_count': 0,
-                    'total_streak': 0,
-                    'habits_data': []
-                }
-            
-            client_stats[client_id]['habit_count'] += 1
-            
-            # Calculate progress for this habit
-            target_value = float(habit_info.get('target_value', 1))
-            
-            if view_type == 'daily':
-                # For daily view, check if there's a log for the target date
-                log_key = f"{client_id}_{habit_id}_{date_range[0].isoformat()}"
-                if log_key in processed_logs:
-                    completed_value = float(processed_logs[log_key]['completed_value'])
-                    progress_percent = min(100, (completed_value / target_value) * 100)
-                else:
-                    progress_percent = 0
-                    
-                client_stats[client_id]['total_progress'] += progress_percent
-                
-            else:  # monthly
-                # For monthly view, sum all logs in the month
-                total_completed = 0
-                days_in_month = calendar.monthrange(year_int, month_int)[1]
-                
-                for day in range(1, days_in_month + 1):
-                    day_date = date(year_int, month_int, day)
-                    log_key = f"{client_id}_{habit_id}_{day_date.isoformat()}"
-                    if log_key in processed_logs:
-                        total_completed += float(processed_logs[log_key]['completed_value'])
-                
-                # Calculate monthly progress (target * days in month)
-                monthly_target = target_value * days_in_month
-                progress_percent = min(100, (total_completed / monthly_target) * 100) if monthly_target > 0 else 0
-                client_stats[client_id]['total_progress'] += progress_percent
-            
-            # Calculate streak for this habit (simplified - count consecutive days with logs)
-            streak = calculate_habit_streak(db, habit_id, client_id)
-            client_stats[client_id]['total_streak'] += streak
-        
-        # Create leaderboard entries
-        leaderboard = []
-        for client_data in client_stats.values():
-            if client_data['habit_count'] > 0:
-                avg_progress = client_data['total_progress'] / client_data['habit_count']
-                leaderboard.append({
-                    'client_id': client_data['client_id'],
-                    'name': client_data['name'],
-                    'progress': round(avg_progress, 1),
-                    'habit_count': client_data['habit_count'],
-                    'total_streak': client_data['total_streak'],
-                    'is_current_user': client_data['client_id'] == current_user_id
-                })
-        
-        # Sort by progress (descending), then by total_streak (descending)
-        leaderboard.sort(key=lambda x: (x['progress'], x['total_streak']), reverse=True)
-        
-        # Add ranks and limit to top 10 + current user
-        for i, entry in enumerate(leaderboard):
-            entry['rank'] = i + 1
-        
-        # Ensure current user is included even if not in top 10
-        top_10 = leaderboard[:10]
-        current_user_entry = next((entry for entry in leaderboard if entry['is_current_user']), None)
-        
-        if current_user_entry and current_user_entry not in top_10:
-            top_10.append(current_user_entry)
-        
-        return top_10
+        # Top 10 plus the current user, read from the cached snapshot
+        return get_leaderboard_service(db).get_global_leaderboard(current_user_id, view_type, target_date)
         
     except Exception as e:
         log_error(f"Error calculating proper leaderboard: {str(e)}")
@@ -3,6 +3,8 @@ from utils.logger import log_info, log_error, log_warning
 from datetime import datetime, timedelta
 import json
 from flow_handlers.flow_response_handler import process_flow_webhook
+from services.webhook_ingestion import WebhookIngestionQueue, get_ingestion_queue
+from services.message_dedup import get_dedup_store, DUPLICATE_ID, RAPID_DUPLICATE
 
 webhooks_bp = Blueprint('webhooks', __name__)
 
@@ -31,260 +33,293 @@ def whatsapp_webhook():
     # POST request contains the actual message
     elif request.method == 'POST':
         try:
-            data = request.get_json()
+            data = request.get_json(silent=True)
             log_info(f"Received webhook data: {data}")
-            
-            # Import the services here to avoid circular imports
-            from app import app
-            
-            # Extract message details
-            if data and 'entry' in data:
-                for entry in data['entry']:
-                    for change in entry.get('changes', []):
-                        value = change.get('value', {})
-                        
-                        # Check if it's a message (not a status update)
-                        if 'messages' in value:
-                            for message in value['messages']:
-                                phone = message.get('from')
-                                message_id = message.get('id')
-                                timestamp = message.get('timestamp')
-                                message_type = message.get('type', 'text')
-                                
-                                # Initialize text variable
-                                text = ''
-                                button_id = ''
-                                
-                                # Handle different message types
-                                if message_type == 'interactive':
-                                    # This is a button click, list reply, or flow response
-                                    interactive = message.get('interactive', {})
-                                    interactive_type = interactive.get('type')
-                                    
-                                    if interactive_type == 'button_reply':
-                                        # Button click
-                                        button_reply = interactive.get('button_reply', {})
-                                        text = button_reply.get('title', '')
-                                        button_id = button_reply.get('id', '')
-                                        log_info(f"Button clicked - ID: {button_id}, Title: {text}")
-                                    elif interactive_type == 'list_reply':
-                                        # List selection
-                                        list_reply = interactive.get('list_reply', {})
-                                        text = list_reply.get('title', '')
-                                        button_id = list_reply.get('id', '')
-                                        log_info(f"List selected - ID: {button_id}, Title: {text}")
-                                    elif interactive_type == 'nfm_reply':
-                                        # WhatsApp Flow response (NFM = New Flow Message)
-                                        log_info("Detected WhatsApp Flow response")
-
-                                        # Get required services
-                                        from app import app
-                                        supabase = app.config['supabase']
-                                        whatsapp_service = app.config['services']['whatsapp']
-
-                                        # Process the flow webhook
-                                        try:
-                                            result = process_flow_webhook(data, supabase, whatsapp_service)
-                                            log_info(f"Flow processing complete - Status: {result.get('status', 'unknown')}")
-
-                                            if result.get('success'):
-                                                log_info(f"Flow processed successfully: {result.get('message', 'No message')}")
-                                            else:
-                                                log_error(f"Flow processing failed: {result.get('error', 'Unknown error')}")
-                                        except Exception as e:
-                                            log_error(f"Error processing flow webhook: {str(e)}")
-
-                                        # Return 200 OK to WhatsApp and skip normal message processing
-                                        continue
-                                
-                                elif message_type == 'button':
-                                    # Legacy button format
-                                    button = message.get('button', {})
-                                    text = button.get('text', '')
-                                    button_id = button.get('payload', '')
-                                    log_info(f"Legacy button - ID: {button_id}, Text: {text}")
-
-                                elif message_type == 'contacts':
-                                    # Contact share (vCard) message
-                                    log_info("Detected contact share message")
-
-                                    # Get required services
-                                    from app import app
-                                    supabase = app.config['supabase']
-                                    whatsapp_service = app.config['services']['whatsapp']
-                                    from services.auth import AuthenticationService, TaskService
-
-                                    # Check if user is logged in as trainer
-                                    auth_service = AuthenticationService(supabase)
-                                    task_service = TaskService(supabase)
-                                    login_status = auth_service.get_login_status(phone)
-
-                                    if login_status == 'trainer':
-                                        # Handle contact message
-                                        try:
-                                            from services.message_handlers.contact_share_handler import handle_contact_message
-
-                                            result = handle_contact_message(
-                                                trainer_phone=phone,
-                                                webhook_data=data,
-                                                task_service=task_service,
-                                                whatsapp_service=whatsapp_service,
-                                                role='trainer'
-                                            )
-
-                                            log_info(f"Contact message processed: {result.get('handler')}")
-
-                                            if not result.get('success'):
-                                                log_error(f"Contact processing failed: {result.get('response')}")
-
-                                        except Exception as e:
-                                            log_error(f"Error processing contact message: {str(e)}")
-                                            whatsapp_service.send_message(
-                                                phone,
-                                                "❌ Sorry, I encountered an error processing that contact. Please try again."
-                                            )
-                                    else:
-                                        # User not logged in as trainer
-                                        whatsapp_service.send_message(
-                                            phone,
-                                            "📇 Contact sharing is only available for trainers. Please log in as a trainer first."
-                                        )
-
-                                    # Skip normal message processing for contacts
-                                    continue
-
-                                else:
-                                    # Regular text message or other types
-                                    text = message.get('text', {}).get('body', '')
-                                
-                                # If we have a button_id but no text, use the button_id as text
-                                if button_id and not text:
-                                    # Map button IDs to their expected text
-                                    button_map = {
-                                        'register_trainer': "I'm a Trainer",
-                                        'register_client': 'Find a Trainer',
-                                        'learn_about_me': 'Learn about me'
-                                    }
-                                    text = button_map.get(button_id, button_id)
-                                    log_info(f"Mapped button_id '{button_id}' to text '{text}'")
-                                
-                                # Log what we extracted
-                                log_info(f"Message type: {message_type}, Text: '{text}', Button ID: '{button_id}'")
-                                
-                                # Get Supabase client
-                                supabase = app.config['supabase']
-                                
-                                # Check 1: Exact duplicate (same WhatsApp message ID)
-                                try:
-                                    existing = supabase.table('processed_messages').select('id').eq(
-                                        'whatsapp_message_id', message_id
-                                    ).execute()
-                                    
-                                    if existing.data:
-                                        log_info(f"Duplicate webhook for message {message_id} ignored")
-                                        continue
-                                except Exception as e:
-                                    # If table doesn't exist yet, continue processing
-                                    log_warning(f"Could not check for duplicates: {str(e)}")
-                                
-                                # Check 2: Rapid-fire same content (prevents same text within 2 seconds)
-                                # Only check if text is not empty
-                                if text:
-                                    try:
-                                        recent_duplicate = supabase.table('processed_messages').select('id').eq(
-                                            'phone_number', phone
-                                        ).eq('message_text', text).gte(
-                                            'created_at', (datetime.now() - timedelta(seconds=2)).isoformat()
-                                        ).execute()
-                                        
-                                        if recent_duplicate.data:
-                                            log_info(f"Rapid duplicate from {phone} ignored: {text[:50]}")
-                                            continue
-                                    except Exception as e:
-                                        # If check fails, continue processing to avoid blocking messages
-                                        log_warning(f"Could not check for rapid duplicates: {str(e)}")
-                                
-                                # Store message to prevent reprocessing
-                                try:
-                                    supabase.table('processed_messages').insert({
-                                        'whatsapp_message_id': message_id,
-                                        'phone_number': phone,
-                                        'message_text': text[:500] if text else button_id or 'empty',  # Store button_id if no text
-                                        'timestamp': str(timestamp) if timestamp else None,
-                                        'created_at': datetime.now().isoformat()
-                                    }).execute()
-                                except Exception as e:
-                                    # Log but don't block message processing
-                                    log_warning(f"Could not store processed message: {str(e)}")
-                                
-                                log_info(f"Processing message from {phone}: {text or 'EMPTY MESSAGE'}")
-                                
-                                # Handle empty messages
-                                if not text and not button_id:
-                                    log_warning(f"Empty message received from {phone}")
-                                    whatsapp_service = app.config['services']['whatsapp']
-                                    prompt = (
-                                        "I didn't catch that! 😊\n\n"
-                                        "Please send me a message or use one of the buttons."
-                                    )
-                                    whatsapp_service.send_message(phone, prompt)
-                                    continue
-                                
-                                # PHASE 1 & 2 INTEGRATION: Use MessageRouter for new system
-                                try:
-                                    from services.message_router import MessageRouter
-                                    whatsapp_service = app.config['services']['whatsapp']
-                                    
-                                    # Enable test mode if environment variable is set
-                                    import os
-                                    if os.getenv('TEST_MODE') == 'true' and hasattr(whatsapp_service, 'test_mode'):
-                                        whatsapp_service.test_mode = True
-                                        log_info("Test mode enabled for WhatsApp service")
-                                    
-                                    # Initialize MessageRouter
-                                    router = MessageRouter(supabase, whatsapp_service)
-                                    
-                                    # Route the message (pass button_id for Phase 2 invitation handling)
-                                    result = router.route_message(phone, text, button_id=button_id if button_id else None)
-                                    
-                                    log_info(f"Message routed successfully: {result.get('handler')}")
-                                    
-                                except Exception as router_error:
-                                    log_error(f"MessageRouter error: {str(router_error)}")
-
-                                    # Last resort fallback
-                                    whatsapp_service = app.config['services']['whatsapp']
-                                    whatsapp_service.send_message(
-                                        phone,
-                                        "Sorry, I encountered an error. Please try again."
-                                    )
-                                    result = {'success': False}
-                                    
-                                    # Fallback to old system if Phase 1 fails
-                                    # log_info("Falling back to legacy Refiloe handler")
-                                    # refiloe = app.config['services']['refiloe']
-                                    
-                                    # if hasattr(refiloe, 'handle_message'):
-                                    #     result = refiloe.handle_message(phone, text)
-                                    # elif hasattr(refiloe, 'process_whatsapp_message'):
-                                    #     result = refiloe.process_whatsapp_message(phone, text)
-                                    # else:
-                                    #     # Last resort fallback
-                                    #     whatsapp_service = app.config['services']['whatsapp']
-                                    #     whatsapp_service.send_message(
-                                    #         phone,
-                                    #         "Sorry, I encountered an error. Please try again."
-                                    #     )
-                                    #     result = {'success': False}
-                                
-                                log_info(f"Message processed: {result}")
-            
+
+            is_valid, error = WebhookIngestionQueue.validate_payload(data)
+            if not is_valid:
+                log_warning(f"Rejected invalid webhook payload: {error}")
+                return jsonify({'error': error}), 400
+
+            if not data.get('entry'):
+                return jsonify({'status': 'success'}), 200
+
+            from config import Config
+
+            if not getattr(Config, 'WEBHOOK_ASYNC_ENABLED', True):
+                # Synchronous processing (debugging / test mode)
+                for message in WebhookIngestionQueue.extract_messages(data):
+                    process_webhook_message(message, data)
+                return jsonify({'status': 'success'}), 200
+
+            # Persist and enqueue, then acknowledge straight away so that slow
+            # AI replies never hold the request open and trigger Meta retries
+            result = get_ingestion_queue(process_webhook_message).submit(data)
+
+            if result['rejected']:
+                # Queue is saturated - let WhatsApp redeliver the payload later. Messages
+                # that were accepted this time are dropped as duplicates on redelivery
+                return jsonify({'status': 'busy'}), 503
+
             return jsonify({'status': 'success'}), 200
-            
+
         except Exception as e:
             log_error(f"Error processing webhook: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+
+@webhooks_bp.route('/webhook/metrics', methods=['GET'])
+def webhook_metrics():
+    """Expose ingestion queue depth, wait time, processing time, cache counters and AI call stats"""
+    from config import Config
+    from services.ai_gateway import get_ai_gateway
+    from services.ai_intent.core.intent_cache import get_intent_cache
+    from services.ai_intent.core.local_classifier import get_local_intent_classifier
+    from services.auth.core.identity_cache import get_identity_cache
+    from services.auth.tasks.task_state_cache import get_task_state_cache
+
+    from services.message_dedup import get_dedup_stats
+
+    task_state_cache = get_task_state_cache()
+    caches = {
+        'identity_cache': get_identity_cache().get_stats(),
+        'task_state_cache': task_state_cache.get_stats() if task_state_cache else None,
+        'dedup': get_dedup_stats()
+    }
+    ai_stats = {
+        **get_ai_gateway().get_stats(),
+        'local_intent': get_local_intent_classifier().get_stats(),
+        'intent_cache': get_intent_cache().get_stats()
+    }
+
+    if not getattr(Config, 'WEBHOOK_ASYNC_ENABLED', True):
+        return jsonify({'async_enabled': False, 'caches': caches, 'ai': ai_stats}), 200
+
+    metrics = get_ingestion_queue(process_webhook_message).get_metrics()
+    return jsonify({'async_enabled': True, **metrics, 'caches': caches, 'ai': ai_stats}), 200
+
+
+def process_webhook_message(message, data):
+    """
+    Process a single inbound WhatsApp message.
+
+    Called by the ingestion queue workers (or inline when async processing is
+    disabled). Messages from the same phone are always processed in order.
+
+    Args:
+        message: Message object from the webhook payload
+        data: Full webhook payload the message arrived in
+    """
+    # Import the services here to avoid circular imports
+    from app import app
+
+    phone = message.get('from')
+    message_id = message.get('id')
+    timestamp = message.get('timestamp')
+    message_type = message.get('type', 'text')
+
+    # Initialize text variable
+    text = ''
+    button_id = ''
+
+    # Handle different message types
+    if message_type == 'interactive':
+        # This is a button click, list reply, or flow response
+        interactive = message.get('interactive', {})
+        interactive_type = interactive.get('type')
+
+        if interactive_type == 'button_reply':
+            # Button click
+            button_reply = interactive.get('button_reply', {})
+            text = button_reply.get('title', '')
+            button_id = button_reply.get('id', '')
+            log_info(f"Button clicked - ID: {button_id}, Title: {text}")
+        elif interactive_type == 'list_reply':
+            # List selection
+            list_reply = interactive.get('list_reply', {})
+            text = list_reply.get('title', '')
+            button_id = list_reply.get('id', '')
+            log_info(f"List selected - ID: {button_id}, Title: {text}")
+        elif interactive_type == 'nfm_reply':
+            # WhatsApp Flow response (NFM = New Flow Message)
+            log_info("Detected WhatsApp Flow response")
+
+            # Get required services
+            from app import app
+            supabase = app.config['supabase']
+            whatsapp_service = app.config['services']['whatsapp']
+
+            # Process the flow webhook
+            try:
+                result = process_flow_webhook(data, supabase, whatsapp_service)
+                log_info(f"Flow processing complete - Status: {result.get('status', 'unknown')}")
+
+                if result.get('success'):
+                    log_info(f"Flow processed successfully: {result.get('message', 'No message')}")
+                else:
+                    log_error(f"Flow processing failed: {result.get('error', 'Unknown error')}")
+            except Exception as e:
+                log_error(f"Error processing flow webhook: {str(e)}")
+
+            # Return 200 OK to WhatsApp and skip normal message processing
+            return
+
+    elif message_type == 'button':
+        # Legacy button format
+        button = message.get('button', {})
+        text = button.get('text', '')
+        button_id = button.get('payload', '')
+        log_info(f"Legacy button - ID: {button_id}, Text: {text}")
+
+    elif message_type == 'contacts':
+        # Contact share (vCard) message
+        log_info("Detected contact share message")
+
+        # Get required services
+        from app import app
+        supabase = app.config['supabase']
+        whatsapp_service = app.config['services']['whatsapp']
+        from services.message_router import get_message_router
+
+        # Check if user is logged in as trainer
+        router = get_message_router(supabase, whatsapp_service)
+        auth_service = router.auth_service
+        task_service = router.task_service
+        login_status = auth_service.get_login_status(phone)
+
+        if login_status == 'trainer':
+            # Handle contact message
+            try:
+                from services.message_handlers.contact_share_handler import handle_contact_message
+
+                result = handle_contact_message(
+                    trainer_phone=phone,
+                    webhook_data=data,
+                    task_service=task_service,
+                    whatsapp_service=whatsapp_service,
+                    role='trainer'
+                )
+
+                log_info(f"Contact message processed: {result.get('handler')}")
+
+                if not result.get('success'):
+                    log_error(f"Contact processing failed: {result.get('response')}")
+
+            except Exception as e:
+                log_error(f"Error processing contact message: {str(e)}")
+                whatsapp_service.send_message(
+                    phone,
+                    "❌ Sorry, I encountered an error processing that contact. Please try again."
+                )
+        else:
+            # User not logged in as trainer
+            whatsapp_service.send_message(
+                phone,
+                "📇 Contact sharing is only available for trainers. Please log in as a trainer first."
+            )
+
+        # Skip normal message processing for contacts
+        return
+
+    else:
+        # Regular text message or other types
+        text = message.get('text', {}).get('body', '')
+
+    # If we have a button_id but no text, use the button_id as text
+    if button_id and not text:
+        # Map button IDs to their expected text
+        button_map = {
+            'register_trainer': "I'm a Trainer",
+            'register_client': 'Find a Trainer',
+            'learn_about_me': 'Learn about me'
+        }
+        text = button_map.get(button_id, button_id)
+        log_info(f"Mapped button_id '{button_id}' to text '{text}'")
+
+    # Log what we extracted
+    log_info(f"Message type: {message_type}, Text: '{text}', Button ID: '{button_id}'")
+
+    # Get Supabase client
+    supabase = app.config['supabase']
+
+    # Duplicate checks: exact WhatsApp message ID, then the same text from the
+    # same phone within 2 seconds. The store also records the message.
+    duplicate = get_dedup_store(supabase).check_and_record(
+        message_id, phone, text,
+        record_text=text[:500] if text else button_id or 'empty',  # Store button_id if no text
+        timestamp=timestamp
+    )
+
+    if duplicate == DUPLICATE_ID:
+        log_info(f"Duplicate webhook for message {message_id} ignored")
+        return
+    if duplicate == RAPID_DUPLICATE:
+        log_info(f"Rapid duplicate from {phone} ignored: {text[:50]}")
+        return
+
+    log_info(f"Processing message from {phone}: {text or 'EMPTY MESSAGE'}")
+
+    # Handle empty messages
+    if not text and not button_id:
+        log_warning(f"Empty message received from {phone}")
+        whatsapp_service = app.config['services']['whatsapp']
+        prompt = (
+            "I didn't catch that! 😊\n\n"
+            "Please send me a message or use one of the buttons."
+        )
+        whatsapp_service.send_message(phone, prompt)
+        return
+
+    # PHASE 1 & 2 INTEGRATION: Use MessageRouter for new system
+    try:
+        from services.message_router import get_message_router
+        whatsapp_service = app.config['services']['whatsapp']
+
+        # Enable test mode if environment variable is set
+        import os
+        if os.getenv('TEST_MODE') == 'true' and hasattr(whatsapp_service, 'test_mode'):
+            whatsapp_service.test_mode = True
+            log_info("Test mode enabled for WhatsApp service")
+
+        # Long-lived MessageRouter (handler graph is built once per process)
+        router = get_message_router(supabase, whatsapp_service)
+
+        # Route the message (pass button_id for Phase 2 invitation handling)
+        result = router.route_message(phone, text, button_id=button_id if button_id else None)
+
+        log_info(f"Message routed successfully: {result.get('handler')}")
+
+    except Exception as router_error:
+        log_error(f"MessageRouter error: {str(router_error)}")
+
+        # Last resort fallback
+        whatsapp_service = app.config['services']['whatsapp']
+        whatsapp_service.send_message(
+            phone,
+            "Sorry, I encountered an error. Please try again."
+        )
+        result = {'success': False}
+
+        # Fallback to old system if Phase 1 fails
+        # log_info("Falling back to legacy Refiloe handler")
+        # refiloe = app.config['services']['refiloe']
+
+        # if hasattr(refiloe, 'handle_message'):
+        #     result = refiloe.handle_message(phone, text)
+        # elif hasattr(refiloe, 'process_whatsapp_message'):
+        #     result = refiloe.process_whatsapp_message(phone, text)
+        # else:
+        #     # Last resort fallback
+        #     whatsapp_service = app.config['services']['whatsapp']
+        #     whatsapp_service.send_message(
+        #         phone,
+        #         "Sorry, I encountered an error. Please try again."
+        #     )
+        #     result = {'success': False}
+
+    log_info(f"Message processed: {result}")
+
+
 @webhooks_bp.route('/payfast', methods=['POST'])
 def payfast_webhook():
     return jsonify({'message': 'Webhook received'}), 200
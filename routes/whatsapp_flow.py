@@ -4,11 +4,8 @@ from datetime import datetime
 import hashlib
 import hmac
 import json
-import base64
 import os
-from cryptography.hazmat.primitives.asymmetric.padding import OAEP, MGF1, hashes
-from cryptography.hazmat.primitives.ciphers import algorithms, Cipher, modes
-from cryptography.hazmat.primitives.serialization import load_pem_private_key
+from services.flow_crypto import get_flow_crypto
 from flow_handlers.flow_data_exchange import handle_flow_data_exchange, get_collected_data
 
 whatsapp_flow_bp = Blueprint('whatsapp_flow', __name__)
@@ -16,30 +13,8 @@ whatsapp_flow_bp = Blueprint('whatsapp_flow', __name__)
 def decrypt_request(encrypted_flow_data_b64, encrypted_aes_key_b64, initial_vector_b64):
     """Decrypt WhatsApp Flow request data"""
     try:
-        # Load private key from environment
-        private_key_str = os.environ.get('WHATSAPP_FLOW_PRIVATE_KEY')
-        if not private_key_str:
-            raise Exception("WHATSAPP_FLOW_PRIVATE_KEY environment variable not set")
-        
-        flow_data = base64.b64decode(encrypted_flow_data_b64)
-        iv = base64.b64decode(initial_vector_b64)
-        
-        # Decrypt the AES encryption key
-        encrypted_aes_key = base64.b64decode(encrypted_aes_key_b64)
-        private_key = load_pem_private_key(
-            private_key_str.encode('utf-8'), password=None)
-        aes_key = private_key.decrypt(encrypted_aes_key, OAEP(
-            mgf=MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None))
-        
-        # Decrypt the Flow data
-        encrypted_flow_data_body = flow_data[:-16]
-        encrypted_flow_data_tag = flow_data[-16:]
-        decryptor = Cipher(algorithms.AES(aes_key),
-                          modes.GCM(iv, encrypted_flow_data_tag)).decryptor()
-        decrypted_data_bytes = decryptor.update(
-            encrypted_flow_data_body) + decryptor.finalize()
-        decrypted_data = json.loads(decrypted_data_bytes.decode("utf-8"))
-        return decrypted_data, aes_key, iv
+        return get_flow_crypto().decrypt_request(
+            encrypted_flow_data_b64, encrypted_aes_key_b64, initial_vector_b64)
     except Exception as e:
         log_error(f"Decryption error: {str(e)}")
         raise
@@ -47,19 +22,7 @@ def decrypt_request(encrypted_flow_data_b64, encrypted_aes_key_b64, initial_vect
 def encrypt_response(response, aes_key, iv):
     """Encrypt WhatsApp Flow response data"""
     try:
-        # Flip the initialization vector
-        flipped_iv = bytearray()
-        for byte in iv:
-            flipped_iv.append(byte ^ 0xFF)
-        
-        # Encrypt the response data
-        encryptor = Cipher(algorithms.AES(aes_key),
-                          modes.GCM(flipped_iv)).encryptor()
-        return base64.b64encode(
-            encryptor.update(json.dumps(response).encode("utf-8")) +
-            encryptor.finalize() +
-            encryptor.tag
-        ).decode("utf-8")
+        return get_flow_crypto().encrypt_response(response, aes_key, iv)
     except Exception as e:
         log_error(f"Encryption error: {str(e)}")
         raise
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark for peak memory of CSV exports against an in-memory Supabase stand-in
+Compares building the whole export in memory (all rows fetched into a list,
+CSV built in a StringIO) with the streaming pipeline (paged reads, CSV
+written in chunks) for growing export sizes.
+
+Usage:
+    python scripts/benchmark_exports.py [max_rows]
+"""
+import csv
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.calendar_export_service import CalendarExportService
+from services.helpers.export_stream import write_chunks
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Filters are ignored: every table holds one trainer's bookings for one month"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.bounds = None
+
+    def select(self, *args):
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def gte(self, *args):
+        return self
+
+    def lte(self, *args):
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        rows = self.rows[self.bounds[0]:self.bounds[1] + 1] if self.bounds else self.rows
+        # PostgREST returns fresh rows, not references to stored ones
+        return FakeResult([dict(row) for row in rows])
+
+
+class FakeSupabase:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def table(self, name):
+        return FakeQuery(self.rows)
+
+
+class Config:
+    TIMEZONE = 'Africa/Johannesburg'
+    SMTP_SERVER = SMTP_PORT = SMTP_USERNAME = SMTP_PASSWORD = SENDER_EMAIL = None
+
+
+def build_bookings(count):
+    return [{
+        'id': n, 'session_date': f'2026-03-{1 + n % 28:02d}', 'session_time': '09:00',
+        'session_type': 'standard', 'status': 'confirmed', 'notes': 'Bring water and a towel',
+        'clients': {'name': f'Client {n}', 'whatsapp': '27610000000', 'email': f'client{n}@example.com'}
+    } for n in range(count)]
+
+
+def in_memory_export(db):
+    """Old behaviour: every booking in one list, the whole CSV in a StringIO"""
+    bookings = db.table('bookings').select('*').eq('trainer_id', 't1').execute().data
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['Date', 'Time', 'Client', 'Phone', 'Email', 'Type', 'Status', 'Notes'])
+    for booking in bookings:
+        client = booking.get('clients', {})
+        writer.writerow([booking.get('session_date'), booking.get('session_time'), client.get('name', ''),
+                         client.get('whatsapp', ''), client.get('email', ''), booking.get('session_type'),
+                         booking.get('status', ''), booking.get('notes', '')])
+    return output.getvalue().encode('utf-8')
+
+
+def streamed_export(db):
+    service = CalendarExportService(db, Config)
+    with open(os.devnull, 'w') as devnull:
+        write_chunks(service.iter_csv(service.iter_month_bookings('t1', 3, 2026)), devnull)
+
+
+def measure(fn, db):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(db)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print(f"{'rows':>8}   {'in memory':>20}   {'streamed':>20}")
+    rows = 10
+    while rows <= max_rows:
+        db = FakeSupabase(build_bookings(rows))
+        old_time, old_peak = measure(in_memory_export, db)
+        new_time, new_peak = measure(streamed_export, db)
+        print(f"{rows:>8}   {old_peak:>7.2f} MB {old_time:>7.2f} s   {new_peak:>7.2f} MB {new_time:>7.2f} s")
+        rows *= 10
+
+
+if __name__ == '__main__':
+    main()
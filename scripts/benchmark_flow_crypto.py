@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for WhatsApp Flow data-exchange crypto
+Measures decrypt + encrypt round trips per second per core, comparing parsing
+the private key on every request (old routes/whatsapp_flow.py behaviour) with
+the shared FlowCrypto path.
+
+Usage:
+    python scripts/benchmark_flow_crypto.py [iterations]
+"""
+import base64
+import json
+import logging
+import os
+import sys
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+from services.flow_crypto import _OAEP_SHA256, FlowCrypto, FlowKeyRing
+
+
+REQUEST = {
+    'version': '3.0',
+    'action': 'data_exchange',
+    'screen': 'basic_info',
+    'flow_token': 'trainer_onboarding_27710000000_1700000000',
+    'data': {'first_name': 'Thandi', 'surname': 'Mokoena', 'email': 'thandi@example.com'}
+}
+RESPONSE = {'version': '3.0', 'screen': 'business_details', 'data': {'first_name': 'Thandi'}}
+
+
+def build_request(public_key):
+    aes_key = AESGCM.generate_key(bit_length=128)
+    iv = os.urandom(16)
+    flow_data = AESGCM(aes_key).encrypt(iv, json.dumps(REQUEST).encode('utf-8'), None)
+    return (
+        base64.b64encode(flow_data).decode(),
+        base64.b64encode(public_key.encrypt(aes_key, _OAEP_SHA256)).decode(),
+        base64.b64encode(iv).decode()
+    )
+
+
+def per_request_key(pem):
+    """Old behaviour: load_pem_private_key and Cipher objects on every request"""
+    def round_trip(flow_data_b64, aes_key_b64, iv_b64):
+        flow_data = base64.b64decode(flow_data_b64)
+        iv = base64.b64decode(iv_b64)
+        private_key = load_pem_private_key(pem, password=None)
+        aes_key = private_key.decrypt(base64.b64decode(aes_key_b64), _OAEP_SHA256)
+
+        decryptor = Cipher(algorithms.AES(aes_key), modes.GCM(iv, flow_data[-16:])).decryptor()
+        json.loads(decryptor.update(flow_data[:-16]) + decryptor.finalize())
+
+        encryptor = Cipher(algorithms.AES(aes_key), modes.GCM(bytes(b ^ 0xFF for b in iv))).encryptor()
+        return base64.b64encode(
+            encryptor.update(json.dumps(RESPONSE).encode('utf-8')) + encryptor.finalize() + encryptor.tag
+        ).decode()
+    return round_trip
+
+
+def shared_crypto(pem):
+    """New behaviour: key parsed once, AESGCM one-shot calls"""
+    crypto = FlowCrypto(FlowKeyRing(lambda: pem))
+
+    def round_trip(flow_data_b64, aes_key_b64, iv_b64):
+        _, aes_key, iv = crypto.decrypt_request(flow_data_b64, aes_key_b64, iv_b64)
+        return crypto.encrypt_response(RESPONSE, aes_key, iv)
+    return round_trip
+
+
+def measure(label, round_trip, requests):
+    round_trip(*requests[0])
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for request in requests:
+        round_trip(*request)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    per_core = len(requests) / cpu if cpu else float('inf')
+    print(f"{label:<20} {per_core:>9.0f} req/s/core   {wall / len(requests) * 1000:>7.3f} ms/request")
+    return per_core
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    logging.disable(logging.CRITICAL)
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    requests = [build_request(key.public_key()) for _ in range(iterations)]
+
+    print(f"{iterations} decrypt+encrypt round trips, RSA-2048 / AES-128-GCM, single thread\n")
+    old = measure('per-request key', per_request_key(pem), requests)
+    new = measure('shared FlowCrypto', shared_crypto(pem), requests)
+
+    print(f"\n{new / old:.1f}x more round trips per core")
+
+
+if __name__ == '__main__':
+    main()
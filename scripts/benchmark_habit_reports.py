@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmark for habit CSV reports against an in-memory Supabase stand-in
+Each query sleeps for a simulated round trip and, like PostgREST, returns
+at most MAX_ROWS rows. Compares the old per-habit
+report loop (one habit_logs query per habit per client, CSV built in a
+StringIO) with the bulk-fetch reports: one monthly report per client, and
+one streamed trainer-wide report.
+
+Usage:
+    python scripts/benchmark_habit_reports.py [clients] [habits] [round_trip_ms]
+"""
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from calendar import monthrange
+from datetime import date, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.habits.report_service import ReportService
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+# PostgREST's default max-rows: larger reads come back truncated
+MAX_ROWS = 1000
+
+
+class FakeQuery:
+    def __init__(self, db, rows):
+        self.db = db
+        self.rows = rows
+        self.filters = []
+        self.bounds = None
+        self.sort = None
+        self.count = None
+
+    def select(self, *args):
+        return self
+
+    def order(self, column, desc=False):
+        self.sort = column
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def eq(self, column, value):
+        return self.in_(column, [value])
+
+    def in_(self, column, values):
+        values = set(values)
+        index = self.db.indexes.get(id(self.rows)) if column == 'client_id' else None
+        if index is not None:
+            # Stand-in for the database's client_id index
+            self.rows = [row for value in values for row in index.get(value, [])]
+        else:
+            self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        self.db.queries += 1
+        time.sleep(self.db.round_trip)
+        rows = [row for row in self.rows if all(f(row) for f in self.filters)]
+        if self.sort:
+            rows = sorted(rows, key=lambda row: row[self.sort])
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        return FakeResult(rows[:min(self.count or MAX_ROWS, MAX_ROWS)])
+
+
+class FakeSupabase:
+    def __init__(self, tables, round_trip):
+        self.tables = tables
+        self.round_trip = round_trip
+        self.queries = 0
+        self.indexes = {}
+        for rows in tables.values():
+            index = {}
+            for row in rows:
+                index.setdefault(row.get('client_id'), []).append(row)
+            self.indexes[id(rows)] = index
+
+    def table(self, name):
+        return FakeQuery(self, self.tables.get(name, []))
+
+
+def build_tables(clients, habits, month_start, days):
+    tables = {'clients': [], 'trainee_habit_assignments': [], 'habit_logs': []}
+    for c in range(clients):
+        client_id = f'c{c}'
+        tables['clients'].append({'client_id': client_id, 'name': f'Client {c}'})
+        for h in range(habits):
+            habit = {'habit_id': f'h{h}', 'habit_name': f'Habit {h}', 'target_value': 8, 'unit': 'glasses'}
+            tables['trainee_habit_assignments'].append({
+                'id': len(tables['trainee_habit_assignments']), 'client_id': client_id, 'trainer_id': 't1',
+                'is_active': True, 'fitness_habits': habit
+            })
+            for d in range(0, days, 2):
+                tables['habit_logs'].append({
+                    'id': len(tables['habit_logs']), 'client_id': client_id, 'habit_id': f'h{h}',
+                    'log_date': (month_start + timedelta(days=d)).isoformat(), 'completed_value': (c + h + d) % 10
+                })
+    return tables
+
+
+def legacy_monthly_report(db, client_id, month_start, month_end):
+    """Old behaviour: one habit_logs query per habit and the whole CSV in a StringIO"""
+    assignments = db.table('trainee_habit_assignments').select('*, fitness_habits(*)') \
+        .eq('client_id', client_id).eq('is_active', True).execute()
+    csv_data = []
+    for assignment in assignments.data:
+        habit = assignment['fitness_habits']
+        target = float(habit['target_value'])
+        logs = db.table('habit_logs').select('log_date, completed_value').eq('client_id', client_id) \
+            .eq('habit_id', habit['habit_id']).gte('log_date', month_start.isoformat()) \
+            .lte('log_date', month_end.isoformat()).order('log_date').execute()
+        daily_totals = {}
+        for log in logs.data:
+            daily_totals[log['log_date']] = daily_totals.get(log['log_date'], 0) + log['completed_value']
+        current = month_start
+        while current <= month_end:
+            completed = daily_totals.get(current.isoformat(), 0)
+            csv_data.append({
+                'Date': current.isoformat(), 'Day': current.strftime('%A'), 'Habit': habit['habit_name'],
+                'Target': target, 'Unit': habit['unit'], 'Completed': completed,
+                'Due': max(0, target - completed), 'Completion %': round(completed / target * 100, 1)
+            })
+            current += timedelta(days=1)
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=list(csv_data[0].keys()))
+    writer.writeheader()
+    writer.writerows(csv_data)
+    return output.getvalue()
+
+
+def run(label, tables, round_trip, fn):
+    db = FakeSupabase(tables, round_trip)
+    start = time.perf_counter()
+    fn(db)
+    elapsed = time.perf_counter() - start
+
+    # Memory on a second pass without round trips; tracemalloc would skew the timing
+    tracemalloc.start()
+    fn(FakeSupabase(tables, 0))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<44} {elapsed:>8.2f} s   {db.queries:>6} queries   {peak / 1024 / 1024:>7.1f} MB peak")
+    return elapsed
+
+
+def main():
+    args = sys.argv[1:]
+    clients = int(args[0]) if args else 100
+    habits = int(args[1]) if len(args) > 1 else 10
+    round_trip = (float(args[2]) if len(args) > 2 else 5) / 1000
+
+    month_start = date(2026, 3, 1)
+    days = monthrange(month_start.year, month_start.month)[1]
+    month_end = month_start + timedelta(days=days - 1)
+    tables = build_tables(clients, habits, month_start, days)
+    client_ids = [client['client_id'] for client in tables['clients']]
+    out_path = os.path.join(tempfile.mkdtemp(), 'trainer_report.csv')
+
+    def legacy(db):
+        for client_id in client_ids:
+            legacy_monthly_report(db, client_id, month_start, month_end)
+
+    def per_client(db):
+        service = ReportService(db)
+        for client_id in client_ids:
+            service.generate_monthly_report(client_id, month_start.month, month_start.year)
+
+    def trainer_wide(db):
+        with open(out_path, 'w', encoding='utf-8', newline='') as f:
+            ReportService(db).generate_trainer_clients_report('t1', month_start, month_end, output=f)
+
+    import services.habits.report_service as report_service
+    report_service.log_info = lambda message: None
+
+    print(f"Monthly reports: {clients} clients x {habits} habits, {len(tables['habit_logs'])} logs, "
+          f"{round_trip * 1000:.0f} ms per query\n")
+    old = run('per-habit queries, StringIO (old)', tables, round_trip, legacy)
+    new = run('bulk fetch, one report per client', tables, round_trip, per_client)
+    wide = run('bulk fetch, one trainer report streamed', tables, round_trip, trainer_wide)
+
+    print(f"\nPer client: {old / new:.1f}x   Trainer-wide: {old / wide:.1f}x   "
+          f"({os.path.getsize(out_path) / 1024 / 1024:.1f} MB CSV written to disk)")
+
+
+if __name__ == '__main__':
+    main()
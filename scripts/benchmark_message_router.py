@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for MessageRouter construction
+Compares building the router + handler graph for every message (old webhook
+behaviour) with reusing the process-wide router from get_message_router.
+
+Usage:
+    python scripts/benchmark_message_router.py [iterations]
+"""
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from services.message_router import MessageRouter, get_message_router, reset_message_routers
+
+# Never reach the real Claude API from a benchmark - the AI step uses its fallback
+Config.ANTHROPIC_API_KEY = None
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """Chainable stand-in for a postgrest query builder"""
+
+    def __init__(self, rows):
+        self._rows = rows
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+    def execute(self):
+        return FakeResult(self._rows)
+
+
+class FakeSupabase:
+    """Returns a logged-in trainer for 'users'/'trainers' and nothing else"""
+
+    USER = {
+        'id': 1, 'phone_number': '27710000000', 'login_status': 'trainer',
+        'trainer_id': 'TR001', 'client_id': None
+    }
+
+    def table(self, name):
+        if name in ('users', 'trainers'):
+            return FakeQuery([dict(self.USER)])
+        return FakeQuery([])
+
+
+class FakeWhatsApp:
+    def send_message(self, phone, message):
+        return {'success': True}
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: {'success': True}
+
+
+def per_message_router(db, whatsapp, phone, message):
+    """Old behaviour: a fresh router and handler graph for every message"""
+    router = MessageRouter(db, whatsapp)
+    return router.route_message(phone, message)
+
+
+def shared_router(db, whatsapp, phone, message):
+    """New behaviour: one router per process"""
+    return get_message_router(db, whatsapp).route_message(phone, message)
+
+
+def measure(label, func, iterations, db, whatsapp):
+    phone = '27710000000'
+
+    # Warm up imports and the shared router
+    func(db, whatsapp, phone, 'show my profile')
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(db, whatsapp, phone, 'show my profile')
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    allocated = sum(stat.size for stat in snapshot.statistics('filename'))
+    per_message_us = elapsed / iterations * 1_000_000
+
+    print(f"{label:<22} {per_message_us:>10.1f} us/msg   "
+          f"live alloc {allocated / 1024:>8.1f} KiB   peak {peak / 1024:>8.1f} KiB")
+    return per_message_us
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    # Handlers log on every construction/route; keep the output readable
+    logging.disable(logging.CRITICAL)
+
+    db = FakeSupabase()
+    whatsapp = FakeWhatsApp()
+    reset_message_routers()
+
+    print(f"Routing {iterations} logged-in messages (fake Supabase, no network)\n")
+    old = measure('per-message router', per_message_router, iterations, db, whatsapp)
+    new = measure('shared router', shared_router, iterations, db, whatsapp)
+
+    print(f"\nSaved {old - new:.1f} us per message ({old / new:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Benchmark for outbound WhatsApp sends against a local mock Graph API server
+Compares a bare requests.post per message (new TCP + TLS handshake each time)
+with the pooled keep-alive GraphTransport, for sequential bulk sends and for
+several sending threads.
+
+Usage:
+    python scripts/benchmark_whatsapp_transport.py [messages] [threads] [--no-tls]
+"""
+import datetime
+import json
+import logging
+import os
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from services.whatsapp import WhatsAppService
+from services.whatsapp_transport import GraphTransport
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the Graph messages endpoint"""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this, Nagle + delayed ACK
+    # adds ~40ms to every keep-alive response
+    disable_nagle_algorithm = True
+    connections = 0
+    _lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with MockGraphHandler._lock:
+            MockGraphHandler.connections += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        body = json.dumps({'messages': [{'id': f'wamid.{time.time_ns()}'}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def self_signed_cert(directory):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.utcnow()
+    cert = (
+        x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+        .serial_number(x509.random_serial_number()).not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost')]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = os.path.join(directory, 'cert.pem')
+    key_path = os.path.join(directory, 'key.pem')
+    with open(cert_path, 'wb') as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, 'wb') as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+    return cert_path, key_path
+
+
+def start_server(use_tls):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockGraphHandler)
+    server.daemon_threads = True
+    cert_path = None
+    if use_tls:
+        cert_path, key_path = self_signed_cert(tempfile.mkdtemp())
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheme = 'https' if use_tls else 'http'
+    return server, f"{scheme}://localhost:{server.server_address[1]}/v17.0/123/messages", cert_path
+
+
+class BareRequestsTransport:
+    """Old behaviour: module-level requests.post for every message"""
+
+    def __init__(self, verify):
+        self.verify = verify
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        return requests.post(url, json=json, headers=headers, timeout=10, verify=self.verify)
+
+
+def run(label, transport, url, messages, threads):
+    config = SimpleNamespace(WHATSAPP_API_URL=url, WHATSAPP_API_TOKEN='token', TIMEZONE='Africa/Johannesburg')
+    service = WhatsAppService(config, None, None, transport=transport)
+    recipients = [{'phone': f'2782{i:07d}', 'name': 'Client'} for i in range(messages)]
+
+    MockGraphHandler.connections = 0
+    start = time.perf_counter()
+    if threads == 1:
+        result = service.send_bulk_messages(recipients, 'Hi {name}, your session is tomorrow at 07:00')
+        sent = len(result['sent'])
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(lambda r: service.send_message(r['phone'], 'Reminder'), recipients))
+        sent = sum(1 for r in results if r['success'])
+    elapsed = time.perf_counter() - start
+
+    print(f"{label:<34} {sent / elapsed:>8.0f} msg/s   {elapsed / messages * 1000:>6.2f} ms/msg   "
+          f"{MockGraphHandler.connections:>5} connections")
+    return sent / elapsed
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    messages = int(args[0]) if args else 500
+    threads = int(args[1]) if len(args) > 1 else 8
+    use_tls = '--no-tls' not in sys.argv
+
+    logging.disable(logging.CRITICAL)
+    server, url, cert_path = start_server(use_tls)
+    verify = cert_path if use_tls else True
+
+    def pooled():
+        transport = GraphTransport(pool_size=threads)
+        # REQUESTS_CA_BUNDLE in the environment would otherwise override verify
+        transport.session.trust_env = False
+        transport.session.verify = verify
+        return transport
+
+    print(f"{messages} sends to a local mock Graph server ({'TLS' if use_tls else 'plain HTTP'})\n")
+    old = run('bare requests.post, sequential', BareRequestsTransport(verify), url, messages, 1)
+    new = run('pooled transport, sequential', pooled(), url, messages, 1)
+    old_threaded = run(f'bare requests.post, {threads} threads', BareRequestsTransport(verify), url, messages, threads)
+    new_threaded = run(f'pooled transport, {threads} threads', pooled(), url, messages, threads)
+
+    print(f"\nSequential: {new / old:.1f}x   {threads} threads: {new_threaded / old_threaded:.1f}x")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
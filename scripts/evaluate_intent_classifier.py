@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of the local intent classifier
+Runs the labelled messages in scripts/intent_eval_messages.json through
+LocalIntentClassifier (no Claude calls) and reports how many would be served
+locally, how accurate those local answers are, and how often a message that
+should go to Claude is answered locally instead. Use it before changing
+config/intent_phrases.json or the INTENT_LOCAL_* thresholds.
+
+Usage:
+    python scripts/evaluate_intent_classifier.py [--eval-file PATH] [--min-confidence X]
+                                                 [--min-similarity X] [--sweep]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.ai_intent.core.local_classifier import LocalIntentClassifier
+from services.ai_intent.utils.intent_types import IntentTypes
+
+EVAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intent_eval_messages.json')
+
+
+def evaluate(classifier, messages):
+    """Decide every message; returns (summary dict, per-intent counters, escalation reasons, latencies)"""
+    intent_types = IntentTypes()
+    per_intent = defaultdict(Counter)
+    reasons = Counter()
+    latencies = []
+    served = correct = wrong_local = 0
+
+    for item in messages:
+        expected = item['intent']
+        started = time.perf_counter()
+        intent, reason = classifier.decide(item['text'], item['role'],
+                                           intent_types.get_intents_for_role(item['role']))
+        latencies.append((time.perf_counter() - started) * 1e6)
+
+        label = expected or '(escalate)'
+        per_intent[label]['total'] += 1
+        if intent is None:
+            reasons[reason] += 1
+            continue
+
+        served += 1
+        per_intent[label]['served'] += 1
+        if intent['intent'] == expected:
+            correct += 1
+            per_intent[label]['correct'] += 1
+        elif expected is None:
+            wrong_local += 1
+
+    summary = {
+        'messages': len(messages),
+        'served': served,
+        'correct': correct,
+        'wrong_local': wrong_local,
+        'should_escalate': sum(1 for item in messages if item['intent'] is None)
+    }
+    return summary, per_intent, reasons, latencies
+
+
+def print_summary(summary):
+    total, served, correct = summary['messages'], summary['served'], summary['correct']
+    print(f"Messages:                 {total}")
+    print(f"Served locally:           {served} ({served / total:.0%})")
+    print(f"Accuracy of local answers: {correct}/{served} ({correct / served:.1%})" if served
+          else "Accuracy of local answers: n/a")
+    print(f"Should-escalate served:   {summary['wrong_local']}/{summary['should_escalate']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--eval-file', default=EVAL_FILE)
+    parser.add_argument('--min-confidence', type=float, default=0.75)
+    parser.add_argument('--min-similarity', type=float, default=0.5)
+    parser.add_argument('--sweep', action='store_true', help='Also report coverage/accuracy per threshold')
+    args = parser.parse_args()
+
+    with open(args.eval_file, encoding='utf-8') as f:
+        messages = json.load(f)['messages']
+
+    classifier = LocalIntentClassifier(min_confidence=args.min_confidence, min_similarity=args.min_similarity)
+    started = time.perf_counter()
+    classifier.decide('warm up', 'client')
+    print(f"Trained in {(time.perf_counter() - started) * 1000:.0f} ms "
+          f"(min_confidence={args.min_confidence}, min_similarity={args.min_similarity})\n")
+
+    summary, per_intent, reasons, latencies = evaluate(classifier, messages)
+    print_summary(summary)
+    print(f"Median decision time:     {statistics.median(latencies):.0f} us\n")
+
+    print(f"{'intent':<24} {'total':>5} {'served':>7} {'correct':>8}")
+    for label in sorted(per_intent):
+        counts = per_intent[label]
+        print(f"{label:<24} {counts['total']:>5} {counts['served']:>7} {counts['correct']:>8}")
+
+    print("\nEscalation reasons:")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:<16} {count}")
+
+    if args.sweep:
+        print(f"\n{'min_conf':>8} {'min_sim':>8} {'served':>8} {'accuracy':>9} {'bad_local':>10}")
+        for min_confidence in (0.5, 0.6, 0.7, 0.75, 0.8, 0.9):
+            for min_similarity in (0.3, 0.4, 0.5, 0.6):
+                classifier.min_confidence, classifier.min_similarity = min_confidence, min_similarity
+                result = evaluate(classifier, messages)[0]
+                accuracy = result['correct'] / result['served'] if result['served'] else 0
+                print(f"{min_confidence:>8.2f} {min_similarity:>8.2f} "
+                      f"{result['served'] / result['messages']:>8.0%} {accuracy:>9.1%} {result['wrong_local']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Prompt size per Claude call, before and after prompt caching
+Builds the intent detection, app_core intent handler and social content
+prompts for sample inputs and compares sending them as one user message
+(before) with a cached system prefix plus per-call suffix (after). Token
+counts are estimated offline (~4 chars/token) unless --api is given, in
+which case the Anthropic token counting endpoint is used.
+
+Billed input per call after caching assumes a warm cache: cache reads cost
+0.1x the normal input price (the first call each 5 minutes writes the
+cache at 1.25x). Prefixes under MIN_CACHEABLE_TOKENS are not cached.
+
+Usage:
+    python scripts/measure_prompt_tokens.py [--api]
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import yaml
+
+from config import Config
+from services.ai_prompt import MIN_CACHEABLE_TOKENS, estimate_tokens
+
+# Build prompts only - never reach Claude with a generation request
+Config.ANTHROPIC_API_KEY, API_KEY = None, Config.ANTHROPIC_API_KEY
+
+from services.ai_intent.utils.prompt_builder import PromptBuilder
+from services.ai_intent_handler import AIIntentHandler
+from social_media.content_generator import ContentGenerator
+
+CONTEXT = {
+    'name': 'Thandi',
+    'recent_tasks': ['log_habits', 'view_progress'],
+    'chat_history': ['Hi Refiloe', 'Hi Thandi! How can I help you today?']
+}
+MESSAGE = "hey, can you show me how I'm doing with my water this week?"
+
+
+def sample_prompts():
+    """(label, CachedPrompt) for each prompt the app sends"""
+    builder = PromptBuilder()
+    handler = AIIntentHandler(None, None)
+
+    # ContentGenerator insists on an API key; only its prompt building is needed here
+    generator = ContentGenerator.__new__(ContentGenerator)
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'social_media', 'config.yaml'), encoding='utf-8') as f:
+        generator.config = yaml.safe_load(f)
+    generator._system_prompt = None
+
+    return [
+        ('intent_detection (client)', builder.build_intent_prompt(MESSAGE, 'client', CONTEXT)),
+        ('intent_detection (trainer)', builder.build_intent_prompt(MESSAGE, 'trainer', CONTEXT)),
+        ('intent_handler (client)', handler._create_intent_prompt(MESSAGE, 'client', CONTEXT)),
+        ('social_content', generator.create_claude_prompt('admin_hacks', 'carousel_style', 'question_hook')),
+    ]
+
+
+def api_counter():
+    """Token counter backed by the count_tokens endpoint"""
+    import anthropic
+
+    client = anthropic.Anthropic(api_key=API_KEY)
+
+    def count(system=None, user='.'):
+        kwargs = {'system': system} if system else {}
+        return client.beta.messages.count_tokens(
+            model=Config.AI_MODEL, messages=[{'role': 'user', 'content': user}], **kwargs
+        ).input_tokens
+
+    return count
+
+
+def offline_counter(system=None, user='.'):
+    return (estimate_tokens(system) if system else 0) + estimate_tokens(user)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--api', action='store_true', help='Count tokens with the Anthropic API')
+    args = parser.parse_args()
+
+    if args.api and not API_KEY:
+        parser.error('--api needs ANTHROPIC_API_KEY')
+    count = api_counter() if args.api else offline_counter
+    print(f"Token counts: {'Anthropic count_tokens' if args.api else 'estimated (~4 chars/token)'}\n")
+
+    print(f"{'prompt':<28} {'before':>7} {'prefix':>7} {'suffix':>7} {'cached':>7} "
+          f"{'billed after':>13} {'saving':>7}")
+    for label, prompt in sample_prompts():
+        before = count(user=prompt.as_text())
+        prefix = count(system=prompt.system) - count()
+        suffix = count(user=prompt.user)
+        cacheable = prefix >= MIN_CACHEABLE_TOKENS
+        billed_after = suffix + (prefix * 0.1 if cacheable else prefix)
+        print(f"{label:<28} {before:>7} {prefix:>7} {suffix:>7} {'yes' if cacheable else 'no':>7} "
+              f"{billed_after:>13.0f} {1 - billed_after / before:>7.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,346 @@
+"""
+AI Gateway
+Process-wide Anthropic client shared by every AI call site, with a pooled
+keep-alive HTTP connection, a cap on concurrent calls, per-call timeouts, a
+retry policy for rate limits and transient server errors, and per-call
+latency and token accounting (including prompt-cache reads and writes).
+"""
+import random
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Union
+
+import anthropic
+import httpx
+
+from services.ai_prompt import CachedPrompt, estimate_tokens
+from utils.json_object import JSONObjectScanner, MalformedJSON, validate_schema
+from utils.logger import log_info, log_warning
+
+
+# Statuses that mean "not processed, try again later"
+# (408 timeout, 409 lock conflict, 429 rate limit, 5xx incl. 529 overloaded)
+RETRY_STATUSES = frozenset({408, 409, 429})
+# Latencies kept for the percentiles in get_stats()
+LATENCY_WINDOW = 1000
+
+
+class AIGatewayBusy(Exception):
+    """Raised when no call slot frees up within the queue timeout"""
+
+
+class AIGateway:
+    """
+    Shared anthropic.Anthropic client.
+
+    At most max_concurrency calls are in flight at once; further callers wait
+    up to queue_timeout for a slot. Calls are retried (up to max_retries) on
+    connection failures, rate limits and 408/409/5xx responses, honouring
+    Retry-After, otherwise backing off exponentially with jitter. Read
+    timeouts are not retried so a slow model cannot multiply the latency of a
+    WhatsApp turn. The SDK's own retries are disabled so every attempt is
+    counted here.
+    """
+
+    def __init__(self, api_key: Optional[str], model: str = 'claude-sonnet-4-20250514', pool_size: int = 20,
+                 max_concurrency: int = 8, connect_timeout: float = 5, read_timeout: float = 30,
+                 max_retries: int = 2, backoff_factor: float = 0.5, max_backoff: float = 20,
+                 queue_timeout: float = 30, client=None, sleep=time.sleep):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.queue_timeout = queue_timeout
+        self._sleep = sleep
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+        self.client = client
+        if self.client is None and api_key:
+            timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+            self.client = anthropic.Anthropic(
+                api_key=api_key,
+                timeout=timeout,
+                max_retries=0,
+                http_client=httpx.Client(
+                    timeout=timeout,
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                )
+            )
+
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.streams_stopped_early = 0
+        self.malformed_json = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_creation_input_tokens = 0
+        self.cache_read_input_tokens = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._by_purpose: Dict[str, Dict] = {}
+
+    def is_available(self) -> bool:
+        """Whether an API key was configured"""
+        return self.client is not None
+
+    def complete(self, prompt: Union[str, CachedPrompt], purpose: str = 'default', max_tokens: int = 500,
+                 temperature: float = 0.3, **kwargs) -> str:
+        """
+        Send a single user prompt and return the text of the reply ('' if it has no content).
+
+        A CachedPrompt is sent as a cacheable system prefix plus its user suffix.
+        """
+        if isinstance(prompt, CachedPrompt):
+            kwargs.setdefault('system', prompt.system_blocks())
+            prompt = prompt.user
+        response = self.create_message(
+            messages=[{"role": "user", "content": prompt}],
+            purpose=purpose, max_tokens=max_tokens, temperature=temperature, **kwargs
+        )
+        return response.content[0].text if response.content else ''
+
+    def complete_json(self, prompt: Union[str, CachedPrompt], purpose: str = 'default',
+                      schema: Optional[Dict] = None, max_tokens: int = 500, temperature: float = 0.3,
+                      **kwargs) -> Dict:
+        """
+        Stream the reply and return its first JSON object, validated against schema.
+
+        The stream is closed as soon as the object's closing brace arrives, so
+        any trailing text the model adds is never waited for.
+
+        Raises:
+            MalformedJSON: If the reply holds no complete, valid object matching schema
+        """
+        if isinstance(prompt, CachedPrompt):
+            kwargs.setdefault('system', prompt.system_blocks())
+            prompt = prompt.user
+        response = self.create_message(
+            messages=[{"role": "user", "content": prompt}],
+            purpose=purpose, max_tokens=max_tokens, temperature=temperature,
+            stream=True, consume=self._consume_json_stream, **kwargs
+        )
+        try:
+            data = response.scanner.parse()
+            return validate_schema(data, schema) if schema else data
+        except MalformedJSON:
+            self._add('malformed_json', 1)
+            raise
+
+    def _consume_json_stream(self, stream) -> SimpleNamespace:
+        """Read stream events until the first JSON object is complete"""
+        scanner = JSONObjectScanner()
+        usage = SimpleNamespace(input_tokens=0, output_tokens=0,
+                                cache_creation_input_tokens=0, cache_read_input_tokens=0)
+        try:
+            for event in stream:
+                if event.type == 'message_start':
+                    started = event.message.usage
+                    for field in vars(usage):
+                        setattr(usage, field, getattr(started, field, 0) or 0)
+                elif event.type == 'content_block_delta' and getattr(event.delta, 'text', None):
+                    if scanner.feed(event.delta.text) is not None:
+                        # Output usage only arrives at the end of the stream - estimate it
+                        usage.output_tokens = estimate_tokens(scanner.result)
+                        self._add('streams_stopped_early', 1)
+                        break
+                elif event.type == 'message_delta':
+                    usage.output_tokens = event.usage.output_tokens
+        finally:
+            stream.close()
+        return SimpleNamespace(scanner=scanner, usage=usage)
+
+    def create_message(self, messages: List[Dict], purpose: str = 'default', max_tokens: int = 500,
+                       temperature: float = 0.3, model: Optional[str] = None,
+                       max_retries: Optional[int] = None, consume=None, **kwargs):
+        """
+        messages.create() through the shared client.
+
+        Args:
+            purpose: Label the call's latency and tokens are accounted under
+            max_retries: Overrides the gateway's retry limit for this call
+            consume: Called with the raw response (e.g. a stream) inside the
+                call slot and retry loop; its return value (with a .usage) is
+                returned instead
+        """
+        if self.client is None:
+            raise RuntimeError("AI gateway not available (no Anthropic API key)")
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._record(purpose, None, None, failed=True)
+            raise AIGatewayBusy(f"No AI call slot free after {self.queue_timeout}s")
+
+        retries = self.max_retries if max_retries is None else max_retries
+        self._add('in_flight', 1)
+        started = time.perf_counter()
+        try:
+            attempt = 0
+            while True:
+                try:
+                    response = self.client.messages.create(
+                        model=model or self.model, messages=messages,
+                        max_tokens=max_tokens, temperature=temperature, **kwargs
+                    )
+                    if consume is not None:
+                        response = consume(response)
+                except (anthropic.APIConnectionError, anthropic.APIStatusError) as e:
+                    delay = self._retry_delay(e, attempt)
+                    if delay is None or attempt >= retries:
+                        raise
+                    log_warning(f"AI call ({purpose}) failed ({str(e)}), retrying in {delay:.2f}s")
+                    attempt += 1
+                    self._add('retries', 1)
+                    self._sleep(delay)
+                    continue
+
+                self._record(purpose, time.perf_counter() - started, getattr(response, 'usage', None))
+                return response
+        except Exception:
+            self._record(purpose, time.perf_counter() - started, None, failed=True)
+            raise
+        finally:
+            self._add('in_flight', -1)
+            self._slots.release()
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None if the error is not retryable"""
+        if isinstance(error, anthropic.APITimeoutError):
+            return None
+        if isinstance(error, anthropic.APIStatusError):
+            status = error.status_code
+            if status == 429:
+                self._add('rate_limited', 1)
+            if status not in RETRY_STATUSES and status < 500:
+                return None
+            retry_after = self._retry_after(error.response)
+            if retry_after is not None:
+                return retry_after
+        return self._backoff(attempt)
+
+    def _retry_after(self, response) -> Optional[float]:
+        value = response.headers.get('retry-after') if response is not None else None
+        if not value:
+            return None
+        try:
+            return min(max(float(value), 0.0), self.max_backoff)
+        except ValueError:
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _add(self, counter: str, amount: int):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def _record(self, purpose: str, elapsed: Optional[float], usage, failed: bool = False):
+        # input_tokens excludes tokens written to or read from the prompt cache
+        input_tokens = getattr(usage, 'input_tokens', 0) or 0
+        output_tokens = getattr(usage, 'output_tokens', 0) or 0
+        cache_creation = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+        cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+        with self._stats_lock:
+            self.calls += 1
+            stats = self._by_purpose.setdefault(purpose, {
+                'calls': 0, 'errors': 0, 'input_tokens': 0, 'output_tokens': 0,
+                'cache_creation_input_tokens': 0, 'cache_read_input_tokens': 0, 'total_latency_ms': 0.0
+            })
+            stats['calls'] += 1
+            if failed:
+                self.errors += 1
+                stats['errors'] += 1
+            self.input_tokens += input_tokens
+            self.output_tokens += output_tokens
+            stats['input_tokens'] += input_tokens
+            stats['output_tokens'] += output_tokens
+            self.cache_creation_input_tokens += cache_creation
+            self.cache_read_input_tokens += cache_read
+            stats['cache_creation_input_tokens'] += cache_creation
+            stats['cache_read_input_tokens'] += cache_read
+            if elapsed is not None:
+                self._latencies.append(elapsed * 1000)
+                stats['total_latency_ms'] += elapsed * 1000
+
+        if not failed:
+            log_info(f"AI call ({purpose}): {elapsed * 1000:.0f}ms, "
+                     f"{input_tokens} input ({cache_read} cache read, {cache_creation} cache write) / "
+                     f"{output_tokens} output tokens")
+
+    @staticmethod
+    def _prompt_tokens(stats: Dict) -> int:
+        """All prompt tokens sent: uncached input plus cache writes and reads"""
+        return stats['input_tokens'] + stats['cache_creation_input_tokens'] + stats['cache_read_input_tokens']
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            by_purpose = {
+                purpose: {
+                    **stats,
+                    'avg_latency_ms': round(stats['total_latency_ms'] / stats['calls'], 1),
+                    'avg_prompt_tokens': round(self._prompt_tokens(stats) / stats['calls'], 1),
+                    'avg_uncached_input_tokens': round(stats['input_tokens'] / stats['calls'], 1)
+                }
+                for purpose, stats in self._by_purpose.items()
+            }
+            stats = {
+                'available': self.is_available(),
+                'calls': self.calls,
+                'errors': self.errors,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'in_flight': self.in_flight,
+                'streams_stopped_early': self.streams_stopped_early,
+                'malformed_json': self.malformed_json,
+                'input_tokens': self.input_tokens,
+                'output_tokens': self.output_tokens,
+                'cache_creation_input_tokens': self.cache_creation_input_tokens,
+                'cache_read_input_tokens': self.cache_read_input_tokens,
+                'by_purpose': by_purpose
+            }
+
+        prompt_tokens = self._prompt_tokens(stats)
+        stats['cache_read_ratio'] = round(stats['cache_read_input_tokens'] / prompt_tokens, 3) if prompt_tokens else 0.0
+        if latencies:
+            stats['latency_p50_ms'] = round(latencies[len(latencies) // 2], 1)
+            stats['latency_p95_ms'] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1)
+        return stats
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_ai_gateway(config=None) -> AIGateway:
+    """Get (or lazily create) the process-wide AI gateway"""
+    global _gateway
+
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                if config is None:
+                    from config import Config as config
+
+                _gateway = AIGateway(
+                    api_key=getattr(config, 'ANTHROPIC_API_KEY', None),
+                    model=getattr(config, 'AI_MODEL', 'claude-sonnet-4-20250514'),
+                    pool_size=getattr(config, 'AI_HTTP_POOL_SIZE', 20),
+                    max_concurrency=getattr(config, 'AI_MAX_CONCURRENCY', 8),
+                    connect_timeout=getattr(config, 'AI_CONNECT_TIMEOUT', 5),
+                    read_timeout=getattr(config, 'AI_READ_TIMEOUT', 30),
+                    max_retries=getattr(config, 'AI_MAX_RETRIES', 2),
+                    backoff_factor=getattr(config, 'AI_BACKOFF_SECONDS', 0.5),
+                    queue_timeout=getattr(config, 'AI_QUEUE_TIMEOUT', 30)
+                )
+                if _gateway.is_available():
+                    log_info(f"AI gateway initialised (model {_gateway.model}, "
+                             f"{getattr(config, 'AI_MAX_CONCURRENCY', 8)} concurrent calls)")
+                else:
+                    log_warning("No Anthropic API key - AI gateway disabled")
+
+    return _gateway
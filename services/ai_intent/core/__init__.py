@@ -7,10 +7,16 @@ from .context_builder import ContextBuilder
 from .intent_detector import IntentDetector
 from .response_generator import ResponseGenerator
 from .ai_client import AIClient
+from .intent_cache import IntentCache, get_intent_cache
+from .local_classifier import LocalIntentClassifier, get_local_intent_classifier
 
 __all__ = [
     'ContextBuilder',
     'IntentDetector', 
     'ResponseGenerator',
-    'AIClient'
+    'AIClient',
+    'IntentCache',
+    'get_intent_cache',
+    'LocalIntentClassifier',
+    'get_local_intent_classifier'
 ]
\ No newline at end of file
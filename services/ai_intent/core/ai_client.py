@@ -1,51 +1,52 @@
 """
 AI Client Manager
-Manages Claude API client and interactions
+Manages Claude API interactions through the shared AI gateway
 """
-import anthropic
-from config import Config
-from utils.logger import log_info, log_error
+from typing import Dict, Optional, Union
+from services.ai_gateway import get_ai_gateway
+from services.ai_prompt import CachedPrompt
+from utils.logger import log_error
 
 
 class AIClient:
     """Manages Claude AI client"""
     
     def __init__(self):
-        self.client = None
-        self.model = "claude-sonnet-4-20250514"
-        self._initialize_client()
-    
-    def _initialize_client(self):
-        """Initialize Claude client"""
-        try:
-            if Config.ANTHROPIC_API_KEY:
-                self.client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-                log_info("Claude AI client initialized successfully")
-            else:
-                log_error("No Anthropic API key - AI client disabled")
-        except Exception as e:
-            log_error(f"Error initializing AI client: {str(e)}")
-            self.client = None
+        # Process-wide client: no per-message construction or cold connection
+        self.gateway = get_ai_gateway()
+        self.model = self.gateway.model
     
     def is_available(self) -> bool:
         """Check if AI client is available"""
-        return self.client is not None
+        return self.gateway.is_available()
     
-    def send_message(self, prompt: str, max_tokens: int = 500, temperature: float = 0.3) -> str:
+    def send_message(self, prompt: Union[str, CachedPrompt], max_tokens: int = 500, temperature: float = 0.3) -> str:
         """Send message to Claude and get response"""
         try:
-            if not self.client:
+            if not self.gateway.is_available():
                 raise Exception("AI client not available")
             
-            response = self.client.messages.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            return self.gateway.complete(
+                prompt,
+                purpose='intent_detection',
                 max_tokens=max_tokens,
                 temperature=temperature
             )
             
-            return response.content[0].text
-            
         except Exception as e:
             log_error(f"Error sending message to AI: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+    
+    def send_json(self, prompt: Union[str, CachedPrompt], schema: Optional[Dict] = None,
+                  max_tokens: int = 500, temperature: float = 0.3) -> Dict:
+        """Send message to Claude and return the JSON object it replies with (stream stops at its end)"""
+        if not self.gateway.is_available():
+            raise Exception("AI client not available")
+        
+        return self.gateway.complete_json(
+            prompt,
+            purpose='intent_detection',
+            schema=schema,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
@@ -0,0 +1,142 @@
+"""
+Intent Cache
+Remembers Claude's intent result for repeated free-text messages ("what can
+you do", "how do I log water", "thanks") so the same question from another
+user skips the round trip. Keys are the normalised message, the role, the
+prompt scope (the intents/features the prompt offered) and a fingerprint of
+the conversation context sent with it; entries are bounded and expire after
+a TTL.
+"""
+import hashlib
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Optional, Tuple
+
+from utils.ttl_cache import TTLCache
+from .local_classifier import normalize
+
+
+# Only these fields are cached - never anything that could carry user data
+CACHED_FIELDS = (
+    'intent', 'confidence', 'needs_action', 'suggested_command', 'user_sentiment',
+    'is_asking_about_phase2', 'is_asking_about_phase3'
+)
+
+
+def prompt_scope(name: str, *parts: str) -> str:
+    """Short fingerprint of what a prompt offers, so a changed feature list never reuses old results"""
+    checksum = zlib.crc32('\n'.join(parts).encode('utf-8'))
+    return f"{name}:{checksum:08x}"
+
+
+def context_fingerprint(context: Optional[Dict]) -> str:
+    """Fingerprint of the conversation context the prompt carries ('' when there is none)"""
+    context = context or {}
+    tasks = context.get('recent_tasks') or []
+    history = context.get('chat_history') or []
+    if not tasks and not history:
+        return ''
+    return hashlib.blake2b(repr((list(tasks), list(history))).encode('utf-8'), digest_size=8).hexdigest()
+
+
+class IntentCache:
+    """
+    TTL + LRU cache of intent dicts.
+
+    Only messages that can be understood on their own are cached: at least
+    min_words words and at most max_chars long, with an intent Claude was
+    reasonably sure of (not 'unclear'). The recent tasks and chat history in
+    the prompt are part of the key, so "yes go ahead" answered in one
+    conversation is never served to a different one. Responses are built
+    from the intent at send time with the current user's name, so a cached
+    intent is safe to reuse across users. make_key() is the place to add
+    near-duplicate matching (embeddings, MinHash) later.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl_seconds: float = 3600, min_confidence: float = 0.4,
+                 min_words: int = 3, max_chars: int = 200, enabled: bool = True, clock=time.monotonic):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.max_chars = max_chars
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='intent_cache', clock=clock)
+
+        self._stats_lock = threading.Lock()
+        self.saved_ms = 0.0
+        self.bypassed = 0
+
+    def make_key(self, message: str, role: str, scope: str, context: Optional[Dict] = None) -> Optional[Tuple]:
+        """Cache key for a message in its conversation context, or None if it should not be cached"""
+        if not self.enabled:
+            return None
+
+        text = re.sub(r'(.)\1{2,}', r'\1\1', normalize(message or ''))
+        if len(text.split()) < self.min_words or len(text) > self.max_chars:
+            with self._stats_lock:
+                self.bypassed += 1
+            return None
+        return (scope, role, context_fingerprint(context), text)
+
+    def get(self, key: Optional[Tuple]) -> Optional[Dict]:
+        """Cached intent for key (marked source='cache'), or None"""
+        if key is None:
+            return None
+
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        intent, latency_ms = entry
+        with self._stats_lock:
+            self.saved_ms += latency_ms
+        return {**intent, 'source': 'cache'}
+
+    def put(self, key: Optional[Tuple], intent: Dict, latency_seconds: float):
+        """Cache an intent returned by Claude, with how long the call took"""
+        if key is None or intent.get('intent') in (None, 'unclear'):
+            return
+        if (intent.get('confidence') or 0) < self.min_confidence:
+            return
+
+        cached = {field: intent[field] for field in CACHED_FIELDS if field in intent}
+        command = cached.get('suggested_command')
+        if command is not None and not (isinstance(command, str) and command.startswith('/')):
+            cached['suggested_command'] = None
+        self._cache.set(key, (cached, latency_seconds * 1000))
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        stats = self._cache.get_stats()
+        with self._stats_lock:
+            stats['bypassed'] = self.bypassed
+            stats['saved_calls'] = stats['hits']
+            stats['saved_ms'] = round(self.saved_ms, 1)
+        stats['enabled'] = self.enabled
+        return stats
+
+
+_intent_cache = None
+_intent_cache_lock = threading.Lock()
+
+
+def get_intent_cache(config=None) -> IntentCache:
+    """Get (or lazily create) the process-wide intent cache"""
+    global _intent_cache
+
+    if _intent_cache is None:
+        with _intent_cache_lock:
+            if _intent_cache is None:
+                if config is None:
+                    from config import Config as config
+
+                _intent_cache = IntentCache(
+                    enabled=getattr(config, 'INTENT_CACHE_ENABLED', True),
+                    max_size=getattr(config, 'INTENT_CACHE_MAX_SIZE', 5000),
+                    ttl_seconds=getattr(config, 'INTENT_CACHE_TTL_SECONDS', 3600)
+                )
+
+    return _intent_cache
@@ -3,10 +3,13 @@ Intent Detector
 Handles AI-powered intent detection using Claude
 """
 from typing import Dict
-import json
-import re
+import time
+from utils.json_object import MalformedJSON
 from utils.logger import log_info, log_error
 from .ai_client import AIClient
+from .intent_cache import get_intent_cache, prompt_scope
+from .local_classifier import get_local_intent_classifier
+from ..utils.intent_types import INTENT_RESPONSE_SCHEMA, IntentTypes
 from ..utils.prompt_builder import PromptBuilder
 
 
@@ -15,6 +18,9 @@ class IntentDetector:
     
     def __init__(self):
         self.ai_client = AIClient()
+        self.local_classifier = get_local_intent_classifier()
+        self.intent_cache = get_intent_cache()
+        self.intent_types = IntentTypes()
         self.prompt_builder = PromptBuilder()
     
     def is_available(self) -> bool:
@@ -22,19 +28,32 @@ class IntentDetector:
         return self.ai_client.is_available()
     
     def detect_intent(self, message: str, role: str, context: Dict) -> Dict:
-        """Detect user intent using AI"""
+        """Detect user intent locally if the message is clear enough, otherwise using AI"""
         try:
+            intent = self.local_classifier.classify(message, role, self.intent_types.get_intents_for_role(role))
+            if intent:
+                return intent
+            
             if not self.ai_client.is_available():
                 return self._get_default_intent()
             
+            # Same message, role, feature list and conversation context as an earlier call
+            cache_key = self.intent_cache.make_key(message, role, self._prompt_scope(role), context)
+            intent = self.intent_cache.get(cache_key)
+            if intent:
+                return intent
+            
             # Build prompt
             prompt = self.prompt_builder.build_intent_prompt(message, role, context)
             
-            # Call Claude API
-            response_text = self.ai_client.send_message(prompt)
-            
-            # Parse response
-            intent = self._parse_intent_response(response_text)
+            # Call Claude API, reading the reply only up to the end of its JSON object
+            started = time.perf_counter()
+            try:
+                intent = self.ai_client.send_json(prompt, INTENT_RESPONSE_SCHEMA)
+            except MalformedJSON as e:
+                log_error(f"Failed to parse AI response: {e}")
+                return self._get_default_intent()
+            self.intent_cache.put(cache_key, intent, time.perf_counter() - started)
             
             log_info(f"AI detected intent: {intent.get('intent')} (confidence: {intent.get('confidence')})")
             
@@ -44,17 +63,13 @@ class IntentDetector:
             log_error(f"Error detecting intent: {str(e)}")
             return self._get_default_intent()
     
-    def _parse_intent_response(self, response_text: str) -> Dict:
-        """Parse Claude's JSON response"""
-        try:
-            # Extract JSON from response
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            return json.loads(response_text.strip())
-        except json.JSONDecodeError as e:
-            log_error(f"Failed to parse AI response: {e}")
-            return self._get_default_intent()
+    def _prompt_scope(self, role: str) -> str:
+        """Cache scope for the features and intents the prompt offers this role"""
+        return prompt_scope(
+            'intent_detector',
+            self.prompt_builder._get_available_features(role),
+            *self.intent_types.get_intents_for_role(role)
+        )
     
     def _get_default_intent(self) -> Dict:
         """Get default intent when AI is unavailable"""
@@ -0,0 +1,297 @@
+"""
+Local Intent Classifier
+Fast path ahead of Claude for short, unambiguous messages ("show my profile",
+"hi", "log my habits"). Exact phrase and greeting rules are checked first,
+then a character n-gram TF-IDF logistic regression trained on
+config/intent_phrases.json. Anything it is not confident about returns None
+and goes to Claude as before.
+"""
+import json
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.logger import log_info, log_error
+
+
+PHRASES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    'config', 'intent_phrases.json'
+)
+
+GREETING = re.compile(
+    r"^(hi+|hey+|hello+|howzit|sawubona|molo|dumela|good (morning|afternoon|evening))"
+    r"( (there|refiloe|everyone))?$"
+)
+# Negated requests and why/how/should questions look like the command they
+# mention ("don't delete my account") but mean something else
+NEGATION = re.compile(
+    r"\b(not|no|never|don'?t|doesn'?t|didn'?t|can'?t|cannot|won'?t|shouldn'?t)\b|\bstop [a-z]+ing\b"
+)
+QUESTION = re.compile(r"^(why|how|should)\b")
+RULE_CONFIDENCE = 0.95
+CHAR_NGRAMS = (2, 4)
+
+
+def normalize(message: str) -> str:
+    """Lowercase, fold digits to 0 and drop punctuation other than apostrophes"""
+    text = message.lower().replace('’', "'")
+    text = re.sub(r'\d+', '0', text)
+    text = re.sub(r"[^a-z0' ]+", ' ', text)
+    return ' '.join(text.split())
+
+
+def features(text: str) -> List[str]:
+    """Word unigrams/bigrams plus character n-grams inside word boundaries"""
+    words = text.split()
+    grams = [f'w:{word}' for word in words]
+    grams += [f'b:{a}_{b}' for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f' {word} '
+        for n in range(CHAR_NGRAMS[0], CHAR_NGRAMS[1] + 1):
+            grams += [f'c:{padded[i:i + n]}' for i in range(len(padded) - n + 1)]
+    return grams
+
+
+class LocalIntentClassifier:
+    """
+    Rules + TF-IDF/logistic regression intent model, trained lazily on first use.
+
+    A prediction is served only when the message is at most max_words long,
+    the role-restricted probability of the top intent is at least
+    min_confidence, most of the unrestricted probability falls on intents the
+    role can use, and the message is at least min_similarity (cosine) from
+    a training phrase of that intent. Messages that are negated or start with
+    why/how/should are only served by the exact phrase rules. Otherwise the
+    caller escalates to Claude.
+    """
+
+    def __init__(self, phrases: Optional[Dict] = None, phrases_path: str = PHRASES_PATH,
+                 min_confidence: float = 0.75, min_similarity: float = 0.5, max_words: int = 12,
+                 enabled: bool = True, epochs: int = 100, learning_rate: float = 30.0,
+                 l2: float = 1e-4):
+        self.phrases = phrases
+        self.phrases_path = phrases_path
+        self.min_confidence = min_confidence
+        self.min_similarity = min_similarity
+        self.max_words = max_words
+        self.enabled = enabled
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.l2 = l2
+
+        self._train_lock = threading.Lock()
+        self._trained = False
+        self.intents: List[str] = []
+        self.commands: Dict[str, Optional[str]] = {}
+        self.roles: Dict[str, set] = {}
+        self._exact: Dict[str, set] = {}
+
+        self._stats_lock = threading.Lock()
+        self.served = 0
+        self.escalated = 0
+        self._served_by_intent = Counter()
+        self._escalated_by_reason = Counter()
+
+    # ---- training ----
+
+    def _ensure_trained(self) -> bool:
+        if self._trained:
+            return bool(self.intents)
+        with self._train_lock:
+            if not self._trained:
+                try:
+                    self._train(self.phrases if self.phrases is not None else self._load_phrases())
+                except Exception as e:
+                    log_error(f"Local intent classifier unavailable: {str(e)}")
+                    self.intents = []
+                self._trained = True
+        return bool(self.intents)
+
+    def _load_phrases(self) -> Dict:
+        with open(self.phrases_path, encoding='utf-8') as f:
+            return json.load(f)['intents']
+
+    def _train(self, phrases: Dict):
+        texts, labels = [], []
+        self.intents = sorted(phrases)
+        for index, intent in enumerate(self.intents):
+            spec = phrases[intent]
+            self.commands[intent] = spec.get('command')
+            self.roles[intent] = set(spec.get('roles', ['trainer', 'client']))
+            for phrase in spec['phrases']:
+                text = normalize(phrase)
+                texts.append(text)
+                labels.append(index)
+                self._exact.setdefault(text, set()).add(intent)
+
+        grams = [features(text) for text in texts]
+        document_frequency = Counter(gram for doc in grams for gram in set(doc))
+        self.vocabulary = {gram: i for i, gram in enumerate(sorted(document_frequency))}
+        self.idf = np.array([
+            np.log((1 + len(texts)) / (1 + document_frequency[gram])) + 1 for gram in sorted(document_frequency)
+        ], dtype=np.float32)
+
+        X = np.vstack([self._vectorize_grams(doc) for doc in grams])
+        y = np.zeros((len(texts), len(self.intents)), dtype=np.float32)
+        y[np.arange(len(texts)), labels] = 1
+
+        # Multinomial logistic regression by full-batch gradient descent
+        self.weights = np.zeros((X.shape[1], len(self.intents)), dtype=np.float32)
+        self.bias = np.zeros(len(self.intents), dtype=np.float32)
+        for _ in range(self.epochs):
+            gradient = (self._softmax(X @ self.weights + self.bias) - y) / len(texts)
+            self.weights -= self.learning_rate * (X.T @ gradient + self.l2 * self.weights)
+            self.bias -= self.learning_rate * gradient.sum(axis=0)
+
+        self._train_vectors = X
+        self._train_labels = np.array(labels)
+        log_info(f"Local intent classifier trained: {len(texts)} phrases, {len(self.intents)} intents, "
+                 f"{len(self.vocabulary)} features")
+
+    def _vectorize_grams(self, grams: Iterable[str]) -> np.ndarray:
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for gram in grams:
+            index = self.vocabulary.get(gram)
+            if index is not None:
+                vector[index] += 1
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @staticmethod
+    def _softmax(scores: np.ndarray) -> np.ndarray:
+        scores = scores - scores.max(axis=-1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=-1, keepdims=True)
+
+    # ---- prediction ----
+
+    def allowed_for(self, role: str, allowed_intents: Optional[Iterable[str]] = None) -> set:
+        """Intents the phrase file offers to this role, narrowed to allowed_intents if given"""
+        allowed = {intent for intent in self.intents if role in self.roles[intent]}
+        return allowed & set(allowed_intents) if allowed_intents is not None else allowed
+
+    def decide(self, message: str, role: str,
+               allowed_intents: Optional[Iterable[str]] = None) -> Tuple[Optional[Dict], str]:
+        """
+        Classify without touching the counters.
+
+        Returns:
+            (intent dict, 'rule' or 'model') when served locally,
+            (None, reason) when the message should go to Claude
+        """
+        if not self.enabled or not self._ensure_trained():
+            return None, 'disabled'
+
+        text = normalize(message or '')
+        if not text:
+            return None, 'empty'
+        if len(text.split()) > self.max_words:
+            return None, 'too_long'
+
+        allowed = self.allowed_for(role, allowed_intents)
+
+        # Rules: known phrases and plain greetings
+        exact = self._exact.get(text, set()) & allowed
+        if len(exact) == 1:
+            return self._intent(exact.pop(), RULE_CONFIDENCE), 'rule'
+        if GREETING.match(text) and 'general_conversation' in allowed:
+            return self._intent('general_conversation', RULE_CONFIDENCE), 'rule'
+
+        if NEGATION.search(text):
+            return None, 'negation'
+        if QUESTION.match(text):
+            return None, 'question'
+
+        vector = self._vectorize_grams(features(text))
+        if not vector.any():
+            return None, 'unknown_words'
+
+        probabilities = self._softmax(vector @ self.weights + self.bias)
+        mask = np.array([intent in allowed for intent in self.intents])
+        role_mass = probabilities[mask].sum()
+        if role_mass < 0.5:
+            return None, 'other_role'
+
+        restricted = np.where(mask, probabilities, 0) / role_mass
+        best = int(restricted.argmax())
+        confidence = float(restricted[best])
+        if confidence < self.min_confidence:
+            return None, 'low_confidence'
+
+        similarity = float((self._train_vectors[self._train_labels == best] @ vector).max())
+        if similarity < self.min_similarity:
+            return None, 'low_similarity'
+
+        return self._intent(self.intents[best], round(confidence, 2)), 'model'
+
+    def classify(self, message: str, role: str,
+                 allowed_intents: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """Intent dict in the same shape as Claude's, or None to escalate"""
+        intent, reason = self.decide(message, role, allowed_intents)
+        if reason == 'disabled':
+            return None
+
+        with self._stats_lock:
+            if intent:
+                self.served += 1
+                self._served_by_intent[intent['intent']] += 1
+            else:
+                self.escalated += 1
+                self._escalated_by_reason[reason] += 1
+
+        if intent:
+            log_info(f"Local intent: {intent['intent']} (confidence: {intent['confidence']}, {reason})")
+        return intent
+
+    def _intent(self, intent: str, confidence: float) -> Dict:
+        command = self.commands.get(intent)
+        return {
+            'intent': intent,
+            'confidence': confidence,
+            'needs_action': command is not None,
+            'suggested_command': command,
+            'user_sentiment': 'neutral',
+            'source': 'local'
+        }
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            total = self.served + self.escalated
+            return {
+                'enabled': self.enabled,
+                'served_locally': self.served,
+                'escalated': self.escalated,
+                'local_fraction': round(self.served / total, 3) if total else 0.0,
+                'served_by_intent': dict(self._served_by_intent),
+                'escalated_by_reason': dict(self._escalated_by_reason)
+            }
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_local_intent_classifier(config=None) -> LocalIntentClassifier:
+    """Get (or lazily create) the process-wide local intent classifier"""
+    global _classifier
+
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                if config is None:
+                    from config import Config as config
+
+                _classifier = LocalIntentClassifier(
+                    enabled=getattr(config, 'INTENT_LOCAL_CLASSIFIER_ENABLED', True),
+                    min_confidence=getattr(config, 'INTENT_LOCAL_MIN_CONFIDENCE', 0.75),
+                    min_similarity=getattr(config, 'INTENT_LOCAL_MIN_SIMILARITY', 0.5),
+                    max_words=getattr(config, 'INTENT_LOCAL_MAX_WORDS', 12)
+                )
+
+    return _classifier
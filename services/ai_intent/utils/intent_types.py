@@ -5,6 +5,16 @@ Defines available intent types for different roles
 from typing import List
 
 
+# Shape of the intent JSON Claude returns (checked with utils.json_object.validate_schema)
+INTENT_RESPONSE_SCHEMA = {
+    'intent': {'type': str, 'required': True},
+    'confidence': {'type': (int, float), 'min': 0, 'max': 1, 'default': 0.5},
+    'needs_action': {'type': bool, 'default': False},
+    'suggested_command': {'type': str, 'default': None},
+    'user_sentiment': {'type': str, 'default': 'neutral'}
+}
+
+
 class IntentTypes:
     """Defines and manages intent types"""
     
@@ -3,6 +3,7 @@ Prompt Builder
 Constructs AI prompts for intent detection
 """
 from typing import Dict
+from services.ai_prompt import CachedPrompt
 from .intent_types import IntentTypes
 
 
@@ -11,28 +12,44 @@ class PromptBuilder:
     
     def __init__(self):
         self.intent_types = IntentTypes()
+        self._system_prompts: Dict[str, str] = {}
     
-    def build_intent_prompt(self, message: str, role: str, context: Dict) -> str:
-        """Build intent detection prompt"""
+    def build_intent_prompt(self, message: str, role: str, context: Dict) -> CachedPrompt:
+        """
+        Build intent detection prompt
         
-        # Get available features for role
-        available_features = self._get_available_features(role)
-        
-        # Get available intents for role
-        available_intents = self.intent_types.get_intents_for_role(role)
+        The instructions, features, schema and examples only depend on the
+        role and go in the cached system prefix; the user, message and chat
+        context are the per-call suffix.
+        """
+        if role not in self._system_prompts:
+            self._system_prompts[role] = self._build_system_prompt(role)
         
-        prompt = f"""You are Refiloe, an AI fitness assistant. Analyze this message from a {role}.
-
-USER: {context.get('name', 'User')} ({role})
+        user_prompt = f"""USER: {context.get('name', 'User')} ({role})
 MESSAGE: "{message}"
 
 CONTEXT:
 - Recent tasks: {', '.join(context.get('recent_tasks', [])) or 'None'}
 - Recent chat: {context.get('chat_history', [])}
 
+Analyze the message and return ONLY the JSON."""
+        
+        return CachedPrompt(self._system_prompts[role], user_prompt)
+    
+    def _build_system_prompt(self, role: str) -> str:
+        """Static part of the intent prompt for a role"""
+        
+        # Get available features for role
+        available_features = self._get_available_features(role)
+        
+        # Get available intents for role
+        available_intents = self.intent_types.get_intents_for_role(role)
+        
+        prompt = f"""You are Refiloe, an AI fitness assistant. You analyze WhatsApp messages from a {role} and work out what they want.
+
 {available_features}
 
-Analyze the message and return ONLY valid JSON with:
+For each message, return ONLY valid JSON with:
 {{
     "intent": "one of: {', '.join(available_intents)}",
     "confidence": 0.0-1.0,
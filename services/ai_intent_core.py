@@ -1,11 +1,19 @@
 """Core AI intent detection functionality"""
-import json
-import anthropic
 from typing import Dict, Optional, List
 from datetime import datetime
 import pytz
+from services.ai_gateway import get_ai_gateway
+from utils.json_object import MalformedJSON
 from utils.logger import log_info, log_error, log_warning
 
+# Fields understand_message relies on (defaults are filled in by _validate_intent)
+UNDERSTANDING_SCHEMA = {
+    'primary_intent': {'type': str, 'required': True},
+    'confidence': {'type': (int, float), 'min': 0, 'max': 1},
+    'extracted_data': {'type': dict},
+    'requires_confirmation': {'type': bool}
+}
+
 class AIIntentCore:
     """Core AI intent detection"""
     
@@ -13,19 +21,17 @@ class AIIntentCore:
         self.config = config
         self.sa_tz = pytz.timezone(config.TIMEZONE)
         
-        if config.ANTHROPIC_API_KEY:
-            self.client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
-            self.model = "claude-sonnet-4-20250514"
+        self.ai = get_ai_gateway(config)
+        if self.ai.is_available():
             log_info("AI Intent Handler initialized with Claude")
         else:
-            self.client = None
             log_warning("No Anthropic API key - falling back to keyword matching")
     
     def understand_message(self, message: str, sender_type: str,
                           sender_data: Dict, conversation_history: List[str] = None) -> Dict:
         """Main entry point - understands any message using AI"""
         
-        if not self.client:
+        if not self.ai.is_available():
             log_info(f"Using fallback intent detection for: {message[:50]}")
             return self._fallback_intent_detection(message, sender_type)
         
@@ -33,17 +39,13 @@ class AIIntentCore:
             context = self._build_context(sender_type, sender_data)
             prompt = self._create_intent_prompt(message, sender_type, context, conversation_history)
             
-            # Get AI understanding
-            response = self.client.messages.create(
-                model=self.model,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
-            
-            intent_data = self._parse_ai_response(response.content[0].text)
+            # Get AI understanding, reading the reply only up to the end of its JSON object
+            try:
+                intent_data = self.ai.complete_json(prompt, purpose='intent_understanding',
+                                                    schema=UNDERSTANDING_SCHEMA, max_tokens=500, temperature=0.3)
+            except MalformedJSON as e:
+                log_error(f"Failed to parse AI response: {e}")
+                intent_data = self._unclear_intent()
             validated_intent = self._validate_intent(intent_data, sender_data, sender_type)
             
             log_info(f"AI Intent detected: {validated_intent.get('primary_intent')} "
@@ -74,23 +76,15 @@ class AIIntentCore:
                 'sessions_remaining': sender_data.get('sessions_remaining', 0)
             }
     
-    def _parse_ai_response(self, response_text: str) -> Dict:
-        """Parse the AI's JSON response"""
-        try:
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            return json.loads(response_text.strip())
-        except json.JSONDecodeError as e:
-            log_error(f"Failed to parse AI response: {e}")
-            return {
-                'primary_intent': 'unclear',
-                'confidence': 0.3,
-                'extracted_data': {},
-                'sentiment': 'neutral',
-                'suggested_response_type': 'conversational'
-            }
+    def _unclear_intent(self) -> Dict:
+        """Understanding used when the AI's reply cannot be parsed"""
+        return {
+            'primary_intent': 'unclear',
+            'confidence': 0.3,
+            'extracted_data': {},
+            'sentiment': 'neutral',
+            'suggested_response_type': 'conversational'
+        }
     
     def _validate_intent(self, intent_data: Dict, sender_data: Dict, sender_type: str) -> Dict:
         """Validate and enrich the AI's intent understanding"""
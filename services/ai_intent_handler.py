@@ -4,12 +4,26 @@ Natural language intent detection for Phase 1 features
 Uses Claude AI for accurate, context-aware understanding
 """
 from typing import Dict, List, Optional
-import json
-import anthropic
 from datetime import datetime
+import time
 import pytz
+from services.ai_gateway import get_ai_gateway
+from services.ai_prompt import CachedPrompt
+from services.ai_intent.core.intent_cache import get_intent_cache, prompt_scope
+from services.ai_intent.core.local_classifier import get_local_intent_classifier
+from services.ai_intent.utils.intent_types import INTENT_RESPONSE_SCHEMA
+from utils.json_object import MalformedJSON
 from utils.logger import log_info, log_error
-from config import Config
+
+
+# Intents _create_intent_prompt offers Claude
+PROMPT_INTENTS = (
+    'view_profile', 'edit_profile', 'delete_account', 'logout', 'switch_role', 'help',
+    'invite_trainee', 'create_trainee', 'view_trainees', 'remove_trainee',
+    'search_trainer', 'invite_trainer', 'view_trainers', 'remove_trainer',
+    'general_conversation'
+)
+INTENT_CACHE_SCOPE = prompt_scope('app_core_intent_handler', *PROMPT_INTENTS)
 
 
 class AIIntentHandler:
@@ -39,13 +53,11 @@ class AIIntentHandler:
         
         self.sa_tz = pytz.timezone('Africa/Johannesburg')
         
-        # Initialize Claude client
-        if Config.ANTHROPIC_API_KEY:
-            self.client = anthropic.Anthropic(api_key=Config.ANTHROPIC_API_KEY)
-            self.model = "claude-sonnet-4-20250514"
-            log_info("AI Intent Handler (Phase 1) initialized with Claude")
-        else:
-            self.client = None
+        # Shared Claude client, behind the local classifier for clear-cut messages
+        self.ai = get_ai_gateway()
+        self.local_classifier = get_local_intent_classifier()
+        self.intent_cache = get_intent_cache()
+        if not self.ai.is_available():
             log_error("No Anthropic API key - AI intent detection disabled")
     
     def handle_intent(self, phone: str, message: str, role: str, user_id: str,
@@ -54,7 +66,7 @@ class AIIntentHandler:
         Main entry point - analyze message and respond appropriately
         """
         try:
-            if not self.client:
+            if not self.ai.is_available():
                 # Fallback to simple response
                 return self._fallback_response(phone, message, role)
             
@@ -108,19 +120,27 @@ class AIIntentHandler:
 
     
     def _detect_intent(self, message: str, role: str, context: Dict) -> Dict:
-        """Use Claude AI to detect user intent"""
+        """Detect user intent locally if the message is clear enough, otherwise using Claude AI"""
         try:
-            prompt = self._create_intent_prompt(message, role, context)
+            intent_data = self.local_classifier.classify(message, role, PROMPT_INTENTS)
+            if intent_data:
+                return intent_data
             
-            response = self.client.messages.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=500,
-                temperature=0.3
-            )
+            cache_key = self.intent_cache.make_key(message, role, INTENT_CACHE_SCOPE, context)
+            intent_data = self.intent_cache.get(cache_key)
+            if intent_data:
+                return intent_data
+            
+            prompt = self._create_intent_prompt(message, role, context)
             
-            # Parse AI response
-            intent_data = self._parse_ai_response(response.content[0].text)
+            started = time.perf_counter()
+            try:
+                intent_data = self.ai.complete_json(prompt, purpose='intent_handler', schema=INTENT_RESPONSE_SCHEMA,
+                                                    max_tokens=500, temperature=0.3)
+            except MalformedJSON as e:
+                log_error(f"Failed to parse AI response: {e}")
+                return self._unclear_intent()
+            self.intent_cache.put(cache_key, intent_data, time.perf_counter() - started)
             
             log_info(f"AI detected intent: {intent_data.get('intent')} (confidence: {intent_data.get('confidence')})")
             
@@ -134,8 +154,23 @@ class AIIntentHandler:
                 'needs_action': False
             }
     
-    def _create_intent_prompt(self, message: str, role: str, context: Dict) -> str:
-        """Create prompt for Claude AI"""
+    def _create_intent_prompt(self, message: str, role: str, context: Dict) -> CachedPrompt:
+        """Create prompt for Claude AI (static instructions as the cached system prefix)"""
+        
+        user_prompt = f"""USER: {context.get('name', 'User')} ({role})
+MESSAGE: "{message}"
+
+CONTEXT:
+- Recent tasks: {', '.join(context.get('recent_tasks', [])) or 'None'}
+- Recent chat: {context.get('chat_history', [])}
+
+Analyze the message and return ONLY the JSON."""
+        
+        return CachedPrompt(self._intent_system_prompt(role), user_prompt)
+    
+    @staticmethod
+    def _intent_system_prompt(role: str) -> str:
+        """Instructions, features and examples - the same for every message from a role"""
         
         # Define available features (Phase 1 & 2)
         if role == 'trainer':
@@ -181,18 +216,11 @@ Coming Soon (Phase 3):
 - View progress
 """
         
-        prompt = f"""You are Refiloe, an AI fitness assistant. Analyze this message from a {role}.
-
-USER: {context.get('name', 'User')} ({role})
-MESSAGE: "{message}"
-
-CONTEXT:
-- Recent tasks: {', '.join(context.get('recent_tasks', [])) or 'None'}
-- Recent chat: {context.get('chat_history', [])}
+        prompt = f"""You are Refiloe, an AI fitness assistant. You analyze WhatsApp messages from a {role} and work out what they want.
 
 {available_features}
 
-Analyze the message and return ONLY valid JSON with:
+For each message, return ONLY valid JSON with:
 {{
     "intent": "one of: view_profile, edit_profile, delete_account, logout, switch_role, help, invite_trainee, create_trainee, view_trainees, remove_trainee, search_trainer, invite_trainer, view_trainers, remove_trainer, general_conversation, unclear",
     "confidence": 0.0-1.0,
@@ -217,22 +245,13 @@ Return ONLY the JSON, no other text."""
         
         return prompt
     
-    def _parse_ai_response(self, response_text: str) -> Dict:
-        """Parse Claude's JSON response"""
-        try:
-            # Extract JSON from response
-            import re
-            json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-            if json_match:
-                return json.loads(json_match.group())
-            return json.loads(response_text.strip())
-        except json.JSONDecodeError as e:
-            log_error(f"Failed to parse AI response: {e}")
-            return {
-                'intent': 'general_conversation',
-                'confidence': 0.3,
-                'needs_action': False
-            }
+    def _unclear_intent(self) -> Dict:
+        """Intent used when Claude's reply cannot be parsed"""
+        return {
+            'intent': 'general_conversation',
+            'confidence': 0.3,
+            'needs_action': False
+        }
     
     def _generate_response(self, phone: str, message: str, role: str, 
                           intent: Dict, context: Dict) -> Dict:
@@ -0,0 +1,40 @@
+"""
+AI Prompt
+Prompts split into a static system prefix and a per-call user suffix. The
+prefix (instructions, feature lists, JSON schema, examples) is identical
+across calls and is marked for Anthropic prompt caching, so repeated calls
+only pay full price for the short suffix.
+"""
+from typing import Dict, List
+
+# Minimum prefix length Anthropic will cache (Sonnet/Opus; Haiku needs 2048).
+# Shorter prefixes are sent normally - marking them is harmless.
+MIN_CACHEABLE_TOKENS = 1024
+
+
+class CachedPrompt:
+    """System prefix (cached provider-side) + user suffix (sent fresh every call)"""
+
+    def __init__(self, system: str, user: str):
+        self.system = system.strip()
+        self.user = user.strip()
+
+    def system_blocks(self) -> List[Dict]:
+        """`system` argument for messages.create with the prefix marked cacheable"""
+        return [{"type": "text", "text": self.system, "cache_control": {"type": "ephemeral"}}]
+
+    def extend(self, text: str) -> 'CachedPrompt':
+        """Copy with text appended to the per-call suffix"""
+        return CachedPrompt(self.system, self.user + text)
+
+    def as_text(self) -> str:
+        """Single user message equivalent (how the prompt was sent before it was split)"""
+        return f"{self.system}\n\n{self.user}"
+
+    def __str__(self) -> str:
+        return self.as_text()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) for offline comparisons"""
+    return max(1, round(len(text) / 4))
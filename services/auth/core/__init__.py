@@ -6,5 +6,9 @@ Core authentication functionality
 from .login_status_manager import LoginStatusManager
 from .user_manager import UserManager
 from .role_manager import RoleManager
+from .identity_cache import IdentityCache, get_identity_cache, invalidate_identity
 
-__all__ = ['LoginStatusManager', 'UserManager', 'RoleManager']
\ No newline at end of file
+__all__ = [
+    'LoginStatusManager', 'UserManager', 'RoleManager',
+    'IdentityCache', 'get_identity_cache', 'invalidate_identity'
+]
\ No newline at end of file
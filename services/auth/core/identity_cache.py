@@ -0,0 +1,64 @@
+"""
+Identity Cache
+Process-wide phone -> users row cache used by UserManager
+"""
+from typing import Dict, Optional
+from config import Config
+from utils.logger import log_info
+from utils.ttl_cache import TTLCache
+
+
+def clean_phone_number(phone: str) -> str:
+    """Normalise a phone number the same way the users table stores it"""
+    return (phone or '').replace('+', '').replace('-', '').replace(' ', '')
+
+
+class IdentityCache:
+    """
+    Caches resolved users rows by cleaned phone number.
+
+    Only positive lookups are cached, so a brand-new user is always looked up
+    in the database. Anything that writes to the users table for a phone
+    (login/logout, registration, /reset_me, role deletion) must call
+    invalidate() so the next message re-reads the row.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 60):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='identity')
+
+    def get(self, phone: str) -> Optional[Dict]:
+        """Return a copy of the cached users row, or None"""
+        user = self._cache.get(clean_phone_number(phone))
+        return dict(user) if user is not None else None
+
+    def set(self, phone: str, user: Dict):
+        """Cache a users row for a phone"""
+        if user:
+            self._cache.set(clean_phone_number(phone), dict(user))
+
+    def invalidate(self, phone: str, reason: str = ''):
+        """Drop the cached identity for a phone"""
+        if self._cache.invalidate(clean_phone_number(phone)) and reason:
+            log_info(f"Identity cache invalidated for {clean_phone_number(phone)} ({reason})")
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        return self._cache.get_stats()
+
+
+_identity_cache = IdentityCache(
+    max_size=getattr(Config, 'IDENTITY_CACHE_MAX_SIZE', 10000),
+    ttl_seconds=getattr(Config, 'IDENTITY_CACHE_TTL_SECONDS', 60)
+)
+
+
+def get_identity_cache() -> IdentityCache:
+    """Get the process-wide identity cache"""
+    return _identity_cache
+
+
+def invalidate_identity(phone: str, reason: str = ''):
+    """Invalidation hook for code that writes to the users table directly"""
+    _identity_cache.invalidate(phone, reason)
@@ -50,6 +50,7 @@ class LoginStatusManager:
                 'login_status': status,
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('phone_number', clean_phone).execute()
+            self.user_manager.identity_cache.invalidate(clean_phone, 'login' if status else 'logout')
             
             # Also update conversation_states for consistency (use original phone for conversation_states)
             self.db.table('conversation_states').update({
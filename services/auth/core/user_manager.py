@@ -5,15 +5,17 @@ Handles user CRUD operations and basic user management
 from typing import Dict, Optional
 from datetime import datetime
 import pytz
-from utils.logger import log_info, log_error
+from utils.logger import log_info, log_error, log_warning
+from .identity_cache import get_identity_cache
 
 
 class UserManager:
     """Manages user data and basic operations"""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, identity_cache=None):
         self.db = supabase_client
         self.sa_tz = pytz.timezone('Africa/Johannesburg')
+        self.identity_cache = identity_cache or get_identity_cache()
     
     def check_user_exists(self, phone: str) -> Optional[Dict]:
         """
@@ -25,18 +27,25 @@ class UserManager:
         3. If not found, check clients table by whatsapp
         4. If found in trainer/client, create users entry and return it
         
+        Known users are served from the in-process identity cache.
+        
         Returns user data if found, None otherwise
         """
         try:
             # Clean phone number (remove + and other formatting)
             clean_phone = phone.replace('+', '').replace('-', '').replace(' ', '')
             
+            cached_user = self.identity_cache.get(clean_phone)
+            if cached_user is not None:
+                return cached_user
+            
             # Step 1: Check users table
             result = self.db.table('users').select('*').eq(
                 'phone_number', clean_phone
             ).execute()
             
             if result.data and len(result.data) > 0:
+                self.identity_cache.set(clean_phone, result.data[0])
                 return result.data[0]
             
             # Step 2: Fallback - Check trainers table
@@ -63,6 +72,7 @@ class UserManager:
                 user_result = self.db.table('users').insert(user_data).execute()
                 if user_result.data:
                     log_info(f"Created users entry for trainer {trainer_id}")
+                    self.identity_cache.set(clean_phone, user_result.data[0])
                     return user_result.data[0]
             
             # Step 3: Fallback - Check clients table
@@ -89,6 +99,7 @@ class UserManager:
                 user_result = self.db.table('users').insert(user_data).execute()
                 if user_result.data:
                     log_info(f"Created users entry for client {client_id}")
+                    self.identity_cache.set(clean_phone, user_result.data[0])
                     return user_result.data[0]
             
             # Not found anywhere
@@ -142,6 +153,7 @@ class UserManager:
                 
                 log_info(f"Created new user entry for {clean_phone} as {role}")
             
+            self.identity_cache.invalidate(clean_phone, 'registration')
             return bool(result.data)
             
         except Exception as e:
@@ -188,6 +200,8 @@ class UserManager:
             
             # Delete all related data first
             self._delete_role_related_data(role_id, role, clean_phone)
+            from services.auth.tasks.task_state_cache import invalidate_running_task
+            invalidate_running_task(phone, role)
             
             # Delete from role table
             table = 'trainers' if role == 'trainer' else 'clients'
@@ -217,10 +231,13 @@ class UserManager:
                 ).execute()
                 log_info(f"Removed {role} role for {clean_phone}")
             
+            self.identity_cache.invalidate(clean_phone, 'profile deletion')
             return True
             
         except Exception as e:
             log_error(f"Error deleting user role: {str(e)}")
+            # The deletion may have partially applied
+            self.identity_cache.invalidate(phone.replace('+', '').replace('-', '').replace(' ', ''), 'profile deletion')
             return False
     
     def _delete_role_related_data(self, role_id: str, role: str, phone: str):
@@ -247,6 +264,11 @@ class UserManager:
                 except:
                     pass  # Tables might not exist
                 
+                from services.habits.streak_engine import invalidate_client_streaks
+                from services.habits.leaderboard_service import invalidate_leaderboards
+                invalidate_client_streaks(role_id)
+                invalidate_leaderboards('client deleted')
+                
                 log_info(f"Deleted all client-related data for {role_id}")
                 
             elif role == 'trainer':
@@ -297,6 +319,8 @@ class UserManager:
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('phone_number', clean_phone).execute()
             
+            self.identity_cache.invalidate(clean_phone, 'login')
+            
             if result.data:
                 log_info(f"Auto-logged in {clean_phone} as {role}")
                 return True
@@ -420,6 +444,7 @@ class UserManager:
                 
                 log_info(f"Created users table entry for {role}: {clean_phone} with {role_field}: {role_id}, login_status: {role}")
             
+            self.identity_cache.invalidate(clean_phone, 'registration')
             return True
             
         except Exception as e:
@@ -225,6 +225,10 @@ class DataSaver:
                 'created_at': now,
                 'updated_at': now
             }).execute()
+            from services.dashboard.response_cache import touch_dashboard_users
+            from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+            touch_dashboard_users(trainer_id, client_id)
+            invalidate_trainer_leaderboards(trainer_id, reason='trainee list changed')
             
             log_info(f"Created relationship: trainer {trainer_id} <-> client {client_id}")
             return True
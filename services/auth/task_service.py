@@ -10,6 +10,7 @@ from utils.logger import log_info, log_error
 # Import specialized managers
 from .tasks.task_manager import TaskManager
 from .tasks.task_tracker import TaskTracker
+from .tasks.task_state_cache import invalidate_running_task
 
 
 class TaskService:
@@ -112,6 +113,7 @@ class TaskService:
                 except Exception as role_error:
                     log_error(f"Emergency cleanup error for {reg_role}: {str(role_error)}")
             
+            invalidate_running_task(phone)
             log_info(f"Emergency cleanup completed for {phone}: {cleaned_count} tasks cleaned")
             return cleaned_count
             
@@ -5,5 +5,9 @@ Task management functionality
 
 from .task_manager import TaskManager
 from .task_tracker import TaskTracker
+from .task_state_cache import TaskStateCache, get_task_state_cache, invalidate_running_task
 
-__all__ = ['TaskManager', 'TaskTracker']
\ No newline at end of file
+__all__ = [
+    'TaskManager', 'TaskTracker',
+    'TaskStateCache', 'get_task_state_cache', 'invalidate_running_task'
+]
\ No newline at end of file
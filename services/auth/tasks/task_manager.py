@@ -6,14 +6,16 @@ from typing import Dict, Optional, List
 from datetime import datetime
 import pytz
 from utils.logger import log_info, log_error
+from .task_state_cache import get_task_state_cache
 
 
 class TaskManager:
     """Manages task CRUD operations"""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, task_state_cache=None):
         self.db = supabase_client
         self.sa_tz = pytz.timezone('Africa/Johannesburg')
+        self.task_state_cache = task_state_cache or get_task_state_cache()
     
     def create_task(self, phone: str, role: str, task_type: str, task_data: Dict = None) -> Optional[str]:
         """
@@ -39,6 +41,8 @@ class TaskManager:
             if result.data and len(result.data) > 0:
                 task_id = result.data[0]['id']
                 log_info(f"Created {role} task: {task_type} for {phone}")
+                if self.task_state_cache:
+                    self.task_state_cache.apply_task_row(role, result.data[0], created=True)
                 return task_id
 
             return None
@@ -50,9 +54,15 @@ class TaskManager:
     def get_running_task(self, phone: str, role: str) -> Optional[Dict]:
         """
         Get currently running task using phone number
+        Served from the task state cache when possible
         Returns: task data if found, None otherwise
         """
         try:
+            if self.task_state_cache:
+                found, task = self.task_state_cache.get(phone, role)
+                if found:
+                    return task
+
             table = 'trainer_tasks' if role == 'trainer' else 'client_tasks'
             phone_column = 'trainer_phone' if role == 'trainer' else 'client_phone'
 
@@ -62,10 +72,10 @@ class TaskManager:
                 'task_status', 'running'
             ).order('started_at', desc=True).limit(1).execute()
 
-            if result.data and len(result.data) > 0:
-                return result.data[0]
-
-            return None
+            task = result.data[0] if result.data and len(result.data) > 0 else None
+            if self.task_state_cache:
+                self.task_state_cache.set(phone, role, task)
+            return task
 
         except Exception as e:
             log_error(f"Error getting running task: {str(e)}")
@@ -0,0 +1,215 @@
+"""
+Task State Cache
+Per-phone cache of the currently running task, kept up to date by
+TaskManager/TaskTracker writes (write-through) so conversational turns do not
+need a trainer_tasks/client_tasks lookup
+"""
+from typing import Dict, Optional, Tuple
+from config import Config
+from utils.logger import log_info, log_warning
+from utils.ttl_cache import TTLCache
+
+
+RUNNING_STATUS = 'running'
+
+
+def task_phone(task: Dict, role: str) -> Optional[str]:
+    """Phone number stored on a task row"""
+    return task.get('trainer_phone' if role == 'trainer' else 'client_phone')
+
+
+class MemoryTaskStateBackend:
+    """In-process backend. Only correct when a single process handles a phone"""
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='task_state')
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str):
+        return self._cache.get(key)
+
+    def set(self, key: str, value):
+        self._cache.set(key, value)
+
+    def delete(self, key: str):
+        self._cache.invalidate(key)
+
+    def get_stats(self) -> Dict:
+        return {'backend': 'memory', **self._cache.get_stats()}
+
+
+class SharedTaskStateBackend:
+    """SQLite/WAL backend shared by every worker process on the host"""
+
+    def __init__(self, path: str, ttl_seconds: float = 300):
+        from utils.shared_kv_store import SQLiteKVStore
+        self._store = SQLiteKVStore(path, table='task_state')
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str):
+        return self._store.get(key)
+
+    def set(self, key: str, value):
+        self._store.set(key, value, ttl_seconds=self.ttl_seconds)
+
+    def delete(self, key: str):
+        self._store.delete(key)
+
+    def get_stats(self) -> Dict:
+        return self._store.get_stats()
+
+
+class TaskStateCache:
+    """
+    Caches "running task for (role, phone)", including the fact that there is none.
+
+    Any backend failure falls back to Supabase: get() reports a miss and the
+    caller queries the task table as before.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def _key(role: str, phone: str) -> str:
+        return f"running:{role}:{phone}"
+
+    @staticmethod
+    def _id_key(role: str, task_id) -> str:
+        return f"task:{role}:{task_id}"
+
+    def get(self, phone: str, role: str) -> Tuple[bool, Optional[Dict]]:
+        """
+        Returns:
+            (found, task) - found is False on a cache miss, task is None when
+            the phone is known to have no running task
+        """
+        try:
+            entry = self.backend.get(self._key(role, phone))
+        except Exception as e:
+            self.errors += 1
+            log_warning(f"Task state cache read failed, falling back to Supabase: {str(e)}")
+            return False, None
+
+        if entry is None:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        task = entry.get('task')
+        return True, (dict(task) if task else None)
+
+    def set(self, phone: str, role: str, task: Optional[Dict]):
+        """Record the running task for a phone (None = no running task)"""
+        if not phone:
+            return
+        try:
+            self.backend.set(self._key(role, phone), {'task': task})
+            if task and task.get('id') is not None:
+                self.backend.set(self._id_key(role, task['id']), {'phone': phone})
+        except Exception as e:
+            self.errors += 1
+            log_warning(f"Task state cache write failed: {str(e)}")
+            self.invalidate(phone, role)
+
+    def invalidate(self, phone: str, role: str):
+        """Forget whatever is cached for a phone so the next read hits Supabase"""
+        if not phone:
+            return
+        try:
+            self.backend.delete(self._key(role, phone))
+        except Exception as e:
+            self.errors += 1
+            log_warning(f"Task state cache invalidation failed: {str(e)}")
+
+    def apply_task_row(self, role: str, task: Dict, created: bool = False):
+        """
+        Write-through for a task row returned by an insert/update.
+
+        A newly created running task is always the latest one, so it becomes
+        the cached running task. An updated running task refreshes the cache
+        only if it is the task already cached. A task that is no longer running
+        is dropped; the phone may still have an older running task, so the next
+        read goes back to Supabase.
+        """
+        phone = task_phone(task, role) or self._phone_for_task(role, task.get('id'))
+        if not phone:
+            return
+
+        if task.get('task_status') != RUNNING_STATUS:
+            self.invalidate(phone, role)
+            return
+
+        if created:
+            self.set(phone, role, task)
+            return
+
+        found, cached = self.get(phone, role)
+        if found and cached and cached.get('id') == task.get('id'):
+            self.set(phone, role, {**cached, **task})
+        elif found:
+            # Cache disagrees with the database - let the next read resolve it
+            self.invalidate(phone, role)
+
+    def invalidate_task(self, role: str, task_id):
+        """Drop the cached state of whichever phone owns task_id"""
+        phone = self._phone_for_task(role, task_id)
+        if phone:
+            self.invalidate(phone, role)
+
+    def _phone_for_task(self, role: str, task_id) -> Optional[str]:
+        if task_id is None:
+            return None
+        try:
+            entry = self.backend.get(self._id_key(role, task_id))
+            return entry.get('phone') if entry else None
+        except Exception:
+            return None
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'errors': self.errors,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'backend': self.backend.get_stats()
+        }
+
+
+def _build_task_state_cache() -> Optional[TaskStateCache]:
+    backend_name = getattr(Config, 'TASK_CACHE_BACKEND', 'memory')
+    ttl = getattr(Config, 'TASK_CACHE_TTL_SECONDS', 300)
+
+    try:
+        if backend_name == 'sqlite':
+            backend = SharedTaskStateBackend(Config.TASK_CACHE_SQLITE_PATH, ttl_seconds=ttl)
+        elif backend_name == 'memory':
+            backend = MemoryTaskStateBackend(ttl_seconds=ttl)
+        else:
+            log_info("Task state cache disabled")
+            return None
+    except Exception as e:
+        log_warning(f"Could not initialise task state cache ({backend_name}), using Supabase only: {str(e)}")
+        return None
+
+    return TaskStateCache(backend)
+
+
+_task_state_cache = _build_task_state_cache()
+
+
+def get_task_state_cache() -> Optional[TaskStateCache]:
+    """Get the process-wide task state cache (None when disabled)"""
+    return _task_state_cache
+
+
+def invalidate_running_task(phone: str, role: Optional[str] = None):
+    """Invalidation hook for code that writes task rows without TaskManager/TaskTracker"""
+    if not _task_state_cache:
+        return
+    for task_role in ([role] if role else ['trainer', 'client']):
+        _task_state_cache.invalidate(phone, task_role)
@@ -6,14 +6,16 @@ from typing import Dict, Optional
 from datetime import datetime
 import pytz
 from utils.logger import log_info, log_error
+from .task_state_cache import get_task_state_cache
 
 
 class TaskTracker:
     """Manages task status tracking and updates"""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, task_state_cache=None):
         self.db = supabase_client
         self.sa_tz = pytz.timezone('Africa/Johannesburg')
+        self.task_state_cache = task_state_cache or get_task_state_cache()
     
     def update_task(self, task_id: str, role: str, task_data: Dict = None, status: str = None) -> bool:
         """
@@ -39,10 +41,20 @@ class TaskTracker:
             
             result = self.db.table(table).update(update_data).eq('id', task_id).execute()
             
+            # Write through to the running-task cache
+            if self.task_state_cache:
+                if result.data:
+                    for task in result.data:
+                        self.task_state_cache.apply_task_row(role, task)
+                else:
+                    self.task_state_cache.invalidate_task(role, task_id)
+            
             return bool(result.data)
             
         except Exception as e:
             log_error(f"Error updating task: {str(e)}")
+            if self.task_state_cache:
+                self.task_state_cache.invalidate_task(role, task_id)
             return False
     
     def complete_task(self, task_id: str, role: str) -> bool:
@@ -65,6 +77,10 @@ class TaskTracker:
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq(id_column, user_id).eq('task_status', 'running').execute()
             
+            if self.task_state_cache:
+                for task in (result.data or []):
+                    self.task_state_cache.apply_task_row(role, task)
+            
             log_info(f"Stopped all running tasks for {role} {user_id}")
             return True
             
@@ -0,0 +1,315 @@
+"""
+Bulk Message Sender
+Sends one message per recipient with bounded concurrency, paced by a token
+bucket matched to the WhatsApp Cloud API throughput tier. Retryable failures
+are requeued with backoff; progress can be polled or streamed while the job
+runs in the background.
+"""
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
+
+from services.whatsapp_transport import RETRY_STATUSES, is_connect_failure
+from utils.logger import log_error, log_info
+
+
+# Failure classes
+RATE_LIMITED = 'rate_limited'
+TRANSIENT = 'transient'
+NETWORK = 'network'
+INVALID_RECIPIENT = 'invalid_recipient'
+OUTSIDE_WINDOW = 'outside_window'
+AUTH = 'auth'
+PERMANENT = 'permanent'
+DELIVERY_UNKNOWN = 'delivery_unknown'
+
+RETRYABLE = frozenset({RATE_LIMITED, TRANSIENT, NETWORK})
+
+_RATE_LIMIT_CODES = {4, 80007, 130429, 131056}
+_TRANSIENT_CODES = {1, 2, 131000, 131016}
+_INVALID_RECIPIENT_CODES = {131026, 131030, 131021, 131009}
+_OUTSIDE_WINDOW_CODES = {131047}
+_AUTH_CODES = {0, 10, 190, 200}
+
+
+def classify_failure(result: Dict) -> str:
+    """
+    Classify a failed WhatsAppService send result.
+
+    WhatsAppService returns the Graph response body as 'error' (with its
+    'status_code') for API errors, and the exception text (with
+    'connect_failed') for transport errors. As in GraphTransport, only
+    failures where Meta cannot have accepted the message are retryable:
+    connect failures, throttling, transient errors and 502/503/504. Read
+    timeouts, dropped connections and other 5xx replies are DELIVERY_UNKNOWN
+    and are not resent.
+    """
+    error_text = result.get('error') or ''
+    try:
+        error = json.loads(error_text).get('error') or {}
+    except (ValueError, TypeError, AttributeError):
+        return _classify_unparsed_failure(result)
+
+    code = error.get('code')
+    if code in _RATE_LIMIT_CODES:
+        return RATE_LIMITED
+    if code in _AUTH_CODES:
+        return AUTH
+    if code in _OUTSIDE_WINDOW_CODES:
+        return OUTSIDE_WINDOW
+    if code in _INVALID_RECIPIENT_CODES:
+        return INVALID_RECIPIENT
+    if error.get('is_transient') or code in _TRANSIENT_CODES:
+        return TRANSIENT
+    return PERMANENT
+
+
+def _classify_unparsed_failure(result: Dict) -> str:
+    """Classify a failure without a Graph error body (transport error or e.g. an HTML gateway page)"""
+    status = result.get('status_code')
+    if status is None:
+        return NETWORK if result.get('connect_failed') else DELIVERY_UNKNOWN
+    if status == 429:
+        return RATE_LIMITED
+    if status in RETRY_STATUSES:
+        return TRANSIENT
+    return DELIVERY_UNKNOWN if status >= 500 else PERMANENT
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting for it if necessary"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Tolerate float rounding so a refill of exactly one token counts
+                if self._tokens >= 1 - 1e-9:
+                    self._tokens = max(self._tokens - 1, 0.0)
+                    return
+                wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+class BulkSendJob:
+    """
+    A running bulk send.
+
+    Items are dicts with at least 'phone' and 'message'; any other keys are
+    passed back untouched in results and to on_result.
+    """
+
+    def __init__(self, items: List[Dict], send_func: Callable[[Dict], Dict], concurrency: int = 16,
+                 rate_per_second: float = 80, max_attempts: int = 3, retry_backoff: float = 2.0,
+                 on_result: Optional[Callable[[Dict, Dict], None]] = None, name: str = 'bulk-send'):
+        self.name = name
+        self.send_func = send_func
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.on_result = on_result
+        self.bucket = TokenBucket(rate_per_second)
+
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._ready = [(0.0, index, dict(item), 1) for index, item in enumerate(items)]
+        self._sequence = itertools.count(len(items))
+        self._in_flight = threading.Semaphore(self.concurrency)
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+
+        self.total = len(items)
+        self.sent: List[Dict] = []
+        self.failed: List[Dict] = []
+        self.retries = 0
+        self.failures_by_class: Dict[str, int] = {}
+        self.started_at = None
+        self.finished_at = None
+        self.aborted_reason = None
+
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self) -> 'BulkSendJob':
+        self.started_at = time.time()
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop dispatching new sends; sends already in flight complete"""
+        self._cancelled.set()
+        with self._changed:
+            self._changed.notify_all()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=self.name) as pool:
+            while not self._cancelled.is_set():
+                with self._changed:
+                    if not self._ready and self._outstanding() == 0:
+                        break
+                    if not self._ready:
+                        # Only in-flight sends remain; one of them may requeue
+                        self._changed.wait(0.5)
+                        continue
+                    not_before = self._ready[0][0]
+                    delay = not_before - time.monotonic()
+                    if delay > 0:
+                        self._changed.wait(delay)
+                        continue
+                    _, _, item, attempt = heapq.heappop(self._ready)
+
+                self._in_flight.acquire()
+                self.bucket.acquire()
+                if self._cancelled.is_set():
+                    # Cancelled (e.g. auth failure) while waiting for a slot
+                    self._in_flight.release()
+                    with self._lock:
+                        heapq.heappush(self._ready, (0.0, next(self._sequence), item, attempt))
+                    break
+                pool.submit(self._send_one, item, attempt)
+
+        if self._cancelled.is_set():
+            with self._lock:
+                for _, _, item, attempt in self._ready:
+                    self.failed.append({'phone': item.get('phone'), 'error': 'cancelled',
+                                        'failure_class': 'cancelled', 'attempts': attempt - 1, 'item': item})
+                self._ready = []
+
+        self.finished_at = time.time()
+        self._done.set()
+        with self._changed:
+            self._changed.notify_all()
+
+        report = self.progress()
+        log_info(f"Bulk send '{self.name}' finished: {report['sent']} sent, {report['failed']} failed, "
+                 f"{report['retries']} retries in {report['elapsed_seconds']}s")
+
+    def _outstanding(self) -> int:
+        return self.total - len(self.sent) - len(self.failed)
+
+    def _send_one(self, item: Dict, attempt: int):
+        try:
+            try:
+                result = self.send_func(item) or {}
+            except Exception as e:
+                result = {'success': False, 'error': str(e), 'connect_failed': is_connect_failure(e)}
+
+            outcome = self._record(item, attempt, result)
+            if outcome and self.on_result:
+                try:
+                    self.on_result(item, outcome)
+                except Exception as e:
+                    log_error(f"Bulk send result callback failed: {str(e)}")
+        finally:
+            self._in_flight.release()
+
+    def _record(self, item: Dict, attempt: int, result: Dict) -> Optional[Dict]:
+        """Store the outcome, or requeue a retryable failure. Returns the final outcome (None if requeued)"""
+        with self._changed:
+            try:
+                if result.get('success'):
+                    outcome = {'phone': item.get('phone'), 'success': True,
+                               'message_id': result.get('message_id'), 'attempts': attempt, 'item': item}
+                    self.sent.append(outcome)
+                    return outcome
+
+                failure_class = classify_failure(result)
+                self.failures_by_class[failure_class] = self.failures_by_class.get(failure_class, 0) + 1
+
+                if failure_class in RETRYABLE and attempt < self.max_attempts and not self._cancelled.is_set():
+                    self.retries += 1
+                    delay = self.retry_backoff * (2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+                    heapq.heappush(self._ready, (time.monotonic() + delay, next(self._sequence), item, attempt + 1))
+                    return None
+
+                outcome = {'phone': item.get('phone'), 'success': False, 'error': result.get('error'),
+                           'failure_class': failure_class, 'attempts': attempt, 'item': item}
+                self.failed.append(outcome)
+
+                if failure_class == AUTH and not self._cancelled.is_set():
+                    # Every remaining send would fail the same way
+                    self.aborted_reason = 'WhatsApp API credentials rejected'
+                    log_error(f"Bulk send '{self.name}' aborted: {self.aborted_reason}")
+                    self._cancelled.set()
+                return outcome
+            finally:
+                self._changed.notify_all()
+
+    def progress(self) -> Dict:
+        """Snapshot of the job's progress"""
+        with self._lock:
+            finished = self.finished_at or time.time()
+            elapsed = finished - self.started_at if self.started_at else 0.0
+            return {
+                'name': self.name,
+                'total': self.total,
+                'sent': len(self.sent),
+                'failed': len(self.failed),
+                'pending': self._outstanding(),
+                'retries': self.retries,
+                'failures_by_class': dict(self.failures_by_class),
+                'done': self._done.is_set(),
+                'aborted_reason': self.aborted_reason,
+                'elapsed_seconds': round(elapsed, 3),
+                'messages_per_second': round(len(self.sent) / elapsed, 2) if elapsed else 0.0
+            }
+
+    def iter_progress(self, interval: float = 1.0) -> Iterator[Dict]:
+        """Yield a progress snapshot every `interval` seconds until the job is done (last one is final)"""
+        while not self._done.wait(interval):
+            yield self.progress()
+        yield self.progress()
+
+    def wait(self, timeout: Optional[float] = None) -> Dict:
+        """Block until the job finishes (or timeout) and return the progress report"""
+        self._done.wait(timeout)
+        return self.progress()
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+
+def start_bulk_send(whatsapp_service, items: List[Dict], config=None, send_func=None,
+                    on_result=None, name: str = 'bulk-send') -> BulkSendJob:
+    """
+    Start a bulk send in the background and return immediately.
+
+    Args:
+        whatsapp_service: used for send_message(phone, message) unless send_func is given
+        items: dicts with 'phone' and 'message' (plus any caller metadata)
+        on_result: called as on_result(item, outcome) once per recipient
+    """
+    if config is None:
+        from config import Config as config
+
+    if send_func is None:
+        def send_func(item):
+            return whatsapp_service.send_message(item['phone'], item['message'])
+
+    job = BulkSendJob(
+        items,
+        send_func,
+        concurrency=getattr(config, 'WHATSAPP_BULK_CONCURRENCY', 16),
+        rate_per_second=getattr(config, 'WHATSAPP_SEND_RATE_PER_SECOND', 80),
+        max_attempts=getattr(config, 'WHATSAPP_BULK_MAX_ATTEMPTS', 3),
+        on_result=on_result,
+        name=name
+    )
+    log_info(f"Starting bulk send '{name}' to {len(items)} recipients")
+    return job.start()
@@ -1,10 +1,9 @@
-from typing import Dict, List, Optional, Any
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional
 from datetime import datetime, timedelta
 import pytz
 import uuid
 import base64
 from io import BytesIO
-import csv
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
@@ -16,6 +15,12 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.lib import colors
 
 from utils.logger import log_error, log_info
+from services.helpers.export_stream import csv_chunks, encode_chunks, iter_offset_rows, write_chunks
+
+CSV_COLUMNS = ['Date', 'Time', 'Client', 'Phone', 'Email', 'Type', 'Status', 'Notes']
+PDF_COLUMNS = ['Date', 'Time', 'Client', 'Type', 'Status']
+PDF_TABLE_ROWS = 40
+
 
 class CalendarExportService:
     """Handle calendar export functionality including ICS files and email invites"""
@@ -235,23 +240,10 @@ class CalendarExportService:
     def bulk_export_month(self, trainer_id: str, month: int, year: int) -> Dict:
         """Export all bookings for a month"""
         try:
-            # Get date range
-            start_date = datetime(year, month, 1).date()
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-            else:
-                end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-            
             # Get all bookings for the month
-            bookings = self.db.table('bookings').select(
-                '*, clients(name, email, whatsapp), trainers(name, email, business_name, gym_location)'
-            ).eq('trainer_id', trainer_id).gte(
-                'session_date', start_date.isoformat()
-            ).lte('session_date', end_date.isoformat()).order(
-                'session_date'
-            ).order('session_time').execute()
-            
-            if not bookings.data:
+            bookings = list(self.iter_month_bookings(trainer_id, month, year))
+            
+            if not bookings:
                 return {
                     'success': False,
                     'error': 'No bookings found for this month'
@@ -264,55 +256,87 @@ class CalendarExportService:
             
             return {
                 'success': True,
-                'bookings': bookings.data,
+                'bookings': bookings,
                 'trainer': trainer.data,
                 'month': month,
                 'year': year,
-                'count': len(bookings.data)
+                'count': len(bookings)
             }
             
         except Exception as e:
             log_error(f"Error exporting month: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def export_to_csv(self, bookings: List[Dict]) -> bytes:
-        """Export bookings to CSV format"""
+    def iter_month_bookings(self, trainer_id: str, month: int, year: int) -> Iterator[Dict]:
+        """A month's bookings in session order, read a page at a time"""
+        # Get date range
+        start_date = datetime(year, month, 1).date()
+        if month == 12:
+            end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
+        else:
+            end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
+        
+        return iter_offset_rows(lambda: self.db.table('bookings').select(
+            '*, clients(name, email, whatsapp), trainers(name, email, business_name, gym_location)'
+        ).eq('trainer_id', trainer_id).gte(
+            'session_date', start_date.isoformat()
+        ).lte('session_date', end_date.isoformat()).order(
+            'session_date'
+        ).order('session_time').order('id'))
+    
+    def iter_csv(self, bookings: Iterable[Dict]) -> Iterator[str]:
+        """Bookings as CSV text, yielded in chunks as the bookings are consumed"""
+        return csv_chunks(CSV_COLUMNS, (self._csv_row(booking) for booking in bookings))
+    
+    def export_to_csv(self, bookings: Iterable[Dict], output: Optional[BinaryIO] = None) -> Optional[bytes]:
+        """
+        Export bookings to CSV format
+        
+        Args:
+            bookings: Any iterable of bookings, e.g. iter_month_bookings()
+            output: Binary stream to write to; when omitted the CSV is returned
+        """
         try:
-            output = BytesIO()
-            writer = csv.writer(output)
-            
-            # Header
-            writer.writerow([
-                'Date', 'Time', 'Client', 'Phone', 'Email', 
-                'Type', 'Status', 'Notes'
-            ])
-            
-            # Data rows
-            for booking in bookings:
-                client = booking.get('clients', {})
-                writer.writerow([
-                    booking.get('session_date'),
-                    booking.get('session_time'),
-                    client.get('name', ''),
-                    client.get('whatsapp', ''),
-                    client.get('email', ''),
-                    booking.get('session_type', 'standard'),
-                    booking.get('status', ''),
-                    booking.get('notes', '')
-                ])
+            chunks = encode_chunks(self.iter_csv(bookings))
+            if output is not None:
+                write_chunks(chunks, output)
+                return None
             
-            return output.getvalue()
+            return b''.join(chunks)
             
         except Exception as e:
             log_error(f"Error exporting to CSV: {str(e)}")
             raise
     
-    def export_to_pdf(self, bookings: List[Dict], trainer_info: Dict) -> bytes:
-        """Export bookings to PDF format"""
+    def _csv_row(self, booking: Dict) -> List:
+        client = booking.get('clients') or {}
+        return [
+            booking.get('session_date'),
+            booking.get('session_time'),
+            client.get('name', ''),
+            client.get('whatsapp', ''),
+            client.get('email', ''),
+            booking.get('session_type', 'standard'),
+            booking.get('status', ''),
+            booking.get('notes', '')
+        ]
+    
+    def export_to_pdf(self, bookings: Iterable[Dict], trainer_info: Dict,
+                      output: Optional[BinaryIO] = None) -> Optional[bytes]:
+        """
+        Export bookings to PDF format
+        
+        The schedule is laid out as one table per PDF_TABLE_ROWS bookings;
+        reportlab re-splits a single long table for every page, which gets
+        slow for large exports.
+        
+        Args:
+            bookings: Any iterable of bookings, e.g. iter_month_bookings()
+            output: Binary stream to write to; when omitted the PDF is returned
+        """
         try:
-            buffer = BytesIO()
+            buffer = output if output is not None else BytesIO()
             doc = SimpleDocTemplate(buffer, pagesize=letter)
-            story = []
             styles = getSampleStyleSheet()
             
             # Title
@@ -320,53 +344,59 @@ class CalendarExportService:
                 f"Training Schedule - {trainer_info.get('business_name', 'Training Sessions')}",
                 styles['Title']
             )
-            story.append(title)
-            story.append(Spacer(1, 12))
-            
-            # Info
-            info = Paragraph(
-                f"Trainer: {trainer_info.get('name')}<br/>"
-                f"Period: {bookings[0]['session_date']} to {bookings[-1]['session_date']}",
-                styles['Normal']
-            )
-            story.append(info)
-            story.append(Spacer(1, 12))
-            
-            # Table data
-            data = [['Date', 'Time', 'Client', 'Type', 'Status']]
             
+            # Tables of PDF_TABLE_ROWS bookings each
+            tables = []
+            rows = []
+            first_date = last_date = None
             for booking in bookings:
-                client = booking.get('clients', {})
-                data.append([
+                client = booking.get('clients') or {}
+                first_date = first_date or booking.get('session_date')
+                last_date = booking.get('session_date')
+                rows.append([
                     booking.get('session_date'),
                     booking.get('session_time'),
                     client.get('name', 'N/A'),
                     booking.get('session_type', 'standard'),
                     booking.get('status', 'confirmed')
                 ])
+                if len(rows) == PDF_TABLE_ROWS:
+                    tables.append(self._pdf_table(rows))
+                    rows = []
+            if rows or not tables:
+                tables.append(self._pdf_table(rows))
+            
+            # Info
+            info = Paragraph(
+                f"Trainer: {trainer_info.get('name')}<br/>"
+                f"Period: {first_date or 'N/A'} to {last_date or 'N/A'}",
+                styles['Normal']
+            )
             
-            # Create table
-            table = Table(data)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(table)
-            doc.build(story)
+            doc.build([title, Spacer(1, 12), info, Spacer(1, 12), *tables])
             
+            if output is not None:
+                return None
             return buffer.getvalue()
             
         except Exception as e:
             log_error(f"Error exporting to PDF: {str(e)}")
             raise
     
+    def _pdf_table(self, rows: List[List]) -> Table:
+        table = Table([PDF_COLUMNS] + rows, repeatRows=1)
+        table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 14),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ]))
+        return table
+    
     def get_email_preferences(self, trainer_id: str) -> Dict:
         """Get trainer's email preferences for calendar invites"""
         try:
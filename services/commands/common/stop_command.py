@@ -109,6 +109,10 @@ def handle_stop(phone: str, auth_service, task_service, whatsapp) -> Dict:
         except Exception as nuclear_error:
             log_error(f"Nuclear cleanup error for {phone}: {str(nuclear_error)}")
         
+        # Tasks were force-completed directly - drop any cached running task
+        from services.auth.tasks.task_state_cache import invalidate_running_task
+        invalidate_running_task(phone)
+        
         # PHASE 5: Send appropriate response
         if stopped_tasks:
             task_list = ", ".join(stopped_tasks)
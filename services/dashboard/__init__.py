@@ -4,5 +4,8 @@ Provides web dashboard functionality for relationship management
 """
 from .dashboard_service import DashboardService
 from .token_manager import DashboardTokenManager
+from .trainee_loader import TraineeProgressLoader
+from .response_cache import DashboardResponseCache, get_response_cache, touch_dashboard_users
 
-__all__ = ['DashboardService', 'DashboardTokenManager']
\ No newline at end of file
+__all__ = ['DashboardService', 'DashboardTokenManager', 'TraineeProgressLoader',
+           'DashboardResponseCache', 'get_response_cache', 'touch_dashboard_users']
\ No newline at end of file
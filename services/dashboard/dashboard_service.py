@@ -2,9 +2,19 @@
 Dashboard Service
 Handles dashboard data retrieval and management
 """
-from typing import List, Dict, Optional
+from typing import List, Dict, Iterator, Optional, Tuple
 from utils.logger import log_info, log_error
+from services.helpers.export_stream import iter_offset_pages
 from services.relationships import RelationshipService
+from utils.keyset_pagination import iter_rows
+
+EXPORT_PROFILE_BATCH = 100
+
+# CSV columns of the relationships export, by the exporting user's role
+EXPORT_COLUMNS = {
+    'trainer': ['Name', 'Client ID', 'Phone', 'Email', 'Goals', 'Experience', 'Connected Date'],
+    'client': ['Name', 'Trainer ID', 'Phone', 'Email', 'Specialization', 'Experience', 'City', 'Connected Date']
+}
 
 
 class DashboardService:
@@ -186,12 +196,6 @@ class DashboardService:
     def get_all_trainers(self, client_id: str = None) -> List[Dict]:
         """Get all trainers on the platform for client browsing/invitation"""
         try:
-            # Get all trainers from the database
-            all_trainers_result = self.db.table('trainers').select('*').execute()
-            
-            if not all_trainers_result.data:
-                return []
-            
             # Get client's existing connections to mark them
             connected_trainer_ids = set()
             if client_id:
@@ -201,9 +205,9 @@ class DashboardService:
                 except Exception as e:
                     log_error(f"Error getting existing relationships: {str(e)}")
             
-            # Format all trainers for dashboard
+            # Format all trainers for dashboard, a page at a time while the next page loads
             formatted = []
-            for trainer in all_trainers_result.data:
+            for trainer in iter_rows(lambda: self.db.table('trainers').select('*'), prefetch=True):
                 trainer_id = trainer.get('trainer_id')
                 is_connected = trainer_id in connected_trainer_ids
                 
@@ -247,4 +251,60 @@ class DashboardService:
             
         except Exception as e:
             log_error(f"Error getting all trainers: {str(e)}")
-            return []
\ No newline at end of file
+            return []
+    
+    def get_relationship_export(self, user_id: str, role: str) -> Tuple[List[str], Iterator[List]]:
+        """
+        Header and rows for the relationships CSV export
+        
+        Rows are generated from paged reads of the relationship list, with
+        one profile query per EXPORT_PROFILE_BATCH relationships, so the
+        export can be streamed.
+        """
+        return EXPORT_COLUMNS[role], self._iter_export_rows(user_id, role)
+    
+    def _iter_export_rows(self, user_id: str, role: str) -> Iterator[List]:
+        if role == 'trainer':
+            list_table, user_field, profile_table, profile_field = 'trainer_client_list', 'trainer_id', 'clients', 'client_id'
+        else:
+            list_table, user_field, profile_table, profile_field = 'client_trainer_list', 'client_id', 'trainers', 'trainer_id'
+        
+        pages = iter_offset_pages(lambda: self.db.table(list_table).select(
+            f'{profile_field}, created_at, approved_at'
+        ).eq(user_field, user_id).eq('connection_status', 'active').order(profile_field))
+        
+        for page in pages:
+            for start in range(0, len(page), EXPORT_PROFILE_BATCH):
+                links = page[start:start + EXPORT_PROFILE_BATCH]
+                profiles = self.db.table(profile_table).select('*').in_(
+                    profile_field, [link[profile_field] for link in links]
+                ).execute()
+                profiles_by_id = {profile[profile_field]: profile for profile in profiles.data or []}
+                
+                yield from self._export_rows(role, links, profiles_by_id, profile_field)
+    
+    def _export_rows(self, role: str, links: List[Dict], profiles_by_id: Dict[str, Dict],
+                     profile_field: str) -> Iterator[List]:
+        for link in links:
+            profile = profiles_by_id.get(link[profile_field])
+            if not profile:
+                continue
+            
+            connected = link.get('approved_at') or link.get('created_at') or ''
+            if role == 'trainer':
+                yield [
+                    profile.get('name', ''), link['client_id'],
+                    profile.get('whatsapp', ''), profile.get('email', ''),
+                    self._format_array_field(profile.get('fitness_goals', '')),
+                    profile.get('experience_level', ''),
+                    connected[:10]
+                ]
+            else:
+                yield [
+                    profile.get('name', ''), link['trainer_id'],
+                    profile.get('whatsapp', ''), profile.get('email', ''),
+                    self._format_array_field(profile.get('specialization', '')),
+                    profile.get('experience_years') or profile.get('years_experience', ''),
+                    profile.get('city', ''),
+                    connected[:10]
+                ]
@@ -0,0 +1,171 @@
+"""
+Dashboard Response Cache
+Per-user caching and HTTP validators for dashboard pages and JSON APIs
+
+Every user has a change stamp: the time of the latest habit_logs or
+trainer_client_list change behind their pages (a trainer's stamp also covers
+their trainees' logs). A stamp is read from the database the first time it is
+needed and then moved forward by touch_dashboard_users(), which the habit
+logging, assignment and relationship services call when they write. Stamps
+are re-read after DASHBOARD_RESPONSE_CACHE_TTL_SECONDS so writes made by
+other processes are picked up.
+
+Rendered responses are cached per user and URL with the stamp they were
+rendered at. A refresh with no change since is served from the cache, and the
+ETag (a hash of the body) and Last-Modified (the stamp) let the browser
+revalidate with If-None-Match and get a 304. Cached entries also expire after
+the TTL, which bounds how stale shared panels such as leaderboards can get.
+"""
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Hashable, Iterable, List, Optional, Set
+from config import Config
+from utils.logger import log_error
+from utils.ttl_cache import TTLCache
+
+STAMP_CLIENT_BATCH = 100
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _parse_timestamp(value: Optional[str]) -> datetime:
+    """Database timestamp as an aware UTC datetime (naive values are taken as UTC)"""
+    if not value:
+        return EPOCH
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+class CachedResponse:
+    """A rendered 200 response and its validators"""
+
+    def __init__(self, stamp: datetime, body: bytes, headers: Dict[str, str]):
+        self.stamp = stamp
+        self.body = body
+        self.headers = headers
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+
+
+class DashboardResponseCache:
+    """Per-user change stamps and the responses rendered at them"""
+
+    def __init__(self, supabase_client, ttl_seconds: float = 60, max_size: int = 2000):
+        self.db = supabase_client
+        self.stamps = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='dashboard_stamps')
+        self.responses = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='dashboard_responses')
+        self._trainers_by_client: Dict[str, Set[str]] = {}
+        self._last_touch = EPOCH
+        self._lock = threading.Lock()
+
+    def get_stamp(self, user_id: str, role: str) -> datetime:
+        """Time of the latest change behind this user's pages"""
+        stamp = self.stamps.get(user_id)
+        if stamp is not None:
+            return stamp
+
+        loaded = self._load_stamp(user_id, role)
+        with self._lock:
+            # A touch() while we were reading wins over the database value
+            current = self.stamps.get(user_id)
+            stamp = max(current, loaded) if current is not None else loaded
+            self.stamps.set(user_id, stamp)
+        return stamp
+
+    def touch(self, user_ids: Iterable[str]):
+        """Record a change for these users (and the trainers of any of them that are clients)"""
+        with self._lock:
+            # Strictly increasing, so a response rendered between two touches is never reused
+            now = max(datetime.now(timezone.utc), self._last_touch + timedelta(microseconds=1))
+            self._last_touch = now
+            affected = set()
+            for user_id in user_ids:
+                if user_id:
+                    affected.add(user_id)
+                    affected.update(self._trainers_by_client.get(user_id, ()))
+            for user_id in affected:
+                self.stamps.set(user_id, now)
+
+    def get(self, key: Hashable, stamp: datetime) -> Optional[CachedResponse]:
+        """Cached response for this key if nothing has changed since it was rendered"""
+        entry = self.responses.get(key)
+        if entry is None or entry.stamp != stamp:
+            return None
+        return entry
+
+    def store(self, key: Hashable, stamp: datetime, body: bytes, headers: Dict[str, str]) -> CachedResponse:
+        entry = CachedResponse(stamp, body, headers)
+        self.responses.set(key, entry)
+        return entry
+
+    def _load_stamp(self, user_id: str, role: str) -> datetime:
+        """Latest trainer_client_list update and habit_logs insert for the user"""
+        try:
+            if role == 'trainer':
+                relationships = self.db.table('trainer_client_list').select(
+                    'client_id, updated_at'
+                ).eq('trainer_id', user_id).execute().data or []
+                client_ids = [row['client_id'] for row in relationships if row.get('client_id')]
+                with self._lock:
+                    for client_id in client_ids:
+                        self._trainers_by_client.setdefault(client_id, set()).add(user_id)
+            else:
+                relationships = self.db.table('trainer_client_list').select(
+                    'updated_at'
+                ).eq('client_id', user_id).order('updated_at', desc=True).limit(1).execute().data or []
+                client_ids = [user_id]
+
+            stamps = [_parse_timestamp(row.get('updated_at')) for row in relationships]
+            stamps.extend(self._latest_logs(client_ids))
+            return max(stamps, default=EPOCH)
+
+        except Exception as e:
+            # Unknown stamp: use now, so nothing cached earlier is reused
+            log_error(f"Error loading dashboard change stamp for {user_id}: {str(e)}")
+            return datetime.now(timezone.utc)
+
+    def _latest_logs(self, client_ids: List[str]) -> List[datetime]:
+        stamps = []
+        for start in range(0, len(client_ids), STAMP_CLIENT_BATCH):
+            result = self.db.table('habit_logs').select('created_at').in_(
+                'client_id', client_ids[start:start + STAMP_CLIENT_BATCH]
+            ).order('created_at', desc=True).limit(1).execute()
+            stamps.extend(_parse_timestamp(row.get('created_at')) for row in result.data or [])
+        return stamps
+
+    def get_stats(self) -> Dict:
+        return {
+            'stamps': self.stamps.get_stats(),
+            'responses': self.responses.get_stats()
+        }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache(supabase_client) -> DashboardResponseCache:
+    """Get (or lazily create) the process-wide response cache"""
+    global _response_cache
+
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = DashboardResponseCache(
+                    supabase_client,
+                    ttl_seconds=getattr(Config, 'DASHBOARD_RESPONSE_CACHE_TTL_SECONDS', 60),
+                    max_size=getattr(Config, 'DASHBOARD_RESPONSE_CACHE_MAX_SIZE', 2000)
+                )
+
+    return _response_cache
+
+
+def touch_dashboard_users(*user_ids: str):
+    """Hook for code that writes habit_logs, assignments or trainer_client_list rows"""
+    if _response_cache is None:
+        return
+    try:
+        _response_cache.touch(user_ids)
+    except Exception as e:
+        log_error(f"Error invalidating dashboard responses: {str(e)}")
@@ -1,26 +1,143 @@
 """
 Dashboard Token Manager
 Handles secure token generation and validation for dashboard access
+
+Validated tokens are cached in-process by token hash until they expire (or
+DASHBOARD_TOKEN_CACHE_TTL_SECONDS, whichever is sooner), and used_at is
+recorded by a background writer that coalesces accesses into one UPDATE per
+second in which tokens were used (at most one per second of the flush
+interval), so a page load or API call normally costs no token round trips.
 """
 import secrets
 import hashlib
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Optional, Dict
+from config import Config
 from utils.logger import log_info, log_error
+from utils.ttl_cache import TTLCache
+
+
+def hash_token(token: str) -> str:
+    """SHA-256 hex digest stored in dashboard_tokens.token_hash"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _seconds_until(expires_at: str) -> float:
+    """Seconds from now until an ISO expires_at (naive values are local time, as written by generate_token)"""
+    expiry = datetime.fromisoformat(expires_at)
+    now = datetime.now(timezone.utc) if expiry.tzinfo else datetime.now()
+    return (expiry - now).total_seconds()
+
+
+class TokenUsageWriter:
+    """
+    Background writer that coalesces dashboard_tokens.used_at updates.
+    
+    Each access only records the token id and time (to the second); every
+    `flush_interval` seconds the waiting ids are written with one UPDATE per
+    distinct last-use time, so each token keeps its own used_at. Like the
+    original inline update this is best-effort: failures are logged and the
+    batch is dropped.
+    """
+    
+    def __init__(self, supabase_client, flush_interval: float = 30, batch_size: int = 500):
+        self.db = supabase_client
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._pending: Dict[str, str] = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self.accesses = 0
+        self.updates_written = 0
+        self.write_errors = 0
+        
+        self._thread = threading.Thread(target=self._run, name='dashboard-token-usage-writer', daemon=True)
+        self._thread.start()
+    
+    def record(self, token_id, used_at: Optional[str] = None):
+        with self._pending_lock:
+            self._pending[token_id] = used_at or datetime.now().isoformat(timespec='seconds')
+            self.accesses += 1
+    
+    def flush(self):
+        """Write everything that is waiting (also called from the background thread)"""
+        with self._flush_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+            
+            by_used_at: Dict[str, list] = {}
+            for token_id, used_at in pending.items():
+                by_used_at.setdefault(used_at, []).append(token_id)
+            
+            for used_at, token_ids in by_used_at.items():
+                for start in range(0, len(token_ids), self.batch_size):
+                    batch = token_ids[start:start + self.batch_size]
+                    try:
+                        self.db.table('dashboard_tokens').update({
+                            'used_at': used_at
+                        }).in_('id', batch).execute()
+                        self.updates_written += 1
+                    except Exception as e:
+                        self.write_errors += 1
+                        log_error(f"Error recording dashboard token use for {len(batch)} tokens: {str(e)}")
+    
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._pending:
+                self.flush()
+    
+    def get_stats(self) -> Dict:
+        return {
+            'pending': len(self._pending),
+            'accesses': self.accesses,
+            'updates_written': self.updates_written,
+            'write_errors': self.write_errors
+        }
+
+
+_token_cache = TTLCache(
+    max_size=getattr(Config, 'DASHBOARD_TOKEN_CACHE_MAX_SIZE', 5000),
+    ttl_seconds=getattr(Config, 'DASHBOARD_TOKEN_CACHE_TTL_SECONDS', 300),
+    name='dashboard_tokens'
+)
+_usage_writer = None
+_usage_writer_lock = threading.Lock()
+
+
+def get_token_usage_writer(supabase_client) -> TokenUsageWriter:
+    """Get (or lazily create) the process-wide used_at writer"""
+    global _usage_writer
+    
+    if _usage_writer is None:
+        with _usage_writer_lock:
+            if _usage_writer is None:
+                _usage_writer = TokenUsageWriter(
+                    supabase_client,
+                    flush_interval=getattr(Config, 'DASHBOARD_TOKEN_USAGE_FLUSH_SECONDS', 30)
+                )
+    
+    return _usage_writer
 
 
 class DashboardTokenManager:
     """Manages secure tokens for dashboard access"""
     
-    def __init__(self, supabase_client):
+    def __init__(self, supabase_client, cache: Optional[TTLCache] = None,
+                 usage_writer: Optional[TokenUsageWriter] = None):
         self.db = supabase_client
+        self.cache = cache if cache is not None else _token_cache
+        self._usage_writer = usage_writer
     
     def generate_token(self, user_id: str, role: str, purpose: str = 'dashboard') -> Optional[str]:
         """Generate a secure token for dashboard access"""
         try:
             # Generate secure token
             token = secrets.token_urlsafe(32)
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            token_hash = hash_token(token)
             
             # Set expiration (1 hour from now)
             expires_at = datetime.now() + timedelta(hours=1)
@@ -48,29 +165,30 @@ class DashboardTokenManager:
             log_error(f"Error generating dashboard token: {str(e)}")
             return None
     
-    def validate_token(self, token: str, user_id: str) -> Optional[Dict]:
-        """Validate token and return user info if valid"""
+    def validate_token(self, token: str, user_id: str, record_use: bool = True) -> Optional[Dict]:
+        """
+        Validate token and return user info if valid
+        
+        Args:
+            record_use: Update used_at to track last access (API calls skip this)
+        """
         try:
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
+            token_hash = hash_token(token)
             
-            # Find valid token using your current schema
-            result = self.db.table('dashboard_tokens').select('*').eq(
-                'token_hash', token_hash
-            ).eq('user_id', user_id).gt(
-                'expires_at', datetime.now().isoformat()
-            ).execute()
+            token_data = self.cache.get(token_hash)
+            if token_data is None:
+                token_data = self._load_token(token_hash)
+                if token_data is None:
+                    return None
             
-            if not result.data:
+            # A token is only ever valid for the user it was issued to
+            if token_data['user_id'] != user_id:
                 return None
             
-            token_data = result.data[0]
-            
-            # Update used_at timestamp to track last access (but don't mark as used)
-            self.db.table('dashboard_tokens').update({
-                'used_at': datetime.now().isoformat()
-            }).eq('id', token_data['id']).execute()
-            
-            log_info(f"Validated dashboard token for {token_data['role']} {user_id}")
+            if record_use:
+                # Track last access (but don't mark as used); written in batches
+                usage_writer = self._usage_writer or get_token_usage_writer(self.db)
+                usage_writer.record(token_data['id'])
             
             return {
                 'user_id': token_data['user_id'],
@@ -82,6 +200,29 @@ class DashboardTokenManager:
             log_error(f"Error validating dashboard token: {str(e)}")
             return None
     
+    def _load_token(self, token_hash: str) -> Optional[Dict]:
+        """Read an unexpired token and cache it until it expires"""
+        result = self.db.table('dashboard_tokens').select(
+            'id, user_id, role, purpose, expires_at'
+        ).eq('token_hash', token_hash).gt(
+            'expires_at', datetime.now().isoformat()
+        ).execute()
+        
+        if not result.data:
+            return None
+        
+        token_data = result.data[0]
+        ttl = min(self.cache.ttl_seconds, _seconds_until(token_data['expires_at']))
+        if ttl > 0:
+            self.cache.set(token_hash, token_data, ttl_seconds=ttl)
+        
+        log_info(f"Validated dashboard token for {token_data['role']} {token_data['user_id']}")
+        return token_data
+    
+    def invalidate_token(self, token: str):
+        """Drop a token from the validation cache (e.g. after revoking it)"""
+        self.cache.invalidate(hash_token(token))
+    
     def cleanup_expired_tokens(self):
         """Clean up expired tokens"""
         try:
@@ -0,0 +1,137 @@
+"""
+Trainee Progress Loader
+Loads a trainer's trainee list with progress in a fixed number of bulk queries.
+
+Trainees, their contact details, active assignments with habit targets and
+this month's logs are each read once for the whole trainer; progress, streak
+and last activity are then worked out in memory. The number of round trips
+depends on the data size (pages and in_() batches), not on how many trainees
+the trainer has.
+"""
+import calendar
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+from services.habits.streak_engine import get_streak_engine
+from utils.keyset_pagination import fetch_all
+from utils.logger import log_info
+
+
+# Rows per page for paged reads, and client ids per in_() filter
+LOADER_PAGE_SIZE = 1000
+LOADER_CLIENT_BATCH = 100
+
+
+def format_last_activity(last_log: Optional[date]) -> str:
+    """Dashboard label for a client's most recent log date, e.g. 'Nov 06'"""
+    if last_log is None:
+        return "No activity"
+    return last_log.strftime('%b %d')
+
+
+class TraineeProgressLoader:
+    """Bulk data loader behind the trainer dashboard's trainee list"""
+
+    def __init__(self, supabase_client, today: Optional[date] = None):
+        self.db = supabase_client
+        self.today = today or datetime.now().date()
+
+    def load(self, trainer_id: str) -> List[Dict]:
+        """
+        Every active trainee of a trainer with habit count, average monthly
+        progress, total streak and last activity.
+
+        Last activity comes from the streak engine's look-back window, so a
+        client with no logs in the last year shows as 'No activity'.
+        """
+        trainees = self.db.table('trainer_client_list').select(
+            'client_id'
+        ).eq('trainer_id', trainer_id).eq('connection_status', 'active').execute().data or []
+        client_ids = list(dict.fromkeys(trainee['client_id'] for trainee in trainees))
+        if not client_ids:
+            return []
+
+        clients = self._fetch_clients(client_ids)
+        assignments = self._fetch_assignments(trainer_id)
+        monthly_totals = self._fetch_monthly_totals(client_ids)
+        details = get_streak_engine(self.db).get_streak_details(client_ids)
+
+        last_logs: Dict[str, date] = {}
+        for (client_id, _), (last_log, _) in details.items():
+            if client_id not in last_logs or last_log > last_logs[client_id]:
+                last_logs[client_id] = last_log
+
+        days_in_month = calendar.monthrange(self.today.year, self.today.month)[1]
+        results = []
+        for client_id in client_ids:
+            client_info = clients.get(client_id)
+            if not client_info:
+                continue
+
+            client_assignments = assignments.get(client_id, [])
+            total_progress = 0
+            total_streak = 0
+            for habit_id, daily_target in client_assignments:
+                monthly_target = daily_target * days_in_month if daily_target is not None else 0
+                if monthly_target > 0:
+                    completed = monthly_totals.get((client_id, habit_id), 0)
+                    total_progress += min(100, completed / monthly_target * 100)
+                total_streak += details.get((client_id, habit_id), (None, 0))[1]
+
+            habit_count = len(client_assignments)
+            avg_progress = total_progress / habit_count if habit_count > 0 else 0
+
+            results.append({
+                'client_id': client_id,
+                'name': client_info.get('name', 'Unknown'),
+                'phone': client_info.get('whatsapp', ''),
+                'whatsapp': client_info.get('whatsapp', ''),
+                'email': client_info.get('email', ''),
+                'habit_count': habit_count,
+                'avg_progress': round(avg_progress, 1),
+                'total_streak': total_streak,
+                'last_activity': format_last_activity(last_logs.get(client_id))
+            })
+
+        log_info(f"Loaded {len(results)} trainees for trainer {trainer_id}")
+        return results
+
+    def _fetch_clients(self, client_ids: List[str]) -> Dict[str, Dict]:
+        clients = {}
+        for batch in self._batches(client_ids):
+            result = self.db.table('clients').select(
+                'client_id, name, whatsapp, email'
+            ).in_('client_id', batch).execute()
+            clients.update({client['client_id']: client for client in result.data or []})
+        return clients
+
+    def _fetch_assignments(self, trainer_id: str) -> Dict[str, List[tuple]]:
+        """client_id -> [(habit_id, daily_target)]; the target is None if the habit is gone"""
+        rows = fetch_all(lambda: self.db.table('trainee_habit_assignments').select(
+            'id, client_id, habit_id, fitness_habits(target_value)'
+        ).eq('trainer_id', trainer_id).eq('is_active', True), page_size=LOADER_PAGE_SIZE)
+
+        assignments: Dict[str, List[tuple]] = {}
+        for row in rows:
+            habit = row.get('fitness_habits')
+            target = float(habit['target_value']) if habit and habit.get('target_value') is not None else None
+            assignments.setdefault(row['client_id'], []).append((row['habit_id'], target))
+        return assignments
+
+    def _fetch_monthly_totals(self, client_ids: List[str]) -> Dict[tuple, float]:
+        """(client_id, habit_id) -> sum of completed_value logged since the 1st of this month"""
+        month_start = self.today.replace(day=1).isoformat()
+        totals: Dict[tuple, float] = {}
+        for batch in self._batches(client_ids):
+            rows = fetch_all(lambda: self.db.table('habit_logs').select(
+                'id, client_id, habit_id, completed_value'
+            ).in_('client_id', batch).gte('log_date', month_start), page_size=LOADER_PAGE_SIZE)
+            for row in rows:
+                key = (row['client_id'], row['habit_id'])
+                totals[key] = totals.get(key, 0) + float(row['completed_value'] or 0)
+        return totals
+
+    @staticmethod
+    def _batches(items: List[str]) -> Iterable[List[str]]:
+        for start in range(0, len(items), LOADER_CLIENT_BATCH):
+            yield items[start:start + LOADER_CLIENT_BATCH]
@@ -0,0 +1,232 @@
+"""
+WhatsApp Flow Crypto
+Decrypts Flow data-exchange requests and encrypts their responses with a
+private key that is parsed once and reloaded only when it changes.
+
+The key is read from Config.WHATSAPP_FLOW_PRIVATE_KEY_PATH (a PEM file) when
+set, otherwise from Config.WHATSAPP_FLOW_PRIVATE_KEY. The source
+is re-checked at most every `reload_interval` seconds; a new PEM is parsed and
+validated before it replaces the current key, and the previous key stays
+usable so requests encrypted against the old public key during a rotation
+still decrypt.
+"""
+import base64
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric.padding import MGF1, OAEP
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.serialization import load_pem_private_key
+
+from utils.logger import log_error, log_info, log_warning
+
+
+MIN_KEY_SIZE = 2048
+
+# Padding objects are immutable, so one instance serves every request
+_OAEP_SHA256 = OAEP(mgf=MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+
+class FlowCryptoError(Exception):
+    """Raised when a Flow request cannot be decrypted or the key is unusable"""
+
+
+def _fingerprint(pem: bytes) -> str:
+    return hashlib.sha256(pem).hexdigest()[:16]
+
+
+def _parse_private_key(pem: bytes):
+    """Parse and validate a Flow private key"""
+    try:
+        key = load_pem_private_key(pem, password=None)
+    except Exception as e:
+        raise FlowCryptoError(f"Invalid WhatsApp Flow private key: {str(e)}")
+
+    if not isinstance(key, rsa.RSAPrivateKey):
+        raise FlowCryptoError("WhatsApp Flow private key must be an RSA key")
+    if key.key_size < MIN_KEY_SIZE:
+        raise FlowCryptoError(f"WhatsApp Flow private key must be at least {MIN_KEY_SIZE} bits")
+
+    return key
+
+
+class FlowKeyRing:
+    """Holds the parsed current (and previous) Flow private key"""
+
+    def __init__(self, pem_source=None, reload_interval: float = 30, clock=time.monotonic):
+        """
+        Args:
+            pem_source: callable returning the PEM as str/bytes (or None when
+                no key is configured); defaults to the file/env lookup
+            reload_interval: seconds between checks of the key source
+        """
+        self._pem_source = pem_source or _configured_pem
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        self._current = None
+        self._current_fingerprint = None
+        self._previous = None
+        self._checked_at = None
+        self.reloads = 0
+
+    def load(self) -> str:
+        """Load (or reload) the key now. Returns the key fingerprint"""
+        with self._lock:
+            self._refresh()
+            return self._current_fingerprint
+
+    def keys(self):
+        """Current key followed by the previous one (if any)"""
+        now = self._clock()
+        if self._checked_at is None or now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if self._checked_at is None or now - self._checked_at >= self.reload_interval:
+                    try:
+                        self._refresh()
+                    except FlowCryptoError as e:
+                        if self._current is None:
+                            raise
+                        # Keep serving with the key we have rather than failing every request
+                        log_error(f"Flow key reload failed, keeping key {self._current_fingerprint}: {str(e)}")
+
+        if self._current is None:
+            raise FlowCryptoError("WhatsApp Flow private key is not configured")
+
+        return [key for key in (self._current, self._previous) if key is not None]
+
+    def _refresh(self):
+        self._checked_at = self._clock()
+
+        pem = self._pem_source()
+        if not pem:
+            if self._current is None:
+                raise FlowCryptoError("WhatsApp Flow private key is not configured")
+            return
+
+        if isinstance(pem, str):
+            pem = pem.encode('utf-8')
+
+        fingerprint = _fingerprint(pem)
+        if fingerprint == self._current_fingerprint:
+            return
+
+        key = _parse_private_key(pem)
+        if self._current is not None:
+            log_info(f"WhatsApp Flow private key rotated: {self._current_fingerprint} -> {fingerprint}")
+        else:
+            log_info(f"WhatsApp Flow private key loaded ({fingerprint}, {key.key_size} bits)")
+
+        self._previous = self._current
+        self._current = key
+        self._current_fingerprint = fingerprint
+        self.reloads += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            'fingerprint': self._current_fingerprint,
+            'has_previous_key': self._previous is not None,
+            'reloads': self.reloads
+        }
+
+
+class FlowCrypto:
+    """Single decrypt/encrypt path for WhatsApp Flow data exchange"""
+
+    def __init__(self, key_ring: Optional[FlowKeyRing] = None):
+        self.key_ring = key_ring or FlowKeyRing()
+
+    def decrypt_aes_key(self, encrypted_aes_key: bytes) -> bytes:
+        last_error = None
+        for key in self.key_ring.keys():
+            try:
+                return key.decrypt(encrypted_aes_key, _OAEP_SHA256)
+            except ValueError as e:
+                last_error = e
+
+        raise FlowCryptoError(f"Could not decrypt AES key: {str(last_error)}")
+
+    def decrypt_request(self, encrypted_flow_data_b64: str, encrypted_aes_key_b64: str,
+                        initial_vector_b64: str) -> Tuple[Dict[str, Any], bytes, bytes]:
+        """
+        Decrypt a Flow request.
+
+        Returns:
+            (decrypted_data, aes_key, iv) - aes_key and iv are needed to
+            encrypt the response
+        """
+        try:
+            flow_data = base64.b64decode(encrypted_flow_data_b64)
+            iv = base64.b64decode(initial_vector_b64)
+            encrypted_aes_key = base64.b64decode(encrypted_aes_key_b64)
+        except Exception as e:
+            raise FlowCryptoError(f"Invalid base64 in Flow request: {str(e)}")
+
+        aes_key = self.decrypt_aes_key(encrypted_aes_key)
+
+        # Flow data is the GCM ciphertext with the 16-byte tag appended, which
+        # is exactly what AESGCM expects
+        try:
+            decrypted_bytes = AESGCM(aes_key).decrypt(iv, flow_data, None)
+        except InvalidTag:
+            raise FlowCryptoError("Flow data failed authentication")
+
+        return json.loads(decrypted_bytes.decode('utf-8')), aes_key, iv
+
+    @staticmethod
+    def encrypt_response(response: Dict[str, Any], aes_key: bytes, iv: bytes) -> str:
+        """Encrypt a Flow response with the request key and the flipped IV"""
+        flipped_iv = bytes(byte ^ 0xFF for byte in iv)
+        encrypted = AESGCM(aes_key).encrypt(flipped_iv, json.dumps(response).encode('utf-8'), None)
+        return base64.b64encode(encrypted).decode('utf-8')
+
+    def get_stats(self) -> Dict:
+        return self.key_ring.get_stats()
+
+
+def _configured_pem() -> Optional[str]:
+    from config import Config
+    key_path = getattr(Config, 'WHATSAPP_FLOW_PRIVATE_KEY_PATH', None)
+    if key_path:
+        try:
+            with open(key_path, 'rb') as key_file:
+                return key_file.read()
+        except OSError as e:
+            log_warning(f"Could not read Flow private key from {key_path}: {str(e)}")
+
+    return getattr(Config, 'WHATSAPP_FLOW_PRIVATE_KEY', None)
+
+
+_flow_crypto = None
+_flow_crypto_lock = threading.Lock()
+
+
+def get_flow_crypto() -> FlowCrypto:
+    """Get (or lazily create) the process-wide Flow crypto instance"""
+    global _flow_crypto
+
+    if _flow_crypto is None:
+        with _flow_crypto_lock:
+            if _flow_crypto is None:
+                from config import Config
+                _flow_crypto = FlowCrypto(FlowKeyRing(
+                    reload_interval=getattr(Config, 'FLOW_KEY_RELOAD_SECONDS', 30)
+                ))
+
+    return _flow_crypto
+
+
+def init_flow_crypto() -> Optional[str]:
+    """Load and validate the Flow key at startup. Returns its fingerprint, or None if unavailable"""
+    try:
+        return get_flow_crypto().key_ring.load()
+    except FlowCryptoError as e:
+        log_warning(f"WhatsApp Flow encryption unavailable: {str(e)}")
+        return None
@@ -362,6 +362,11 @@ class FlowEndpointHandler:
                 self.db.table('client_trainer_list').insert(client_list_data).execute()
                 log_info(f"Successfully created client_trainer_list relationship")
 
+            from services.dashboard.response_cache import touch_dashboard_users
+            from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+            touch_dashboard_users(trainer_id, client_id)
+            invalidate_trainer_leaderboards(trainer_id, reason='trainee list changed')
+
             return {
                 'success': True,
                 'message': 'Relationship created successfully'
@@ -41,12 +41,21 @@ class ReportingFlow:
                     self.whatsapp.send_message(phone, msg)
                     return {'success': True, 'response': msg, 'handler': 'weekly_report_invalid_week'}
                 
-                # Generate report
-                success, msg, csv_content = self.report_service.generate_weekly_report(
-                    client_id, week_start
-                )
+                # Generate report straight into the file that gets uploaded
+                report_name = f"weekly_report_{client_id}_{week_start.strftime('%Y%m%d')}.csv"
+                filepath = os.path.join(tempfile.gettempdir(), report_name)
                 
-                if not success or not csv_content:
+                with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                    success, msg, _ = self.report_service.generate_weekly_report(
+                        client_id, week_start, output=f
+                    )
+                
+                if not success:
+                    try:
+                        os.remove(filepath)
+                    except:
+                        pass
+                    
                     error_msg = f"❌ {msg}"
                     self.whatsapp.send_message(phone, error_msg)
                     self.task_service.complete_task(task['id'], 'client')
@@ -56,13 +65,6 @@ class ReportingFlow:
                 try:
                     from services.helpers.supabase_storage import SupabaseStorageHelper
                     
-                    temp_dir = tempfile.gettempdir()
-                    report_name = f"weekly_report_{client_id}_{week_start.strftime('%Y%m%d')}.csv"
-                    filepath = os.path.join(temp_dir, report_name)
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(csv_content)
-                    
                     storage_helper = SupabaseStorageHelper(self.db)
                     public_url = storage_helper.upload_csv(filepath, report_name)
                     
@@ -133,12 +135,21 @@ class ReportingFlow:
                     self.whatsapp.send_message(phone, msg)
                     return {'success': True, 'response': msg, 'handler': 'monthly_report_invalid_month'}
                 
-                # Generate report
-                success, msg, csv_content = self.report_service.generate_monthly_report(
-                    client_id, target_month, target_year
-                )
+                # Generate report straight into the file that gets uploaded
+                report_name = f"monthly_report_{client_id}_{target_year}{target_month:02d}.csv"
+                filepath = os.path.join(tempfile.gettempdir(), report_name)
                 
-                if not success or not csv_content:
+                with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                    success, msg, _ = self.report_service.generate_monthly_report(
+                        client_id, target_month, target_year, output=f
+                    )
+                
+                if not success:
+                    try:
+                        os.remove(filepath)
+                    except:
+                        pass
+                    
                     error_msg = f"❌ {msg}"
                     self.whatsapp.send_message(phone, error_msg)
                     self.task_service.complete_task(task['id'], 'client')
@@ -148,13 +159,6 @@ class ReportingFlow:
                 try:
                     from services.helpers.supabase_storage import SupabaseStorageHelper
                     
-                    temp_dir = tempfile.gettempdir()
-                    report_name = f"monthly_report_{client_id}_{target_year}{target_month:02d}.csv"
-                    filepath = os.path.join(temp_dir, report_name)
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(csv_content)
-                    
                     storage_helper = SupabaseStorageHelper(self.db)
                     public_url = storage_helper.upload_csv(filepath, report_name)
                     
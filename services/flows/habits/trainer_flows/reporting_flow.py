@@ -201,11 +201,7 @@ class ReportingFlow:
                         else:
                             week_start = datetime.strptime(message.strip(), '%Y-%m-%d').date()
                         
-                        # Generate report
-                        success, msg, csv_content = self.report_service.generate_trainer_report(
-                            trainer_id, task_data['client_id'], week_start, week_start + timedelta(days=6)
-                        )
-                        
+                        period_start, period_end = week_start, week_start + timedelta(days=6)
                         report_name = f"weekly_report_{task_data['client_id']}_{week_start.strftime('%Y%m%d')}.csv"
                     
                     else:  # monthly
@@ -222,15 +218,10 @@ class ReportingFlow:
                             target_month = int(parts[0])
                             target_year = int(parts[1])
                         
-                        # Generate report
                         from calendar import monthrange
-                        month_start = date(target_year, target_month, 1)
+                        period_start = date(target_year, target_month, 1)
                         last_day = monthrange(target_year, target_month)[1]
-                        month_end = date(target_year, target_month, last_day)
-                        
-                        success, msg, csv_content = self.report_service.generate_trainer_report(
-                            trainer_id, task_data['client_id'], month_start, month_end
-                        )
+                        period_end = date(target_year, target_month, last_day)
                         
                         report_name = f"monthly_report_{task_data['client_id']}_{target_year}{target_month:02d}.csv"
                 
@@ -239,7 +230,20 @@ class ReportingFlow:
                     self.whatsapp.send_message(phone, msg)
                     return {'success': True, 'response': msg, 'handler': 'trainee_report_invalid_period'}
                 
-                if not success or not csv_content:
+                # Generate report straight into the file that gets uploaded
+                filepath = os.path.join(tempfile.gettempdir(), report_name)
+                
+                with open(filepath, 'w', encoding='utf-8', newline='') as f:
+                    success, msg, _ = self.report_service.generate_trainer_report(
+                        trainer_id, task_data['client_id'], period_start, period_end, output=f
+                    )
+                
+                if not success:
+                    try:
+                        os.remove(filepath)
+                    except:
+                        pass
+                    
                     error_msg = f"❌ {msg}"
                     self.whatsapp.send_message(phone, error_msg)
                     self.task_service.complete_task(task['id'], 'trainer')
@@ -249,12 +253,6 @@ class ReportingFlow:
                 try:
                     from services.helpers.supabase_storage import SupabaseStorageHelper
                     
-                    temp_dir = tempfile.gettempdir()
-                    filepath = os.path.join(temp_dir, report_name)
-                    
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(csv_content)
-                    
                     storage_helper = SupabaseStorageHelper(self.db)
                     public_url = storage_helper.upload_csv(filepath, report_name)
                     
@@ -5,6 +5,9 @@ Handles assigning habits to clients and managing assignments
 
 from typing import Dict, List, Optional, Tuple
 
+from services.dashboard.response_cache import touch_dashboard_users
+from services.habits.leaderboard_service import invalidate_leaderboards
+
 
 def log_error(message: str):
     """Log error message"""
@@ -116,6 +119,9 @@ class AssignmentService:
             
             message = "\n".join(msg_parts) if msg_parts else "No assignments made"
             success = len(results['assigned']) > 0
+            if success:
+                invalidate_leaderboards('habit assigned')
+                touch_dashboard_users(trainer_id, *results['assigned'])
             
             return success, message, results
             
@@ -268,6 +274,8 @@ class AssignmentService:
             
             if update_result.data:
                 log_info(f"Habit {habit_id} unassigned from client {client_id}")
+                invalidate_leaderboards('habit unassigned')
+                touch_dashboard_users(trainer_id, client_id)
                 return True, "Habit unassigned successfully"
             else:
                 return False, "Failed to unassign habit"
@@ -310,6 +318,8 @@ class AssignmentService:
             
             if update_result.data:
                 log_info(f"Habit {habit_id} unassigned from {count} clients")
+                invalidate_leaderboards('habit unassigned')
+                touch_dashboard_users(trainer_id, *(row.get('client_id') for row in result.data))
                 return True, f"Unassigned from {count} client(s)", count
             else:
                 return False, "Failed to unassign habit", 0
@@ -0,0 +1,139 @@
+"""
+Daily Progress
+Per-(client, habit, day) habit totals read from habit_daily_progress.
+
+habit_daily_progress holds the summed completed_value and log count for every
+day a client logged a habit. A trigger on habit_logs maintains it (see
+database/migrations/003_create_habit_daily_progress.sql), so the row moves in
+the same transaction as the log LoggingService.log_habit inserts and a day's
+progress is one indexed read instead of a sum over its logs.
+
+If the table cannot be read (e.g. the migration has not been applied yet) the
+totals are recomputed from habit_logs, and the table is skipped for
+AGGREGATE_RETRY_SECONDS before it is tried again. With HABIT_PROGRESS_VERIFY set, every
+read is also recomputed, differences are logged and the recomputed totals are
+returned.
+"""
+import time
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from config import Config
+from utils.keyset_pagination import fetch_all
+from utils.logger import log_warning
+
+# Rows per page for whole-day reads across all clients
+PROGRESS_PAGE_SIZE = 1000
+# Totals closer than this count as equal when verifying (NUMERIC vs float sums)
+VERIFY_TOLERANCE = 1e-6
+# How long reads go straight to habit_logs after habit_daily_progress failed
+AGGREGATE_RETRY_SECONDS = 300
+
+# Clock time before which habit_daily_progress is not tried (shared by all stores)
+_aggregate_unavailable_until = 0.0
+
+# (completed_total, log_count) per habit for a day
+DayTotals = Dict[str, Tuple[float, int]]
+
+
+def _as_iso(value) -> str:
+    return value.isoformat() if isinstance(value, date) else str(value)[:10]
+
+
+class DailyProgressStore:
+    """Reads of habit_daily_progress with a habit_logs fallback"""
+
+    def __init__(self, supabase_client, verify: Optional[bool] = None, clock=time.monotonic):
+        self.db = supabase_client
+        self.verify = getattr(Config, 'HABIT_PROGRESS_VERIFY', False) if verify is None else verify
+        self.clock = clock
+
+    def get_habit_day(self, client_id: str, habit_id: str, log_date) -> Tuple[float, int]:
+        """(completed_total, log_count) for one habit on one day - a single-row lookup"""
+        return self.get_day(client_id, log_date, [habit_id]).get(habit_id, (0.0, 0))
+
+    def get_day(self, client_id: str, log_date, habit_ids: Optional[Iterable[str]] = None) -> DayTotals:
+        """
+        (completed_total, log_count) per habit for one client and day.
+
+        Habits without logs that day are omitted.
+        """
+        totals = self._totals(log_date, client_id, habit_ids)
+        return {habit_id: values for (_, habit_id), values in totals.items()}
+
+    def get_all_clients_day(self, log_date) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        """(completed_total, log_count) keyed by (client_id, habit_id) for every client on one day"""
+        return self._totals(log_date)
+
+    def _totals(self, log_date, client_id: Optional[str] = None,
+                habit_ids: Optional[Iterable[str]] = None) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        day = _as_iso(log_date)
+        habit_ids = list(habit_ids) if habit_ids is not None else None
+        if habit_ids == []:
+            return {}
+
+        global _aggregate_unavailable_until
+        if self.clock() < _aggregate_unavailable_until:
+            return self._recompute(day, client_id, habit_ids)
+
+        try:
+            totals = self._read_aggregate(day, client_id, habit_ids)
+        except Exception as e:
+            _aggregate_unavailable_until = self.clock() + AGGREGATE_RETRY_SECONDS
+            log_warning(f"habit_daily_progress unavailable, recomputing from habit_logs "
+                        f"for the next {AGGREGATE_RETRY_SECONDS}s: {str(e)}")
+            return self._recompute(day, client_id, habit_ids)
+
+        if self.verify:
+            recomputed = self._recompute(day, client_id, habit_ids)
+            differences = self._differences(totals, recomputed)
+            if differences:
+                log_warning(f"habit_daily_progress differs from habit_logs for {day}: {differences}")
+                return recomputed
+        return totals
+
+    def _filtered(self, table: str, columns: str, day: str, client_id: Optional[str], habit_ids):
+        query = self.db.table(table).select(columns).eq('log_date', day)
+        if client_id:
+            query = query.eq('client_id', client_id)
+        if habit_ids is not None:
+            query = query.eq('habit_id', habit_ids[0]) if len(habit_ids) == 1 else query.in_('habit_id', habit_ids)
+        return query
+
+    def _read_aggregate(self, day: str, client_id: Optional[str], habit_ids) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        rows = fetch_all(lambda: self._filtered(
+            'habit_daily_progress', 'id, client_id, habit_id, completed_total, log_count', day, client_id, habit_ids
+        ), page_size=PROGRESS_PAGE_SIZE)
+        return {
+            (row['client_id'], row['habit_id']): (float(row.get('completed_total') or 0), int(row.get('log_count') or 0))
+            for row in rows
+        }
+
+    def _recompute(self, day: str, client_id: Optional[str], habit_ids) -> Dict[Tuple[str, str], Tuple[float, int]]:
+        rows = fetch_all(lambda: self._filtered(
+            'habit_logs', 'id, client_id, habit_id, completed_value', day, client_id, habit_ids
+        ), page_size=PROGRESS_PAGE_SIZE)
+        completed = defaultdict(float)
+        counts = defaultdict(int)
+        for row in rows:
+            key = (row['client_id'], row['habit_id'])
+            completed[key] += float(row.get('completed_value') or 0)
+            counts[key] += 1
+        return {key: (completed[key], counts[key]) for key in counts}
+
+    @staticmethod
+    def _differences(aggregate: Dict, recomputed: Dict) -> Dict:
+        """{key: (aggregate, recomputed)} for every key whose totals disagree"""
+        differences = {}
+        for key in aggregate.keys() | recomputed.keys():
+            stored_total, stored_count = aggregate.get(key, (0.0, 0))
+            total, count = recomputed.get(key, (0.0, 0))
+            if stored_count != count or abs(stored_total - total) > VERIFY_TOLERANCE:
+                differences[key] = (aggregate.get(key), recomputed.get(key))
+        return differences
+
+
+def get_daily_progress_store(supabase_client) -> DailyProgressStore:
+    """Daily progress reads over a Supabase client"""
+    return DailyProgressStore(supabase_client)
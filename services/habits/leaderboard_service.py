@@ -0,0 +1,406 @@
+"""
+Leaderboard Service
+Materialised habit leaderboards for the dashboard.
+
+Each snapshot ranks the clients of one scope (a trainer's trainees, or every
+client with active assignments) for one day or month. It is built from a few
+bulk reads, kept sorted, and updated in place as habit logs arrive, so a page
+view reads the top entries and the viewer's rank without touching habit_logs.
+"""
+import bisect
+import calendar
+import threading
+import time
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+from services.habits.streak_engine import get_streak_engine
+from utils.keyset_pagination import fetch_all
+from utils.logger import log_error, log_info
+from utils.ttl_cache import TTLCache
+
+
+GLOBAL_SCOPE = 'global'
+
+# How a day with several logs for one habit counts towards progress
+DAY_MAX = 'day_max'   # the best log of the day (global dashboard leaderboard)
+DAY_SUM = 'day_sum'   # every log adds up (trainer and monthly client leaderboards)
+
+LEADERBOARD_PAGE_SIZE = 1000
+LEADERBOARD_CLIENT_BATCH = 100
+
+
+def period_bounds(view_type: str, day: date) -> Tuple[date, date]:
+    """First and last day of the daily or monthly period containing `day`"""
+    if view_type == 'daily':
+        return day, day
+    last = calendar.monthrange(day.year, day.month)[1]
+    return day.replace(day=1), day.replace(day=last)
+
+
+class LeaderboardSnapshot:
+    """
+    Ranking for one (scope, view_type, period, aggregate).
+
+    Clients are kept in a sorted list of (-progress, -total_streak, client_id)
+    keys, so the top N is a slice and a client's rank is a bisect.
+    """
+
+    def __init__(self, scope: str, view_type: str, start: date, end: date, aggregate: str):
+        self.scope = scope
+        self.view_type = view_type
+        self.start = start
+        self.end = end
+        self.aggregate = aggregate
+        self.days = (end - start).days + 1
+        self.built_at = time.time()
+        self.updates = 0
+
+        # client_id -> {'name', 'trainer_ids', 'habits': [(habit_id, target)], 'values': {habit_id: {day: [sum, max]}},
+        #               'streaks': {habit_id: streak} as last ranked}
+        self._clients: Dict[str, Dict] = {}
+        self._entries: Dict[str, Dict] = {}
+        self._order: List[tuple] = []
+        self._lock = threading.Lock()
+
+    @property
+    def key(self) -> tuple:
+        return self.scope, self.view_type, self.start.isoformat(), self.aggregate
+
+    def add_client(self, client_id: str, name: str):
+        self._clients.setdefault(client_id, {'name': name, 'trainer_ids': set(), 'habits': [], 'values': {},
+                                             'streaks': {}})
+
+    def add_assignment(self, client_id: str, habit_id: str, target: float, trainer_id: Optional[str] = None):
+        client = self._clients.get(client_id)
+        if client is None:
+            return
+        client['habits'].append((habit_id, target))
+        if trainer_id:
+            client['trainer_ids'].add(trainer_id)
+
+    def habit_count(self, client_id: str) -> int:
+        client = self._clients.get(client_id)
+        return len(client['habits']) if client else 0
+
+    def add_log(self, client_id: str, habit_id: str, log_date: str, value: float) -> bool:
+        """Fold one log into the raw totals. Returns False if it does not belong to this snapshot"""
+        client = self._clients.get(client_id)
+        if client is None or not self.start.isoformat() <= log_date[:10] <= self.end.isoformat():
+            return False
+        if not any(assigned == habit_id for assigned, _ in client['habits']):
+            return False
+
+        day_totals = client['values'].setdefault(habit_id, {})
+        totals = day_totals.setdefault(log_date[:10], [0.0, 0.0])
+        totals[0] += value
+        totals[1] = max(totals[1], value)
+        return True
+
+    def _progress(self, client: Dict) -> float:
+        habits = client['habits']
+        if not habits:
+            return 0.0
+        index = 1 if self.aggregate == DAY_MAX else 0
+        total = 0.0
+        for habit_id, target in habits:
+            period_target = target * self.days
+            if period_target <= 0:
+                continue
+            completed = sum(totals[index] for totals in client['values'].get(habit_id, {}).values())
+            total += min(100, completed / period_target * 100)
+        return total / len(habits)
+
+    def rank_client(self, client_id: str, streaks: Dict[str, int]):
+        """(Re)compute a client's entry from its totals and current streaks and move it into place"""
+        client = self._clients.get(client_id)
+        if client is None:
+            return
+        client['streaks'] = dict(streaks)
+        entry = {
+            'client_id': client_id,
+            'name': client['name'],
+            'progress': round(self._progress(client), 1),
+            'habit_count': len(client['habits']),
+            'total_streak': sum(streaks.get(habit_id, 0) for habit_id, _ in client['habits']),
+            'trainer_ids': sorted(client['trainer_ids'])
+        }
+        key = (-entry['progress'], -entry['total_streak'], client_id)
+
+        with self._lock:
+            old = self._entries.get(client_id)
+            if old is not None:
+                old_key = (-old['progress'], -old['total_streak'], client_id)
+                position = bisect.bisect_left(self._order, old_key)
+                if position < len(self._order) and self._order[position] == old_key:
+                    del self._order[position]
+            self._entries[client_id] = entry
+            bisect.insort(self._order, key)
+
+    def record_log(self, client_id: str, habit_id: str, log_date: str, value: float,
+                   streaks: Dict[str, int]) -> bool:
+        """
+        Apply a newly written log; returns True if the snapshot changed.
+
+        `streaks` holds the current streaks of the habits that changed; the
+        client's other habits keep the streaks they were last ranked with.
+        """
+        with self._lock:
+            applied = self.add_log(client_id, habit_id, log_date, value)
+        if applied:
+            self.rank_client(client_id, {**self._clients[client_id]['streaks'], **streaks})
+            self.updates += 1
+        return applied
+
+    def __contains__(self, client_id: str) -> bool:
+        return client_id in self._clients
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def _entry(self, position: int, key: tuple) -> Dict:
+        entry = dict(self._entries[key[2]])
+        entry['rank'] = position + 1
+        return entry
+
+    def top(self, limit: Optional[int] = None) -> List[Dict]:
+        """Ranked entries, best first"""
+        with self._lock:
+            keys = self._order if limit is None else self._order[:limit]
+            return [self._entry(position, key) for position, key in enumerate(keys)]
+
+    def entry_for(self, client_id: str) -> Optional[Dict]:
+        """A client's ranked entry, or None if the client is not on this leaderboard"""
+        with self._lock:
+            entry = self._entries.get(client_id)
+            if entry is None:
+                return None
+            key = (-entry['progress'], -entry['total_streak'], client_id)
+            return self._entry(bisect.bisect_left(self._order, key), key)
+
+
+class LeaderboardService:
+    """Builds and serves leaderboard snapshots"""
+
+    def __init__(self, supabase_client, snapshots: Optional[TTLCache] = None):
+        self.db = supabase_client
+        self.snapshots = snapshots if snapshots is not None else _snapshots
+
+    # Reads
+
+    def get_snapshot(self, scope: str, view_type: str, day: Optional[date] = None,
+                     aggregate: str = DAY_MAX) -> LeaderboardSnapshot:
+        start, end = period_bounds(view_type, day or date.today())
+        key = (scope, view_type, start.isoformat(), aggregate)
+        snapshot = self.snapshots.get(key)
+        if snapshot is None:
+            generation = _generation()
+            snapshot = self.build(scope, view_type, start, end, aggregate)
+            # A log written mid-build may be missing; serve this one but don't keep it
+            if generation == _generation():
+                self.snapshots.set(key, snapshot)
+        return snapshot
+
+    def get_global_leaderboard(self, current_client_id: str, view_type: str = 'daily',
+                               day: Optional[date] = None, aggregate: str = DAY_MAX,
+                               limit: int = 10) -> List[Dict]:
+        """Top `limit` clients platform-wide, plus the current client if ranked lower"""
+        snapshot = self.get_snapshot(GLOBAL_SCOPE, view_type, day, aggregate)
+        return self._with_current(snapshot.top(limit), snapshot.entry_for(current_client_id),
+                                  current_client_id, 'is_current_user')
+
+    def get_trainer_leaderboard(self, trainer_id: str, current_client_id: str) -> List[Dict]:
+        """Every trainee of a trainer, ranked on this month's progress"""
+        snapshot = self.get_snapshot(trainer_id, 'monthly', aggregate=DAY_SUM)
+        entries = snapshot.top()
+        for entry in entries:
+            entry['is_current_trainee'] = entry['client_id'] == current_client_id
+        return entries
+
+    @staticmethod
+    def _with_current(top: List[Dict], current: Optional[Dict], current_client_id: str, flag: str) -> List[Dict]:
+        for entry in top:
+            entry[flag] = entry['client_id'] == current_client_id
+        if current is not None and current['rank'] > len(top):
+            current[flag] = True
+            top.append(current)
+        return top
+
+    # Writes
+
+    def record_log(self, client_id: str, habit_id: str, log_date: str, value: float,
+                   streak: Optional[int] = None) -> int:
+        """
+        Apply a new habit log to every cached snapshot it belongs to. Returns how many changed
+
+        Args:
+            streak: The habit's streak after this log, as returned by record_habit_log.
+                None (client not in the streak cache, or a backfilled log) reads the
+                client's streaks from habit_logs instead.
+        """
+        _bump_generation()
+        affected = [snapshot for _, snapshot in self.snapshots.items() if client_id in snapshot]
+        if not affected:
+            return 0
+
+        if streak is None:
+            streaks = get_streak_engine(self.db).get_client_streaks(client_id)
+        else:
+            streaks = {habit_id: streak}
+        return sum(1 for snapshot in affected
+                   if snapshot.record_log(client_id, habit_id, log_date, float(value), streaks))
+
+    def refresh(self, keys: Optional[Iterable[tuple]] = None) -> int:
+        """Rebuild the given snapshot keys (default: every cached one plus today's global boards)"""
+        if keys is None:
+            today = date.today()
+            keys = {key for key, _ in self.snapshots.items()}
+            keys.add((GLOBAL_SCOPE, 'daily', today.isoformat(), DAY_MAX))
+            keys.add((GLOBAL_SCOPE, 'monthly', today.replace(day=1).isoformat(), DAY_MAX))
+
+        rebuilt = 0
+        for scope, view_type, start_iso, aggregate in keys:
+            try:
+                generation = _generation()
+                start, end = period_bounds(view_type, date.fromisoformat(start_iso))
+                snapshot = self.build(scope, view_type, start, end, aggregate)
+                if generation == _generation():
+                    self.snapshots.set(snapshot.key, snapshot)
+                else:
+                    self.snapshots.invalidate(snapshot.key)
+                rebuilt += 1
+            except Exception as e:
+                log_error(f"Error refreshing leaderboard {scope}/{view_type}/{start_iso}: {str(e)}")
+        return rebuilt
+
+    # Building
+
+    def build(self, scope: str, view_type: str, start: date, end: date,
+              aggregate: str = DAY_MAX) -> LeaderboardSnapshot:
+        """Materialise one leaderboard from bulk reads"""
+        started = time.perf_counter()
+        snapshot = LeaderboardSnapshot(scope, view_type, start, end, aggregate)
+
+        if scope == GLOBAL_SCOPE:
+            assignments = fetch_all(lambda: self.db.table('trainee_habit_assignments').select(
+                'id, client_id, habit_id, trainer_id, fitness_habits(target_value)'
+            ).eq('is_active', True), page_size=LEADERBOARD_PAGE_SIZE)
+            client_ids = list(dict.fromkeys(row['client_id'] for row in assignments))
+            names = self._client_names(client_ids)
+            for client_id in client_ids:
+                snapshot.add_client(client_id, names.get(client_id, 'Unknown'))
+        else:
+            trainees = self.db.table('trainer_client_list').select(
+                'client_id, clients(name)'
+            ).eq('trainer_id', scope).eq('is_active', True).execute().data or []
+            for trainee in trainees:
+                snapshot.add_client(trainee['client_id'], (trainee.get('clients') or {}).get('name', 'Unknown'))
+            client_ids = [trainee['client_id'] for trainee in trainees]
+            assignments = []
+            for batch in self._batches(client_ids):
+                assignments.extend(fetch_all(lambda: self.db.table('trainee_habit_assignments').select(
+                    'id, client_id, habit_id, trainer_id, fitness_habits(target_value)'
+                ).eq('trainer_id', scope).eq('is_active', True).in_('client_id', batch), page_size=LEADERBOARD_PAGE_SIZE))
+
+        for assignment in assignments:
+            habit = assignment.get('fitness_habits')
+            if not habit:
+                continue
+            snapshot.add_assignment(assignment['client_id'], assignment['habit_id'],
+                                    float(habit.get('target_value') or 1), assignment.get('trainer_id'))
+
+        for row in self._fetch_logs(scope, client_ids, start, end):
+            snapshot.add_log(row['client_id'], row['habit_id'], row['log_date'], float(row['completed_value'] or 0))
+
+        streaks_by_client: Dict[str, Dict[str, int]] = {}
+        for (client_id, habit_id), streak in get_streak_engine(self.db).get_streaks(client_ids).items():
+            streaks_by_client.setdefault(client_id, {})[habit_id] = streak
+
+        for client_id in client_ids:
+            # The global board only lists clients with at least one live habit
+            if scope == GLOBAL_SCOPE and not snapshot.habit_count(client_id):
+                continue
+            snapshot.rank_client(client_id, streaks_by_client.get(client_id, {}))
+
+        log_info(f"Built leaderboard {scope}/{view_type}/{start.isoformat()}: {len(snapshot)} clients, "
+                 f"{len(assignments)} assignments in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return snapshot
+
+    def _fetch_logs(self, scope: str, client_ids: List[str], start: date, end: date) -> List[Dict]:
+        def logs_query():
+            return self.db.table('habit_logs').select(
+                'id, client_id, habit_id, completed_value, log_date'
+            ).gte('log_date', start.isoformat()).lte('log_date', end.isoformat())
+
+        if scope == GLOBAL_SCOPE:
+            return fetch_all(logs_query, page_size=LEADERBOARD_PAGE_SIZE)
+        rows = []
+        for batch in self._batches(client_ids):
+            rows.extend(fetch_all(lambda: logs_query().in_('client_id', batch), page_size=LEADERBOARD_PAGE_SIZE))
+        return rows
+
+    def _client_names(self, client_ids: List[str]) -> Dict[str, str]:
+        names = {}
+        for batch in self._batches(client_ids):
+            result = self.db.table('clients').select('client_id, name').in_('client_id', batch).execute()
+            names.update({client['client_id']: client['name'] for client in result.data or []})
+        return names
+
+    @staticmethod
+    def _batches(items: List[str]) -> Iterable[List[str]]:
+        for start in range(0, len(items), LEADERBOARD_CLIENT_BATCH):
+            yield items[start:start + LEADERBOARD_CLIENT_BATCH]
+
+
+_snapshots = TTLCache(
+    max_size=getattr(Config, 'LEADERBOARD_SNAPSHOT_MAX_SIZE', 500),
+    ttl_seconds=getattr(Config, 'LEADERBOARD_SNAPSHOT_TTL_SECONDS', 600),
+    name='leaderboards'
+)
+_generation_lock = threading.Lock()
+_log_generation = 0
+
+
+def _generation() -> int:
+    return _log_generation
+
+
+def _bump_generation():
+    global _log_generation
+    with _generation_lock:
+        _log_generation += 1
+
+
+def get_leaderboard_service(supabase_client) -> LeaderboardService:
+    """Leaderboard service over the process-wide snapshot cache"""
+    return LeaderboardService(supabase_client)
+
+
+def record_leaderboard_log(supabase_client, client_id: str, habit_id: str, log_date: str, value: float,
+                           streak: Optional[int] = None) -> int:
+    """Hook for code that inserts habit_logs rows (streak: what record_habit_log returned)"""
+    try:
+        return get_leaderboard_service(supabase_client).record_log(client_id, habit_id, log_date, value, streak)
+    except Exception as e:
+        log_error(f"Error updating leaderboards for {client_id}: {str(e)}")
+        return 0
+
+
+def invalidate_leaderboards(reason: str = ''):
+    """Hook for code that changes assignments or deletes logs: drop every snapshot"""
+    _bump_generation()
+    _snapshots.clear()
+    if reason:
+        log_info(f"Leaderboard snapshots cleared ({reason})")
+
+
+def invalidate_trainer_leaderboards(*trainer_ids: str, reason: str = ''):
+    """Hook for code that writes trainer_client_list: drop those trainers' snapshots"""
+    scopes = {trainer_id for trainer_id in trainer_ids if trainer_id}
+    if not scopes:
+        return
+    _bump_generation()
+    dropped = _snapshots.invalidate_where(lambda key: key[0] in scopes)
+    if reason and dropped:
+        log_info(f"Cleared {dropped} trainer leaderboard snapshots ({reason})")
@@ -0,0 +1,183 @@
+"""
+Habit Log Cube
+Columnar in-memory view of habit_logs for dashboard and report aggregations.
+
+A date range of logs is loaded once and laid out as dense (client, habit) x
+day matrices of summed values, best single values and log counts. Daily and
+period totals, completion percentages and "days logged" (several logs on one
+day count once) are then NumPy reductions over those matrices instead of
+Python dict loops over raw rows.
+"""
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from utils.keyset_pagination import fetch_all
+
+
+# Rows per page for habit_logs reads, and client ids per in_() filter
+CUBE_PAGE_SIZE = 1000
+CUBE_CLIENT_BATCH = 100
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+class HabitLogCube:
+    """
+    habit_logs for [start, end], keyed by (client_id, habit_id, day).
+
+    Each (client, habit) pair seen in the logs gets one row in three
+    (pairs x days) matrices: the summed completed_value per day, the largest
+    single completed_value per day, and the number of logs per day.
+    """
+
+    def __init__(self, start, end):
+        self.start = _as_date(start)
+        self.end = _as_date(end)
+        self.days = (self.end - self.start).days + 1
+        self._pairs: Dict[Tuple[str, str], int] = {}
+        self._client_rows: Dict[str, List[int]] = {}
+        self.sums = np.zeros((0, self.days))
+        self.maxes = np.zeros((0, self.days))
+        self.counts = np.zeros((0, self.days), dtype=np.int64)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict], start, end) -> 'HabitLogCube':
+        """Build a cube from habit_logs rows (client_id, habit_id, log_date, completed_value)"""
+        cube = cls(start, end)
+        rows = list(rows)
+        if not rows:
+            return cube
+
+        start_day = np.datetime64(cube.start.isoformat(), 'D')
+        days = (np.array([row['log_date'][:10] for row in rows], dtype='datetime64[D]') - start_day).astype(np.int64)
+        values = np.fromiter((float(row.get('completed_value') or 0) for row in rows), dtype=float, count=len(rows))
+        pairs = np.fromiter(
+            (cube._pairs.setdefault((row['client_id'], row['habit_id']), len(cube._pairs)) for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+
+        for (client_id, _), row in cube._pairs.items():
+            cube._client_rows.setdefault(client_id, []).append(row)
+
+        in_range = (days >= 0) & (days < cube.days)
+        cells = pairs[in_range] * cube.days + days[in_range]
+        values = values[in_range]
+        size = len(cube._pairs) * cube.days
+
+        cube.sums = np.bincount(cells, weights=values, minlength=size).reshape(-1, cube.days)
+        cube.counts = np.bincount(cells, minlength=size).reshape(-1, cube.days)
+        maxes = np.zeros(size)
+        np.maximum.at(maxes, cells, values)
+        cube.maxes = maxes.reshape(-1, cube.days)
+        return cube
+
+    @classmethod
+    def load(cls, supabase_client, client_ids: Iterable[str], start, end,
+             habit_ids: Optional[List[str]] = None) -> 'HabitLogCube':
+        """Fetch every log for the clients (optionally only some habits) in [start, end] and build a cube"""
+        start, end = _as_date(start), _as_date(end)
+        client_ids = list(dict.fromkeys(client_ids))
+        rows = []
+        for offset in range(0, len(client_ids), CUBE_CLIENT_BATCH):
+            batch = client_ids[offset:offset + CUBE_CLIENT_BATCH]
+
+            def build_query():
+                query = supabase_client.table('habit_logs').select(
+                    'id, client_id, habit_id, completed_value, log_date'
+                )
+                query = query.eq('client_id', batch[0]) if len(batch) == 1 else query.in_('client_id', batch)
+                if habit_ids is not None:
+                    query = query.in_('habit_id', habit_ids)
+                return query.gte('log_date', start.isoformat()).lte('log_date', end.isoformat())
+
+            rows.extend(fetch_all(build_query, page_size=CUBE_PAGE_SIZE))
+        return cls.from_rows(rows, start, end)
+
+    # Layout
+
+    def dates(self) -> List[date]:
+        """Every day in the cube, in order"""
+        return [self.start + timedelta(days=offset) for offset in range(self.days)]
+
+    def pairs(self) -> List[Tuple[str, str]]:
+        """(client_id, habit_id) pairs with at least one log"""
+        return list(self._pairs)
+
+    def _window(self, start=None, end=None) -> slice:
+        first = 0 if start is None else max(0, (_as_date(start) - self.start).days)
+        last = self.days if end is None else min(self.days, (_as_date(end) - self.start).days + 1)
+        return slice(first, max(first, last))
+
+    def _rows(self, client_id: str, habit_id: Optional[str] = None) -> List[int]:
+        if habit_id is not None:
+            row = self._pairs.get((client_id, habit_id))
+            return [] if row is None else [row]
+        return self._client_rows.get(client_id, [])
+
+    # Per (client, habit)
+
+    def daily_totals(self, client_id: str, habit_id: str, start=None, end=None) -> np.ndarray:
+        """Summed completed_value per day (zeros where nothing was logged)"""
+        window = self._window(start, end)
+        rows = self._rows(client_id, habit_id)
+        if not rows:
+            return np.zeros(window.stop - window.start)
+        return self.sums[rows[0], window]
+
+    def logged_totals(self, client_id: str, habit_id: str, start=None, end=None) -> Dict[str, float]:
+        """{'YYYY-MM-DD': summed value} for the days that have at least one log"""
+        window = self._window(start, end)
+        rows = self._rows(client_id, habit_id)
+        if not rows:
+            return {}
+        offsets = np.flatnonzero(self.counts[rows[0], window]) + window.start
+        sums = self.sums[rows[0]]
+        return {(self.start + timedelta(days=int(offset))).isoformat(): float(sums[offset]) for offset in offsets}
+
+    def total(self, client_id: str, habit_id: str, start=None, end=None) -> float:
+        """Summed completed_value over the period"""
+        rows = self._rows(client_id, habit_id)
+        return float(self.sums[rows[0], self._window(start, end)].sum()) if rows else 0.0
+
+    def best_value(self, client_id: str, habit_id: str, start=None, end=None) -> float:
+        """Largest single completed_value logged in the period"""
+        rows = self._rows(client_id, habit_id)
+        if not rows:
+            return 0.0
+        window = self.maxes[rows[0], self._window(start, end)]
+        return float(window.max()) if window.size else 0.0
+
+    def log_count(self, client_id: str, habit_id: str, start=None, end=None) -> int:
+        """Number of log rows in the period"""
+        rows = self._rows(client_id, habit_id)
+        return int(self.counts[rows[0], self._window(start, end)].sum()) if rows else 0
+
+    def completion_percent(self, client_id: str, habit_id: str, daily_target: float,
+                           start=None, end=None) -> float:
+        """Period total as a percentage of daily_target x days, capped at 100"""
+        window = self._window(start, end)
+        period_target = daily_target * (window.stop - window.start)
+        if period_target <= 0:
+            return 0.0
+        return min(100.0, self.total(client_id, habit_id, start, end) / period_target * 100)
+
+    # Per client
+
+    def days_logged(self, client_id: str, habit_id: Optional[str] = None, start=None, end=None) -> int:
+        """Distinct days with at least one log (for one habit, or any of the client's habits)"""
+        rows = self._rows(client_id, habit_id)
+        if not rows:
+            return 0
+        return int(np.count_nonzero(self.counts[rows, self._window(start, end)].any(axis=0)))
+
+    def habits_logged(self, client_id: str, start=None, end=None) -> List[str]:
+        """Habit ids the client logged at least once in the period"""
+        window = self._window(start, end)
+        pairs = list(self._pairs)
+        return [pairs[row][1] for row in self._rows(client_id) if self.counts[row, window].any()]
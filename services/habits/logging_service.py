@@ -6,6 +6,12 @@ Handles logging habit completions and calculating progress
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Tuple
 
+from services.dashboard.response_cache import touch_dashboard_users
+from services.habits.daily_progress import get_daily_progress_store
+from services.habits.leaderboard_service import record_leaderboard_log
+from services.habits.log_cube import HabitLogCube
+from services.habits.streak_engine import record_habit_log
+
 
 def log_error(message: str):
     """Log error message"""
@@ -71,6 +77,9 @@ class LoggingService:
             
             if result.data:
                 log_info(f"Habit logged: {habit_id} by {client_id}, value: {value}")
+                streak = record_habit_log(client_id, habit_id, log_entry['log_date'])
+                record_leaderboard_log(self.db, client_id, habit_id, log_entry['log_date'], value, streak)
+                touch_dashboard_users(client_id, *(row.get('trainer_id') for row in assignment.data))
                 return True, "Habit logged successfully", result.data[0]
             else:
                 return False, "Failed to log habit", None
@@ -169,23 +178,16 @@ class LoggingService:
             
             progress_list = []
             
+            # The day's totals for every habit in one read
+            day_totals = get_daily_progress_store(self.db).get_day(client_id, target_date)
+            
             for assignment in assignments.data:
                 habit = assignment.get('fitness_habits')
                 if not habit:
                     continue
                 
                 habit_id = habit.get('habit_id')
-                
-                # Get all logs for this habit on this date
-                logs = self.db.table('habit_logs')\
-                    .select('completed_value')\
-                    .eq('client_id', client_id)\
-                    .eq('habit_id', habit_id)\
-                    .eq('log_date', target_date.isoformat())\
-                    .execute()
-                
-                # Calculate totals
-                total_completed = sum(log.get('completed_value', 0) for log in logs.data) if logs.data else 0
+                total_completed, log_count = day_totals.get(habit_id, (0, 0))
                 target = float(habit.get('target_value', 0))
                 due = max(0, target - total_completed)
                 percentage = (total_completed / target * 100) if target > 0 else 0
@@ -198,7 +200,7 @@ class LoggingService:
                     'completed': total_completed,
                     'due': due,
                     'percentage': round(percentage, 1),
-                    'log_count': len(logs.data) if logs.data else 0
+                    'log_count': log_count
                 })
             
             return True, f"Progress calculated for {len(progress_list)} habits", progress_list
@@ -233,16 +235,10 @@ class LoggingService:
             
             habit = habit_result.data[0]
             
-            # Get all logs for this date
-            logs = self.db.table('habit_logs')\
-                .select('completed_value')\
-                .eq('client_id', client_id)\
-                .eq('habit_id', habit_id)\
-                .eq('log_date', target_date.isoformat())\
-                .execute()
-            
-            # Calculate totals
-            total_completed = sum(log.get('completed_value', 0) for log in logs.data) if logs.data else 0
+            # The day's total for this habit
+            total_completed, log_count = get_daily_progress_store(self.db).get_habit_day(
+                client_id, habit_id, target_date
+            )
             target = float(habit.get('target_value', 0))
             due = max(0, target - total_completed)
             percentage = (total_completed / target * 100) if target > 0 else 0
@@ -255,7 +251,7 @@ class LoggingService:
                 'completed': total_completed,
                 'due': due,
                 'percentage': round(percentage, 1),
-                'log_count': len(logs.data) if logs.data else 0,
+                'log_count': log_count,
                 'date': target_date.isoformat()
             }
             
@@ -291,6 +287,9 @@ class LoggingService:
             
             summary_list = []
             
+            # All of the week's logs in one read
+            cube = HabitLogCube.load(self.db, [client_id], week_start, week_end)
+            
             for assignment in assignments.data:
                 habit = assignment.get('fitness_habits')
                 if not habit:
@@ -298,25 +297,12 @@ class LoggingService:
                 
                 habit_id = habit.get('habit_id')
                 
-                # Get all logs for this week
-                logs = self.db.table('habit_logs')\
-                    .select('log_date, completed_value')\
-                    .eq('client_id', client_id)\
-                    .eq('habit_id', habit_id)\
-                    .gte('log_date', week_start.isoformat())\
-                    .lte('log_date', week_end.isoformat())\
-                    .execute()
-                
-                # Calculate daily totals
-                daily_totals = {}
-                for log in (logs.data if logs.data else []):
-                    log_date = log.get('log_date')
-                    value = log.get('completed_value', 0)
-                    daily_totals[log_date] = daily_totals.get(log_date, 0) + value
+                # Daily totals for the days with logs
+                daily_totals = cube.logged_totals(client_id, habit_id)
                 
                 target = float(habit.get('target_value', 0))
-                days_logged = len(daily_totals)
-                total_completed = sum(daily_totals.values())
+                days_logged = cube.days_logged(client_id, habit_id)
+                total_completed = cube.total(client_id, habit_id)
                 total_target = target * 7
                 avg_completion = (total_completed / total_target * 100) if total_target > 0 else 0
                 
@@ -4,10 +4,77 @@ Handles daily habit reminders for trainees
 """
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime, date, time, timedelta
+import threading
+import time as time_module
+from services.habits.daily_progress import get_daily_progress_store
+from utils.keyset_pagination import fetch_all
 from utils.logger import log_info, log_error
 import pytz
 
 
+# Rows per page for bulk reads
+REMINDER_PAGE_SIZE = 1000
+
+# habit_reminders rows are written while the job runs, at most this many rows
+# (or seconds) behind the sends, so a crash or re-run mid-job only resends the
+# last few unrecorded reminders
+REMINDER_RECORD_BATCH_SIZE = 25
+REMINDER_RECORD_MAX_DELAY = 2.0
+
+DEFAULT_REMINDER_PREFERENCES = {
+    'reminder_enabled': True,
+    'reminder_time': '09:00:00',
+    'timezone': 'UTC',
+    'reminder_days': [1, 2, 3, 4, 5, 6, 7],  # All days
+    'include_progress': True,
+    'include_encouragement': True
+}
+
+
+class ReminderRecordWriter:
+    """
+    Buffers habit_reminders rows from bulk send callbacks (called on the
+    sender's worker threads) and inserts them in small batches: when
+    batch_size rows are waiting or the oldest has waited max_delay seconds,
+    and on flush().
+    """
+
+    def __init__(self, db, batch_size: Optional[int] = None, max_delay: Optional[float] = None,
+                 clock=time_module.monotonic):
+        self.db = db
+        self.batch_size = batch_size or REMINDER_RECORD_BATCH_SIZE
+        self.max_delay = REMINDER_RECORD_MAX_DELAY if max_delay is None else max_delay
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: List[Dict] = []
+        self._oldest = None
+        self.recorded = 0
+        self.failed = 0
+
+    def add(self, record: Dict):
+        with self._lock:
+            if not self._pending:
+                self._oldest = self._clock()
+            self._pending.append(record)
+            if len(self._pending) >= self.batch_size or self._clock() - self._oldest >= self.max_delay:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            self.db.table('habit_reminders').insert(batch).execute()
+            self.recorded += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            log_error(f"Error recording {len(batch)} habit reminders: {str(e)}")
+
+
 class HabitReminderService:
     """Service for managing habit reminders"""
     
@@ -16,15 +83,54 @@ class HabitReminderService:
         self.whatsapp = whatsapp_service
     
     def send_daily_reminders(self) -> Dict:
-        """Send daily habit reminders to all eligible trainees"""
+        """
+        Send daily habit reminders to all eligible trainees.
+
+        Works set-at-a-time: active assignments, today's progress, today's sent
+        reminders and reminder preferences are each fetched in bulk and joined
+        in memory, the messages go out through the bulk sender, and each
+        result is recorded in habit_reminders as it arrives (in small batches).
+        Rows that could not be recorded are counted under 'record_errors'.
+        Per-phase timings are returned under 'timings' (milliseconds).
+        """
+        timings = {}
+        phase_started = time_module.perf_counter()
+
+        def end_phase(name):
+            nonlocal phase_started
+            now = time_module.perf_counter()
+            timings[name] = round((now - phase_started) * 1000, 1)
+            phase_started = now
+
         try:
             today = date.today()
-            current_time = datetime.now().time()
+            today_iso = today.isoformat()
             
             log_info(f"Starting daily habit reminders for {today}")
             
-            # Get all clients with active habit assignments
-            clients = self._get_clients_for_reminders(today)
+            # Phase 1: bulk fetches
+            assignments = fetch_all(lambda: self.db.table('trainee_habit_assignments').select(
+                'id, client_id, habit_id, clients(name, phone), fitness_habits(habit_name, target_value, unit)'
+            ).eq('is_active', True), page_size=REMINDER_PAGE_SIZE)
+            end_phase('fetch_assignments')
+
+            day_totals = get_daily_progress_store(self.db).get_all_clients_day(today)
+            end_phase('fetch_progress')
+
+            sent_rows = fetch_all(lambda: self.db.table('habit_reminders').select(
+                'id, client_id'
+            ).eq('reminder_date', today_iso).eq('status', 'sent'), page_size=REMINDER_PAGE_SIZE)
+            already_sent = {row['client_id'] for row in sent_rows}
+            end_phase('fetch_sent_reminders')
+
+            preference_rows = fetch_all(lambda: self.db.table('habit_reminder_preferences').select(
+                '*'
+            ), key='client_id', page_size=REMINDER_PAGE_SIZE)
+            preferences_by_client = {row['client_id']: row for row in preference_rows}
+            end_phase('fetch_preferences')
+
+            # Phase 2: join in memory
+            clients = self._clients_from_assignments(assignments)
             
             if not clients:
                 log_info("No clients found for reminders")
@@ -33,7 +139,9 @@ class HabitReminderService:
                     'total_clients': 0,
                     'reminders_sent': 0,
                     'reminders_skipped': 0,
-                    'errors': 0
+                    'errors': 0,
+                    'record_errors': 0,
+                    'timings': timings
                 }
             
             results = {
@@ -42,74 +150,115 @@ class HabitReminderService:
                 'reminders_sent': 0,
                 'reminders_skipped': 0,
                 'errors': 0,
+                'record_errors': 0,
                 'details': []
             }
-            
+
+            assignments_by_client = {}
+            for assignment in assignments:
+                assignments_by_client.setdefault(assignment['client_id'], []).append(assignment)
+
+            logged_values = {key: completed for key, (completed, _) in day_totals.items()}
+
+            weekday = datetime.now().isoweekday()
+            send_items = []
             for client in clients:
-                try:
-                    client_id = client['client_id']
-                    
-                    # Check if reminder already sent today
-                    if self._is_reminder_already_sent(client_id, today):
-                        results['reminders_skipped'] += 1
-                        results['details'].append({
-                            'client_id': client_id,
-                            'status': 'skipped',
-                            'reason': 'Already sent today'
-                        })
-                        continue
-                    
-                    # Get client's reminder preferences
-                    preferences = self._get_reminder_preferences(client_id)
-                    
-                    # Check if reminders are enabled for this client
-                    if not preferences.get('reminder_enabled', True):
-                        results['reminders_skipped'] += 1
-                        results['details'].append({
-                            'client_id': client_id,
-                            'status': 'skipped',
-                            'reason': 'Reminders disabled'
-                        })
-                        continue
-                    
-                    # Check if today is a reminder day for this client
-                    if not self._is_reminder_day(preferences):
-                        results['reminders_skipped'] += 1
-                        results['details'].append({
-                            'client_id': client_id,
-                            'status': 'skipped',
-                            'reason': 'Not a reminder day'
-                        })
-                        continue
-                    
-                    # Send reminder
-                    reminder_result = self._send_habit_reminder(client, preferences, today)
-                    
-                    if reminder_result['success']:
-                        results['reminders_sent'] += 1
-                        results['details'].append({
-                            'client_id': client_id,
-                            'status': 'sent',
-                            'message': reminder_result.get('message', '')
-                        })
-                    else:
-                        results['errors'] += 1
-                        results['details'].append({
-                            'client_id': client_id,
-                            'status': 'error',
-                            'reason': reminder_result.get('error', 'Unknown error')
-                        })
-                
-                except Exception as e:
-                    log_error(f"Error sending reminder to client {client.get('client_id', 'unknown')}: {str(e)}")
+                client_id = client['client_id']
+
+                # Check if reminder already sent today
+                if client_id in already_sent:
+                    results['reminders_skipped'] += 1
+                    results['details'].append({
+                        'client_id': client_id,
+                        'status': 'skipped',
+                        'reason': 'Already sent today'
+                    })
+                    continue
+
+                preferences = preferences_by_client.get(client_id) or dict(DEFAULT_REMINDER_PREFERENCES)
+
+                # Check if reminders are enabled for this client
+                if not preferences.get('reminder_enabled', True):
+                    results['reminders_skipped'] += 1
+                    results['details'].append({
+                        'client_id': client_id,
+                        'status': 'skipped',
+                        'reason': 'Reminders disabled'
+                    })
+                    continue
+
+                # Check if today is a reminder day for this client
+                if weekday not in preferences.get('reminder_days', [1, 2, 3, 4, 5, 6, 7]):
+                    results['reminders_skipped'] += 1
+                    results['details'].append({
+                        'client_id': client_id,
+                        'status': 'skipped',
+                        'reason': 'Not a reminder day'
+                    })
+                    continue
+
+                if not client['phone']:
                     results['errors'] += 1
                     results['details'].append({
-                        'client_id': client.get('client_id', 'unknown'),
+                        'client_id': client_id,
                         'status': 'error',
-                        'reason': str(e)
+                        'reason': 'No phone number'
                     })
-            
+                    continue
+
+                progress_data = self._progress_from_rows(
+                    client_id, assignments_by_client.get(client_id, []), logged_values
+                )
+                send_items.append({
+                    'phone': client['phone'],
+                    'message': self._generate_reminder_message(client['name'], progress_data, preferences),
+                    'client_id': client_id,
+                    'preferences': preferences,
+                    'progress': progress_data
+                })
+            end_phase('build_messages')
+
+            # Phase 3: send through the bulk sender, recording each result as it arrives
+            outcomes = []
+            recorder = ReminderRecordWriter(self.db)
+
+            def on_result(item, outcome):
+                recorder.add(self._reminder_record(item, outcome, today_iso))
+                outcomes.append((item, outcome))
+
+            try:
+                if send_items:
+                    from services.bulk_sender import start_bulk_send
+                    job = start_bulk_send(self.whatsapp, send_items, name='habit-reminders', on_result=on_result)
+                    job.wait()
+                end_phase('send')
+            finally:
+                recorder.flush()
+            end_phase('record_reminders')
+
+            # Phase 4: summarise
+            results['record_errors'] = recorder.failed
+            if recorder.failed:
+                log_error(f"{recorder.failed} habit reminders were sent but not recorded - they may be sent again")
+            for item, outcome in outcomes:
+                if outcome['success']:
+                    results['reminders_sent'] += 1
+                    results['details'].append({
+                        'client_id': item['client_id'],
+                        'status': 'sent',
+                        'message': item['message']
+                    })
+                else:
+                    results['errors'] += 1
+                    results['details'].append({
+                        'client_id': item['client_id'],
+                        'status': 'error',
+                        'reason': 'Failed to send WhatsApp message'
+                    })
+
+            results['timings'] = timings
             log_info(f"Daily reminders completed: {results['reminders_sent']} sent, {results['reminders_skipped']} skipped, {results['errors']} errors")
+            log_info(f"Daily reminder phase timings (ms): {timings}")
             
             return results
             
@@ -121,34 +270,95 @@ class HabitReminderService:
                 'total_clients': 0,
                 'reminders_sent': 0,
                 'reminders_skipped': 0,
-                'errors': 0
+                'errors': 0,
+                'timings': timings
             }
+
+    @staticmethod
+    def _reminder_record(item: Dict, outcome: Dict, reminder_date: str) -> Dict:
+        """habit_reminders row for one bulk send result"""
+        progress_data = item['progress']
+        return {
+            'client_id': item['client_id'],
+            'reminder_date': reminder_date,
+            'reminder_time': item['preferences'].get('reminder_time', '09:00:00'),
+            'total_habits': progress_data['total_habits'],
+            'completed_habits': progress_data['completed_habits'],
+            'remaining_habits': progress_data['remaining_habits'],
+            'reminder_type': 'daily',
+            'status': 'sent' if outcome['success'] else 'failed',
+            'message_sent': item['message'],
+            **({'sent_at': datetime.now().isoformat()} if outcome['success'] else {})
+        }
+
+    @staticmethod
+    def _clients_from_assignments(assignments: List[Dict]) -> List[Dict]:
+        """Distinct clients (with name/phone) from assignment rows"""
+        clients_dict = {}
+        for assignment in assignments:
+            client_id = assignment['client_id']
+            client_info = assignment.get('clients')
+            
+            if client_info and client_id not in clients_dict:
+                clients_dict[client_id] = {
+                    'client_id': client_id,
+                    'name': client_info.get('name', 'Unknown'),
+                    'phone': client_info.get('phone', '')
+                }
+        
+        return list(clients_dict.values())
+
+    @staticmethod
+    def _progress_from_rows(client_id: str, assignments: List[Dict], logged_values: Dict) -> Dict:
+        """
+        Daily progress for one client from pre-fetched rows.
+
+        Args:
+            assignments: the client's active assignments with fitness_habits embedded
+            logged_values: {(client_id, habit_id): total completed_value for the day}
+        """
+        total_habits = len(assignments)
+        completed_habits = 0
+        habits_detail = []
+
+        for assignment in assignments:
+            habit_info = assignment.get('fitness_habits', {})
+
+            if not habit_info:
+                continue
+
+            target_value = float(habit_info.get('target_value', 0))
+            completed_value = logged_values.get((client_id, assignment['habit_id']), 0)
+
+            is_completed = completed_value >= target_value
+            if is_completed:
+                completed_habits += 1
+
+            habits_detail.append({
+                'habit_name': habit_info.get('habit_name', 'Unknown'),
+                'target_value': target_value,
+                'completed_value': completed_value,
+                'unit': habit_info.get('unit', ''),
+                'is_completed': is_completed,
+                'remaining': max(0, target_value - completed_value)
+            })
+
+        return {
+            'total_habits': total_habits,
+            'completed_habits': completed_habits,
+            'remaining_habits': total_habits - completed_habits,
+            'habits_detail': habits_detail
+        }
     
     def _get_clients_for_reminders(self, reminder_date: date) -> List[Dict]:
         """Get all clients who should receive reminders"""
         try:
             # Get all clients with active habit assignments
-            result = self.db.table('trainee_habit_assignments').select(
-                'client_id, clients(name, phone)'
-            ).eq('is_active', True).execute()
-            
-            if not result.data:
-                return []
-            
-            # Group by client_id to avoid duplicates
-            clients_dict = {}
-            for assignment in result.data:
-                client_id = assignment['client_id']
-                client_info = assignment.get('clients')
-                
-                if client_info and client_id not in clients_dict:
-                    clients_dict[client_id] = {
-                        'client_id': client_id,
-                        'name': client_info.get('name', 'Unknown'),
-                        'phone': client_info.get('phone', '')
-                    }
+            assignments = fetch_all(lambda: self.db.table('trainee_habit_assignments').select(
+                'id, client_id, clients(name, phone)'
+            ).eq('is_active', True), page_size=REMINDER_PAGE_SIZE)
             
-            return list(clients_dict.values())
+            return self._clients_from_assignments(assignments)
             
         except Exception as e:
             log_error(f"Error getting clients for reminders: {str(e)}")
@@ -178,25 +388,11 @@ class HabitReminderService:
                 return result.data[0]
             else:
                 # Return default preferences
-                return {
-                    'reminder_enabled': True,
-                    'reminder_time': '09:00:00',
-                    'timezone': 'UTC',
-                    'reminder_days': [1, 2, 3, 4, 5, 6, 7],  # All days
-                    'include_progress': True,
-                    'include_encouragement': True
-                }
+                return dict(DEFAULT_REMINDER_PREFERENCES)
                 
         except Exception as e:
             log_error(f"Error getting reminder preferences: {str(e)}")
-            return {
-                'reminder_enabled': True,
-                'reminder_time': '09:00:00',
-                'timezone': 'UTC',
-                'reminder_days': [1, 2, 3, 4, 5, 6, 7],
-                'include_progress': True,
-                'include_encouragement': True
-            }
+            return dict(DEFAULT_REMINDER_PREFERENCES)
     
     def _is_reminder_day(self, preferences: Dict) -> bool:
         """Check if today is a reminder day based on preferences"""
@@ -296,49 +492,11 @@ class HabitReminderService:
                     'habits_detail': []
                 }
             
-            total_habits = len(assignments_result.data)
-            completed_habits = 0
-            habits_detail = []
-            
-            for assignment in assignments_result.data:
-                habit_id = assignment['habit_id']
-                habit_info = assignment.get('fitness_habits', {})
-                
-                if not habit_info:
-                    continue
-                
-                habit_name = habit_info.get('habit_name', 'Unknown')
-                target_value = float(habit_info.get('target_value', 0))
-                unit = habit_info.get('unit', '')
-                
-                # Get logs for this habit on target date
-                logs_result = self.db.table('habit_logs').select('completed_value').eq(
-                    'habit_id', habit_id
-                ).eq('client_id', client_id).eq('log_date', target_date.isoformat()).execute()
-                
-                completed_value = sum(
-                    float(log['completed_value']) for log in logs_result.data
-                ) if logs_result.data else 0
-                
-                is_completed = completed_value >= target_value
-                if is_completed:
-                    completed_habits += 1
-                
-                habits_detail.append({
-                    'habit_name': habit_name,
-                    'target_value': target_value,
-                    'completed_value': completed_value,
-                    'unit': unit,
-                    'is_completed': is_completed,
-                    'remaining': max(0, target_value - completed_value)
-                })
-            
-            return {
-                'total_habits': total_habits,
-                'completed_habits': completed_habits,
-                'remaining_habits': total_habits - completed_habits,
-                'habits_detail': habits_detail
-            }
+            # The client's totals for the day in one read
+            day_totals = get_daily_progress_store(self.db).get_day(client_id, target_date)
+            logged_values = {(client_id, habit_id): completed for habit_id, (completed, _) in day_totals.items()}
+
+            return self._progress_from_rows(client_id, assignments_result.data, logged_values)
             
         except Exception as e:
             log_error(f"Error calculating daily progress: {str(e)}")
@@ -1,13 +1,23 @@
 """
 Report Service - Generate habit progress reports
 Handles CSV generation and report statistics
+
+Each report reads its period's logs in one paged query per client batch
+(see HabitLogCube.load) and writes CSV rows as they are produced, so a
+report can go straight to a file or upload stream without the rows or the
+CSV text being held in memory.
 """
 
 import csv
 import io
 from datetime import date, timedelta
 from calendar import monthrange
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import numpy as np
+
+from services.habits.log_cube import CUBE_CLIENT_BATCH, CUBE_PAGE_SIZE, HabitLogCube
+from utils.keyset_pagination import fetch_all
 
 
 def log_error(message: str):
@@ -20,6 +30,9 @@ def log_info(message: str):
     print(f"[INFO] {message}")
 
 
+REPORT_FIELDS = ['Date', 'Day', 'Habit', 'Target', 'Unit', 'Completed', 'Due', 'Completion %']
+
+
 class ReportService:
     """Service for generating habit reports"""
     
@@ -29,13 +42,17 @@ class ReportService:
     def generate_weekly_report(
         self, 
         client_id: str, 
-        week_start: date
+        week_start: date, 
+        output: Optional[TextIO] = None
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Generate weekly progress report as CSV
         
+        Args:
+            output: Text stream to write the CSV to; when omitted the CSV is returned
+        
         Returns:
-            Tuple of (success, message, csv_content)
+            Tuple of (success, message, csv_content); csv_content is None when written to `output`
         """
         try:
             week_end = week_start + timedelta(days=6)
@@ -50,78 +67,14 @@ class ReportService:
             if not assignments.data:
                 return False, "No habits assigned", None
             
-            # Prepare CSV data
-            csv_data = []
-            summary_stats = {
-                'total_habits': len(assignments.data),
-                'total_days': 7,
-                'total_logs': 0,
-                'avg_completion': 0
-            }
-            
-            # Process each habit
-            for assignment in assignments.data:
-                habit = assignment.get('fitness_habits')
-                if not habit:
-                    continue
-                
-                habit_id = habit.get('habit_id')
-                habit_name = habit.get('habit_name')
-                target = float(habit.get('target_value', 0))
-                unit = habit.get('unit')
-                
-                # Get logs for the week
-                logs = self.db.table('habit_logs')\
-                    .select('log_date, completed_value')\
-                    .eq('client_id', client_id)\
-                    .eq('habit_id', habit_id)\
-                    .gte('log_date', week_start.isoformat())\
-                    .lte('log_date', week_end.isoformat())\
-                    .order('log_date')\
-                    .execute()
-                
-                # Calculate daily totals
-                daily_totals = {}
-                for log in (logs.data if logs.data else []):
-                    log_date = log.get('log_date')
-                    value = log.get('completed_value', 0)
-                    daily_totals[log_date] = daily_totals.get(log_date, 0) + value
-                
-                # Create row for each day
-                current_date = week_start
-                for day in range(7):
-                    date_str = current_date.isoformat()
-                    completed = daily_totals.get(date_str, 0)
-                    due = max(0, target - completed)
-                    percentage = (completed / target * 100) if target > 0 else 0
-                    
-                    csv_data.append({
-                        'Date': date_str,
-                        'Day': current_date.strftime('%A'),
-                        'Habit': habit_name,
-                        'Target': target,
-                        'Unit': unit,
-                        'Completed': completed,
-                        'Due': due,
-                        'Completion %': round(percentage, 1)
-                    })
-                    
-                    if completed > 0:
-                        summary_stats['total_logs'] += 1
-                    
-                    current_date += timedelta(days=1)
-            
-            # Calculate average completion
-            if csv_data:
-                total_percentage = sum(row['Completion %'] for row in csv_data)
-                summary_stats['avg_completion'] = round(total_percentage / len(csv_data), 1)
-            
-            # Generate CSV
-            csv_content = self._generate_csv(csv_data, summary_stats, 'Weekly Report', week_start, week_end)
+            csv_content = self._write_report(
+                output, 'Weekly Report', week_start, week_end,
+                {client_id: assignments.data}
+            )
             
             log_info(f"Weekly report generated for client {client_id}")
             return True, "Weekly report generated", csv_content
-            
+        
         except Exception as e:
             log_error(f"Error generating weekly report: {str(e)}")
             return False, f"Error: {str(e)}", None
@@ -130,13 +83,17 @@ class ReportService:
         self, 
         client_id: str, 
         month: int, 
-        year: int
+        year: int, 
+        output: Optional[TextIO] = None
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Generate monthly progress report as CSV
         
+        Args:
+            output: Text stream to write the CSV to; when omitted the CSV is returned
+        
         Returns:
-            Tuple of (success, message, csv_content)
+            Tuple of (success, message, csv_content); csv_content is None when written to `output`
         """
         try:
             # Get first and last day of month
@@ -154,78 +111,14 @@ class ReportService:
             if not assignments.data:
                 return False, "No habits assigned", None
             
-            # Prepare CSV data
-            csv_data = []
-            summary_stats = {
-                'total_habits': len(assignments.data),
-                'total_days': last_day,
-                'total_logs': 0,
-                'avg_completion': 0
-            }
-            
-            # Process each habit
-            for assignment in assignments.data:
-                habit = assignment.get('fitness_habits')
-                if not habit:
-                    continue
-                
-                habit_id = habit.get('habit_id')
-                habit_name = habit.get('habit_name')
-                target = float(habit.get('target_value', 0))
-                unit = habit.get('unit')
-                
-                # Get logs for the month
-                logs = self.db.table('habit_logs')\
-                    .select('log_date, completed_value')\
-                    .eq('client_id', client_id)\
-                    .eq('habit_id', habit_id)\
-                    .gte('log_date', month_start.isoformat())\
-                    .lte('log_date', month_end.isoformat())\
-                    .order('log_date')\
-                    .execute()
-                
-                # Calculate daily totals
-                daily_totals = {}
-                for log in (logs.data if logs.data else []):
-                    log_date = log.get('log_date')
-                    value = log.get('completed_value', 0)
-                    daily_totals[log_date] = daily_totals.get(log_date, 0) + value
-                
-                # Create row for each day
-                current_date = month_start
-                for day in range(last_day):
-                    date_str = current_date.isoformat()
-                    completed = daily_totals.get(date_str, 0)
-                    due = max(0, target - completed)
-                    percentage = (completed / target * 100) if target > 0 else 0
-                    
-                    csv_data.append({
-                        'Date': date_str,
-                        'Day': current_date.strftime('%A'),
-                        'Habit': habit_name,
-                        'Target': target,
-                        'Unit': unit,
-                        'Completed': completed,
-                        'Due': due,
-                        'Completion %': round(percentage, 1)
-                    })
-                    
-                    if completed > 0:
-                        summary_stats['total_logs'] += 1
-                    
-                    current_date += timedelta(days=1)
-            
-            # Calculate average completion
-            if csv_data:
-                total_percentage = sum(row['Completion %'] for row in csv_data)
-                summary_stats['avg_completion'] = round(total_percentage / len(csv_data), 1)
-            
-            # Generate CSV
-            csv_content = self._generate_csv(csv_data, summary_stats, 'Monthly Report', month_start, month_end)
+            csv_content = self._write_report(
+                output, 'Monthly Report', month_start, month_end,
+                {client_id: assignments.data}
+            )
             
             log_info(f"Monthly report generated for client {client_id}")
             return True, "Monthly report generated", csv_content
-            
+        
         except Exception as e:
             log_error(f"Error generating monthly report: {str(e)}")
             return False, f"Error: {str(e)}", None
@@ -235,13 +128,17 @@ class ReportService:
         trainer_id: str, 
         client_id: str, 
         start_date: date, 
-        end_date: date
+        end_date: date, 
+        output: Optional[TextIO] = None
     ) -> Tuple[bool, str, Optional[str]]:
         """
         Generate trainer view of client progress
         
+        Args:
+            output: Text stream to write the CSV to; when omitted the CSV is returned
+        
         Returns:
-            Tuple of (success, message, csv_content)
+            Tuple of (success, message, csv_content); csv_content is None when written to `output`
         """
         try:
             # Verify client is in trainer's list using relationship service
@@ -262,17 +159,125 @@ class ReportService:
             if not assignments.data:
                 return False, "No habits assigned to this client", None
             
-            # Prepare CSV data
-            csv_data = []
-            summary_stats = {
-                'total_habits': len(assignments.data),
-                'total_days': (end_date - start_date).days + 1,
-                'total_logs': 0,
-                'avg_completion': 0
-            }
+            csv_content = self._write_report(
+                output, 'Trainer Report', start_date, end_date,
+                {client_id: assignments.data}
+            )
             
-            # Process each habit
-            for assignment in assignments.data:
+            log_info(f"Trainer report generated for client {client_id}")
+            return True, "Trainer report generated", csv_content
+        
+        except Exception as e:
+            log_error(f"Error generating trainer report: {str(e)}")
+            return False, f"Error: {str(e)}", None
+    
+    def generate_trainer_clients_report(
+        self, 
+        trainer_id: str, 
+        start_date: date, 
+        end_date: date, 
+        output: Optional[TextIO] = None
+    ) -> Tuple[bool, str, Optional[str]]:
+        """
+        Generate one report covering every client with habits from this trainer
+        
+        Assignments come from one paged query and logs from one paged query
+        per batch of clients, whatever the number of clients or habits.
+        
+        Args:
+            output: Text stream to write the CSV to; when omitted the CSV is returned
+        
+        Returns:
+            Tuple of (success, message, csv_content); csv_content is None when written to `output`
+        """
+        try:
+            assignments = fetch_all(lambda: self.db.table('trainee_habit_assignments')
+                                    .select('*, fitness_habits(*)')
+                                    .eq('trainer_id', trainer_id)
+                                    .eq('is_active', True), page_size=CUBE_PAGE_SIZE)
+            
+            if not assignments:
+                return False, "No habits assigned to your clients", None
+            
+            assignments_by_client = {}
+            for assignment in assignments:
+                assignments_by_client.setdefault(assignment['client_id'], []).append(assignment)
+            
+            client_names = self._client_names(list(assignments_by_client))
+            
+            csv_content = self._write_report(
+                output, 'Trainer Clients Report', start_date, end_date,
+                assignments_by_client, client_names
+            )
+            
+            log_info(f"Trainer clients report generated for trainer {trainer_id}: {len(assignments_by_client)} clients")
+            return True, "Trainer clients report generated", csv_content
+        
+        except Exception as e:
+            log_error(f"Error generating trainer clients report: {str(e)}")
+            return False, f"Error: {str(e)}", None
+    
+    def _client_names(self, client_ids: List[str]) -> Dict[str, str]:
+        """Client names for a list of client IDs"""
+        names = {}
+        for start in range(0, len(client_ids), CUBE_CLIENT_BATCH):
+            result = self.db.table('clients')\
+                .select('client_id, name')\
+                .in_('client_id', client_ids[start:start + CUBE_CLIENT_BATCH])\
+                .execute()
+            names.update({client['client_id']: client.get('name') for client in result.data or []})
+        return names
+    
+    def _write_report(
+        self, 
+        output: Optional[TextIO], 
+        report_type: str, 
+        start_date: date, 
+        end_date: date, 
+        assignments_by_client: Dict[str, List[Dict]], 
+        client_names: Optional[Dict[str, str]] = None
+    ) -> Optional[str]:
+        """
+        Load the period's logs and stream the report to `output`
+        
+        Returns:
+            CSV content if no output stream was given, otherwise None
+        """
+        cube = HabitLogCube.load(self.db, list(assignments_by_client), start_date, end_date)
+        summary_stats = {
+            'total_habits': sum(len(assignments) for assignments in assignments_by_client.values()),
+            'total_days': (end_date - start_date).days + 1,
+            'total_logs': 0,
+            'avg_completion': 0
+        }
+        rows = self._habit_rows(cube, assignments_by_client, summary_stats, client_names)
+        
+        if output is not None:
+            self._write_csv(output, rows, summary_stats, report_type, start_date, end_date, client_names is not None)
+            return None
+        
+        buffer = io.StringIO()
+        self._write_csv(buffer, rows, summary_stats, report_type, start_date, end_date, client_names is not None)
+        return buffer.getvalue()
+    
+    def _habit_rows(
+        self, 
+        cube: HabitLogCube, 
+        assignments_by_client: Dict[str, List[Dict]], 
+        summary_stats: Dict, 
+        client_names: Optional[Dict[str, str]] = None
+    ) -> Iterator[Dict]:
+        """
+        One CSV row per client habit per day of the cube's period
+        
+        Also adds the number of days with logs to summary_stats['total_logs']
+        """
+        dates = cube.dates()
+        date_strs = [day.isoformat() for day in dates]
+        day_names = [day.strftime('%A') for day in dates]
+        
+        for client_id, assignments in assignments_by_client.items():
+            for assignment in assignments:
                 habit = assignment.get('fitness_habits')
                 if not habit:
                     continue
@@ -282,78 +287,44 @@ class ReportService:
                 target = float(habit.get('target_value', 0))
                 unit = habit.get('unit')
                 
-                # Get logs for the period
-                logs = self.db.table('habit_logs')\
-                    .select('log_date, completed_value')\
-                    .eq('client_id', client_id)\
-                    .eq('habit_id', habit_id)\
-                    .gte('log_date', start_date.isoformat())\
-                    .lte('log_date', end_date.isoformat())\
-                    .order('log_date')\
-                    .execute()
-                
-                # Calculate daily totals
-                daily_totals = {}
-                for log in (logs.data if logs.data else []):
-                    log_date = log.get('log_date')
-                    value = log.get('completed_value', 0)
-                    daily_totals[log_date] = daily_totals.get(log_date, 0) + value
+                completed = cube.daily_totals(client_id, habit_id)
+                due = np.maximum(0, target - completed)
+                percentage = completed / target * 100 if target > 0 else np.zeros(cube.days)
+                summary_stats['total_logs'] += int(np.count_nonzero(completed > 0))
                 
-                # Create row for each day
-                current_date = start_date
-                while current_date <= end_date:
-                    date_str = current_date.isoformat()
-                    completed = daily_totals.get(date_str, 0)
-                    due = max(0, target - completed)
-                    percentage = (completed / target * 100) if target > 0 else 0
-                    
-                    csv_data.append({
+                for date_str, day_name, day_completed, day_due, day_percentage in zip(
+                    date_strs, day_names, completed.tolist(), due.tolist(), np.round(percentage, 1).tolist()
+                ):
+                    row = {
                         'Date': date_str,
-                        'Day': current_date.strftime('%A'),
+                        'Day': day_name,
                         'Habit': habit_name,
                         'Target': target,
                         'Unit': unit,
-                        'Completed': completed,
-                        'Due': due,
-                        'Completion %': round(percentage, 1)
-                    })
-                    
-                    if completed > 0:
-                        summary_stats['total_logs'] += 1
-                    
-                    current_date += timedelta(days=1)
-            
-            # Calculate average completion
-            if csv_data:
-                total_percentage = sum(row['Completion %'] for row in csv_data)
-                summary_stats['avg_completion'] = round(total_percentage / len(csv_data), 1)
-            
-            # Generate CSV
-            csv_content = self._generate_csv(csv_data, summary_stats, 'Trainer Report', start_date, end_date)
-            
-            log_info(f"Trainer report generated for client {client_id}")
-            return True, "Trainer report generated", csv_content
-            
-        except Exception as e:
-            log_error(f"Error generating trainer report: {str(e)}")
-            return False, f"Error: {str(e)}", None
+                        'Completed': day_completed,
+                        'Due': day_due,
+                        'Completion %': day_percentage
+                    }
+                    if client_names is not None:
+                        row['Client'] = client_names.get(client_id) or client_id
+                    yield row
     
-    def _generate_csv(
+    def _write_csv(
         self, 
-        data: List[Dict], 
+        output: TextIO, 
+        rows: Iterator[Dict], 
         summary: Dict, 
         report_type: str, 
         start_date: date, 
-        end_date: date
-    ) -> str:
+        end_date: date, 
+        include_client: bool = False
+    ):
         """
-        Generate CSV content from data
+        Write the report header, rows and summary to a text stream
         
-        Returns:
-            CSV content as string
+        Rows are written as they are produced; the average completion in the
+        summary is accumulated along the way.
         """
-        output = io.StringIO()
-        
         # Write header
         output.write(f"{report_type}\n")
         output.write(f"Period: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}\n")
@@ -361,11 +332,20 @@ class ReportService:
         output.write("\n")
         
         # Write data
-        if data:
-            fieldnames = list(data[0].keys())
-            writer = csv.DictWriter(output, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+        fieldnames = (['Client'] if include_client else []) + REPORT_FIELDS
+        writer = csv.DictWriter(output, fieldnames=fieldnames)
+        row_count = 0
+        total_percentage = 0.0
+        for row in rows:
+            if row_count == 0:
+                writer.writeheader()
+            writer.writerow(row)
+            row_count += 1
+            total_percentage += row['Completion %']
+        
+        # Calculate average completion
+        if row_count:
+            summary['avg_completion'] = round(total_percentage / row_count, 1)
         
         # Write summary
         output.write("\n")
@@ -374,8 +354,3 @@ class ReportService:
         output.write(f"Total Days,{summary.get('total_days', 0)}\n")
         output.write(f"Days with Logs,{summary.get('total_logs', 0)}\n")
         output.write(f"Average Completion %,{summary.get('avg_completion', 0)}\n")
-        
-        csv_content = output.getvalue()
-        output.close()
-        
-        return csv_content
@@ -0,0 +1,262 @@
+"""
+Streak Engine
+Computes habit streaks from bulk habit_logs reads instead of one query per day.
+
+A streak is the run of consecutive days with at least one log, ending at the
+most recent log date (capped at a year). Log dates for a client - or for many
+clients at once - come back in one paged range query and are reduced to
+streaks in memory with NumPy. Results are cached per client and kept current
+by record_habit_log(), which LoggingService calls whenever it writes a log.
+"""
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+from utils.keyset_pagination import fetch_all
+from utils.logger import log_info
+from utils.ttl_cache import TTLCache
+
+
+# Longest streak reported, and the look-back window used when fetching logs
+MAX_STREAK_DAYS = 365
+# Rows per page for habit_logs reads, and client ids per in_() filter
+STREAK_PAGE_SIZE = 1000
+STREAK_CLIENT_BATCH = 100
+
+_EPOCH = date(1970, 1, 1)
+
+
+def to_day_number(value) -> int:
+    """Days since 1970-01-01 for a date or an ISO 'YYYY-MM-DD' string"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return (value - _EPOCH).days
+
+
+def compute_streaks(groups: np.ndarray, days: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Current streak for every group in one pass.
+
+    Args:
+        groups: integer group code per log row (e.g. one code per client/habit pair)
+        days: day number per log row; any order, duplicates allowed
+
+    Returns:
+        (group_codes, last_days, streaks) with one entry per group present
+    """
+    groups = np.asarray(groups, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    if groups.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    order = np.lexsort((days, groups))
+    groups, days = groups[order], days[order]
+
+    # One row per (group, day)
+    distinct = np.ones(groups.size, dtype=bool)
+    distinct[1:] = (groups[1:] != groups[:-1]) | (days[1:] != days[:-1])
+    groups, days = groups[distinct], days[distinct]
+
+    positions = np.arange(groups.size)
+    new_group = np.ones(groups.size, dtype=bool)
+    new_group[1:] = groups[1:] != groups[:-1]
+    run_start = new_group.copy()
+    run_start[1:] |= (days[1:] - days[:-1]) != 1
+
+    # Index of the row where each row's run began
+    run_origin = np.maximum.accumulate(np.where(run_start, positions, 0))
+
+    last_in_group = np.ones(groups.size, dtype=bool)
+    last_in_group[:-1] = new_group[1:]
+
+    streaks = np.minimum(positions - run_origin + 1, MAX_STREAK_DAYS)
+    return groups[last_in_group], days[last_in_group], streaks[last_in_group]
+
+
+class StreakCache:
+    """
+    Per-client streak cache: client_id -> {habit_id: (last_log_day, streak)}.
+
+    An entry always covers every habit the client logged in the look-back
+    window, so a habit missing from a cached entry has a streak of 0.
+    """
+
+    def __init__(self, max_size: int = 20000, ttl_seconds: float = 300):
+        self._cache = TTLCache(max_size=max_size, ttl_seconds=ttl_seconds, name='streaks')
+        self._lock = threading.Lock()
+        # Bumped on every write so a read that raced a log insert is not cached
+        self._generation = 0
+
+    def get(self, client_id: str) -> Optional[Dict[str, Tuple[int, int]]]:
+        return self._cache.get(client_id)
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, client_id: str, habits: Dict[str, Tuple[int, int]], generation: Optional[int] = None):
+        """Cache a client's streaks, unless a log was recorded since `generation` was read"""
+        with self._lock:
+            if generation is None or generation == self._generation:
+                self._cache.set(client_id, dict(habits))
+
+    def record_log(self, client_id: str, habit_id: str, log_date) -> Optional[int]:
+        """
+        Fold a newly written log into the cached streak.
+
+        Returns the updated streak, or None if the client was not cached or
+        the log was backfilled before the latest logged day (the entry is then
+        dropped and recomputed on the next read).
+        """
+        day = to_day_number(log_date)
+        with self._lock:
+            self._generation += 1
+            habits = self._cache.get(client_id)
+            if habits is None:
+                return None
+
+            last_day, streak = habits.get(habit_id, (None, 0))
+            if last_day is None or day > last_day + 1:
+                last_day, streak = day, 1
+            elif day == last_day + 1:
+                last_day, streak = day, min(streak + 1, MAX_STREAK_DAYS)
+            elif day < last_day:
+                self._cache.invalidate(client_id)
+                return None
+
+            updated = dict(habits)
+            updated[habit_id] = (last_day, streak)
+            self._cache.set(client_id, updated)
+            return streak
+
+    def invalidate(self, client_id: str):
+        with self._lock:
+            self._generation += 1
+            self._cache.invalidate(client_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def get_stats(self) -> Dict:
+        return self._cache.get_stats()
+
+
+_streak_cache = StreakCache(
+    max_size=getattr(Config, 'STREAK_CACHE_MAX_SIZE', 20000),
+    ttl_seconds=getattr(Config, 'STREAK_CACHE_TTL_SECONDS', 300)
+)
+
+
+def get_streak_cache() -> StreakCache:
+    """Get the process-wide streak cache"""
+    return _streak_cache
+
+
+def record_habit_log(client_id: str, habit_id: str, log_date) -> Optional[int]:
+    """Hook for code that inserts habit_logs rows"""
+    return _streak_cache.record_log(client_id, habit_id, log_date)
+
+
+def invalidate_client_streaks(client_id: str):
+    """Hook for code that deletes or rewrites a client's habit_logs rows"""
+    _streak_cache.invalidate(client_id)
+
+
+class StreakEngine:
+    """Bulk streak reads over habit_logs"""
+
+    def __init__(self, supabase_client, cache: Optional[StreakCache] = None):
+        self.db = supabase_client
+        self.cache = cache or get_streak_cache()
+
+    def get_streak(self, client_id: str, habit_id: str) -> int:
+        """Current streak for one habit"""
+        return self.get_client_streaks(client_id).get(habit_id, 0)
+
+    def get_client_streaks(self, client_id: str) -> Dict[str, int]:
+        """Current streak per habit for one client (habits without logs are omitted)"""
+        streaks = self.get_streaks([client_id])
+        return {habit_id: streak for (_, habit_id), streak in streaks.items()}
+
+    def get_streaks(self, client_ids: Iterable[str]) -> Dict[Tuple[str, str], int]:
+        """Current streaks for many clients, keyed by (client_id, habit_id)"""
+        return {pair: streak for pair, (_, streak) in self.get_streak_details(client_ids).items()}
+
+    def get_streak_details(self, client_ids: Iterable[str]) -> Dict[Tuple[str, str], Tuple[date, int]]:
+        """
+        (last_log_date, streak) for many clients, keyed by (client_id, habit_id).
+
+        Cached clients are answered from memory; the rest are fetched together,
+        STREAK_CLIENT_BATCH clients per paged range query.
+        """
+        client_ids = list(dict.fromkeys(client_id for client_id in client_ids if client_id))
+        details = {}
+        missing = []
+
+        for client_id in client_ids:
+            habits = self.cache.get(client_id)
+            if habits is None:
+                missing.append(client_id)
+                continue
+            for habit_id, (last_day, streak) in habits.items():
+                details[(client_id, habit_id)] = (_EPOCH + timedelta(days=last_day), streak)
+
+        for start in range(0, len(missing), STREAK_CLIENT_BATCH):
+            batch = missing[start:start + STREAK_CLIENT_BATCH]
+            generation = self.cache.generation()
+            computed = self._compute(batch)
+            for client_id in batch:
+                habits = computed.get(client_id, {})
+                self.cache.set(client_id, habits, generation)
+                for habit_id, (last_day, streak) in habits.items():
+                    details[(client_id, habit_id)] = (_EPOCH + timedelta(days=last_day), streak)
+
+        return details
+
+    def _compute(self, client_ids: List[str]) -> Dict[str, Dict[str, Tuple[int, int]]]:
+        """Fetch the window of logs for a batch of clients and reduce them to streaks"""
+        rows = self._fetch_log_dates(client_ids)
+        if not rows:
+            return {}
+
+        pair_codes = {}
+        groups = np.fromiter(
+            (pair_codes.setdefault((row['client_id'], row['habit_id']), len(pair_codes)) for row in rows),
+            dtype=np.int64, count=len(rows)
+        )
+        days = np.array([row['log_date'][:10] for row in rows], dtype='datetime64[D]').astype(np.int64)
+
+        codes, last_days, streaks = compute_streaks(groups, days)
+        pairs = list(pair_codes)
+
+        result: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        for code, last_day, streak in zip(codes.tolist(), last_days.tolist(), streaks.tolist()):
+            client_id, habit_id = pairs[code]
+            result.setdefault(client_id, {})[habit_id] = (last_day, streak)
+        return result
+
+    def _fetch_log_dates(self, client_ids: List[str]) -> List[Dict]:
+        """client_id, habit_id and log_date for every log in the look-back window"""
+        since = (date.today() - timedelta(days=MAX_STREAK_DAYS)).isoformat()
+
+        def build_query():
+            query = self.db.table('habit_logs').select('id, client_id, habit_id, log_date')
+            if len(client_ids) == 1:
+                query = query.eq('client_id', client_ids[0])
+            else:
+                query = query.in_('client_id', client_ids)
+            return query.gte('log_date', since)
+
+        rows = fetch_all(build_query, page_size=STREAK_PAGE_SIZE)
+
+        if len(client_ids) > 1:
+            log_info(f"Computed streaks for {len(client_ids)} clients from {len(rows)} log rows")
+        return rows
+
+
+def get_streak_engine(supabase_client) -> StreakEngine:
+    """Streak engine over the shared process-wide cache"""
+    return StreakEngine(supabase_client)
@@ -2,9 +2,10 @@
 Supabase Storage Helper
 Handles file uploads to Supabase Storage for CSV exports
 """
-from typing import Optional, Tuple
+from typing import Iterable, Optional, Tuple
 from datetime import datetime, timedelta
 import os
+import tempfile
 from utils.logger import log_info, log_error
 
 
@@ -48,24 +49,47 @@ class SupabaseStorageHelper:
         Returns:
             Public URL of uploaded file, or None if failed
         """
+        return self.upload_file(filepath, filename, 'text/csv')
+    
+    def upload_stream(self, chunks: Iterable, filename: str, content_type: str = 'text/csv') -> Optional[str]:
+        """
+        Upload generated content (str or bytes chunks) and return public URL
+        
+        Chunks are spooled to a temporary file as they are produced and the
+        file is then uploaded from disk, so nothing is held in memory whole.
+        """
+        fd, filepath = tempfile.mkstemp(suffix=os.path.splitext(filename)[1])
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            return self.upload_file(filepath, filename, content_type)
+        except Exception as e:
+            log_error(f"Error spooling {filename} for upload: {str(e)}")
+            return None
+        finally:
+            try:
+                os.remove(filepath)
+            except OSError:
+                pass
+    
+    def upload_file(self, filepath: str, filename: str, content_type: str) -> Optional[str]:
+        """Upload a local file to Supabase Storage and return public URL"""
         try:
-            # Read file content
-            with open(filepath, 'rb') as f:
-                file_content = f.read()
-            
             # Upload to Supabase Storage
             storage_path = f"{filename}"
             
-            # Upload file
-            self.db.storage.from_(self.bucket_name).upload(
-                storage_path,
-                file_content,
-                file_options={
-                    'content-type': 'text/csv',
-                    'cache-control': '3600',
-                    'upsert': 'true'  # Overwrite if exists
-                }
-            )
+            # Upload file, streamed from disk rather than read into memory first
+            with open(filepath, 'rb') as f:
+                self.db.storage.from_(self.bucket_name).upload(
+                    storage_path,
+                    f,
+                    file_options={
+                        'content-type': content_type,
+                        'cache-control': '3600',
+                        'upsert': 'true'  # Overwrite if exists
+                    }
+                )
             
             # Get public URL
             public_url = self.db.storage.from_(self.bucket_name).get_public_url(storage_path)
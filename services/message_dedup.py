@@ -0,0 +1,308 @@
+"""
+Message Deduplication
+Decides whether an inbound WhatsApp message was already processed, without a
+database round trip per message.
+
+Two store implementations are available:
+- InMemoryDedupStore: bounded, time-windowed index of message ids plus a
+  short (phone, text) window for rapid-fire repeats. Records are written to
+  processed_messages asynchronously in batches.
+- SupabaseDedupStore: the original SELECT/SELECT/INSERT against
+  processed_messages, kept as a fallback.
+"""
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from utils.logger import log_info, log_warning
+
+
+DUPLICATE_ID = 'duplicate_id'
+RAPID_DUPLICATE = 'rapid_duplicate'
+
+
+def _processed_message_row(message_id: str, phone: str, record_text: str, timestamp) -> Dict:
+    return {
+        'whatsapp_message_id': message_id,
+        'phone_number': phone,
+        'message_text': record_text,
+        'timestamp': str(timestamp) if timestamp else None,
+        'created_at': datetime.now().isoformat()
+    }
+
+
+class ProcessedMessageWriter:
+    """
+    Background writer that batches processed_messages inserts.
+
+    Rows are flushed when `batch_size` rows are waiting or every
+    `flush_interval` seconds. Writing is best-effort, like the original
+    inline insert: failures are logged and the batch is dropped.
+    """
+
+    def __init__(self, supabase_client, batch_size: int = 100, flush_interval: float = 1.0,
+                 max_pending: int = 10000):
+        self.db = supabase_client
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self.rows_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name='processed-messages-writer', daemon=True)
+        self._thread.start()
+
+    def add(self, row: Dict):
+        self._pending.append(row)
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write everything that is waiting (also called from the background thread)"""
+        with self._lock:
+            while self._pending:
+                batch = []
+                while self._pending and len(batch) < self.batch_size:
+                    batch.append(self._pending.popleft())
+
+                try:
+                    # Duplicate ids (e.g. after a restart) must not fail the whole batch
+                    self.db.table('processed_messages').upsert(
+                        batch, on_conflict='whatsapp_message_id', ignore_duplicates=True
+                    ).execute()
+                    self.rows_written += len(batch)
+                    self.batches_written += 1
+                except Exception as e:
+                    self.write_errors += 1
+                    log_warning(f"Could not store {len(batch)} processed messages: {str(e)}")
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            if self._pending:
+                self.flush()
+
+    def get_stats(self) -> Dict:
+        return {
+            'pending': len(self._pending),
+            'rows_written': self.rows_written,
+            'batches_written': self.batches_written,
+            'write_errors': self.write_errors
+        }
+
+
+class InMemoryDedupStore:
+    """
+    Bounded, time-windowed duplicate index.
+
+    Message ids are remembered for `id_window_seconds` (bounded by
+    `max_ids`); (phone, text) pairs are remembered for `rapid_window_seconds`
+    so the same text sent twice within that window is treated as a repeat.
+    """
+
+    def __init__(self, writer: Optional[ProcessedMessageWriter] = None, id_window_seconds: float = 86400,
+                 rapid_window_seconds: float = 2, max_ids: int = 200000, clock=time.time):
+        self.writer = writer
+        self.id_window_seconds = id_window_seconds
+        self.rapid_window_seconds = rapid_window_seconds
+        self.max_ids = max_ids
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # message_id -> first seen (insertion order == time order)
+        self._ids: 'OrderedDict[str, float]' = OrderedDict()
+        # (phone, text) -> last seen, with an expiry queue so pruning never scans
+        self._recent_text: Dict[tuple, float] = {}
+        self._recent_order = deque()
+
+        self.new_messages = 0
+        self.duplicate_ids = 0
+        self.rapid_duplicates = 0
+
+    def check_and_record(self, message_id: str, phone: str, text: str,
+                         record_text: str = None, timestamp=None) -> Optional[str]:
+        """
+        Classify a message and remember it.
+
+        Returns:
+            None for a new message, otherwise DUPLICATE_ID or RAPID_DUPLICATE
+        """
+        now = self._clock()
+
+        with self._lock:
+            self._prune(now)
+
+            if message_id and message_id in self._ids:
+                self.duplicate_ids += 1
+                return DUPLICATE_ID
+
+            text_key = (phone, text) if text else None
+            if text_key:
+                last_seen = self._recent_text.get(text_key)
+                if last_seen is not None and now - last_seen <= self.rapid_window_seconds:
+                    self.rapid_duplicates += 1
+                    return RAPID_DUPLICATE
+
+            if message_id:
+                self._ids[message_id] = now
+                if len(self._ids) > self.max_ids:
+                    self._ids.popitem(last=False)
+
+            if text_key:
+                self._recent_text[text_key] = now
+                self._recent_order.append((now, text_key))
+
+            self.new_messages += 1
+
+        if self.writer:
+            self.writer.add(_processed_message_row(message_id, phone, record_text or text or 'empty', timestamp))
+
+        return None
+
+    def preload(self, message_ids: List[str]):
+        """Seed the id index (e.g. with ids processed just before a restart)"""
+        now = self._clock()
+        with self._lock:
+            for message_id in message_ids:
+                if message_id:
+                    self._ids.setdefault(message_id, now)
+
+    def _prune(self, now: float):
+        id_cutoff = now - self.id_window_seconds
+        while self._ids:
+            oldest_id, seen_at = next(iter(self._ids.items()))
+            if seen_at > id_cutoff:
+                break
+            self._ids.popitem(last=False)
+
+        text_cutoff = now - self.rapid_window_seconds
+        while self._recent_order and self._recent_order[0][0] < text_cutoff:
+            seen_at, key = self._recent_order.popleft()
+            if self._recent_text.get(key) == seen_at:
+                del self._recent_text[key]
+
+    def get_stats(self) -> Dict:
+        stats = {
+            'backend': 'memory',
+            'tracked_ids': len(self._ids),
+            'tracked_recent_texts': len(self._recent_text),
+            'new_messages': self.new_messages,
+            'duplicate_ids': self.duplicate_ids,
+            'rapid_duplicates': self.rapid_duplicates
+        }
+        if self.writer:
+            stats['writer'] = self.writer.get_stats()
+        return stats
+
+
+class SupabaseDedupStore:
+    """Original processed_messages round-trip checks"""
+
+    def __init__(self, supabase_client, rapid_window_seconds: float = 2):
+        self.db = supabase_client
+        self.rapid_window_seconds = rapid_window_seconds
+
+    def check_and_record(self, message_id: str, phone: str, text: str,
+                         record_text: str = None, timestamp=None) -> Optional[str]:
+        # Check 1: Exact duplicate (same WhatsApp message ID)
+        try:
+            existing = self.db.table('processed_messages').select('id').eq(
+                'whatsapp_message_id', message_id
+            ).execute()
+
+            if existing.data:
+                return DUPLICATE_ID
+        except Exception as e:
+            # If table doesn't exist yet, continue processing
+            log_warning(f"Could not check for duplicates: {str(e)}")
+
+        # Check 2: Rapid-fire same content
+        if text:
+            try:
+                recent_duplicate = self.db.table('processed_messages').select('id').eq(
+                    'phone_number', phone
+                ).eq('message_text', text).gte(
+                    'created_at', (datetime.now() - timedelta(seconds=self.rapid_window_seconds)).isoformat()
+                ).execute()
+
+                if recent_duplicate.data:
+                    return RAPID_DUPLICATE
+            except Exception as e:
+                # If check fails, continue processing to avoid blocking messages
+                log_warning(f"Could not check for rapid duplicates: {str(e)}")
+
+        # Store message to prevent reprocessing
+        try:
+            self.db.table('processed_messages').insert(
+                _processed_message_row(message_id, phone, record_text or text or 'empty', timestamp)
+            ).execute()
+        except Exception as e:
+            # Log but don't block message processing
+            log_warning(f"Could not store processed message: {str(e)}")
+
+        return None
+
+    def get_stats(self) -> Dict:
+        return {'backend': 'supabase'}
+
+
+_dedup_store = None
+_dedup_lock = threading.Lock()
+
+
+def get_dedup_store(supabase_client, config=None):
+    """Get (or lazily create) the process-wide dedup store"""
+    global _dedup_store
+
+    if _dedup_store is None:
+        with _dedup_lock:
+            if _dedup_store is None:
+                if config is None:
+                    from config import Config as config
+
+                backend = getattr(config, 'DEDUP_BACKEND', 'memory')
+                if backend == 'supabase':
+                    _dedup_store = SupabaseDedupStore(supabase_client)
+                else:
+                    writer = ProcessedMessageWriter(
+                        supabase_client,
+                        batch_size=getattr(config, 'DEDUP_FLUSH_BATCH_SIZE', 100),
+                        flush_interval=getattr(config, 'DEDUP_FLUSH_INTERVAL_SECONDS', 1.0)
+                    )
+                    store = InMemoryDedupStore(
+                        writer,
+                        id_window_seconds=getattr(config, 'DEDUP_ID_WINDOW_SECONDS', 86400)
+                    )
+                    store.preload(_recent_processed_ids(supabase_client,
+                                                        getattr(config, 'DEDUP_PRELOAD_MINUTES', 60)))
+                    _dedup_store = store
+
+                log_info(f"Message dedup store initialised ({backend})")
+
+    return _dedup_store
+
+
+def get_dedup_stats() -> Optional[Dict]:
+    """Counters of the process-wide dedup store (None before first use)"""
+    return _dedup_store.get_stats() if _dedup_store else None
+
+
+def _recent_processed_ids(supabase_client, minutes: int) -> List[str]:
+    """Ids processed shortly before this process started, so Meta retries stay deduplicated"""
+    if not minutes:
+        return []
+    try:
+        since = (datetime.now() - timedelta(minutes=minutes)).isoformat()
+        result = supabase_client.table('processed_messages').select('whatsapp_message_id').gte(
+            'created_at', since
+        ).limit(10000).execute()
+        return [row['whatsapp_message_id'] for row in (result.data or [])]
+    except Exception as e:
+        log_warning(f"Could not preload processed message ids: {str(e)}")
+        return []
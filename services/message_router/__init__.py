@@ -4,5 +4,6 @@ Routes incoming messages based on authentication status and user role
 """
 
 from .message_router import MessageRouter
+from .router_registry import get_message_router, reset_message_routers
 
-__all__ = ['MessageRouter']
\ No newline at end of file
+__all__ = ['MessageRouter', 'get_message_router', 'reset_message_routers']
\ No newline at end of file
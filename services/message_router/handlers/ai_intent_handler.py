@@ -13,6 +13,14 @@ class AIIntentHandler:
         self.db = supabase_client
         self.whatsapp = whatsapp_service
         self.task_service = task_service
+        self._ai_handler = None
+
+    def _get_ai_handler(self):
+        """Get the AI intent pipeline, building it on first use"""
+        if self._ai_handler is None:
+            from services.ai_intent import AIIntentHandler as AIIntentHandlerPhase1
+            self._ai_handler = AIIntentHandlerPhase1(self.db, self.whatsapp, self.task_service)
+        return self._ai_handler
     
     def handle_ai_intent(self, phone: str, message: str, role: str, user_id: str) -> Dict:
         """Use AI to determine user intent and respond"""
@@ -27,10 +35,7 @@ class AIIntentHandler:
             self._save_message(phone, message, 'user')
             
             # Use AI to determine intent
-            from services.ai_intent import AIIntentHandler as AIIntentHandlerPhase1
-            ai_handler = AIIntentHandlerPhase1(self.db, self.whatsapp, self.task_service)
-            
-            result = ai_handler.handle_intent(
+            result = self._get_ai_handler().handle_intent(
                 phone, message, role, user_id,
                 recent_tasks, chat_history
             )
@@ -11,7 +11,6 @@ from .client_creation_buttons import ClientCreationButtonHandler
 from .contact_confirmation_buttons import ContactConfirmationButtonHandler
 from .timeout_buttons import TimeoutButtonHandler
 from .invitation_buttons import InvitationButtonHandler
-from services.auth.core.user_manager import UserManager
 
 
 class ButtonHandler:
@@ -50,6 +49,29 @@ class ButtonHandler:
             )
         else:
             self.timeout_handler = None
+
+        # Built on first use and reused for every later message
+        self._logged_in_handler = None
+        self._universal_handler = None
+
+    def _get_logged_in_handler(self):
+        """Get the shared LoggedInUserHandler (and its sub-handler graph)"""
+        if self._logged_in_handler is None:
+            from ..logged_in_user_handler import LoggedInUserHandler
+            self._logged_in_handler = LoggedInUserHandler(
+                self.db, self.whatsapp, self.auth_service, self.task_service,
+                getattr(self, 'reg_service', None)
+            )
+        return self._logged_in_handler
+
+    def _get_universal_handler(self):
+        """Get the shared UniversalCommandHandler"""
+        if self._universal_handler is None:
+            from ..universal_command_handler import UniversalCommandHandler
+            self._universal_handler = UniversalCommandHandler(
+                self.auth_service, self.task_service, self.whatsapp
+            )
+        return self._universal_handler
     
     def handle_button_response(self, phone: str, button_id: str) -> Dict:
         """Handle button responses by delegating to appropriate handler"""
@@ -143,12 +165,7 @@ class ButtonHandler:
         """
         try:
             # Use logged_in_user_handler for message processing
-            from ..logged_in_user_handler import LoggedInUserHandler
-            logged_in_handler = LoggedInUserHandler(
-                self.db, self.whatsapp, self.auth_service, self.task_service, 
-                getattr(self, 'reg_service', None)
-            )
-            return logged_in_handler.handle_logged_in_user(phone, message, role)
+            return self._get_logged_in_handler().handle_logged_in_user(phone, message, role)
             
         except Exception as e:
             log_error(f"Error handling logged-in message: {str(e)}")
@@ -161,11 +178,7 @@ class ButtonHandler:
         """
         try:
             # First check if it's a universal command (works in any state)
-            from ..universal_command_handler import UniversalCommandHandler
-            universal_handler = UniversalCommandHandler(
-                self.auth_service, self.task_service, self.whatsapp
-            )
-            universal_result = universal_handler.handle_universal_command(phone, button_id)
+            universal_result = self._get_universal_handler().handle_universal_command(phone, button_id)
             
             if universal_result is not None:
                 # It was a universal command, return the result
@@ -176,17 +189,12 @@ class ButtonHandler:
             
             if not role:
                 # User not logged in - route through message router for proper handling
-                from services.message_router.message_router import MessageRouter
-                router = MessageRouter(self.db, self.whatsapp)
+                from services.message_router.router_registry import get_message_router
+                router = get_message_router(self.db, self.whatsapp)
                 return router.route_message(phone, button_id, button_id=None)
             
             # User is logged in - use logged_in_user_handler directly
-            from ..logged_in_user_handler import LoggedInUserHandler
-            logged_in_handler = LoggedInUserHandler(
-                self.db, self.whatsapp, self.auth_service, self.task_service, 
-                getattr(self, 'reg_service', None)
-            )
-            return logged_in_handler.handle_logged_in_button(phone, button_id, role)
+            return self._get_logged_in_handler().handle_logged_in_button(phone, button_id, role)
             
         except Exception as e:
             log_error(f"Error handling command button: {str(e)}")
@@ -553,8 +561,7 @@ class ButtonHandler:
             log_info(f"Executing account deletion for {phone} ({role})")
             
             # Execute deletion using UserManager directly
-            user_manager = UserManager(self.db)
-            success = user_manager.delete_user_role(phone, role)
+            success = self.auth_service.user_manager.delete_user_role(phone, role)
             
             if success:
                 # Check if user has other role
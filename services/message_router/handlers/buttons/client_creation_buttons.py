@@ -203,6 +203,8 @@ class ClientCreationButtonHandler:
                     'created_at': datetime.now(sa_tz).isoformat()
                 }
                 self.db.table('users').insert(user_data).execute()
+                from services.auth.core.identity_cache import invalidate_identity
+                invalidate_identity(phone, 'registration')
             
             # Create relationship and immediately approve it (since client accepted invitation)
             from services.relationships.invitations.invitation_manager import InvitationManager
@@ -104,8 +104,8 @@ class TimeoutButtonHandler:
             # If we have a restart command, initiate it
             if restart_command and restart_command.startswith('/'):
                 # Import here to avoid circular dependency
-                from services.message_router.message_router import MessageRouter
-                router = MessageRouter(self.db, self.whatsapp)
+                from services.message_router.router_registry import get_message_router
+                router = get_message_router(self.db, self.whatsapp)
                 router.route_message(phone, restart_command)
 
             log_info(f"User {phone} started over from task {task['id']}")
@@ -176,8 +176,8 @@ class TimeoutButtonHandler:
                     msg = "❌ No resumable task found. Let's start fresh!"
                     self.whatsapp.send_message(phone, msg)
                     # Start fresh
-                    from services.message_router.message_router import MessageRouter
-                    router = MessageRouter(self.db, self.whatsapp)
+                    from services.message_router.router_registry import get_message_router
+                    router = get_message_router(self.db, self.whatsapp)
                     return router.route_message(phone, '/add-client')
 
                 # Resume the task
@@ -207,8 +207,8 @@ class TimeoutButtonHandler:
                 else:
                     msg = "❌ Error resuming. Let's start fresh!"
                     self.whatsapp.send_message(phone, msg)
-                    from services.message_router.message_router import MessageRouter
-                    router = MessageRouter(self.db, self.whatsapp)
+                    from services.message_router.router_registry import get_message_router
+                    router = get_message_router(self.db, self.whatsapp)
                     return router.route_message(phone, '/add-client')
 
             elif button_id == 'start_fresh_add_client':
@@ -216,8 +216,8 @@ class TimeoutButtonHandler:
                 self.whatsapp.send_message(phone, msg)
 
                 # Start the add-client flow from scratch
-                from services.message_router.message_router import MessageRouter
-                router = MessageRouter(self.db, self.whatsapp)
+                from services.message_router.router_registry import get_message_router
+                router = get_message_router(self.db, self.whatsapp)
                 return router.route_message(phone, '/add-client')
 
         except Exception as e:
@@ -15,6 +15,17 @@ class NewUserHandler:
         self.auth_service = auth_service
         self.reg_service = reg_service
         self.task_service = task_service
+        self._registration_handler = None
+
+    def _get_registration_handler(self):
+        """Get the registration button handler, building it on first use"""
+        if self._registration_handler is None:
+            from .buttons.registration_buttons import RegistrationButtonHandler
+            self._registration_handler = RegistrationButtonHandler(
+                self.db, self.whatsapp, self.auth_service,
+                self.reg_service, self.task_service
+            )
+        return self._registration_handler
     
     def handle_new_user(self, phone: str, message: str) -> Dict:
         """
@@ -31,22 +42,12 @@ class NewUserHandler:
             # Check if user is selecting trainer role
             if any(keyword in msg_lower for keyword in ['trainer', '💪', 'register as trainer']):
                 log_info(f"New user {phone} selecting trainer role - sending WhatsApp Flow")
-                from .buttons.registration_buttons import RegistrationButtonHandler
-                button_handler = RegistrationButtonHandler(
-                    self.db, self.whatsapp, self.auth_service, 
-                    self.reg_service, self.task_service
-                )
-                return button_handler.handle_registration_button(phone, 'register_trainer')
+                return self._get_registration_handler().handle_registration_button(phone, 'register_trainer')
             
             # Check if user is selecting client role
             elif any(keyword in msg_lower for keyword in ['client', 'trainee', '🏃', 'register as trainee']):
                 log_info(f"New user {phone} selecting client role")
-                from .buttons.registration_buttons import RegistrationButtonHandler
-                button_handler = RegistrationButtonHandler(
-                    self.db, self.whatsapp, self.auth_service, 
-                    self.reg_service, self.task_service
-                )
-                return button_handler.handle_registration_button(phone, 'register_client')
+                return self._get_registration_handler().handle_registration_button(phone, 'register_client')
             
             # First time user - show welcome message with buttons
             log_info(f"New user {phone} - showing welcome message")
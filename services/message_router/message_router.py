@@ -6,7 +6,6 @@ from typing import Dict, Optional
 from datetime import datetime
 from utils.logger import log_info, log_error
 from services.auth import AuthenticationService, RegistrationService, TaskService
-from services.auth.core.user_manager import UserManager
 
 from .handlers.buttons.button_handler import ButtonHandler
 from .handlers.universal_command_handler import UniversalCommandHandler
@@ -23,7 +22,8 @@ class MessageRouter:
         self.db = supabase_client
         self.whatsapp = whatsapp_service
         self.auth_service = AuthenticationService(supabase_client)
-        self.user_manager = UserManager(supabase_client)
+        # Share the auth service's manager instead of building a second one
+        self.user_manager = self.auth_service.user_manager
         # todo: will be deleted after client onboarding clean
         self.reg_service = RegistrationService(supabase_client)
         self.task_service = TaskService(supabase_client)
@@ -38,6 +38,8 @@ class MessageRouter:
         self.new_user_handler = NewUserHandler(
             self.db, self.whatsapp, self.auth_service, self.reg_service, self.task_service
         )
+        self._registration_flow_handler = None
+        self._refiloe_service = None
         # self.login_handler = LoginHandler(
         #     self.db, self.whatsapp, self.auth_service, self.task_service
         # )
@@ -69,9 +71,10 @@ class MessageRouter:
             # Step 0.5: Check for /reset_me command (highest priority - works in any state)
             if message.strip().lower() == '/reset_me':
                 try:
-                    from services.refiloe import RefiloeService
-                    refiloe = RefiloeService(self.db)
-                    return refiloe._handle_reset_command(phone)
+                    if self._refiloe_service is None:
+                        from services.refiloe import RefiloeService
+                        self._refiloe_service = RefiloeService(self.db)
+                    return self._refiloe_service._handle_reset_command(phone)
                 except Exception as e:
                     log_error(f"Error handling reset command: {str(e)}")
                     return {
@@ -92,12 +95,13 @@ class MessageRouter:
             client_task = self.task_service.get_running_task(phone, 'client')
             
             if client_task and client_task.get('task_type') == 'registration':
-                from services.flows import RegistrationFlowHandler
-                handler = RegistrationFlowHandler(
-                    self.db, self.whatsapp, self.auth_service,
-                    self.reg_service, self.task_service
-                )
-                return handler.continue_registration(phone, message, 'client', client_task)
+                if self._registration_flow_handler is None:
+                    from services.flows import RegistrationFlowHandler
+                    self._registration_flow_handler = RegistrationFlowHandler(
+                        self.db, self.whatsapp, self.auth_service,
+                        self.reg_service, self.task_service
+                    )
+                return self._registration_flow_handler.continue_registration(phone, message, 'client', client_task)
             
             # Step 3: Check if user exists (direct call to user_manager)
             user = self.user_manager.check_user_exists(phone)
@@ -179,8 +183,7 @@ class MessageRouter:
                 )
 
                 # Use the invitation handler's flow launch method
-                from .handlers.buttons.invitation_buttons import InvitationButtonHandler
-                invitation_handler = InvitationButtonHandler(self.db, self.whatsapp, self.auth_service)
+                invitation_handler = self.button_handler.invitation_handler
 
                 log_info(f"[_handle_template_response] Launching client onboarding flow - invitation_id: {invitation_id}, trainer_id: {invitation_data['trainer_id']}, trainer_name: '{trainer_name}', phone: {phone}")
 
@@ -310,6 +313,7 @@ class MessageRouter:
                     'login_status': 'trainer',
                     'updated_at': datetime.now().isoformat()
                 }).eq('phone_number', clean_phone).execute()
+                self.user_manager.identity_cache.invalidate(clean_phone, 'login')
                 
                 # Send informational message about switching roles
                 switch_msg = (
@@ -333,6 +337,7 @@ class MessageRouter:
                     'login_status': 'trainer',
                     'updated_at': datetime.now().isoformat()
                 }).eq('phone_number', clean_phone).execute()
+                self.user_manager.identity_cache.invalidate(clean_phone, 'login')
                 return 'trainer'
             
             # If user has only client role, auto-login as client
@@ -344,6 +349,7 @@ class MessageRouter:
                     'login_status': 'client',
                     'updated_at': datetime.now().isoformat()
                 }).eq('phone_number', clean_phone).execute()
+                self.user_manager.identity_cache.invalidate(clean_phone, 'login')
                 return 'client'
             
             # User has no roles (shouldn't happen, but handle it)
@@ -0,0 +1,42 @@
+"""
+Message Router Registry
+Builds the MessageRouter and its handler graph once per process and hands out
+the same instance for every inbound message
+"""
+import threading
+from typing import Dict, Tuple
+
+from utils.logger import log_info
+
+from .message_router import MessageRouter
+
+
+_routers: Dict[Tuple[int, int], MessageRouter] = {}
+_routers_lock = threading.Lock()
+
+
+def get_message_router(supabase_client, whatsapp_service) -> MessageRouter:
+    """
+    Get the long-lived MessageRouter for this supabase client / WhatsApp service pair.
+
+    The router and every handler it owns are stateless between messages, so a
+    single instance can be shared by all webhook workers.
+    """
+    key = (id(supabase_client), id(whatsapp_service))
+    router = _routers.get(key)
+
+    if router is None:
+        with _routers_lock:
+            router = _routers.get(key)
+            if router is None:
+                router = MessageRouter(supabase_client, whatsapp_service)
+                _routers[key] = router
+                log_info("MessageRouter handler graph built")
+
+    return router
+
+
+def reset_message_routers():
+    """Drop all cached routers (used by tests and after config changes)"""
+    with _routers_lock:
+        _routers.clear()
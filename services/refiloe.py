@@ -1851,6 +1851,10 @@ class RefiloeService:
             except Exception as e:
                 debug_info.append(f"✗ User delete error: {str(e)[:50]}")
 
+            # Drop any cached identity for this phone
+            from services.auth.core.identity_cache import invalidate_identity
+            invalidate_identity(phone, 'reset')
+
             # Delete conversation states
             try:
                 result = self.db.table('conversation_states').delete().eq('phone_number', phone).execute()
@@ -1941,6 +1945,10 @@ class RefiloeService:
             except Exception as e:
                 debug_info.append(f"✗ Client tasks error: {str(e)[:50]}")
 
+            # Drop any cached running task for this phone
+            from services.auth.tasks.task_state_cache import invalidate_running_task
+            invalidate_running_task(phone)
+
             log_info(f"Reset for {phone} - Results: {debug_info}")
             
             # Count successful deletions
@@ -4596,11 +4604,12 @@ If you cannot determine a value, use null. Return ONLY valid JSON, no other text
     def _generate_habit_analytics(self, trainer_id: str) -> Dict:
         """Generate habit analytics for trainers to monitor client progress"""
         try:
-            from services.habits import HabitTrackingService
-            habits_service = HabitTrackingService(self.db)
+            from datetime import date, timedelta
+            from services.habits.log_cube import HabitLogCube
+            from services.habits.streak_engine import get_streak_engine
             
             # Get trainer's clients
-            clients_result = self.db.table('clients').select('id, name').eq(
+            clients_result = self.db.table('clients').select('id, client_id, name').eq(
                 'trainer_id', trainer_id
             ).eq('status', 'active').execute()
             
@@ -4621,39 +4630,34 @@ If you cannot determine a value, use null. Return ONLY valid JSON, no other text
                 'longest_streak': 0
             }
             
+            # Last 30 days of logs and current streaks for every client, read in bulk
+            client_ids = [client.get('client_id') or client['id'] for client in clients_result.data]
+            today = date.today()
+            cube = HabitLogCube.load(self.db, client_ids, today - timedelta(days=29), today)
+            streaks = get_streak_engine(self.db).get_streaks(client_ids)
+            
             client_scores = []
             habit_counts = {}
             
-            for client in clients_result.data:
-                client_id = client['id']
+            for client, client_id in zip(clients_result.data, client_ids):
                 client_name = client['name']
+                days_tracked = cube.days_logged(client_id)
                 
-                # Get client's habit data for last 30 days
-                habits_data = habits_service.get_client_habits(client_id, days=30)
-                
-                if habits_data['success'] and habits_data.get('days_tracked', 0) > 0:
+                if days_tracked > 0:
                     analytics['clients_with_habits'] += 1
                     
                     # Calculate compliance rate (days logged / 30)
-                    compliance_rate = (habits_data['days_tracked'] / 30) * 100
-                    
-                    # Count habit types
-                    client_habits = set()
-                    total_entries = 0
-                    
-                    for date_data in habits_data['data'].values():
-                        for habit_type in date_data.keys():
-                            client_habits.add(habit_type)
-                            total_entries += 1
+                    compliance_rate = (days_tracked / 30) * 100
                     
                     # Update habit popularity
+                    client_habits = cube.habits_logged(client_id)
                     for habit in client_habits:
                         habit_counts[habit] = habit_counts.get(habit, 0) + 1
                     
                     # Calculate streaks
                     client_streaks = []
-                    for habit_type in client_habits:
-                        streak = habits_service.calculate_streak(client_id, habit_type)
+                    for habit_id in client_habits:
+                        streak = streaks.get((client_id, habit_id), 0)
                         if streak > 0:
                             client_streaks.append(streak)
                             analytics['total_streaks'] += 1
@@ -4672,6 +4676,18 @@ If you cannot determine a value, use null. Return ONLY valid JSON, no other text
                         'total_habits': len(client_habits)
                     })
             
+            # Name habits for the popularity table
+            if habit_counts:
+                names_result = self.db.table('fitness_habits').select('habit_id, habit_name').in_(
+                    'habit_id', list(habit_counts)
+                ).execute()
+                habit_names = {h['habit_id']: h.get('habit_name') or h['habit_id'] for h in names_result.data or []}
+                named_counts = {}
+                for habit_id, count in habit_counts.items():
+                    name = habit_names.get(habit_id, habit_id)
+                    named_counts[name] = named_counts.get(name, 0) + count
+                habit_counts = named_counts
+            
             # Calculate overall metrics
             if client_scores:
                 analytics['average_compliance'] = sum(c['compliance_rate'] for c in client_scores) / len(client_scores)
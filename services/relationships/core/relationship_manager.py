@@ -135,6 +135,10 @@ class RelationshipManager:
             
             # Update any pending invitations to accepted status
             self._update_invitation_status(actual_trainer_id, actual_client_id, 'accepted')
+            from services.dashboard.response_cache import touch_dashboard_users
+            touch_dashboard_users(actual_trainer_id, actual_client_id)
+            from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+            invalidate_trainer_leaderboards(actual_trainer_id, reason='trainee list changed')
             
             log_info(f"Approved relationship: trainer {actual_trainer_id} <-> client {actual_client_id}")
             return True, "Relationship approved"
@@ -170,6 +174,10 @@ class RelationshipManager:
             
             # Update any pending invitations to declined status
             self._update_invitation_status(actual_trainer_id, actual_client_id, 'declined')
+            from services.dashboard.response_cache import touch_dashboard_users
+            touch_dashboard_users(actual_trainer_id, actual_client_id)
+            from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+            invalidate_trainer_leaderboards(actual_trainer_id, reason='trainee list changed')
             
             log_info(f"Declined relationship: trainer {actual_trainer_id} <-> client {actual_client_id}")
             return True, "Relationship declined"
@@ -198,6 +206,10 @@ class RelationshipManager:
             self.db.table('client_trainer_list').delete().eq(
                 'client_id', actual_client_id
             ).eq('trainer_id', actual_trainer_id).execute()
+            from services.dashboard.response_cache import touch_dashboard_users
+            touch_dashboard_users(actual_trainer_id, actual_client_id)
+            from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+            invalidate_trainer_leaderboards(actual_trainer_id, reason='trainee list changed')
             
             log_info(f"Removed relationship: trainer {actual_trainer_id} <-> client {actual_client_id}")
             return True, "Relationship removed"
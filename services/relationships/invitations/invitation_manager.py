@@ -376,6 +376,10 @@ class InvitationManager:
                 self.db.table('client_trainer_list').update(relationship_data).eq(
                     'client_id', client_id
                 ).eq('trainer_id', trainer_id).execute()
+                from services.dashboard.response_cache import touch_dashboard_users
+                touch_dashboard_users(trainer_id, client_id)
+                from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+                invalidate_trainer_leaderboards(trainer_id, reason='trainee list changed')
                 
                 log_info(f"Updated existing relationship: trainer {trainer_id} <-> client {client_id}")
                 return True, "Relationship updated successfully"
@@ -398,6 +402,10 @@ class InvitationManager:
                 }
                 
                 self.db.table('client_trainer_list').insert(client_list_data).execute()
+                from services.dashboard.response_cache import touch_dashboard_users
+                touch_dashboard_users(trainer_id, client_id)
+                from services.habits.leaderboard_service import invalidate_trainer_leaderboards
+                invalidate_trainer_leaderboards(trainer_id, reason='trainee list changed')
                 
                 log_info(f"Created new relationship: trainer {trainer_id} <-> client {client_id}")
                 return True, "Relationship created successfully"
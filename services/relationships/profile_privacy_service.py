@@ -121,6 +121,8 @@ class ProfilePrivacyService:
                 'custom_price_per_session': custom_price,
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('trainer_id', trainer_id).eq('client_id', client_id).execute()
+            from services.dashboard.response_cache import touch_dashboard_users
+            touch_dashboard_users(trainer_id, client_id)
 
             log_info(f"Set custom pricing R{custom_price} for trainer {trainer_id} and client {client_id}")
             return True, f"Custom pricing set to R{custom_price}"
@@ -188,6 +190,8 @@ class ProfilePrivacyService:
                 'private_notes': notes,
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('trainer_id', trainer_id).eq('client_id', client_id).execute()
+            from services.dashboard.response_cache import touch_dashboard_users
+            touch_dashboard_users(trainer_id, client_id)
 
             log_info(f"Updated private notes for trainer {trainer_id} and client {client_id}")
             return True, "Private notes updated"
@@ -4,6 +4,7 @@ Handles cron job scheduling for habit reminders
 """
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.executors.pool import ThreadPoolExecutor
 from datetime import datetime, time
 from utils.logger import log_info, log_error
@@ -57,6 +58,7 @@ class ReminderScheduler:
                 
                 # Schedule daily reminders
                 self._schedule_daily_reminders()
+                self._schedule_leaderboard_refresh()
                 
         except Exception as e:
             log_error(f"Error starting reminder scheduler: {str(e)}")
@@ -110,6 +112,35 @@ class ReminderScheduler:
         except Exception as e:
             log_error(f"Error scheduling daily reminders: {str(e)}")
     
+    def _schedule_leaderboard_refresh(self):
+        """Schedule the periodic rebuild of dashboard leaderboard snapshots"""
+        try:
+            from config import Config
+            minutes = getattr(Config, 'LEADERBOARD_REFRESH_MINUTES', 5)
+            
+            self.scheduler.add_job(
+                func=self._refresh_leaderboards_job,
+                trigger=IntervalTrigger(minutes=minutes, timezone='UTC'),
+                id='refresh_leaderboards',
+                name='Refresh Leaderboard Snapshots',
+                replace_existing=True
+            )
+            
+            log_info(f"Leaderboard refresh scheduled every {minutes} minutes")
+            
+        except Exception as e:
+            log_error(f"Error scheduling leaderboard refresh: {str(e)}")
+    
+    def _refresh_leaderboards_job(self):
+        """Job function to rebuild leaderboard snapshots"""
+        try:
+            from services.habits.leaderboard_service import get_leaderboard_service
+            rebuilt = get_leaderboard_service(self.db).refresh()
+            log_info(f"Leaderboard refresh completed: {rebuilt} snapshots rebuilt")
+            
+        except Exception as e:
+            log_error(f"Error in leaderboard refresh job: {str(e)}")
+    
     def _send_daily_reminders_job(self):
         """Job function to send daily reminders"""
         try:
@@ -5,7 +5,9 @@ Monitors abandoned add-client flows and handles timeouts
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import pytz
+from utils.keyset_pagination import fetch_all
 from utils.logger import log_info, log_error
+from services.auth.tasks.task_state_cache import get_task_state_cache, invalidate_running_task
 
 
 class TaskTimeoutService:
@@ -76,11 +78,9 @@ class TaskTimeoutService:
     def _get_monitored_running_tasks(self, table: str) -> List[Dict]:
         """Get all running tasks that should be monitored for timeouts"""
         try:
-            result = self.db.table(table).select('*').eq(
+            return fetch_all(lambda: self.db.table(table).select('*').eq(
                 'task_status', 'running'
-            ).in_('task_type', self.MONITORED_TASK_TYPES).execute()
-
-            return result.data if result.data else []
+            ).in_('task_type', self.MONITORED_TASK_TYPES))
 
         except Exception as e:
             log_error(f"Error getting monitored tasks: {str(e)}")
@@ -140,6 +140,7 @@ class TaskTimeoutService:
                 'task_data': task_data,
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('id', task['id']).execute()
+            invalidate_running_task(phone, role)
 
             log_info(f"Sent timeout reminder for task {task['id']} to {phone}")
             return True
@@ -179,6 +180,7 @@ class TaskTimeoutService:
                 'completed_at': now,
                 'updated_at': now
             }).eq('id', task_id).execute()
+            invalidate_running_task(phone, role)
 
             log_info(f"Cleaned up abandoned task {task_id} for {phone}")
             return True
@@ -317,6 +319,10 @@ class TaskTimeoutService:
                     'updated_at': now
                 }).eq('id', task['id']).execute()
 
+                task_state_cache = get_task_state_cache()
+                if task_state_cache:
+                    task_state_cache.apply_task_row(role, result.data[0], created=True)
+
                 log_info(f"Resumed task {task['id']} as new task {new_task_id}")
                 return new_task_id
 
@@ -347,6 +353,7 @@ class TaskTimeoutService:
                 'task_data': task_data,
                 'updated_at': datetime.now(self.sa_tz).isoformat()
             }).eq('id', task_id).execute()
+            invalidate_running_task(task.get('trainer_phone' if role == 'trainer' else 'client_phone'), role)
 
             return True
 
@@ -16,8 +16,7 @@ Features:
 
 from typing import Dict, Tuple, Optional, List
 import re
-from anthropic import Anthropic
-from config import Config
+from services.ai_gateway import get_ai_gateway
 from utils.logger import log_info, log_error, log_warning, log_debug
 
 
@@ -45,9 +44,8 @@ class ClientAdditionValidator:
         """Initialize the validator"""
         self.retry_counts = {}  # Track retry attempts per user per field
 
-        # Initialize Claude client for AI validation
-        self.client = Anthropic(api_key=Config.ANTHROPIC_API_KEY) if Config.ANTHROPIC_API_KEY else None
-        self.model = "claude-sonnet-4-20250514"
+        # Shared Claude client for AI validation
+        self.ai = get_ai_gateway()
 
         log_info("ClientAdditionValidator initialized")
 
@@ -552,15 +550,11 @@ Be helpful - if it's close to valid but missing info, mark invalid and ask for c
 """
 
             # Use Claude AI for validation
-            if self.client:
+            if self.ai.is_available():
                 try:
-                    response = self.client.messages.create(
-                        model=self.model,
-                        messages=[{"role": "user", "content": prompt}],
-                        max_tokens=300,
-                        temperature=0.3
+                    response_text = self.ai.complete(
+                        prompt, purpose='package_validation', max_tokens=300, temperature=0.3
                     )
-                    response_text = response.content[0].text
                 except Exception as e:
                     log_error(f"Claude API call failed: {str(e)}")
                     log_warning("AI validation failed, using fallback validation")
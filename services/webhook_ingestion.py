@@ -0,0 +1,371 @@
+"""
+Webhook Ingestion Queue
+Validates and persists incoming WhatsApp webhook payloads, acknowledges them
+immediately and processes the messages on a bounded pool of worker threads.
+
+Messages are sharded by phone number so every message from the same sender
+is handled by the same worker, which keeps per-phone ordering intact.
+"""
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.logger import log_info, log_error, log_warning
+
+
+class WebhookJournal:
+    """
+    Append-only JSONL spool of accepted webhook messages.
+
+    Every accepted message is written as a 'received' record before the HTTP
+    request is acknowledged and as a 'done' record once a worker has finished
+    with it. Messages without a 'done' record are replayed on restart.
+    """
+
+    # Compact the spool once it grows past this size and nothing is in flight
+    MAX_SIZE_BYTES = 5 * 1024 * 1024
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = None
+        self._in_flight = 0
+
+        if self.path:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            except Exception as e:
+                log_warning(f"Webhook journal disabled, could not open {self.path}: {str(e)}")
+                self._file = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._file is not None
+
+    def record_received(self, event: Dict):
+        """Persist a newly accepted message event"""
+        with self._lock:
+            self._in_flight += 1
+            self._write({'status': 'received', **event})
+
+    def record_done(self, event_id: str, status: str = 'done'):
+        """Mark a message event as finished (processed, failed or dropped)"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._write({'status': status, 'event_id': event_id})
+
+            if self._in_flight == 0 and self.enabled:
+                try:
+                    if self._file.tell() > self.MAX_SIZE_BYTES:
+                        self._file.truncate(0)
+                        self._file.seek(0)
+                except Exception as e:
+                    log_warning(f"Could not compact webhook journal: {str(e)}")
+
+    def load_pending(self) -> List[Dict]:
+        """Return received events that never got a completion record"""
+        if not self.path or not os.path.exists(self.path):
+            return []
+
+        pending: Dict[str, Dict] = {}
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as journal:
+                    for line in journal:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            # Partially written line from a crash
+                            continue
+
+                        if record.get('status') == 'received':
+                            pending[record['event_id']] = record
+                        else:
+                            pending.pop(record.get('event_id'), None)
+            except Exception as e:
+                log_error(f"Error reading webhook journal: {str(e)}")
+                return []
+
+            # Rewrite the spool so it only contains what is still outstanding
+            if self.enabled:
+                try:
+                    self._file.truncate(0)
+                    self._file.seek(0)
+                    self._in_flight = 0
+                except Exception as e:
+                    log_warning(f"Could not reset webhook journal: {str(e)}")
+
+        return list(pending.values())
+
+    def _write(self, record: Dict):
+        if not self.enabled:
+            return
+        try:
+            self._file.write(json.dumps(record, default=str) + '\n')
+            self._file.flush()
+        except Exception as e:
+            log_warning(f"Could not write webhook journal: {str(e)}")
+
+
+class _LatencyStats:
+    """Running count/mean/max plus percentiles over a recent sample window"""
+
+    def __init__(self, window: int = 1000):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples = deque(maxlen=window)
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.samples.append(value)
+
+    def snapshot(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+        return {
+            'count': self.count,
+            'avg_ms': round((self.total / self.count) * 1000, 2) if self.count else 0.0,
+            'p50_ms': round(percentile(0.50) * 1000, 2),
+            'p95_ms': round(percentile(0.95) * 1000, 2),
+            'max_ms': round(self.max * 1000, 2)
+        }
+
+
+class WebhookIngestionQueue:
+    """
+    Bounded, phone-sharded work queue for inbound WhatsApp messages.
+
+    The request thread only validates the payload, writes it to the journal and
+    puts one event per message on the shard owned by the sender's phone.
+    A single worker drains each shard, so messages from one phone are always
+    processed in the order they were received.
+    """
+
+    def __init__(self, handler: Callable[[Dict, Dict], None], num_workers: int = 4,
+                 max_queue_size: int = 1000, journal_path: Optional[str] = None):
+        """
+        Args:
+            handler: Callable invoked as handler(message, payload) for each message
+            num_workers: Number of worker threads (and shards)
+            max_queue_size: Maximum number of waiting events per shard
+            journal_path: File used to persist accepted events, None to disable
+        """
+        self.handler = handler
+        self.num_workers = max(1, int(num_workers))
+        self.max_queue_size = max(1, int(max_queue_size))
+        self.journal = WebhookJournal(journal_path)
+
+        self._shards = [queue.Queue(maxsize=self.max_queue_size) for _ in range(self.num_workers)]
+        self._workers: List[threading.Thread] = []
+        self._started = False
+        self._start_lock = threading.Lock()
+
+        self._metrics_lock = threading.Lock()
+        self._wait_stats = _LatencyStats()
+        self._processing_stats = _LatencyStats()
+        self._counters = {
+            'accepted': 0,
+            'processed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'replayed': 0
+        }
+
+    def start(self):
+        """Start worker threads and replay any events left over from a previous run"""
+        with self._start_lock:
+            if self._started:
+                return
+
+            for index, shard in enumerate(self._shards):
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(shard,),
+                    name=f"webhook-worker-{index}",
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+            self._started = True
+            log_info(f"Webhook ingestion queue started with {self.num_workers} workers")
+
+        for event in self.journal.load_pending():
+            if self._enqueue(event, persist=True):
+                with self._metrics_lock:
+                    self._counters['replayed'] += 1
+
+        if self._counters['replayed']:
+            log_info(f"Replayed {self._counters['replayed']} unprocessed webhook messages")
+
+    @staticmethod
+    def validate_payload(data) -> Tuple[bool, str]:
+        """
+        Basic structural validation of a WhatsApp webhook payload.
+
+        Returns:
+            (is_valid, error_message)
+        """
+        if not isinstance(data, dict):
+            return False, 'Payload must be a JSON object'
+
+        entries = data.get('entry')
+        if entries is None:
+            return True, ''
+
+        if not isinstance(entries, list):
+            return False, "'entry' must be a list"
+
+        for entry in entries:
+            if not isinstance(entry, dict) or not isinstance(entry.get('changes', []), list):
+                return False, "Malformed 'entry' object"
+
+        return True, ''
+
+    @staticmethod
+    def extract_messages(data: Dict) -> List[Dict]:
+        """Flatten all inbound messages (not status updates) from a payload"""
+        messages = []
+        for entry in data.get('entry', []) or []:
+            for change in entry.get('changes', []) or []:
+                value = change.get('value', {}) or {}
+                for message in value.get('messages', []) or []:
+                    if isinstance(message, dict):
+                        messages.append(message)
+        return messages
+
+    def submit(self, data: Dict) -> Dict:
+        """
+        Accept a webhook payload for asynchronous processing.
+
+        Returns:
+            {'accepted': int, 'rejected': int}
+        """
+        if not self._started:
+            self.start()
+
+        accepted = 0
+        rejected = 0
+        now = time.time()
+
+        for message in self.extract_messages(data):
+            event = {
+                'event_id': message.get('id') or str(uuid.uuid4()),
+                'phone': message.get('from', ''),
+                'message': message,
+                'payload': data,
+                'enqueued_at': now
+            }
+
+            if self._enqueue(event, persist=True):
+                accepted += 1
+            else:
+                rejected += 1
+
+        with self._metrics_lock:
+            self._counters['accepted'] += accepted
+            self._counters['rejected'] += rejected
+
+        return {'accepted': accepted, 'rejected': rejected}
+
+    def get_metrics(self) -> Dict:
+        """Queue depth, wait time and processing time metrics"""
+        depths = [shard.qsize() for shard in self._shards]
+        with self._metrics_lock:
+            return {
+                'workers': self.num_workers,
+                'max_queue_size': self.max_queue_size,
+                'queue_depth': sum(depths),
+                'queue_depth_per_worker': depths,
+                'wait_time': self._wait_stats.snapshot(),
+                'processing_time': self._processing_stats.snapshot(),
+                **self._counters
+            }
+
+    def join(self, timeout: float = 5.0) -> bool:
+        """Wait until every queued event has been processed (used by tests/scripts)"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if all(shard.unfinished_tasks == 0 for shard in self._shards):
+                return True
+            time.sleep(0.01)
+        return False
+
+    def _shard_for(self, phone: str) -> queue.Queue:
+        return self._shards[zlib.crc32((phone or '').encode('utf-8')) % self.num_workers]
+
+    def _enqueue(self, event: Dict, persist: bool) -> bool:
+        event.setdefault('enqueued_at', time.time())
+        if persist:
+            self.journal.record_received(event)
+
+        try:
+            self._shard_for(event.get('phone')).put_nowait(event)
+            return True
+        except queue.Full:
+            log_warning(f"Webhook queue full, rejecting message {event.get('event_id')} from {event.get('phone')}")
+            if persist:
+                self.journal.record_done(event['event_id'], status='rejected')
+            return False
+
+    def _worker_loop(self, shard: queue.Queue):
+        while True:
+            event = shard.get()
+            started = time.time()
+            status = 'done'
+
+            try:
+                self.handler(event['message'], event['payload'])
+            except Exception as e:
+                status = 'failed'
+                log_error(f"Error processing queued webhook message {event.get('event_id')}: {str(e)}")
+            finally:
+                finished = time.time()
+                with self._metrics_lock:
+                    self._wait_stats.add(max(0.0, started - event.get('enqueued_at', started)))
+                    self._processing_stats.add(finished - started)
+                    self._counters['processed' if status == 'done' else 'failed'] += 1
+
+                self.journal.record_done(event['event_id'], status=status)
+                shard.task_done()
+
+
+_ingestion_queue: Optional[WebhookIngestionQueue] = None
+_ingestion_lock = threading.Lock()
+
+
+def get_ingestion_queue(handler: Callable[[Dict, Dict], None], config=None) -> WebhookIngestionQueue:
+    """Get (or lazily create) the process-wide ingestion queue"""
+    global _ingestion_queue
+
+    if _ingestion_queue is None:
+        with _ingestion_lock:
+            if _ingestion_queue is None:
+                if config is None:
+                    from config import Config as config
+                _ingestion_queue = WebhookIngestionQueue(
+                    handler,
+                    num_workers=getattr(config, 'WEBHOOK_WORKERS', 4),
+                    max_queue_size=getattr(config, 'WEBHOOK_QUEUE_SIZE', 1000),
+                    journal_path=getattr(config, 'WEBHOOK_JOURNAL_PATH', None)
+                )
+                _ingestion_queue.start()
+
+    return _ingestion_queue
@@ -1,21 +1,24 @@
 """WhatsApp messaging service"""
-import requests
 import json
 from typing import Dict, List, Optional
 from datetime import datetime
 import pytz
 from utils.logger import log_info, log_error, log_warning
+from services.whatsapp_transport import get_graph_transport, is_connect_failure
 
 class WhatsAppService:
     """Handle WhatsApp message sending and receiving"""
     
-    def __init__(self, config, supabase_client, logger):
+    def __init__(self, config, supabase_client, logger, transport=None):
         self.config = config
         self.db = supabase_client
         self.logger = logger
         self.api_url = config.WHATSAPP_API_URL
         self.api_token = config.WHATSAPP_API_TOKEN
         self.sa_tz = pytz.timezone(config.TIMEZONE)
+
+        # Shared keep-alive session: one connection pool for every outbound call
+        self.transport = transport or get_graph_transport(config)
         
         # Test mode support
         self.test_mode = False
@@ -55,11 +58,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             if response.status_code == 200:
@@ -67,11 +69,11 @@ class WhatsAppService:
                 return {'success': True, 'message_id': response.json().get('messages', [{}])[0].get('id')}
             else:
                 log_error(f"Failed to send message: {response.text}")
-                return {'success': False, 'error': response.text}
+                return {'success': False, 'error': response.text, 'status_code': response.status_code}
                 
         except Exception as e:
             log_error(f"Error sending WhatsApp message: {str(e)}")
-            return {'success': False, 'error': str(e)}
+            return {'success': False, 'error': str(e), 'connect_failed': is_connect_failure(e)}
     
     def send_template_message(self, to_phone: str, template_name: str,
                              language_code: str, components: list) -> bool:
@@ -111,11 +113,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
 
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=message_data,
-                timeout=10
+                json=message_data
             )
 
             if response.status_code == 200:
@@ -152,11 +153,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             if response.status_code == 200:
@@ -184,11 +184,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 f"{self.api_url}/messages",
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             return response.status_code == 200
@@ -224,28 +223,37 @@ class WhatsAppService:
         """
         return self._format_phone_number(phone)
     
+    def start_bulk_send(self, recipients: List[Dict], message: str, on_result=None,
+                        name: str = 'bulk-send'):
+        """
+        Start sending a personalised message to many recipients in the background.
+
+        Returns a BulkSendJob; use job.progress(), job.iter_progress() or
+        job.wait() to follow it. '{name}' in the message is replaced per recipient.
+        """
+        from services.bulk_sender import start_bulk_send
+
+        items = [
+            {
+                'phone': recipient.get('phone'),
+                'message': message.replace('{name}', recipient.get('name', 'User'))
+            }
+            for recipient in recipients
+        ]
+        return start_bulk_send(self, items, config=self.config, on_result=on_result, name=name)
+
     def send_bulk_messages(self, recipients: List[Dict], message: str) -> Dict:
-        """Send bulk messages to multiple recipients"""
-        results = {
-            'sent': [],
-            'failed': []
+        """Send bulk messages to multiple recipients (blocks until every send has finished)"""
+        job = self.start_bulk_send(recipients, message)
+        job.wait()
+
+        return {
+            'sent': [outcome['phone'] for outcome in job.sent],
+            'failed': [
+                {'phone': outcome['phone'], 'error': outcome.get('error')}
+                for outcome in job.failed
+            ]
         }
-        
-        for recipient in recipients:
-            phone = recipient.get('phone')
-            name = recipient.get('name', 'User')
-            
-            # Personalize message
-            personalized = message.replace('{name}', name)
-            
-            result = self.send_message(phone, personalized)
-            
-            if result['success']:
-                results['sent'].append(phone)
-            else:
-                results['failed'].append({'phone': phone, 'error': result.get('error')})
-        
-        return results
 
     def send_button_message(self, phone_number: str, message: str, 
                            buttons: List[Dict]) -> Dict:
@@ -300,11 +308,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             if response.status_code == 200:
@@ -370,11 +377,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             if response.status_code == 200:
@@ -414,11 +420,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=payload,
-                timeout=10
+                json=payload
             )
             
             if response.status_code == 200:
@@ -447,11 +452,10 @@ class WhatsAppService:
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = self.transport.post(
                 self.api_url,
                 headers=headers,
-                json=flow_message,
-                timeout=10
+                json=flow_message
             )
             
             if response.status_code == 200:
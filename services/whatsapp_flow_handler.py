@@ -1880,6 +1880,8 @@ Ready to get started? Just say 'Hi' anytime! 💪"""
                 'created_at': datetime.now(sa_tz).isoformat()
             }
             self.supabase.table('users').insert(user_data).execute()
+            from services.auth.core.identity_cache import invalidate_identity
+            invalidate_identity(phone_number, 'registration')
             log_info(f"Created user record for {client_id}")
 
             # Create trainer-client relationship
@@ -1906,6 +1908,8 @@ Ready to get started? Just say 'Hi' anytime! 💪"""
                                 'pricing_per_session': custom_price,
                                 'updated_at': datetime.now(sa_tz).isoformat()
                             }).eq('trainer_id', trainer_id).eq('client_id', client_id).execute()
+                            from services.dashboard.response_cache import touch_dashboard_users
+                            touch_dashboard_users(trainer_id, client_id)
 
                             log_info(f"Applied custom pricing R{custom_price} for client {client_id}")
                         except Exception as pricing_error:
@@ -3247,25 +3251,23 @@ Ready to get started? Just say 'Hi' anytime! 💪"""
     
     def _decrypt_flow_data(self, encrypted_data: str, encrypted_key: str, iv: str) -> Dict:
         """
-        Decrypt WhatsApp Flow data (placeholder implementation)
-        
-        In production, you would:
-        1. Decrypt the AES key using your private key
-        2. Use the decrypted AES key and IV to decrypt the flow data
-        3. Parse the decrypted JSON data
-        
-        For now, this returns empty data as decryption requires proper key management
+        Decrypt WhatsApp Flow data
+
+        Uses the shared Flow crypto path (services.flow_crypto), so the private
+        key is parsed once per process rather than per request. The returned
+        aes_key/iv are needed to encrypt the response.
         """
         try:
-            # This is a placeholder - implement actual decryption logic here
-            log_warning("Flow data decryption not implemented - using mock data")
-            
+            from services.flow_crypto import get_flow_crypto
+            data, aes_key, initial_vector = get_flow_crypto().decrypt_request(encrypted_data, encrypted_key, iv)
+
             return {
-                'decrypted': False,
-                'data': {},
-                'error': 'Decryption not implemented'
+                'decrypted': True,
+                'data': data,
+                'aes_key': aes_key,
+                'iv': initial_vector
             }
-            
+
         except Exception as e:
             log_error(f"Error decrypting flow data: {str(e)}")
             return {
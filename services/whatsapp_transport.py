@@ -0,0 +1,170 @@
+"""
+WhatsApp Graph API Transport
+Shared keep-alive HTTP session for outbound Graph API calls, with connection
+pooling, per-call timeouts and a retry policy for rate limits and transient
+server errors.
+"""
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+from utils.logger import log_info, log_warning
+
+
+# HTTP statuses that mean "not processed, try again later". A plain 500 is
+# not retried: the message may already have been accepted.
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+# Graph error codes for app/business-level throttling
+# (4: app request limit, 80007: WABA rate limit, 130429: Cloud API throughput)
+RATE_LIMIT_ERROR_CODES = frozenset({4, 80007, 130429})
+
+
+def is_connect_failure(error: Exception) -> bool:
+    """True if the request failed before reaching the server, so resending a POST cannot duplicate it"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying failure.
+    # A dropped connection after the body was sent arrives as a ProtocolError instead.
+    reason = error.args[0] if error.args else None
+    reason = getattr(reason, 'reason', reason)
+    return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)  # includes NewConnectionError
+
+
+class GraphTransport:
+    """
+    Pooled requests.Session for graph.facebook.com.
+
+    Retries (up to max_retries) when the Graph API answers with a retryable
+    status, a throttling error code or an error marked is_transient, and when
+    the connection could not be established. Read timeouts and connections
+    dropped after the request was sent are not retried because the message
+    may have been delivered. The wait honours Retry-After,
+    otherwise it backs off exponentially with jitter.
+    """
+
+    def __init__(self, pool_size: int = 20, connect_timeout: float = 3.05, read_timeout: float = 10,
+                 max_retries: int = 3, backoff_factor: float = 0.5, max_backoff: float = 30,
+                 sleep=time.sleep):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self._sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._stats_lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.connection_errors = 0
+
+    def post(self, url: str, json: Dict = None, headers: Dict = None,
+             timeout=None) -> requests.Response:
+        """POST with retries. Returns the last response; raises if no response was ever received"""
+        attempt = 0
+        while True:
+            self._count('requests_sent')
+            try:
+                response = self.session.post(url, json=json, headers=headers, timeout=timeout or self.timeout)
+            except requests.exceptions.ConnectionError as e:
+                # Only connect-phase failures are safe to resend; ReadTimeout is not a ConnectionError
+                self._count('connection_errors')
+                if not is_connect_failure(e) or attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                log_warning(f"Graph API connection failed ({str(e)}), retrying in {delay:.2f}s")
+            else:
+                retry, rate_limited = self._should_retry(response)
+                if rate_limited:
+                    self._count('rate_limited')
+                if not retry or attempt >= self.max_retries:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff(attempt)
+                log_warning(f"Graph API returned {response.status_code}, retrying in {delay:.2f}s")
+
+            attempt += 1
+            self._count('retries')
+            self._sleep(delay)
+
+    @staticmethod
+    def _should_retry(response: requests.Response):
+        """Returns (retry, rate_limited) for a Graph API response"""
+        if response.status_code < 400:
+            return False, False
+
+        error = {}
+        try:
+            body = response.json()
+            if isinstance(body, dict) and isinstance(body.get('error'), dict):
+                error = body['error']
+        except ValueError:
+            pass
+
+        rate_limited = response.status_code == 429 or error.get('code') in RATE_LIMIT_ERROR_CODES
+        retry = rate_limited or response.status_code in RETRY_STATUSES or error.get('is_transient') is True
+        return retry, rate_limited
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            return min(max(float(value), 0.0), self.max_backoff)
+        except ValueError:
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_factor * (2 ** attempt), self.max_backoff)
+        return delay * random.uniform(0.5, 1.0)
+
+    def _count(self, counter: str):
+        with self._stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_stats(self) -> Dict:
+        return {
+            'requests_sent': self.requests_sent,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+            'connection_errors': self.connection_errors
+        }
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_graph_transport(config=None) -> GraphTransport:
+    """Get (or lazily create) the process-wide Graph API transport"""
+    global _transport
+
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                if config is None:
+                    from config import Config as config
+
+                _transport = GraphTransport(
+                    pool_size=getattr(config, 'WHATSAPP_HTTP_POOL_SIZE', 20),
+                    connect_timeout=getattr(config, 'WHATSAPP_HTTP_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=getattr(config, 'WHATSAPP_HTTP_READ_TIMEOUT', 10),
+                    max_retries=getattr(config, 'WHATSAPP_HTTP_MAX_RETRIES', 3),
+                    backoff_factor=getattr(config, 'WHATSAPP_HTTP_BACKOFF_SECONDS', 0.5)
+                )
+                log_info(f"Graph API transport initialised (pool size {getattr(config, 'WHATSAPP_HTTP_POOL_SIZE', 20)})")
+
+    return _transport
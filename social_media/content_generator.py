@@ -1,12 +1,12 @@
 """Social Media Content Generator - AI-powered content creation for personal trainers"""
-import os
 import yaml
 import random
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime, timedelta
 import pytz
-from anthropic import Anthropic
+from services.ai_gateway import get_ai_gateway
+from services.ai_prompt import CachedPrompt
 from utils.logger import log_info, log_error, log_warning
 from .database import SocialMediaDatabase
 
@@ -26,13 +26,13 @@ class ContentGenerator:
         self.db = SocialMediaDatabase(supabase_client)
         self.sa_tz = pytz.timezone('Africa/Johannesburg')
         
-        # Initialize Claude client
-        api_key = os.getenv('ANTHROPIC_API_KEY')
-        if not api_key:
-            raise ValueError("ANTHROPIC_API_KEY environment variable is required")
+        # Static part of every content prompt (see _get_system_prompt)
+        self._system_prompt: Optional[str] = None
         
-        self.claude_client = Anthropic(api_key=api_key)
-        self.model = "claude-sonnet-4-20250514"  # Using the specified model
+        # Shared Claude client
+        self.ai = get_ai_gateway()
+        if not self.ai.is_available():
+            raise ValueError("ANTHROPIC_API_KEY environment variable is required")
         
         log_info("ContentGenerator initialized successfully")
     
@@ -200,7 +200,7 @@ class ContentGenerator:
             log_error(f"Error generating single post: {str(e)}")
             return {}
     
-    def create_claude_prompt(self, theme: str, format_type: str, hook_type: str = None, emergency_mode: bool = False) -> str:
+    def create_claude_prompt(self, theme: str, format_type: str, hook_type: str = None, emergency_mode: bool = False) -> CachedPrompt:
         """Build prompt for Claude based on theme and format
         
         Args:
@@ -210,7 +210,8 @@ class ContentGenerator:
             emergency_mode: Whether to generate emergency content quickly
             
         Returns:
-            str: Formatted prompt for Claude
+            CachedPrompt: Shared persona/rules/output format as the cached
+            system prefix, this post's theme, format and hook as the suffix
         """
         # Get theme configuration
         theme_config = self.config.get('content_themes', {}).get(theme, {})
@@ -223,14 +224,47 @@ class ContentGenerator:
             hook_config = self.config.get('hook_categories', {}).get(hook_type, {})
             hook_template = hook_config.get('template', '')
         
+        # Build the per-post part of the prompt
+        prompt = f"""CONTENT THEME: {theme.replace('_', ' ').title()}
+Theme Description: {theme_config.get('description', '')}
+
+POST FORMAT: {format_type.replace('_', ' ').title()}
+
+{f"HOOK TYPE: {hook_type.replace('_', ' ').title()}" if hook_type else ""}
+{f"HOOK DESCRIPTION: {hook_config.get('description', '')}" if hook_type else ""}
+
+HOOK FORMULA:
+{f"Use this specific opening template: {hook_template}" if hook_type and hook_template else "Create a compelling opening that grabs attention immediately"}
+{f"{chr(10)}EMERGENCY MODE: Generate content quickly with high engagement potential" if emergency_mode else ""}
+
+CONTENT EXAMPLES FOR THIS THEME:
+{chr(10).join(f"- {example}" for example in theme_examples[:3])}
+
+{f"HOOK EXAMPLES FOR {hook_type.upper()}:{chr(10)}{chr(10).join(f'- {example}' for example in hook_config.get('examples', [])[:3])}" if hook_type else ""}
+
+FORMAT SPECIFIC INSTRUCTIONS:
+{self._get_format_instructions(format_type)}
+
+Generate engaging, valuable content that personal trainers will love and share!"""
+
+        return CachedPrompt(self._get_system_prompt(), prompt)
+    
+    def _get_system_prompt(self) -> str:
+        """Persona, content rules and output format shared by every post
+        
+        Returns:
+            str: Static instructions, built once per generator
+        """
+        if self._system_prompt is not None:
+            return self._system_prompt
+        
         # Get AI influencer settings
         ai_settings = self.config.get('ai_influencer_settings', {})
         personality = ai_settings.get('personality_traits', [])
         speaking_style = ai_settings.get('speaking_style', {})
         emoji_guidelines = ai_settings.get('emoji_guidelines', {})
         
-        # Build the prompt
-        prompt = f"""You are {ai_settings.get('name', 'Refiloe')}, an AI influencer for personal trainers worldwide.
+        self._system_prompt = f"""You are {ai_settings.get('name', 'Refiloe')}, an AI influencer for personal trainers worldwide.
 
 PERSONALITY & VOICE:
 - {', '.join(personality)}
@@ -238,16 +272,7 @@ PERSONALITY & VOICE:
 - Tone: {speaking_style.get('tone', 'Conversational and supportive')}
 - Approach: Like talking to a knowledgeable friend
 
-CONTENT THEME: {theme.replace('_', ' ').title()}
-Theme Description: {theme_config.get('description', '')}
-
-POST FORMAT: {format_type.replace('_', ' ').title()}
-
-{f"HOOK TYPE: {hook_type.replace('_', ' ').title()}" if hook_type else ""}
-{f"HOOK DESCRIPTION: {hook_config.get('description', '')}" if hook_type else ""}
-
-HOOK FORMULA:
-{f"Use this specific opening template: {hook_template}" if hook_type and hook_template else "Create a compelling opening that grabs attention immediately"}
+Each request gives you a content theme, post format and hook to write one post for.
 
 SCROLL-STOPPER REQUIREMENT:
 - The first 7 words MUST grab attention and make people stop scrolling
@@ -267,21 +292,12 @@ CONTENT REQUIREMENTS:
 - End with an engaging question or call-to-action
 - Be relatable and understanding of trainer challenges
 - Include practical, actionable advice
-{f"- EMERGENCY MODE: Generate content quickly with high engagement potential" if emergency_mode else ""}
 
 EMOJI GUIDELINES:
 - Max per post: {emoji_guidelines.get('max_per_post', 3)}
 - Placement: {emoji_guidelines.get('placement_strategy', [])}
 - Preferred emojis: {emoji_guidelines.get('preferred_emojis', [])}
 
-CONTENT EXAMPLES FOR THIS THEME:
-{chr(10).join(f"- {example}" for example in theme_examples[:3])}
-
-{f"HOOK EXAMPLES FOR {hook_type.upper()}:{chr(10)}{chr(10).join(f'- {example}' for example in hook_config.get('examples', [])[:3])}" if hook_type else ""}
-
-FORMAT SPECIFIC INSTRUCTIONS:
-{self._get_format_instructions(format_type)}
-
 CONTENT GENERATION PROCESS:
 1. Generate 3 different content variations
 2. For each variation, score it on:
@@ -332,11 +348,9 @@ Please provide your response in the following JSON format:
     "tone": "The emotional tone of the post",
     "key_points": [list of main points covered],
     "viral_elements": ["List of viral elements included (numbers, emotions, controversy)"]
-}}
-
-Generate engaging, valuable content that personal trainers will love and share!"""
-
-        return prompt
+}}"""
+        
+        return self._system_prompt
     
     def _select_hook_type(self, post_index: int) -> str:
         """Select hook type for A/B testing
@@ -430,44 +444,32 @@ Generate engaging, valuable content that personal trainers will love and share!"
             'quick_win': "The [time] [tool/method] that [specific result]"
         }
     
-    def _call_claude_with_retry(self, prompt: str, max_retries: int = 3) -> Optional[str]:
+    def _call_claude_with_retry(self, prompt: Union[str, CachedPrompt], max_retries: int = 3) -> Optional[str]:
         """Call Claude API with retry logic
         
         Args:
             prompt: Prompt to send to Claude
-            max_retries: Maximum number of retry attempts
+            max_retries: Maximum number of attempts (retries and backoff are handled by the AI gateway)
             
         Returns:
             Optional[str]: Claude's response or None if failed
         """
-        for attempt in range(max_retries):
-            try:
-                response = self.claude_client.messages.create(
-                    model=self.model,
-                    max_tokens=2000,
-                    temperature=0.7,
-                    messages=[{
-                        "role": "user",
-                        "content": prompt
-                    }]
-                )
-                
-                if response.content and len(response.content) > 0:
-                    return response.content[0].text
-                else:
-                    log_warning(f"Empty response from Claude (attempt {attempt + 1})")
-                    
-            except Exception as e:
-                log_error(f"Claude API error (attempt {attempt + 1}): {str(e)}")
-                
-                if attempt < max_retries - 1:
-                    wait_time = (2 ** attempt) + random.uniform(0, 1)
-                    log_info(f"Retrying in {wait_time:.1f} seconds...")
-                    time.sleep(wait_time)
-                else:
-                    log_error("Max retries reached for Claude API call")
+        try:
+            response_text = self.ai.complete(
+                prompt,
+                purpose='social_content',
+                max_tokens=2000,
+                temperature=0.7,
+                max_retries=max(0, max_retries - 1)
+            )
+        except Exception as e:
+            log_error(f"Claude API error: {str(e)}")
+            return None
         
-        return None
+        if not response_text:
+            log_warning("Empty response from Claude")
+            return None
+        return response_text
     
     def _parse_claude_response(self, response: str, theme: str, format_type: str) -> Dict:
         """Parse Claude's response into structured post data
@@ -543,7 +545,7 @@ Generate engaging, valuable content that personal trainers will love and share!"
                 'created_at': datetime.now(self.sa_tz).isoformat(),
                 'metadata': {
                     'ai_generated': True,
-                    'model_used': self.model,
+                    'model_used': self.ai.model,
                     'generation_time': datetime.now(self.sa_tz).isoformat()
                 }
             })
@@ -666,7 +668,7 @@ VIRAL ELEMENTS TO INCLUDE:
 
 Make this content impossible to scroll past!"""
             
-            full_prompt = prompt + viral_prompt_addition
+            full_prompt = prompt.extend(viral_prompt_addition)
             
             # Call Claude API with retry logic
             response = self._call_claude_with_retry(full_prompt)
@@ -880,7 +882,7 @@ VIRAL ELEMENTS TO INCLUDE:
 
 Make this content impossible to scroll past!"""
             
-            full_prompt = prompt + viral_prompt_addition
+            full_prompt = prompt.extend(viral_prompt_addition)
             
             # Call Claude API with retry logic
             response = self._call_claude_with_retry(full_prompt)
@@ -1181,7 +1183,7 @@ Generate a script that will keep trainers watching until the end!"""
                 'created_at': datetime.now(self.sa_tz).isoformat(),
                 'metadata': {
                     'ai_generated': True,
-                    'model_used': self.model,
+                    'model_used': self.ai.model,
                     'generation_time': datetime.now(self.sa_tz).isoformat()
                 }
             })
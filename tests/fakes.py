@@ -0,0 +1,122 @@
+"""
+In-memory stand-in for the Supabase client used by the tests
+"""
+import threading
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    """
+    Just enough of the postgrest builder over one table's rows: column
+    selection, eq/in_/gt/gte/lte filters, ordering, limit, range paging,
+    insert and update.
+    """
+
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.filters = []
+        self.bounds = None
+        self.sort = None
+        self.descending = False
+        self.count = None
+        self.columns = None
+        self.inserted = None
+        self.values = None
+
+    def select(self, columns='*', **kwargs):
+        if self.db.project_columns and columns != '*':
+            self.columns = [column.strip() for column in columns.split(',')]
+        return self
+
+    def insert(self, rows):
+        self.inserted = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def update(self, values):
+        self.values = values
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def gt(self, column, value):
+        self.filters.append(lambda row: row[column] > value)
+        return self
+
+    def gte(self, column, value):
+        self.filters.append(lambda row: row[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self.filters.append(lambda row: row[column] <= value)
+        return self
+
+    def order(self, column, desc=False):
+        self.sort = column
+        self.descending = desc
+        return self
+
+    def limit(self, count):
+        self.count = count
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def execute(self):
+        self.db.queries.append(self.name)
+        self.db.query_threads.append(threading.current_thread().name)
+        if self.db.strict_tables and self.name not in self.db.tables:
+            raise Exception(f'relation "{self.name}" does not exist')
+
+        if self.inserted is not None:
+            self.db.inserted.setdefault(self.name, []).extend(self.inserted)
+            return FakeResult(self.inserted)
+
+        rows = [row for row in self.db.tables.get(self.name, []) if all(f(row) for f in self.filters)]
+        if self.values is not None:
+            self.db.updates.append((self.name, self.values))
+            for row in rows:
+                row.update(self.values)
+            return FakeResult(rows)
+
+        if self.sort:
+            rows = sorted(rows, key=lambda row: row[self.sort], reverse=self.descending)
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        rows = [{column: row[column] for column in self.columns} if self.columns else dict(row) for row in rows]
+        return FakeResult(rows[:self.count] if self.count else rows)
+
+
+class FakeSupabase:
+    """
+    Tables are {name: [row dicts]}. Every executed query's table name is
+    appended to `queries` (and the calling thread's name to `query_threads`);
+    inserts collect in `inserted`, updates in `updates`.
+
+    project_columns: return only the selected columns (plain column lists only)
+    strict_tables: raise like postgrest when a table does not exist
+    """
+
+    def __init__(self, tables=None, project_columns=False, strict_tables=False):
+        self.tables = tables if tables is not None else {}
+        self.project_columns = project_columns
+        self.strict_tables = strict_tables
+        self.queries = []
+        self.query_threads = []
+        self.inserted = {}
+        self.updates = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
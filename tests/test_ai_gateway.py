@@ -0,0 +1,197 @@
+"""
+Tests for the shared AI gateway
+"""
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+import anthropic
+import httpx
+
+from services import ai_gateway as ai_gateway_module
+from services.ai_gateway import AIGateway, AIGatewayBusy
+from services.ai_prompt import CachedPrompt
+from utils.json_object import MalformedJSON
+from services.ai_intent.core.ai_client import AIClient
+
+REQUEST = httpx.Request('POST', 'https://api.anthropic.com/v1/messages')
+
+
+def make_response(text='ok', input_tokens=10, output_tokens=5, cache_read=0, cache_creation=0):
+    return SimpleNamespace(content=[SimpleNamespace(text=text)],
+                           usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens,
+                                                 cache_read_input_tokens=cache_read,
+                                                 cache_creation_input_tokens=cache_creation))
+
+
+class FakeStream:
+    """Streamed reply: message_start, one text delta per chunk, then message_delta"""
+
+    def __init__(self, chunks, input_tokens=40, output_tokens=30):
+        self.events = [SimpleNamespace(type='message_start', message=SimpleNamespace(
+            usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=1)))]
+        self.events += [SimpleNamespace(type='content_block_delta', delta=SimpleNamespace(text=chunk))
+                        for chunk in chunks]
+        self.events.append(SimpleNamespace(type='message_delta', usage=SimpleNamespace(output_tokens=output_tokens)))
+        self.read = 0
+        self.closed = False
+
+    def __iter__(self):
+        for event in self.events:
+            self.read += 1
+            yield event
+
+    def close(self):
+        self.closed = True
+
+
+def status_error(cls, status_code, headers=None):
+    return cls('error', response=httpx.Response(status_code, headers=headers or {}, request=REQUEST), body=None)
+
+
+class TestAIGateway(unittest.TestCase):
+    """Test suite for AIGateway retries, concurrency limit and accounting"""
+
+    def setUp(self):
+        self.sleeps = []
+        self.client = Mock()
+        self.gateway = AIGateway(api_key=None, client=self.client, max_retries=2, backoff_factor=0.5,
+                                 sleep=self.sleeps.append)
+
+    def test_rate_limit_honours_retry_after(self):
+        """Test that a 429 is retried after Retry-After and the call is accounted once"""
+        self.client.messages.create.side_effect = [
+            status_error(anthropic.RateLimitError, 429, {'retry-after': '2'}),
+            make_response('hello', 12, 3)
+        ]
+
+        self.assertEqual(self.gateway.complete('hi', purpose='intent'), 'hello')
+        self.assertEqual(self.sleeps, [2.0])
+
+        stats = self.gateway.get_stats()
+        self.assertEqual((stats['calls'], stats['retries'], stats['rate_limited']), (1, 1, 1))
+        self.assertEqual((stats['input_tokens'], stats['output_tokens']), (12, 3))
+        self.assertEqual(stats['by_purpose']['intent']['calls'], 1)
+        self.assertIn('latency_p95_ms', stats)
+
+    def test_retry_policy(self):
+        """Test that overloaded and connection errors retry, timeouts and bad requests do not"""
+        self.client.messages.create.side_effect = [
+            status_error(anthropic.InternalServerError, 529),
+            anthropic.APIConnectionError(request=REQUEST),
+            make_response()
+        ]
+        self.assertEqual(self.gateway.complete('hi'), 'ok')
+        self.assertEqual(len(self.sleeps), 2)
+
+        for error in (anthropic.APITimeoutError(request=REQUEST), status_error(anthropic.BadRequestError, 400)):
+            self.client.messages.create.side_effect = [error, make_response()]
+            with self.assertRaises(type(error)):
+                self.gateway.complete('hi')
+        self.assertEqual(len(self.sleeps), 2)
+
+        self.client.messages.create.side_effect = [status_error(anthropic.InternalServerError, 503)] * 3
+        with self.assertRaises(anthropic.InternalServerError):
+            self.gateway.complete('hi')
+        self.assertEqual(self.gateway.get_stats()['errors'], 3)
+
+    def test_concurrency_limit(self):
+        """Test that callers beyond max_concurrency wait and then give up with AIGatewayBusy"""
+        gateway = AIGateway(api_key=None, client=self.client, max_concurrency=1, queue_timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def slow_call(**kwargs):
+            started.set()
+            release.wait(5)
+            return make_response()
+
+        self.client.messages.create.side_effect = slow_call
+        worker = threading.Thread(target=gateway.complete, args=('first',))
+        worker.start()
+        started.wait(5)
+        try:
+            self.assertEqual(gateway.get_stats()['in_flight'], 1)
+            with self.assertRaises(AIGatewayBusy):
+                gateway.complete('second')
+        finally:
+            release.set()
+            worker.join(5)
+
+        self.assertEqual(gateway.complete('third'), 'ok')
+        self.assertEqual(gateway.get_stats()['in_flight'], 0)
+
+    def test_call_sites_share_one_gateway(self):
+        """Test that per-message AIClient instances reuse the process-wide gateway"""
+        with patch.object(ai_gateway_module, '_gateway', self.gateway):
+            self.client.messages.create.return_value = make_response('{"intent": "greeting"}')
+            first, second = AIClient(), AIClient()
+
+            self.assertIs(first.gateway, second.gateway)
+            self.assertEqual(first.send_message('hi'), '{"intent": "greeting"}')
+            self.assertEqual(self.gateway.get_stats()['by_purpose']['intent_detection']['calls'], 1)
+
+    def test_cached_prompt_sends_cacheable_prefix(self):
+        """Test that a CachedPrompt goes out as a cache-marked system block and cache tokens are counted"""
+        self.client.messages.create.side_effect = [
+            make_response(input_tokens=60, cache_creation=1600),
+            make_response(input_tokens=60, cache_read=1600)
+        ]
+        prompt = CachedPrompt('Static instructions', 'MESSAGE: "hi"')
+
+        for _ in range(2):
+            self.gateway.complete(prompt, purpose='intent_detection')
+
+        kwargs = self.client.messages.create.call_args.kwargs
+        self.assertEqual(kwargs['system'], [{'type': 'text', 'text': 'Static instructions',
+                                             'cache_control': {'type': 'ephemeral'}}])
+        self.assertEqual(kwargs['messages'], [{'role': 'user', 'content': 'MESSAGE: "hi"'}])
+
+        stats = self.gateway.get_stats()
+        self.assertEqual((stats['cache_creation_input_tokens'], stats['cache_read_input_tokens']), (1600, 1600))
+        self.assertEqual(stats['by_purpose']['intent_detection']['avg_prompt_tokens'], 1660)
+        self.assertEqual(stats['by_purpose']['intent_detection']['avg_uncached_input_tokens'], 60)
+        self.assertEqual(stats['cache_read_ratio'], round(1600 / 3320, 3))
+
+    def test_json_reply_stops_stream_at_closing_brace(self):
+        """Test that complete_json stops reading once the object is complete and validates it"""
+        stream = FakeStream(['{"intent": "greeting", ', '"confidence": 0.9}', ' Hope that helps!'])
+        self.client.messages.create.return_value = stream
+
+        result = self.gateway.complete_json('hi', purpose='intent', schema={'intent': {'type': str, 'required': True},
+                                                                            'needs_action': {'default': False}})
+
+        self.assertEqual(result, {'intent': 'greeting', 'confidence': 0.9, 'needs_action': False})
+        self.assertTrue(self.client.messages.create.call_args.kwargs['stream'])
+        self.assertEqual(stream.read, 3)
+        self.assertTrue(stream.closed)
+
+        stats = self.gateway.get_stats()
+        self.assertEqual((stats['calls'], stats['streams_stopped_early']), (1, 1))
+        self.assertEqual(stats['input_tokens'], 40)
+
+    def test_malformed_json_reply_is_counted(self):
+        """Test that a reply without a usable object raises MalformedJSON and is counted"""
+        self.client.messages.create.side_effect = [
+            FakeStream(['I am not sure what you mean'], output_tokens=7),
+            FakeStream(['{"confidence": 0.9}'])
+        ]
+
+        for _ in range(2):
+            with self.assertRaises(MalformedJSON):
+                self.gateway.complete_json('hi', schema={'intent': {'type': str, 'required': True}})
+
+        stats = self.gateway.get_stats()
+        self.assertEqual((stats['malformed_json'], stats['streams_stopped_early'], stats['retries']), (2, 1, 0))
+        self.assertEqual(stats['output_tokens'], 7 + 5)
+
+    def test_unavailable_without_api_key(self):
+        """Test that a gateway without a key reports unavailable and refuses calls"""
+        gateway = AIGateway(api_key=None)
+        self.assertFalse(gateway.is_available())
+        with self.assertRaises(RuntimeError):
+            gateway.complete('hi')
+
+
+if __name__ == '__main__':
+    unittest.main()
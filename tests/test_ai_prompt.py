@@ -0,0 +1,41 @@
+"""
+Tests for splitting Claude prompts into a cached prefix and per-call suffix
+"""
+import unittest
+
+from services.ai_intent.utils.prompt_builder import PromptBuilder
+from services.ai_intent_handler import AIIntentHandler
+from services.ai_prompt import CachedPrompt
+
+
+class TestCachedPrompts(unittest.TestCase):
+    """Test suite for the static/dynamic prompt split"""
+
+    def test_intent_prefix_is_identical_across_users_and_messages(self):
+        """Test that only the suffix carries the user, message and chat context"""
+        builder = PromptBuilder()
+        first = builder.build_intent_prompt('show my profile', 'client',
+                                            {'name': 'Thandi', 'recent_tasks': ['log_habits']})
+        second = builder.build_intent_prompt('log my water', 'client', {'name': 'Sipho'})
+
+        self.assertEqual(first.system, second.system)
+        self.assertNotIn('Thandi', first.system)
+        self.assertIn('MESSAGE: "show my profile"', first.user)
+        self.assertIn('log_habits', first.user)
+        self.assertIn('/view-my-habits', first.system)
+        self.assertNotEqual(first.system, builder.build_intent_prompt('hi', 'trainer', {}).system)
+
+        legacy = AIIntentHandler(None, None)._create_intent_prompt('hi', 'trainer', {'name': 'Thandi'})
+        self.assertNotIn('Thandi', legacy.system)
+        self.assertIn('/invite-trainee', legacy.system)
+
+    def test_extend_appends_to_suffix_only(self):
+        """Test that extend() keeps the cached prefix and the single-message form is prefix + suffix"""
+        prompt = CachedPrompt('Rules', 'Theme: admin hacks').extend('\n\nVIRAL ELEMENTS')
+        self.assertEqual(prompt.system, 'Rules')
+        self.assertEqual(prompt.user, 'Theme: admin hacks\n\nVIRAL ELEMENTS')
+        self.assertEqual(prompt.as_text(), 'Rules\n\nTheme: admin hacks\n\nVIRAL ELEMENTS')
+
+
+if __name__ == '__main__':
+    unittest.main()
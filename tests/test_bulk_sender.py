@@ -0,0 +1,103 @@
+"""
+Tests for the concurrent bulk message sender
+"""
+import json
+import threading
+import unittest
+
+from services.bulk_sender import (
+    AUTH, DELIVERY_UNKNOWN, INVALID_RECIPIENT, NETWORK, PERMANENT, RATE_LIMITED, TRANSIENT, BulkSendJob, TokenBucket, classify_failure
+)
+
+
+def graph_error(code, **extra):
+    return {'success': False, 'error': json.dumps({'error': dict(code=code, **extra)})}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestBulkSender(unittest.TestCase):
+    """Test suite for BulkSendJob"""
+
+    def _items(self, count):
+        return [{'phone': f'2782000{i:04d}', 'message': f'Hi {i}'} for i in range(count)]
+
+    def test_classify_failure(self):
+        """Test Graph error classification"""
+        self.assertEqual(classify_failure(graph_error(130429)), RATE_LIMITED)
+        self.assertEqual(classify_failure(graph_error(131026)), INVALID_RECIPIENT)
+        self.assertEqual(classify_failure(graph_error(190)), AUTH)
+
+    def test_classify_transport_failures(self):
+        """Test that only failures before Meta could accept the message are retryable"""
+        connect_failed = {'success': False, 'error': 'Failed to establish a new connection', 'connect_failed': True}
+        self.assertEqual(classify_failure(connect_failed), NETWORK)
+        self.assertEqual(classify_failure({'success': False, 'error': 'Read timed out.', 'connect_failed': False}),
+                         DELIVERY_UNKNOWN)
+        self.assertEqual(classify_failure({'success': False, 'error': 'Connection reset'}), DELIVERY_UNKNOWN)
+
+        html = '<html><body>Server Error</body></html>'
+        self.assertEqual(classify_failure({'success': False, 'error': html, 'status_code': 500}), DELIVERY_UNKNOWN)
+        self.assertEqual(classify_failure({'success': False, 'error': html, 'status_code': 503}), TRANSIENT)
+        self.assertEqual(classify_failure({'success': False, 'error': html, 'status_code': 429}), RATE_LIMITED)
+        self.assertEqual(classify_failure({'success': False, 'error': html, 'status_code': 404}), PERMANENT)
+
+    def test_token_bucket_paces_sends(self):
+        """Test that the bucket allows a burst and then the configured rate"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+        for _ in range(15):
+            bucket.acquire()
+        self.assertAlmostEqual(clock.now, 1.0, places=5)
+
+    def test_concurrent_sends_and_requeue(self):
+        """Test that every recipient is sent, retryable failures are requeued and permanent ones are not"""
+        attempts = {}
+        lock = threading.Lock()
+
+        def send(item):
+            with lock:
+                attempts[item['phone']] = attempts.get(item['phone'], 0) + 1
+                count = attempts[item['phone']]
+            if item['phone'].endswith('0003'):
+                return graph_error(131026)
+            if item['phone'].endswith('0005') and count == 1:
+                return graph_error(130429)
+            return {'success': True, 'message_id': f"wamid.{item['phone']}"}
+
+        outcomes = []
+        job = BulkSendJob(self._items(50), send, concurrency=8, rate_per_second=10000, retry_backoff=0,
+                          on_result=lambda item, outcome: outcomes.append(outcome)).start()
+        report = job.wait(timeout=10)
+
+        self.assertTrue(report['done'])
+        self.assertEqual((report['sent'], report['failed'], report['retries']), (49, 1, 1))
+        self.assertEqual(job.failed[0]['failure_class'], INVALID_RECIPIENT)
+        self.assertEqual(attempts['27820000005'], 2)
+        self.assertEqual(len(outcomes), 50)
+
+    def test_auth_failure_aborts_and_progress_streams(self):
+        """Test that rejected credentials stop the job and progress snapshots end with the final report"""
+        job = BulkSendJob(self._items(20), lambda item: graph_error(190), concurrency=1,
+                          rate_per_second=10000).start()
+        snapshots = list(job.iter_progress(interval=0.01))
+
+        final = snapshots[-1]
+        self.assertTrue(final['done'])
+        self.assertEqual(final['failed'], 20)
+        self.assertEqual(final['pending'], 0)
+        self.assertEqual(final['failures_by_class'], {AUTH: 1})
+        self.assertIsNotNone(final['aborted_reason'])
+
+
+if __name__ == '__main__':
+    unittest.main()
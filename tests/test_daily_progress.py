@@ -0,0 +1,113 @@
+"""
+Tests for habit_daily_progress reads and their habit_logs fallback
+"""
+import unittest
+from datetime import date
+from unittest.mock import Mock, patch
+
+from services.habits import daily_progress
+from services.habits.daily_progress import DailyProgressStore
+from services.habits.logging_service import LoggingService
+
+from fakes import FakeResult, FakeSupabase
+
+
+DAY = '2026-03-02'
+
+LOGS = [
+    {'id': 1, 'client_id': 'c1', 'habit_id': 'water', 'log_date': DAY, 'completed_value': 1.5},
+    {'id': 2, 'client_id': 'c1', 'habit_id': 'water', 'log_date': DAY, 'completed_value': 0.5},
+    {'id': 3, 'client_id': 'c1', 'habit_id': 'steps', 'log_date': DAY, 'completed_value': 4000},
+    {'id': 4, 'client_id': 'c1', 'habit_id': 'water', 'log_date': '2026-03-01', 'completed_value': 3},
+    {'id': 5, 'client_id': 'c2', 'habit_id': 'water', 'log_date': DAY, 'completed_value': 2},
+]
+
+PROGRESS = [
+    {'id': 1, 'client_id': 'c1', 'habit_id': 'water', 'log_date': DAY, 'completed_total': 2, 'log_count': 2},
+    {'id': 2, 'client_id': 'c1', 'habit_id': 'steps', 'log_date': DAY, 'completed_total': 4000, 'log_count': 1},
+    {'id': 3, 'client_id': 'c1', 'habit_id': 'water', 'log_date': '2026-03-01', 'completed_total': 3,
+     'log_count': 1},
+    {'id': 4, 'client_id': 'c2', 'habit_id': 'water', 'log_date': DAY, 'completed_total': 2, 'log_count': 1},
+]
+
+
+class TestDailyProgressStore(unittest.TestCase):
+    """Test suite for DailyProgressStore"""
+
+    def setUp(self):
+        daily_progress._aggregate_unavailable_until = 0.0
+        self.addCleanup(setattr, daily_progress, '_aggregate_unavailable_until', 0.0)
+
+    def test_reads_are_aggregate_lookups(self):
+        """Test that day and habit reads come from habit_daily_progress in one query each"""
+        db = FakeSupabase({'habit_daily_progress': PROGRESS, 'habit_logs': LOGS}, strict_tables=True)
+        store = DailyProgressStore(db, verify=False)
+
+        self.assertEqual(store.get_habit_day('c1', 'water', date(2026, 3, 2)), (2.0, 2))
+        self.assertEqual(store.get_habit_day('c1', 'sleep', DAY), (0.0, 0))
+        self.assertEqual(store.get_day('c1', DAY), {'water': (2.0, 2), 'steps': (4000.0, 1)})
+        self.assertEqual(store.get_all_clients_day(DAY)[('c2', 'water')], (2.0, 1))
+        self.assertEqual(db.queries, ['habit_daily_progress'] * 4)
+
+    def test_missing_table_falls_back_to_logs(self):
+        """Test that totals are recomputed from habit_logs when the aggregate cannot be read"""
+        db = FakeSupabase({'habit_logs': LOGS}, strict_tables=True)
+        store = DailyProgressStore(db, verify=False)
+
+        self.assertEqual(store.get_day('c1', DAY), {'water': (2.0, 2), 'steps': (4000.0, 1)})
+        self.assertEqual(db.queries, ['habit_daily_progress', 'habit_logs'])
+
+    def test_missing_table_is_not_retried_on_every_read(self):
+        """Test that after one failure reads skip habit_daily_progress until the retry delay passes"""
+        db = FakeSupabase({'habit_logs': LOGS}, strict_tables=True)
+        now = [1000.0]
+        store = DailyProgressStore(db, verify=False, clock=lambda: now[0])
+
+        with patch('services.habits.daily_progress.log_warning') as warning:
+            store.get_day('c1', DAY)
+            self.assertEqual(DailyProgressStore(db, verify=False, clock=lambda: now[0]).get_habit_day('c1', 'water', DAY),
+                             (2.0, 2))
+            self.assertEqual(db.queries, ['habit_daily_progress', 'habit_logs', 'habit_logs'])
+            self.assertEqual(warning.call_count, 1)
+
+            db.tables['habit_daily_progress'] = PROGRESS
+            now[0] += daily_progress.AGGREGATE_RETRY_SECONDS
+            self.assertEqual(store.get_habit_day('c1', 'water', DAY), (2.0, 2))
+            self.assertEqual(db.queries[-1], 'habit_daily_progress')
+            self.assertEqual(warning.call_count, 1)
+
+    def test_verify_mode_reports_and_returns_recomputed(self):
+        """Test that verification diffs the aggregate against habit_logs and trusts the logs"""
+        stale = [dict(row, completed_total=1.5, log_count=1) if row['id'] == 1 else row for row in PROGRESS]
+        db = FakeSupabase({'habit_daily_progress': stale, 'habit_logs': LOGS}, strict_tables=True)
+        store = DailyProgressStore(db, verify=True)
+
+        with patch('services.habits.daily_progress.log_warning') as warning:
+            self.assertEqual(store.get_habit_day('c1', 'water', DAY), (2.0, 2))
+            self.assertIn("('c1', 'water')", warning.call_args[0][0])
+
+            warning.reset_mock()
+            self.assertEqual(store.get_habit_day('c1', 'steps', DAY), (4000.0, 1))
+            warning.assert_not_called()
+
+    def test_logging_service_progress_reads_one_row_per_day(self):
+        """Test that LoggingService progress reads the aggregate instead of summing logs"""
+        db = FakeSupabase({'habit_daily_progress': PROGRESS, 'habit_logs': LOGS}, strict_tables=True)
+        assignments = Mock()
+        assignments.select.return_value.eq.return_value.eq.return_value.execute.return_value = FakeResult([
+            {'fitness_habits': {'habit_id': 'water', 'habit_name': 'Water', 'target_value': 4, 'unit': 'l'}},
+            {'fitness_habits': {'habit_id': 'steps', 'habit_name': 'Steps', 'target_value': 8000, 'unit': 'steps'}},
+        ])
+        table = db.table
+        db.table = lambda name: assignments if name == 'trainee_habit_assignments' else table(name)
+
+        success, _, progress = LoggingService(db).calculate_daily_progress('c1', date(2026, 3, 2))
+
+        self.assertTrue(success)
+        self.assertEqual([(p['habit_id'], p['completed'], p['percentage'], p['log_count']) for p in progress],
+                         [('water', 2.0, 50.0, 2), ('steps', 4000.0, 50.0, 1)])
+        self.assertEqual(db.queries, ['habit_daily_progress'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Tests for per-user dashboard response caching and HTTP validators
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+import routes.dashboard as dashboard_routes
+from services.dashboard import response_cache as response_cache_module
+from services.dashboard.response_cache import DashboardResponseCache, touch_dashboard_users
+
+from fakes import FakeSupabase
+
+
+def build_db():
+    return FakeSupabase({
+        'trainer_client_list': [
+            {'trainer_id': 't1', 'client_id': 'c1', 'updated_at': '2026-03-01T08:00:00+00:00'},
+            {'trainer_id': 't1', 'client_id': 'c2', 'updated_at': '2026-03-02T08:00:00+00:00'},
+        ],
+        'habit_logs': [
+            {'client_id': 'c1', 'created_at': '2026-03-05T09:30:00+00:00'},
+            {'client_id': 'c2', 'created_at': '2026-03-03T10:00:00+00:00'},
+        ]
+    })
+
+
+class TestDashboardResponseCache(unittest.TestCase):
+    """Test suite for the dashboard response cache and its route decorator"""
+
+    def setUp(self):
+        self.cache = DashboardResponseCache(build_db())
+        self.token_manager = Mock()
+        self.token_manager.validate_token.side_effect = lambda token, user_id, record_use=True: (
+            {'user_id': user_id, 'role': 'client', 'purpose': 'dashboard'} if token == 'good' else None
+        )
+        self.dashboard_service = Mock()
+        self.dashboard_service.get_relationships.return_value = [{'name': 'Ann'}]
+
+        for name, value in (('response_cache', self.cache), ('token_manager', self.token_manager),
+                            ('dashboard_service', self.dashboard_service)):
+            patcher = patch.object(dashboard_routes, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch.object(response_cache_module, '_response_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        app = Flask(__name__)
+        app.register_blueprint(dashboard_routes.dashboard_bp)
+        self.client = app.test_client()
+        self.url = '/dashboard/api/c1/good/relationships'
+
+    def test_refresh_is_served_from_cache_and_revalidates(self):
+        """Test that a repeat request is not rebuilt and a matching ETag gets a 304"""
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_json(), {'relationships': [{'name': 'Ann'}]})
+        self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+        self.assertEqual(first.headers['Last-Modified'], 'Thu, 05 Mar 2026 09:30:00 GMT')
+        etag = first.headers['ETag']
+
+        second = self.client.get(self.url)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers['ETag'], etag)
+        self.assertEqual(self.dashboard_service.get_relationships.call_count, 1)
+
+        not_modified = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.data, b'')
+        self.assertEqual(self.dashboard_service.get_relationships.call_count, 1)
+
+        # Query strings are cached separately
+        self.client.get(self.url + '?status=pending')
+        self.assertEqual(self.dashboard_service.get_relationships.call_count, 2)
+
+    def test_touch_rebuilds_and_etag_follows_content(self):
+        """Test that a change re-renders, keeping the ETag only if the content is the same"""
+        etag = self.client.get(self.url).headers['ETag']
+
+        touch_dashboard_users('c1')
+        unchanged = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(self.dashboard_service.get_relationships.call_count, 2)
+
+        touch_dashboard_users('c1')
+        self.dashboard_service.get_relationships.return_value = [{'name': 'Ann'}, {'name': 'Ben'}]
+        changed = self.client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(len(changed.get_json()['relationships']), 2)
+
+    def test_invalid_token_is_not_cached(self):
+        """Test that the view handles invalid tokens and nothing is stored"""
+        response = self.client.get('/dashboard/api/c1/bad/relationships')
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('ETag', response.headers)
+        self.assertEqual(self.cache.responses.items(), [])
+
+    def test_trainer_stamp_covers_trainees(self):
+        """Test that a trainer's stamp is read once and moved by a trainee's log"""
+        stamp = self.cache.get_stamp('t1', 'trainer')
+        self.assertEqual(stamp.isoformat(), '2026-03-05T09:30:00+00:00')
+        queries = len(self.cache.db.queries)
+        self.assertEqual(self.cache.get_stamp('t1', 'trainer'), stamp)
+        self.assertEqual(len(self.cache.db.queries), queries)
+
+        touch_dashboard_users('c2')
+        self.assertGreater(self.cache.get_stamp('t1', 'trainer'), stamp)
+        self.assertGreater(self.cache.get_stamp('c2', 'client'), stamp)
+        self.assertEqual(len(self.cache.db.queries), queries)
+
+
+if __name__ == '__main__':
+    unittest.main()
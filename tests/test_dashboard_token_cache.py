@@ -0,0 +1,86 @@
+"""
+Tests for cached dashboard token validation and batched used_at writes
+"""
+import unittest
+from datetime import datetime, timedelta
+
+from services.dashboard.token_manager import DashboardTokenManager, TokenUsageWriter, hash_token
+from utils.ttl_cache import TTLCache
+
+from fakes import FakeSupabase
+
+
+def token_row(token_id, token, user_id, expires_in=timedelta(hours=1)):
+    return {'id': token_id, 'token_hash': hash_token(token), 'user_id': user_id, 'role': 'client',
+            'purpose': 'dashboard', 'expires_at': (datetime.now() + expires_in).isoformat(), 'used_at': None}
+
+
+class TestDashboardTokenCache(unittest.TestCase):
+    """Test suite for DashboardTokenManager validation caching"""
+
+    def setUp(self):
+        self.db = FakeSupabase({'dashboard_tokens': [token_row(1, 'tok-a', 'c1'), token_row(2, 'tok-b', 'c2')]})
+        self.writer = TokenUsageWriter(self.db, flush_interval=3600)
+        self.now = 0
+        self.cache = TTLCache(ttl_seconds=300, name='test', clock=lambda: self.now)
+        self.manager = DashboardTokenManager(self.db, cache=self.cache, usage_writer=self.writer)
+
+    def test_repeat_validation_is_served_from_cache(self):
+        """Test that only the first validation of a token reads dashboard_tokens"""
+        self.assertEqual(self.manager.validate_token('tok-a', 'c1')['user_id'], 'c1')
+        self.assertEqual(self.manager.validate_token('tok-a', 'c1')['role'], 'client')
+        self.assertEqual(len(self.db.queries), 1)
+
+    def test_wrong_user_and_unknown_token_are_rejected(self):
+        """Test that a cached token still only validates for its own user"""
+        self.assertIsNotNone(self.manager.validate_token('tok-a', 'c1'))
+        self.assertIsNone(self.manager.validate_token('tok-a', 'c2'))
+        self.assertIsNone(self.manager.validate_token('tok-x', 'c1'))
+        self.assertIsNone(self.manager.validate_token('tok-x', 'c1'))
+        self.assertEqual(len(self.db.queries), 3)
+
+    def test_cache_entry_does_not_outlive_token(self):
+        """Test that tokens close to expiry are cached no longer than they are valid"""
+        self.db.tables['dashboard_tokens'].append(token_row(3, 'tok-c', 'c3', expires_in=timedelta(seconds=30)))
+        self.manager.validate_token('tok-a', 'c1')
+        self.manager.validate_token('tok-c', 'c3')
+
+        self.now = 60
+        self.assertIn(hash_token('tok-a'), self.cache)
+        self.assertNotIn(hash_token('tok-c'), self.cache)
+
+        self.manager.invalidate_token('tok-a')
+        self.assertNotIn(hash_token('tok-a'), self.cache)
+
+    def test_used_at_writes_are_coalesced(self):
+        """Test that many accesses become one UPDATE per last-use time, and API calls record nothing"""
+        for _ in range(5):
+            self.manager.validate_token('tok-a', 'c1')
+            self.manager.validate_token('tok-b', 'c2')
+        self.manager.validate_token('tok-a', 'c1', record_use=False)
+        self.assertEqual(len(self.db.updates), 0)
+        self.assertEqual(self.writer.get_stats()['pending'], 2)
+
+        self.writer.flush()
+        used_at = {row['used_at'] for row in self.db.tables['dashboard_tokens']}
+        self.assertNotIn(None, used_at)
+        self.assertEqual(len(self.db.updates), len(used_at))
+        self.assertEqual(self.writer.get_stats()['accesses'], 10)
+
+        self.writer.flush()
+        self.assertEqual(len(self.db.updates), len(used_at))
+
+    def test_each_token_keeps_its_own_used_at(self):
+        """Test that tokens used at different times are not all stamped with the latest time"""
+        self.writer.record(1, '2024-01-01T09:00:00')
+        self.writer.record(2, '2024-01-01T10:00:00')
+        self.writer.record(1, '2024-01-01T09:30:00')
+        self.writer.flush()
+
+        rows = {row['id']: row['used_at'] for row in self.db.tables['dashboard_tokens']}
+        self.assertEqual(rows, {1: '2024-01-01T09:30:00', 2: '2024-01-01T10:00:00'})
+        self.assertEqual(len(self.db.updates), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the streaming CSV/PDF export pipeline
+"""
+import csv
+import io
+import os
+import unittest
+from io import BufferedReader
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+import routes.dashboard as dashboard_routes
+from services.calendar_export_service import CalendarExportService
+from services.dashboard.dashboard_service import DashboardService
+from services.helpers.export_stream import csv_chunks, iter_offset_pages
+from services.helpers.supabase_storage import SupabaseStorageHelper
+
+from fakes import FakeSupabase
+
+
+def trainer_db(clients):
+    return FakeSupabase({
+        'trainer_client_list': [
+            {'trainer_id': 't1', 'client_id': f'c{n:04d}', 'connection_status': 'active',
+             'created_at': '2026-01-02T10:00:00', 'approved_at': None}
+            for n in range(clients)
+        ],
+        'clients': [
+            {'client_id': f'c{n:04d}', 'name': f'Client {n}', 'whatsapp': '2761000', 'email': '',
+             'fitness_goals': ['strength', 'mobility'], 'experience_level': 'beginner'}
+            for n in range(clients)
+        ]
+    })
+
+
+def bookings(count):
+    return [{'session_date': f'2026-03-{1 + n % 28:02d}', 'session_time': '09:00', 'status': 'confirmed',
+             'clients': {'name': f'Client {n}', 'whatsapp': '2761000', 'email': 'a@b.c'}} for n in range(count)]
+
+
+class TestExportStream(unittest.TestCase):
+    """Test suite for the export stream helpers and the exports built on them"""
+
+    def test_csv_chunks_are_bounded(self):
+        """Test that chunks stay near the chunk size and join to the full CSV"""
+        rows = [[n, 'x' * 50] for n in range(500)]
+        chunks = list(csv_chunks(['n', 'text'], rows, chunk_size=1024))
+
+        self.assertGreater(len(chunks), 10)
+        self.assertTrue(all(len(chunk) < 1024 + 100 for chunk in chunks))
+        parsed = list(csv.reader(io.StringIO(''.join(chunks))))
+        self.assertEqual(parsed[0], ['n', 'text'])
+        self.assertEqual(len(parsed), 501)
+
+    def test_iter_offset_pages_reads_until_short_page(self):
+        """Test range paging, including an exact multiple of the page size"""
+        db = FakeSupabase({'bookings': [{'id': n} for n in range(20)]})
+        pages = list(iter_offset_pages(lambda: db.table('bookings').select('*'), page_size=10))
+        self.assertEqual([len(page) for page in pages], [10, 10])
+        self.assertEqual(len(db.queries), 3)
+
+    def test_relationship_export_is_streamed(self):
+        """Test the dashboard CSV export rows, profile batching and streamed response"""
+        db = trainer_db(250)
+        token_manager = Mock()
+        token_manager.validate_token.return_value = {'user_id': 't1', 'role': 'trainer', 'purpose': 'dashboard'}
+        with patch.object(dashboard_routes, 'dashboard_service', DashboardService(db)), \
+                patch.object(dashboard_routes, 'token_manager', token_manager):
+            app = Flask(__name__)
+            app.register_blueprint(dashboard_routes.dashboard_bp)
+            response = app.test_client().get('/dashboard/api/t1/tok/export')
+
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_streamed)
+            self.assertEqual(response.headers['Content-Disposition'],
+                             'attachment; filename=trainer_t1_relationships.csv')
+            rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+
+        self.assertEqual(rows[0][:3], ['Name', 'Client ID', 'Phone'])
+        self.assertEqual(rows[1], ['Client 0', 'c0000', '2761000', '', 'strength, mobility', 'beginner', '2026-01-02'])
+        self.assertEqual(len(rows), 251)
+        self.assertEqual(db.queries.count('clients'), 3)
+
+    def test_calendar_exports_accept_generators(self):
+        """Test CSV and PDF exports from a booking generator, returned or written to a stream"""
+        service = CalendarExportService(FakeSupabase({}), Mock(TIMEZONE='Africa/Johannesburg'))
+
+        content = service.export_to_csv(iter(bookings(100)))
+        lines = content.decode('utf-8').splitlines()
+        self.assertEqual(lines[0], 'Date,Time,Client,Phone,Email,Type,Status,Notes')
+        self.assertEqual(lines[1], '2026-03-01,09:00,Client 0,2761000,a@b.c,standard,confirmed,')
+        self.assertEqual(len(lines), 101)
+
+        output = io.BytesIO()
+        self.assertIsNone(service.export_to_csv(iter(bookings(100)), output=output))
+        self.assertEqual(output.getvalue(), content)
+
+        pdf = service.export_to_pdf(iter(bookings(100)), {'name': 'Tom', 'business_name': 'Gym'})
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_upload_stream_spools_to_disk(self):
+        """Test that generated chunks are uploaded from a file handle and the spool file removed"""
+        db = Mock()
+        db.storage.list_buckets.return_value = [{'name': 'csv-exports'}]
+        uploads = []
+
+        def upload(path, f, file_options):
+            uploads.append((path, type(f), f.read(), f.name, file_options['content-type']))
+
+        db.storage.from_.return_value.upload.side_effect = upload
+        db.storage.from_.return_value.get_public_url.return_value = 'https://example/report.csv'
+
+        url = SupabaseStorageHelper(db).upload_stream(csv_chunks(['a'], [[1], [2]]), 'report.csv')
+        self.assertEqual(url, 'https://example/report.csv')
+        path, file_type, data, spool_path, content_type = uploads[0]
+        self.assertEqual((path, data, content_type), ('report.csv', b'a\r\n1\r\n2\r\n', 'text/csv'))
+        self.assertTrue(issubclass(file_type, BufferedReader))
+        self.assertFalse(os.path.exists(spool_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Tests for the shared WhatsApp Flow crypto path
+"""
+import base64
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from config import Config
+from services.flow_crypto import _OAEP_SHA256, FlowCrypto, FlowCryptoError, FlowKeyRing
+
+
+def make_pem(key_size=2048):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=key_size)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+    return key, pem
+
+
+def encrypt_like_whatsapp(public_key, payload):
+    """Build a request the way the WhatsApp client does"""
+    aes_key = AESGCM.generate_key(bit_length=128)
+    iv = os.urandom(16)
+    flow_data = AESGCM(aes_key).encrypt(iv, json.dumps(payload).encode('utf-8'), None)
+    encrypted_key = public_key.encrypt(aes_key, _OAEP_SHA256)
+    return (
+        base64.b64encode(flow_data).decode(),
+        base64.b64encode(encrypted_key).decode(),
+        base64.b64encode(iv).decode()
+    ), aes_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFlowCrypto(unittest.TestCase):
+    """Test suite for FlowCrypto / FlowKeyRing"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.key, cls.pem = make_pem()
+        cls.new_key, cls.new_pem = make_pem()
+
+    def test_round_trip(self):
+        """Test decrypting a request and encrypting the response with the flipped IV"""
+        crypto = FlowCrypto(FlowKeyRing(lambda: self.pem))
+        request, aes_key = encrypt_like_whatsapp(self.key.public_key(), {'action': 'ping'})
+
+        data, returned_key, iv = crypto.decrypt_request(*request)
+        self.assertEqual(data, {'action': 'ping'})
+        self.assertEqual(returned_key, aes_key)
+
+        response = crypto.encrypt_response({'data': {'status': 'active'}}, returned_key, iv)
+        flipped_iv = bytes(byte ^ 0xFF for byte in iv)
+        plaintext = AESGCM(aes_key).decrypt(flipped_iv, base64.b64decode(response), None)
+        self.assertEqual(json.loads(plaintext), {'data': {'status': 'active'}})
+
+    def test_key_parsed_once(self):
+        """Test that the PEM source is only re-read after the reload interval"""
+        clock = FakeClock()
+        reads = []
+        ring = FlowKeyRing(lambda: reads.append(1) or self.pem, reload_interval=30, clock=clock)
+
+        for _ in range(5):
+            ring.keys()
+        self.assertEqual(len(reads), 1)
+
+        clock.now += 31
+        ring.keys()
+        self.assertEqual(len(reads), 2)
+        self.assertEqual(ring.reloads, 1)
+
+    def test_rotation_keeps_previous_key(self):
+        """Test that requests for the old and new public key both decrypt after rotation"""
+        clock = FakeClock()
+        source = {'pem': self.pem}
+        crypto = FlowCrypto(FlowKeyRing(lambda: source['pem'], reload_interval=30, clock=clock))
+        old_request, _ = encrypt_like_whatsapp(self.key.public_key(), {'v': 'old'})
+        crypto.decrypt_request(*old_request)
+
+        source['pem'] = self.new_pem
+        clock.now += 31
+        new_request, _ = encrypt_like_whatsapp(self.new_key.public_key(), {'v': 'new'})
+
+        self.assertEqual(crypto.decrypt_request(*new_request)[0], {'v': 'new'})
+        self.assertEqual(crypto.decrypt_request(*old_request)[0], {'v': 'old'})
+
+    def test_invalid_keys_rejected(self):
+        """Test startup validation and that a bad rotation keeps the working key"""
+        with self.assertRaises(FlowCryptoError):
+            FlowKeyRing(lambda: None).load()
+        with self.assertRaises(FlowCryptoError):
+            FlowKeyRing(lambda: make_pem(1024)[1]).load()
+
+        clock = FakeClock()
+        source = {'pem': self.pem}
+        ring = FlowKeyRing(lambda: source['pem'], clock=clock)
+        fingerprint = ring.load()
+
+        source['pem'] = b'not a key'
+        clock.now += 60
+        self.assertEqual(len(ring.keys()), 1)
+        self.assertEqual(ring.get_stats()['fingerprint'], fingerprint)
+
+    def test_default_source_reads_config(self):
+        """Test that the key ring reads the PEM file, then the inline key, from Config"""
+        with tempfile.NamedTemporaryFile(suffix='.pem') as key_file:
+            key_file.write(self.new_pem)
+            key_file.flush()
+            with patch.object(Config, 'WHATSAPP_FLOW_PRIVATE_KEY_PATH', key_file.name, create=True), \
+                    patch.object(Config, 'WHATSAPP_FLOW_PRIVATE_KEY', self.pem.decode(), create=True):
+                self.assertEqual(FlowKeyRing().load(), FlowKeyRing(lambda: self.new_pem).load())
+
+        with patch.object(Config, 'WHATSAPP_FLOW_PRIVATE_KEY_PATH', None, create=True), \
+                patch.object(Config, 'WHATSAPP_FLOW_PRIVATE_KEY', self.pem.decode(), create=True):
+            self.assertEqual(FlowKeyRing().load(), FlowKeyRing(lambda: self.pem).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
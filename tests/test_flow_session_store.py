@@ -0,0 +1,88 @@
+"""
+Tests for the WhatsApp Flow session store
+"""
+import os
+import tempfile
+import unittest
+
+from flow_handlers import flow_data_exchange
+from flow_handlers.session_store import (
+    MemoryFlowSessionStore, SharedFlowSessionStore, set_flow_session_store
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFlowSessionStore(unittest.TestCase):
+    """Test suite for flow session backends"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = MemoryFlowSessionStore(ttl_seconds=60, clock=self.clock)
+
+    def tearDown(self):
+        set_flow_session_store(None)
+
+    def test_update_merges_and_slides_expiry(self):
+        """Test that updates merge data and push the expiry out"""
+        self.store.update('token-1', {'first_name': 'Thandi'})
+        self.clock.now += 50
+        self.store.update('token-1', {'surname': 'Mokoena'})
+        self.clock.now += 50
+
+        self.assertEqual(self.store.purge_expired(), 0)
+        self.assertEqual(self.store.get('token-1'), {'first_name': 'Thandi', 'surname': 'Mokoena'})
+
+    def test_purge_only_expired(self):
+        """Test heap-driven expiry, including stale heap entries from touches"""
+        for i in range(3):
+            self.store.create(f'old-{i}')
+            self.store.update(f'old-{i}', {'step': i})
+        self.clock.now += 30
+        self.store.create('fresh')
+        self.clock.now += 31
+
+        self.assertIsNone(self.store.get('old-0'))
+        self.assertEqual(self.store.purge_expired(), 3)
+        self.assertEqual(self.store.tokens(), ['fresh'])
+
+    def test_shared_backend_across_workers(self):
+        """Test that a session started on one worker continues on another"""
+        path = os.path.join(tempfile.mkdtemp(), 'flow_sessions.db')
+        worker_a = SharedFlowSessionStore(path, ttl_seconds=60)
+        worker_b = SharedFlowSessionStore(path, ttl_seconds=60)
+
+        worker_a.create('token-1')
+        worker_a.update('token-1', {'first_name': 'Thandi'})
+        merged = worker_b.update('token-1', {'city': 'Soweto'})
+
+        self.assertEqual(merged, {'first_name': 'Thandi', 'city': 'Soweto'})
+        self.assertEqual(worker_a.get_info('token-1')['data_fields'], ['first_name', 'city'])
+        self.assertTrue(worker_b.delete('token-1'))
+        self.assertIsNone(worker_a.get('token-1'))
+
+    def test_data_exchange_uses_store(self):
+        """Test that handle_flow_data_exchange keeps progress in the configured store"""
+        set_flow_session_store(self.store)
+
+        flow_data_exchange.handle_flow_data_exchange({'action': 'INIT'}, 'trainer_onboarding_1')
+        flow_data_exchange.handle_flow_data_exchange(
+            {'action': 'data_exchange', 'data': {'first_name': 'Thandi'}}, 'trainer_onboarding_1'
+        )
+        flow_data_exchange.handle_flow_data_exchange(
+            {'action': 'navigate', 'data': {'city': 'Soweto'}}, 'trainer_onboarding_1'
+        )
+
+        self.assertEqual(flow_data_exchange.get_collected_data('trainer_onboarding_1'),
+                         {'first_name': 'Thandi', 'city': 'Soweto'})
+        self.assertEqual(flow_data_exchange.get_session_info('trainer_onboarding_1')['field_count'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
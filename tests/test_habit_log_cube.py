@@ -0,0 +1,88 @@
+"""
+Tests for the columnar habit log cube
+"""
+import unittest
+from datetime import date
+from unittest.mock import Mock
+
+from services.habits.log_cube import HabitLogCube
+from services.habits.logging_service import LoggingService
+
+from fakes import FakeResult, FakeSupabase
+
+
+def log(client_id, habit_id, log_date, value):
+    return {'client_id': client_id, 'habit_id': habit_id, 'log_date': log_date, 'completed_value': value}
+
+
+LOGS = [
+    log('c1', 'water', '2026-03-01', 3), log('c1', 'water', '2026-03-01', 5),
+    log('c1', 'water', '2026-03-03', 0), log('c1', 'steps', '2026-03-02', 4000),
+    log('c2', 'water', '2026-03-02', 8),
+    log('c1', 'water', '2026-02-28', 9),  # outside the range
+]
+
+
+class TestHabitLogCube(unittest.TestCase):
+    """Test suite for HabitLogCube"""
+
+    def setUp(self):
+        self.cube = HabitLogCube.from_rows(LOGS, date(2026, 3, 1), date(2026, 3, 7))
+
+    def test_daily_and_period_totals(self):
+        """Test summed, best and counted values per day and per period"""
+        self.assertEqual(self.cube.daily_totals('c1', 'water').tolist(), [8, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(self.cube.total('c1', 'water'), 8)
+        self.assertEqual(self.cube.total('c1', 'water', start=date(2026, 3, 2)), 0)
+        self.assertEqual(self.cube.best_value('c1', 'water'), 5)
+        self.assertEqual(self.cube.log_count('c1', 'water'), 3)
+        self.assertEqual(self.cube.daily_totals('c3', 'water').tolist(), [0] * 7)
+        self.assertEqual(self.cube.total('c3', 'water'), 0)
+
+    def test_multi_entry_dedup(self):
+        """Test that several logs on one day count as one logged day"""
+        self.assertEqual(self.cube.logged_totals('c1', 'water'), {'2026-03-01': 8.0, '2026-03-03': 0.0})
+        self.assertEqual(self.cube.days_logged('c1', 'water'), 2)
+        self.assertEqual(self.cube.days_logged('c1'), 3)
+        self.assertEqual(sorted(self.cube.habits_logged('c1')), ['steps', 'water'])
+        self.assertEqual(self.cube.habits_logged('c1', start=date(2026, 3, 3)), ['water'])
+
+    def test_completion_percent(self):
+        """Test the period completion percentage and its cap"""
+        self.assertAlmostEqual(self.cube.completion_percent('c1', 'water', 2), 8 / 14 * 100)
+        self.assertEqual(self.cube.completion_percent('c2', 'water', 1, end=date(2026, 3, 2)), 100)
+        self.assertEqual(self.cube.completion_percent('c1', 'water', 0), 0)
+
+    def test_load_pages_and_batches(self):
+        """Test that load() reads the range for many clients and keeps only the range"""
+        db = FakeSupabase({'habit_logs': [dict(row, id=n) for n, row in enumerate(LOGS)]})
+        cube = HabitLogCube.load(db, ['c1', 'c2'], '2026-03-01', '2026-03-07', habit_ids=['water'])
+        self.assertEqual(len(db.queries), 1)
+        self.assertEqual(cube.total('c1', 'water'), 8)
+        self.assertEqual(cube.total('c2', 'water'), 8)
+        self.assertEqual(cube.total('c1', 'steps'), 0)
+
+    def test_weekly_summary_uses_one_log_read(self):
+        """Test that LoggingService.get_weekly_summary aggregates every habit from one read"""
+        db = FakeSupabase({'habit_logs': [dict(row, id=n) for n, row in enumerate(LOGS)]})
+        assignments = Mock()
+        assignments.select.return_value.eq.return_value.eq.return_value.execute.return_value = FakeResult([
+            {'fitness_habits': {'habit_id': 'water', 'habit_name': 'Water', 'target_value': 2, 'unit': 'l'}},
+            {'fitness_habits': {'habit_id': 'steps', 'habit_name': 'Steps', 'target_value': 1000, 'unit': 'steps'}},
+        ])
+        table = db.table
+        db.table = lambda name: assignments if name == 'trainee_habit_assignments' else table(name)
+
+        success, _, summary = LoggingService(db).get_weekly_summary('c1', date(2026, 3, 1))
+        self.assertTrue(success)
+        self.assertEqual(len(db.queries), 1)
+        water, steps = summary
+        self.assertEqual(water['days_logged'], 2)
+        self.assertEqual(water['total_completed'], 8)
+        self.assertEqual(water['avg_completion'], round(8 / 14 * 100, 1))
+        self.assertEqual(water['daily_totals'], {'2026-03-01': 8.0, '2026-03-03': 0.0})
+        self.assertEqual(steps['avg_completion'], round(4000 / 7000 * 100, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
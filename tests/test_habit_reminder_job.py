@@ -0,0 +1,107 @@
+"""
+Tests for the set-based daily habit reminder job
+"""
+import unittest
+from datetime import date
+from unittest.mock import Mock, patch
+
+from config import Config
+from services.habits.reminder_service import HabitReminderService
+
+from fakes import FakeQuery, FakeSupabase
+
+
+class FailingInsertQuery(FakeQuery):
+    def execute(self):
+        if self.inserted is not None:
+            raise Exception('connection lost')
+        return super().execute()
+
+
+def build_rows(client_count, habits_per_client=4):
+    today = date.today().isoformat()
+    assignments, progress = [], []
+    for c in range(client_count):
+        client_id = f'client-{c}'
+        for h in range(habits_per_client):
+            assignments.append({
+                'id': len(assignments), 'client_id': client_id, 'habit_id': f'habit-{h}', 'is_active': True,
+                'clients': {'name': f'Client {c}', 'phone': f'2782{c:07d}'},
+                'fitness_habits': {'habit_name': f'Habit {h}', 'target_value': 2, 'unit': 'litres'}
+            })
+        progress.append({'id': c, 'client_id': client_id, 'habit_id': 'habit-0', 'completed_total': 2,
+                         'log_count': 1, 'log_date': today})
+    return {
+        'trainee_habit_assignments': assignments,
+        'habit_daily_progress': progress,
+        'habit_reminders': [{'id': 1, 'client_id': 'client-0', 'reminder_date': today, 'status': 'sent'}],
+        'habit_reminder_preferences': [{'client_id': 'client-1', 'reminder_enabled': False}]
+    }
+
+
+class TestHabitReminderJob(unittest.TestCase):
+    """Test suite for HabitReminderService.send_daily_reminders"""
+
+    def _run(self, client_count):
+        db = FakeSupabase(build_rows(client_count))
+        whatsapp = Mock()
+        whatsapp.send_message.return_value = {'success': True, 'message_id': 'wamid.1'}
+        service = HabitReminderService(db, whatsapp)
+
+        with patch('services.habits.reminder_service.REMINDER_PAGE_SIZE', 100):
+            result = service.send_daily_reminders()
+        return db, whatsapp, result
+
+    def test_sends_and_skips(self):
+        """Test that sent-today and disabled clients are skipped and the rest are reminded"""
+        db, whatsapp, result = self._run(10)
+
+        self.assertEqual(result['reminders_sent'], 8)
+        self.assertEqual(result['reminders_skipped'], 2)
+        self.assertEqual(whatsapp.send_message.call_count, 8)
+        self.assertEqual(len(db.inserted['habit_reminders']), 8)
+
+        record = next(r for r in db.inserted['habit_reminders'] if r['client_id'] == 'client-2')
+        self.assertEqual((record['total_habits'], record['completed_habits']), (4, 1))
+        self.assertEqual(set(result['timings']),
+                         {'fetch_assignments', 'fetch_progress', 'fetch_sent_reminders', 'fetch_preferences',
+                          'build_messages', 'send', 'record_reminders'})
+
+    def test_query_count_does_not_grow_per_client(self):
+        """Test that the job issues a handful of paged reads, not per-client queries"""
+        small_db, _, _ = self._run(10)
+        large_db, _, large_result = self._run(200)
+
+        self.assertEqual(large_result['reminders_sent'], 198)
+        self.assertEqual(len(small_db.queries), 5)
+        # 800 assignments over 100-row pages, one read of the day's 200 progress rows,
+        # plus 198 reminder rows in batches of 25
+        self.assertEqual(len(large_db.queries), 9 + 1 + 1 + 1 + 8)
+
+    def test_reminders_are_recorded_while_sending(self):
+        """Test that rows are written in small batches during the job and insert failures are reported"""
+        db = FakeSupabase(build_rows(10))
+        recorded_before_send = []
+
+        def send_message(phone, message):
+            recorded_before_send.append(len(db.inserted.get('habit_reminders', [])))
+            return {'success': True, 'message_id': 'wamid.1'}
+
+        whatsapp = Mock()
+        whatsapp.send_message.side_effect = send_message
+        with patch('services.habits.reminder_service.REMINDER_RECORD_BATCH_SIZE', 3), \
+                patch.object(Config, 'WHATSAPP_BULK_CONCURRENCY', 1, create=True):
+            result = HabitReminderService(db, whatsapp).send_daily_reminders()
+
+        self.assertEqual(len(db.inserted['habit_reminders']), 8)
+        self.assertEqual(recorded_before_send, [0, 0, 0, 3, 3, 3, 6, 6])
+        self.assertEqual(result['record_errors'], 0)
+
+        failing = FakeSupabase(build_rows(10))
+        failing.table = lambda name: FailingInsertQuery(failing, name)
+        with patch('services.habits.reminder_service.REMINDER_RECORD_BATCH_SIZE', 3):
+            result = HabitReminderService(failing, whatsapp).send_daily_reminders()
+        self.assertEqual((result['reminders_sent'], result['record_errors']), (8, 8))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+Tests for the UserManager identity cache
+"""
+import unittest
+from unittest.mock import Mock
+
+from services.auth.core.identity_cache import IdentityCache
+from services.auth.core.login_status_manager import LoginStatusManager
+from services.auth.core.user_manager import UserManager
+from utils.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test suite for the generic TTL + LRU cache"""
+
+    def test_expiry_and_lru_eviction(self):
+        clock = FakeClock()
+        cache = TTLCache(max_size=2, ttl_seconds=10, clock=clock)
+
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.get('a'), 1)  # 'a' is now most recently used
+        cache.set('c', 3)                    # evicts 'b'
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+        clock.now = 11
+        self.assertIsNone(cache.get('a'))
+
+        stats = cache.get_stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 2)
+        self.assertEqual(stats['evictions'], 1)
+
+
+class TestIdentityCache(unittest.TestCase):
+    """Test suite for identity caching in UserManager"""
+
+    def setUp(self):
+        self.db = Mock()
+        self.db.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [
+            {'phone_number': '27821234567', 'trainer_id': 'TR_JOHN_123', 'login_status': 'trainer'}
+        ]
+        self.cache = IdentityCache()
+        self.user_manager = UserManager(self.db, identity_cache=self.cache)
+
+    def test_known_user_resolved_without_db(self):
+        """Test that repeat lookups for a known user skip the database"""
+        self.assertIsNotNone(self.user_manager.check_user_exists('+27821234567'))
+        self.db.table.reset_mock()
+
+        self.assertEqual(self.user_manager.get_user_id_by_role('27821234567', 'trainer'), 'TR_JOHN_123')
+        self.assertEqual(self.user_manager.check_user_exists('+27 82 123 4567')['login_status'], 'trainer')
+        self.db.table.assert_not_called()
+
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 2)
+
+    def test_cached_rows_are_copies(self):
+        """Test that callers cannot mutate the cached row"""
+        self.user_manager.check_user_exists('27821234567')['login_status'] = None
+        self.assertEqual(self.user_manager.check_user_exists('27821234567')['login_status'], 'trainer')
+
+    def test_logout_invalidates(self):
+        """Test that changing login status drops the cached identity"""
+        self.user_manager.check_user_exists('27821234567')
+        LoginStatusManager(self.db, self.user_manager).set_login_status('+27821234567', None)
+
+        self.assertIsNone(self.cache.get('27821234567'))
+
+    def test_unknown_user_not_cached(self):
+        """Test that missing users are always looked up again"""
+        self.db.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+        self.assertIsNone(self.user_manager.check_user_exists('27820000000'))
+        self.assertEqual(self.cache.get_stats()['size'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
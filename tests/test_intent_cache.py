@@ -0,0 +1,119 @@
+"""
+Tests for the cache of Claude intent results
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+from services.ai_intent.core import intent_detector as intent_detector_module
+from services.ai_intent.core.intent_cache import IntentCache
+from services.ai_intent.core.intent_detector import IntentDetector
+from services.ai_intent.core.local_classifier import LocalIntentClassifier
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+INTENT = {'intent': 'log_habits', 'confidence': 0.9, 'needs_action': True,
+          'suggested_command': '/log-habits', 'user_sentiment': 'neutral'}
+
+
+class TestIntentCache(unittest.TestCase):
+    """Test suite for IntentCache keys, storage and accounting"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = IntentCache(max_size=2, ttl_seconds=60, clock=self.clock)
+
+    def test_keys_normalise_text_and_skip_context_dependent_messages(self):
+        """Test that equivalent phrasings share a key and bare replies are not cached"""
+        key = self.cache.make_key('Pleeease, how do I log water??', 'client', 'scope')
+        self.assertEqual(key, self.cache.make_key('  pleeeeeease how do i LOG water ', 'client', 'scope'))
+        self.assertNotEqual(key, self.cache.make_key('pleeease how do i log water', 'trainer', 'scope'))
+        self.assertNotEqual(key, self.cache.make_key('pleeease how do i log water', 'client', 'other_scope'))
+
+        self.assertIsNone(self.cache.make_key('yes please', 'client', 'scope'))
+        self.assertIsNone(self.cache.make_key('word ' * 60, 'client', 'scope'))
+        self.assertEqual(self.cache.get_stats()['bypassed'], 2)
+
+    def test_stores_only_intent_fields_and_counts_saved_latency(self):
+        """Test that hits return the whitelisted intent fields and add up the saved call time"""
+        key = self.cache.make_key('how do I log water', 'client', 'scope')
+        self.cache.put(key, {**INTENT, 'reply': 'Hi Thandi, ...', 'suggested_command': '/log-habits'}, 1.25)
+
+        for _ in range(2):
+            self.assertEqual(self.cache.get(key), {**INTENT, 'source': 'cache'})
+
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['saved_calls'], stats['saved_ms']), (2, 2, 2500.0))
+
+    def test_uncertain_results_are_not_cached(self):
+        """Test that unclear, low-confidence and fallback intents are never stored"""
+        key = self.cache.make_key('what should I do now', 'client', 'scope')
+        self.cache.put(key, {'intent': 'unclear', 'confidence': 0.9}, 1)
+        self.cache.put(key, {'intent': 'general_conversation', 'confidence': 0.3, 'needs_action': False}, 1)
+        self.assertIsNone(self.cache.get(key))
+
+    def test_entries_expire_and_are_bounded(self):
+        """Test TTL expiry and LRU eviction"""
+        keys = [self.cache.make_key(f'how do I log water {n}', 'client', 'scope') for n in 'abc']
+        for key in keys:
+            self.cache.put(key, INTENT, 1)
+        self.assertIsNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+        self.clock.now += 61
+        self.assertIsNone(self.cache.get(keys[2]))
+
+    def test_intent_detector_reuses_result_across_users(self):
+        """Test that a repeated question only reaches Claude once"""
+        with patch.object(intent_detector_module, 'get_local_intent_classifier',
+                          return_value=LocalIntentClassifier(enabled=False)), \
+                patch.object(intent_detector_module, 'get_intent_cache', return_value=self.cache):
+            detector = IntentDetector()
+        detector.ai_client = Mock()
+        detector.ai_client.is_available.return_value = True
+        detector.ai_client.send_json.return_value = {
+            'intent': 'log_habits', 'confidence': 0.9, 'needs_action': True, 'suggested_command': '/log-habits'
+        }
+
+        first = detector.detect_intent('How do I log water?', 'client', {'name': 'Thandi'})
+        second = detector.detect_intent('how do i log water', 'client', {'name': 'Sipho'})
+
+        self.assertEqual(first['intent'], 'log_habits')
+        self.assertEqual({**second, 'source': None}, {**first, 'source': None})
+        self.assertEqual(second['source'], 'cache')
+        detector.ai_client.send_json.assert_called_once()
+
+        # A different role's prompt offers different intents
+        detector.detect_intent('how do i log water', 'trainer', {})
+        self.assertEqual(detector.ai_client.send_json.call_count, 2)
+
+    def test_context_dependent_replies_are_not_shared_across_conversations(self):
+        """Test that the same words with different chat history or tasks do not hit the cache"""
+        with patch.object(intent_detector_module, 'get_local_intent_classifier',
+                          return_value=LocalIntentClassifier(enabled=False)), \
+                patch.object(intent_detector_module, 'get_intent_cache', return_value=IntentCache(clock=self.clock)):
+            detector = IntentDetector()
+        detector.ai_client = Mock()
+        detector.ai_client.is_available.return_value = True
+        detector.ai_client.send_json.return_value = {'intent': 'delete_account', 'confidence': 0.9}
+
+        deleting = {'chat_history': ['Do you want to delete your account?'], 'recent_tasks': []}
+        detector.detect_intent('yes go ahead', 'client', deleting)
+        detector.detect_intent('yes go ahead', 'client', {'chat_history': ['Shall I log 2L of water?']})
+        detector.detect_intent('yes go ahead', 'client', {'recent_tasks': ['log_habits']})
+        detector.detect_intent('yes go ahead', 'client', {})
+        self.assertEqual(detector.ai_client.send_json.call_count, 4)
+
+        # Only an identical conversation reuses the result
+        self.assertEqual(detector.detect_intent('yes go ahead', 'client', dict(deleting))['source'], 'cache')
+        self.assertEqual(detector.ai_client.send_json.call_count, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+"""
+Tests for incremental JSON object extraction and schema checks
+"""
+import unittest
+
+from services.ai_intent.utils.intent_types import INTENT_RESPONSE_SCHEMA
+from utils.json_object import JSONObjectScanner, MalformedJSON, parse_json_object, validate_schema
+
+
+class TestJSONObjectScanner(unittest.TestCase):
+    """Test suite for JSONObjectScanner and validate_schema"""
+
+    def test_object_completes_mid_chunk_across_chunks(self):
+        """Test that the object is returned as soon as its closing brace arrives"""
+        scanner = JSONObjectScanner()
+        chunks = ['Sure! Here it is:\n{"intent": "log', '_habits", "extra": {"n": 1', '}', ', "confidence": 0.9}',
+                  ' Let me know if you need anything else {}']
+
+        results = [scanner.feed(chunk) for chunk in chunks]
+        self.assertEqual(results[:3], [None, None, None])
+        self.assertEqual(results[3], '{"intent": "log_habits", "extra": {"n": 1}, "confidence": 0.9}')
+        self.assertEqual(scanner.parse()['extra'], {'n': 1})
+        self.assertEqual(scanner.chars_seen, sum(map(len, chunks[:4])))
+
+    def test_braces_and_quotes_inside_strings(self):
+        """Test that braces inside strings and escaped quotes do not end the object"""
+        text = '{"reply": "use {curly} \\"braces\\" \\\\", "intent": "greeting"} trailing }'
+        self.assertEqual(parse_json_object(text), {'reply': 'use {curly} "braces" \\', 'intent': 'greeting'})
+
+    def test_incomplete_invalid_and_oversized_replies(self):
+        """Test that unusable replies raise MalformedJSON"""
+        for text in ('no json here', '{"intent": "greeting"', '{intent: greeting}', ''):
+            with self.assertRaises(MalformedJSON):
+                parse_json_object(text)
+
+        scanner = JSONObjectScanner(max_chars=10)
+        with self.assertRaises(MalformedJSON):
+            scanner.feed('{"intent": "greeting"}')
+
+    def test_schema_fills_defaults_and_rejects_bad_fields(self):
+        """Test defaults for missing optional fields and errors for bad types or ranges"""
+        intent = validate_schema({'intent': 'greeting', 'confidence': 1, 'extra': 'kept'}, INTENT_RESPONSE_SCHEMA)
+        self.assertEqual(intent, {'intent': 'greeting', 'confidence': 1, 'extra': 'kept', 'needs_action': False,
+                                  'suggested_command': None, 'user_sentiment': 'neutral'})
+
+        for data in ({'confidence': 0.9}, {'intent': 'greeting', 'confidence': 1.5},
+                     {'intent': 'greeting', 'confidence': True}, {'intent': 'greeting', 'needs_action': 'yes'}):
+            with self.assertRaises(MalformedJSON):
+                validate_schema(data, INTENT_RESPONSE_SCHEMA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Tests for keyset-paginated Supabase reads
+"""
+import threading
+import unittest
+
+from utils.keyset_pagination import fetch_all, iter_pages, iter_rows
+
+from fakes import FakeSupabase
+
+
+def subscriptions(count):
+    return [{'id': n, 'status': 'active'} for n in range(count)]
+
+
+class TestKeysetPagination(unittest.TestCase):
+    """Test suite for iter_pages, iter_rows and fetch_all"""
+
+    def test_pages_until_short_page(self):
+        """Test page sizes and query counts, including an exact multiple of the page size"""
+        db = FakeSupabase({'trainer_subscriptions': subscriptions(25)})
+        pages = list(iter_pages(lambda: db.table('trainer_subscriptions').select('*'), page_size=10))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(len(db.queries), 3)
+
+        db = FakeSupabase({'trainer_subscriptions': subscriptions(20)})
+        rows = fetch_all(lambda: db.table('trainer_subscriptions').select('*'), page_size=10)
+        self.assertEqual([row['id'] for row in rows], list(range(20)))
+        self.assertEqual(len(db.queries), 3)
+
+    def test_rows_updated_out_of_filter_are_not_skipped(self):
+        """Test that expiring rows mid-scan does not shift later rows past the reader"""
+        table = subscriptions(30)
+        db = FakeSupabase({'trainer_subscriptions': table})
+        seen = []
+        for row in iter_rows(lambda: db.table('trainer_subscriptions').select('*').eq('status', 'active'),
+                             page_size=10):
+            seen.append(row['id'])
+            table[row['id']]['status'] = 'expired'
+
+        self.assertEqual(seen, list(range(30)))
+
+    def test_prefetch_reads_next_page_in_background(self):
+        """Test that prefetching returns the same rows with later pages read off the caller's thread"""
+        db = FakeSupabase({'trainer_subscriptions': subscriptions(25)})
+        rows = list(iter_rows(lambda: db.table('trainer_subscriptions').select('*'), page_size=10, prefetch=True))
+
+        self.assertEqual([row['id'] for row in rows], list(range(25)))
+        self.assertEqual(db.query_threads[0], threading.current_thread().name)
+        self.assertTrue(all(name.startswith('keyset-prefetch') for name in db.query_threads[1:]))
+        self.assertEqual(len(db.queries), 3)
+
+    def test_key_must_be_selected(self):
+        """Test that a page without the key column raises instead of looping"""
+        db = FakeSupabase({'habit_reminder_preferences': [{'id': 1, 'client_id': 'c1'}]}, project_columns=True)
+        with self.assertRaises(ValueError):
+            fetch_all(lambda: db.table('habit_reminder_preferences').select('client_id'))
+        self.assertEqual(fetch_all(lambda: db.table('habit_reminder_preferences').select('client_id'),
+                                   key='client_id'), [{'client_id': 'c1'}])
+
+
+if __name__ == '__main__':
+    unittest.main()
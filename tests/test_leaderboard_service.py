@@ -0,0 +1,154 @@
+"""
+Tests for materialised leaderboard snapshots
+"""
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from services.habits import leaderboard_service as leaderboard_module
+from services.habits.leaderboard_service import (
+    DAY_MAX, DAY_SUM, GLOBAL_SCOPE, LeaderboardService, invalidate_leaderboards, invalidate_trainer_leaderboards
+)
+from services.habits.streak_engine import StreakCache, StreakEngine
+from utils.ttl_cache import TTLCache
+
+from fakes import FakeSupabase
+
+
+def assignment(client_id, habit_id, target, trainer_id='t1'):
+    return {'id': f'{client_id}-{habit_id}', 'client_id': client_id, 'habit_id': habit_id,
+            'trainer_id': trainer_id, 'is_active': True, 'fitness_habits': {'target_value': target}}
+
+
+def build_db(logs):
+    return FakeSupabase({
+        'clients': [{'client_id': 'c1', 'name': 'Ann'}, {'client_id': 'c2', 'name': 'Ben'},
+                    {'client_id': 'c3', 'name': 'Cat'}],
+        'trainer_client_list': [
+            {'trainer_id': 't1', 'client_id': client_id, 'is_active': True, 'clients': {'name': name}}
+            for client_id, name in (('c1', 'Ann'), ('c2', 'Ben'))
+        ],
+        'trainee_habit_assignments': [assignment('c1', 'water', 8), assignment('c2', 'water', 8),
+                                      assignment('c3', 'steps', 10, trainer_id='t2')],
+        'habit_logs': logs
+    })
+
+
+def log(client_id, habit_id, value, log_date=None):
+    return {'id': len(client_id) + value, 'client_id': client_id, 'habit_id': habit_id,
+            'completed_value': value, 'log_date': (log_date or date.today()).isoformat()}
+
+
+class TestLeaderboardService(unittest.TestCase):
+    """Test suite for LeaderboardService and LeaderboardSnapshot"""
+
+    def setUp(self):
+        self.streaks = StreakCache()
+        patcher = patch('services.habits.leaderboard_service.get_streak_engine',
+                        lambda db: StreakEngine(db, cache=self.streaks))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_global_daily_ranking(self):
+        """Test ranking, day aggregation and the current user appended below the top N"""
+        db = build_db([log('c1', 'water', 4), log('c1', 'water', 6), log('c2', 'water', 8),
+                       log('c3', 'steps', 2)])
+        service = LeaderboardService(db, snapshots=TTLCache(name='test'))
+
+        board = service.get_global_leaderboard('c3', 'daily', limit=2)
+        self.assertEqual([entry['client_id'] for entry in board], ['c2', 'c1', 'c3'])
+        self.assertEqual([entry['progress'] for entry in board], [100.0, 75.0, 20.0])
+        self.assertEqual(board[2]['rank'], 3)
+        self.assertTrue(board[2]['is_current_user'])
+
+        summed = service.get_global_leaderboard('c1', 'daily', aggregate=DAY_SUM)
+        self.assertEqual(summed[0]['client_id'], 'c1')
+        self.assertEqual(summed[0]['progress'], 100.0)
+
+    def test_snapshot_is_reused_and_updated_in_place(self):
+        """Test that page views after the first build don't query, and new logs re-rank"""
+        db = build_db([log('c1', 'water', 4), log('c2', 'water', 6)])
+        service = LeaderboardService(db, snapshots=TTLCache(name='test'))
+
+        service.get_global_leaderboard('c1', 'daily')
+        queries = len(db.queries)
+        board = service.get_global_leaderboard('c1', 'daily')
+        self.assertEqual(len(db.queries), queries)
+        self.assertEqual(board[0]['client_id'], 'c2')
+
+        self.assertEqual(service.record_log('c1', 'water', date.today().isoformat(), 8), 1)
+        board = service.get_global_leaderboard('c1', 'daily')
+        self.assertEqual(board[0]['client_id'], 'c1')
+        self.assertEqual(board[0]['progress'], 100.0)
+
+        # Logs outside the period or for unassigned habits leave the snapshot alone
+        self.assertEqual(service.record_log('c1', 'water', '2000-01-01', 8), 0)
+        self.assertEqual(service.record_log('c1', 'steps', date.today().isoformat(), 8), 0)
+
+    def test_record_log_uses_the_streak_it_is_given(self):
+        """Test that a log with a known streak re-ranks without reading habit_logs"""
+        db = build_db([log('c1', 'water', 4), log('c2', 'water', 4)])
+        service = LeaderboardService(db, snapshots=TTLCache(name='test'))
+        with patch('services.habits.leaderboard_service.get_streak_engine',
+                   lambda db: StreakEngine(db, cache=StreakCache())):
+            service.get_global_leaderboard('c1', 'daily')
+            queries = len(db.queries)
+
+            self.assertEqual(service.record_log('c1', 'water', date.today().isoformat(), 1, streak=5), 1)
+            self.assertEqual(len(db.queries), queries)
+            board = service.get_global_leaderboard('c1', 'daily')
+            self.assertEqual((board[0]['client_id'], board[0]['total_streak']), ('c1', 5))
+
+            # Without a streak (e.g. a backfilled log) the client's streaks are read again
+            service.record_log('c1', 'water', date.today().isoformat(), 1)
+            self.assertEqual(db.queries[queries:], ['habit_logs'])
+
+    def test_trainer_leaderboard_is_scoped(self):
+        """Test that a trainer snapshot only lists that trainer's trainees"""
+        db = build_db([log('c1', 'water', 2), log('c2', 'water', 4), log('c3', 'steps', 10)])
+        service = LeaderboardService(db, snapshots=TTLCache(name='test'))
+
+        board = service.get_trainer_leaderboard('t1', 'c1')
+        self.assertEqual([entry['client_id'] for entry in board], ['c2', 'c1'])
+        self.assertEqual([entry['is_current_trainee'] for entry in board], [False, True])
+
+    def test_trainee_list_changes_drop_that_trainers_snapshots(self):
+        """Test that invalidating a trainer only rebuilds that trainer's leaderboards"""
+        db = build_db([log('c1', 'water', 2)])
+        snapshots = TTLCache(name='test')
+        service = LeaderboardService(db, snapshots=snapshots)
+        service.get_trainer_leaderboard('t1', 'c1')
+        service.get_trainer_leaderboard('t2', 'c3')
+        service.get_global_leaderboard('c1', 'daily')
+
+        db.tables['trainer_client_list'].append(
+            {'trainer_id': 't1', 'client_id': 'c3', 'is_active': True, 'clients': {'name': 'Cat'}})
+        with patch.object(leaderboard_module, '_snapshots', snapshots):
+            invalidate_trainer_leaderboards('t1', reason='trainee added')
+
+        self.assertEqual(sorted(key[0] for key, _ in snapshots.items()), ['global', 't2'])
+        board = service.get_trainer_leaderboard('t1', 'c3')
+        self.assertIn('c3', [entry['client_id'] for entry in board])
+
+    def test_write_during_build_is_not_cached(self):
+        """Test that a log arriving mid-build keeps the snapshot out of the cache"""
+        snapshots = TTLCache(name='test')
+        service = LeaderboardService(build_db([]), snapshots=snapshots)
+        original_build = LeaderboardService.build
+
+        def build_and_log(self, *args, **kwargs):
+            snapshot = original_build(self, *args, **kwargs)
+            invalidate_leaderboards()
+            return snapshot
+
+        with patch.object(LeaderboardService, 'build', build_and_log):
+            service.get_snapshot(GLOBAL_SCOPE, 'daily', aggregate=DAY_MAX)
+        self.assertEqual(snapshots.items(), [])
+
+        service.get_snapshot(GLOBAL_SCOPE, 'daily', aggregate=DAY_MAX)
+        self.assertEqual(len(snapshots.items()), 1)
+        self.assertEqual(service.refresh(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
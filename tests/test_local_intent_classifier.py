@@ -0,0 +1,119 @@
+"""
+Tests for the local intent classifier fast path
+"""
+import unittest
+from unittest.mock import Mock, patch
+
+from services.ai_intent.core import intent_detector as intent_detector_module
+from services.ai_intent.core.intent_detector import IntentDetector
+from services.ai_intent.core.local_classifier import LocalIntentClassifier
+from services.ai_intent.utils.intent_types import INTENT_RESPONSE_SCHEMA
+
+
+class TestLocalIntentClassifier(unittest.TestCase):
+    """Test suite for LocalIntentClassifier rules, model and escalation"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.trained = LocalIntentClassifier()
+        cls.trained.decide('warm up', 'client')
+
+    def setUp(self):
+        # Fresh counters on the shared trained model
+        self.classifier = self.trained
+        self.classifier.served = self.classifier.escalated = 0
+        self.classifier._served_by_intent.clear()
+        self.classifier._escalated_by_reason.clear()
+
+    def test_rules_serve_known_phrases_and_greetings(self):
+        """Test that exact phrases and greetings are answered without the model"""
+        intent, reason = self.classifier.decide('Show my profile!', 'client')
+        self.assertEqual(reason, 'rule')
+        self.assertEqual(intent, {
+            'intent': 'view_profile', 'confidence': 0.95, 'needs_action': True,
+            'suggested_command': '/view-profile', 'user_sentiment': 'neutral', 'source': 'local'
+        })
+
+        intent, reason = self.classifier.decide('Heyyy Refiloe', 'trainer')
+        self.assertEqual((intent['intent'], intent['needs_action'], reason), ('general_conversation', False, 'rule'))
+
+        # The same phrase resolves by role
+        self.assertEqual(self.classifier.decide('which habits do i have', 'trainer')[0]['intent'], 'view_habits')
+        self.assertEqual(self.classifier.decide('which habits do i have', 'client')[0]['intent'], 'view_my_habits')
+
+    def test_model_serves_paraphrases(self):
+        """Test that confident paraphrases are served by the model"""
+        for message, role, expected in [
+            ('I want to add a new client', 'trainer', 'create_trainee'),
+            ('I need to update my phone number', 'trainer', 'edit_profile'),
+            ('log my water', 'client', 'log_habits'),
+        ]:
+            intent, reason = self.classifier.decide(message, role)
+            self.assertEqual((intent['intent'], reason), (expected, 'model'), message)
+            self.assertGreaterEqual(intent['confidence'], 0.75)
+
+    def test_unclear_messages_escalate(self):
+        """Test that long, off-topic, other-role and disallowed messages go to Claude"""
+        self.assertEqual(self.classifier.decide(
+            'I am feeling unmotivated today and need some advice on my diet plan please', 'client'),
+            (None, 'too_long'))
+        self.assertEqual(self.classifier.decide('create a habit', 'client'), (None, 'other_role'))
+        self.assertIsNone(self.classifier.decide('What is the weather in Durban tomorrow?', 'client')[0])
+        self.assertIsNone(self.classifier.decide('asdfgh', 'client')[0])
+        self.assertIsNone(self.classifier.decide('stop', 'client', allowed_intents=['help', 'view_profile'])[0])
+
+    def test_negated_and_question_messages_escalate(self):
+        """Test that messages naming a command they do not ask for are never served by the model"""
+        for message, role, reason in [
+            ("don't delete my account", 'client', 'negation'),
+            ('never delete my account', 'client', 'negation'),
+            ('please don’t log me out', 'client', 'negation'),
+            ('not logging out', 'client', 'negation'),
+            ('dont remove trainee', 'trainer', 'negation'),
+            ('why did you delete my account', 'client', 'question'),
+            ('How do I change my email?', 'trainer', 'question'),
+        ]:
+            self.assertEqual(self.classifier.decide(message, role), (None, reason), message)
+
+        # Exact training phrases are still answered by the rules
+        self.assertEqual(self.classifier.decide('stop reminding me', 'client')[0]['intent'], 'reminder_settings')
+
+    def test_stats_count_served_and_escalated(self):
+        """Test that classify() keeps served/escalated counters"""
+        self.classifier.classify('hi', 'client')
+        self.classifier.classify('show my progress', 'client')
+        self.classifier.classify('create a habit', 'client')
+
+        stats = self.classifier.get_stats()
+        self.assertEqual((stats['served_locally'], stats['escalated']), (2, 1))
+        self.assertEqual(stats['escalated_by_reason'], {'other_role': 1})
+        self.assertAlmostEqual(stats['local_fraction'], 0.667)
+
+    def test_disabled_or_missing_phrases_escalate_everything(self):
+        """Test that a disabled classifier or unreadable phrase file never answers"""
+        self.assertEqual(LocalIntentClassifier(enabled=False).decide('hi', 'client'), (None, 'disabled'))
+        with patch('services.ai_intent.core.local_classifier.log_error'):
+            missing = LocalIntentClassifier(phrases_path='/nonexistent/intent_phrases.json')
+            self.assertIsNone(missing.classify('hi', 'client'))
+        self.assertEqual(missing.get_stats()['served_locally'], 0)
+
+    def test_intent_detector_skips_claude_when_served_locally(self):
+        """Test that IntentDetector only calls Claude for escalated messages"""
+        with patch.object(intent_detector_module, 'get_local_intent_classifier', return_value=self.classifier):
+            detector = IntentDetector()
+        detector.ai_client = Mock()
+        detector.ai_client.is_available.return_value = True
+        detector.ai_client.send_json.return_value = {'intent': 'general_conversation', 'confidence': 0.8}
+
+        intent = detector.detect_intent('view my profile', 'client', {})
+        self.assertEqual(intent['source'], 'local')
+        detector.ai_client.send_json.assert_not_called()
+
+        with patch.object(detector.prompt_builder, 'build_intent_prompt', return_value='prompt'):
+            intent = detector.detect_intent('how many calories should I eat to lose weight', 'client', {})
+        self.assertEqual(intent['intent'], 'general_conversation')
+        detector.ai_client.send_json.assert_called_once_with('prompt', INTENT_RESPONSE_SCHEMA)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""
+Tests for the in-process message dedup store
+"""
+import unittest
+from unittest.mock import Mock
+
+from services.message_dedup import (
+    DUPLICATE_ID, RAPID_DUPLICATE, InMemoryDedupStore, ProcessedMessageWriter
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestInMemoryDedupStore(unittest.TestCase):
+    """Test suite for InMemoryDedupStore"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.store = InMemoryDedupStore(id_window_seconds=60, rapid_window_seconds=2, clock=self.clock)
+
+    def test_exact_duplicate_id(self):
+        """Test that a redelivered message id is a duplicate"""
+        self.assertIsNone(self.store.check_and_record('wamid.1', '27821234567', 'hi'))
+        self.clock.now += 10
+        self.assertEqual(self.store.check_and_record('wamid.1', '27821234567', 'hi'), DUPLICATE_ID)
+
+    def test_rapid_fire_same_text(self):
+        """Test the 2-second same-text window"""
+        self.assertIsNone(self.store.check_and_record('wamid.1', '27821234567', 'hi'))
+        self.clock.now += 1
+        self.assertEqual(self.store.check_and_record('wamid.2', '27821234567', 'hi'), RAPID_DUPLICATE)
+        self.assertIsNone(self.store.check_and_record('wamid.3', '27820000000', 'hi'))
+
+        self.clock.now += 5
+        self.assertIsNone(self.store.check_and_record('wamid.4', '27821234567', 'hi'))
+
+    def test_ids_expire_after_window(self):
+        """Test that the id index is time-bounded"""
+        self.store.check_and_record('wamid.1', '27821234567', '')
+        self.clock.now += 61
+        self.assertIsNone(self.store.check_and_record('wamid.1', '27821234567', ''))
+        self.assertEqual(self.store.get_stats()['tracked_ids'], 1)
+
+    def test_records_are_batched(self):
+        """Test that new messages are flushed to processed_messages in one upsert"""
+        db = Mock()
+        writer = ProcessedMessageWriter(db, batch_size=100, flush_interval=60)
+        store = InMemoryDedupStore(writer, clock=self.clock)
+
+        for i in range(3):
+            store.check_and_record(f'wamid.{i}', '27821234567', f'msg {i}')
+        store.check_and_record('wamid.0', '27821234567', 'msg 0')
+        writer.flush()
+
+        rows = db.table.return_value.upsert.call_args[0][0]
+        self.assertEqual([row['whatsapp_message_id'] for row in rows], ['wamid.0', 'wamid.1', 'wamid.2'])
+        self.assertEqual(writer.get_stats()['batches_written'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
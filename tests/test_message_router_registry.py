@@ -0,0 +1,40 @@
+"""
+Tests for the long-lived MessageRouter registry
+"""
+import unittest
+from unittest.mock import Mock
+
+from services.message_router import get_message_router, reset_message_routers
+
+
+class TestMessageRouterRegistry(unittest.TestCase):
+    """Test suite for get_message_router"""
+
+    def setUp(self):
+        reset_message_routers()
+        self.db = Mock()
+        self.whatsapp = Mock()
+
+    def tearDown(self):
+        reset_message_routers()
+
+    def test_same_router_is_reused(self):
+        """Test that the router is built once per supabase/whatsapp pair"""
+        router = get_message_router(self.db, self.whatsapp)
+        self.assertIs(get_message_router(self.db, self.whatsapp), router)
+        self.assertIsNot(get_message_router(Mock(), self.whatsapp), router)
+
+    def test_router_shares_user_manager(self):
+        """Test that the router does not build a second UserManager"""
+        router = get_message_router(self.db, self.whatsapp)
+        self.assertIs(router.user_manager, router.auth_service.user_manager)
+
+    def test_logged_in_handler_built_once(self):
+        """Test that the logged-in handler graph is reused across messages"""
+        button_handler = get_message_router(self.db, self.whatsapp).button_handler
+        self.assertIs(button_handler._get_logged_in_handler(), button_handler._get_logged_in_handler())
+        self.assertIs(button_handler._get_universal_handler(), button_handler._get_universal_handler())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -242,13 +242,15 @@ class TestProfilePrivacy(unittest.TestCase):
         ]
 
         # Trainer 1 sets pricing
-        success, msg = self.service.set_trainer_custom_pricing(self.trainer1_id, self.client_id, 550.00)
+        with patch('services.dashboard.response_cache.touch_dashboard_users') as touch:
+            success, msg = self.service.set_trainer_custom_pricing(self.trainer1_id, self.client_id, 550.00)
 
         self.assertTrue(success)
         self.assertIn('550', msg)
 
-        # Verify the update was called
+        # Verify the update was called and the cached dashboards will show it
         self.mock_db.table.return_value.update.assert_called()
+        touch.assert_called_once_with(self.trainer1_id, self.client_id)
 
         # Trainer 2 should still have their own pricing (not affected)
         # This is ensured by database constraints and RLS policies
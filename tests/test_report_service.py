@@ -0,0 +1,100 @@
+"""
+Tests for bulk-fetch, streamed habit reports
+"""
+import io
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from services.habits.report_service import ReportService
+
+from fakes import FakeSupabase
+
+
+def trainer_db(clients, habits):
+    """A trainer whose clients each have `habits` habits, each logged twice on 2026-03-02"""
+    tables = {'clients': [], 'trainee_habit_assignments': [], 'habit_logs': []}
+    for c in range(clients):
+        client_id = f'c{c}'
+        tables['clients'].append({'client_id': client_id, 'name': f'Client {c}'})
+        for h in range(habits):
+            habit = {'habit_id': f'h{h}', 'habit_name': f'Habit {h}', 'target_value': 4, 'unit': 'x'}
+            tables['trainee_habit_assignments'].append({
+                'id': len(tables['trainee_habit_assignments']), 'client_id': client_id, 'trainer_id': 't1',
+                'is_active': True, 'fitness_habits': habit
+            })
+            for value in (1, 2):
+                tables['habit_logs'].append({
+                    'id': len(tables['habit_logs']), 'client_id': client_id, 'habit_id': f'h{h}',
+                    'log_date': '2026-03-02', 'completed_value': value
+                })
+    return FakeSupabase(tables)
+
+
+class TestReportService(unittest.TestCase):
+    """Test suite for ReportService"""
+
+    def test_weekly_report_reads_logs_once(self):
+        """Test the report rows and summary built from a single habit_logs read"""
+        db = trainer_db(1, 3)
+        success, _, csv_content = ReportService(db).generate_weekly_report('c0', date(2026, 3, 1))
+
+        self.assertTrue(success)
+        self.assertEqual(db.queries.count('habit_logs'), 1)
+        lines = csv_content.splitlines()
+        self.assertEqual(lines[4], 'Date,Day,Habit,Target,Unit,Completed,Due,Completion %')
+        self.assertIn('2026-03-02,Monday,Habit 0,4.0,x,3.0,1.0,75.0', lines)
+        self.assertEqual(len([line for line in lines if line.startswith('2026-03')]), 21)
+        self.assertIn('Days with Logs,3', lines)
+        self.assertIn(f'Average Completion %,{round(75 / 7, 1)}', lines)
+
+    def test_streamed_output_matches_returned_content(self):
+        """Test that writing to a stream produces the same CSV as the returned string"""
+        service = ReportService(trainer_db(1, 2))
+        _, _, returned = service.generate_monthly_report('c0', 3, 2026)
+
+        output = io.StringIO()
+        success, _, content = service.generate_monthly_report('c0', 3, 2026, output=output)
+        self.assertTrue(success)
+        self.assertIsNone(content)
+        self.assertEqual(output.getvalue(), returned)
+
+    def test_trainer_clients_report_query_count_is_flat(self):
+        """Test that the trainer-wide report costs the same round trips for 3 or 40 clients"""
+        counts = []
+        for clients in (3, 40):
+            db = trainer_db(clients, 10)
+            output = io.StringIO()
+            success, _, _ = ReportService(db).generate_trainer_clients_report(
+                't1', date(2026, 3, 1), date(2026, 3, 7), output=output
+            )
+            self.assertTrue(success)
+            counts.append(len(db.queries))
+            lines = output.getvalue().splitlines()
+            self.assertEqual(lines[4].split(',')[0], 'Client')
+            self.assertEqual(len([line for line in lines if line.startswith('Client ')]), clients * 10 * 7)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_trainer_clients_report_pages_assignments(self):
+        """Test that assignments beyond one page still reach the report"""
+        db = trainer_db(5, 3)
+        output = io.StringIO()
+        with patch('services.habits.report_service.CUBE_PAGE_SIZE', 4):
+            success, _, _ = ReportService(db).generate_trainer_clients_report(
+                't1', date(2026, 3, 1), date(2026, 3, 1), output=output
+            )
+        self.assertTrue(success)
+        self.assertEqual(db.queries.count('trainee_habit_assignments'), 4)
+        self.assertEqual(len([line for line in output.getvalue().splitlines() if line.startswith('Client ')]), 15)
+
+    def test_no_assignments(self):
+        """Test the failure path when nothing is assigned"""
+        success, message, content = ReportService(trainer_db(0, 0)).generate_trainer_clients_report(
+            't1', date(2026, 3, 1), date(2026, 3, 7)
+        )
+        self.assertFalse(success)
+        self.assertIsNone(content)
+
+
+if __name__ == '__main__':
+    unittest.main()
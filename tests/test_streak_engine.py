@@ -0,0 +1,95 @@
+"""
+Tests for the bulk habit streak engine
+"""
+import itertools
+import unittest
+from datetime import date, timedelta
+from unittest.mock import Mock, patch
+
+import numpy as np
+
+from services.habits.logging_service import LoggingService
+from services.habits.streak_engine import StreakCache, StreakEngine, compute_streaks
+
+from fakes import FakeQuery, FakeResult, FakeSupabase
+
+
+LOG_IDS = itertools.count(1)
+
+
+def log_rows(client_id, habit_id, days_ago):
+    today = date.today()
+    return [{'id': next(LOG_IDS), 'client_id': client_id, 'habit_id': habit_id,
+             'log_date': (today - timedelta(days=d)).isoformat()}
+            for d in days_ago]
+
+
+class TestStreakEngine(unittest.TestCase):
+    """Test suite for StreakEngine and StreakCache"""
+
+    def test_compute_streaks_vectorised(self):
+        """Test grouped streaks with duplicates, gaps and unsorted input"""
+        groups = np.array([0, 0, 0, 0, 1, 1, 1, 2])
+        days = np.array([10, 12, 11, 12, 5, 7, 8, 3])
+
+        codes, last_days, streaks = compute_streaks(groups, days)
+        self.assertEqual(codes.tolist(), [0, 1, 2])
+        self.assertEqual(last_days.tolist(), [12, 8, 3])
+        self.assertEqual(streaks.tolist(), [3, 2, 1])
+
+    def test_bulk_streaks_in_one_query(self):
+        """Test that many clients' streaks come from a single paged read"""
+        logs = (log_rows('c1', 'water', [0, 0, 1, 2, 4]) + log_rows('c1', 'steps', [3, 4]) +
+                log_rows('c2', 'water', list(range(30))))
+        db = FakeSupabase({'habit_logs': logs})
+        engine = StreakEngine(db, cache=StreakCache())
+
+        streaks = engine.get_streaks(['c1', 'c2', 'c3'])
+        self.assertEqual(streaks, {('c1', 'water'): 3, ('c1', 'steps'): 2, ('c2', 'water'): 30})
+        self.assertEqual(len(db.queries), 1)
+
+        self.assertEqual(engine.get_streak('c3', 'water'), 0)
+        self.assertEqual(len(db.queries), 1)
+
+    def test_log_habit_updates_cached_streak(self):
+        """Test that LoggingService.log_habit folds new logs into the cached streak"""
+        cache = StreakCache()
+        engine = StreakEngine(FakeSupabase({'habit_logs': log_rows('c1', 'water', [1, 2])}), cache=cache)
+        self.assertEqual(engine.get_streak('c1', 'water'), 2)
+
+        with patch('services.habits.logging_service.record_habit_log', cache.record_log):
+            db = Mock()
+            db.table.return_value.select.return_value.eq.return_value.eq.return_value.eq.return_value \
+                .execute.return_value = FakeResult([{'id': 1}])
+            db.table.return_value.insert.return_value.execute.return_value = FakeResult([{'id': 2}])
+            success, _, _ = LoggingService(db).log_habit('c1', 'water', 2)
+
+        self.assertTrue(success)
+        self.assertEqual(engine.get_streak('c1', 'water'), 3)
+        self.assertEqual(cache.record_log('c1', 'water', date.today()), 3)
+        self.assertEqual(cache.record_log('c1', 'water', date.today() + timedelta(days=3)), 1)
+        self.assertEqual(cache.record_log('c1', 'steps', date.today()), 1)
+
+        # A backfilled log can join two runs, so the client is recomputed
+        self.assertIsNone(cache.record_log('c1', 'water', date.today() - timedelta(days=10)))
+        self.assertIsNone(cache.get('c1'))
+
+    def test_write_during_fetch_is_not_cached(self):
+        """Test that a log recorded while streaks were being fetched keeps the entry uncached"""
+        cache = StreakCache()
+        db = FakeSupabase({'habit_logs': log_rows('c1', 'water', [1])})
+        engine = StreakEngine(db, cache=cache)
+
+        original_execute = FakeQuery.execute
+
+        def execute_and_log(query):
+            cache.record_log('c1', 'water', date.today())
+            return original_execute(query)
+
+        with patch.object(FakeQuery, 'execute', execute_and_log):
+            engine.get_streaks(['c1'])
+        self.assertIsNone(cache.get('c1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for the running-task state cache used by TaskManager/TaskTracker
+"""
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock
+
+from services.auth.tasks.task_manager import TaskManager
+from services.auth.tasks.task_state_cache import (
+    MemoryTaskStateBackend, SharedTaskStateBackend, TaskStateCache
+)
+from services.auth.tasks.task_tracker import TaskTracker
+
+
+RUNNING_TASK = {
+    'id': 'task-1',
+    'trainer_phone': '27821234567',
+    'task_type': 'create_habit',
+    'task_status': 'running',
+    'task_data': {},
+    'started_at': '2025-01-01T10:00:00+02:00'
+}
+
+
+class TestTaskStateCache(unittest.TestCase):
+    """Test suite for running-task write-through caching"""
+
+    def setUp(self):
+        self.db = Mock()
+        self.table = self.db.table.return_value
+        self.cache = TaskStateCache(MemoryTaskStateBackend())
+        self.manager = TaskManager(self.db, task_state_cache=self.cache)
+        self.tracker = TaskTracker(self.db, task_state_cache=self.cache)
+
+    def _running_query(self):
+        return self.table.select.return_value.eq.return_value.eq.return_value.order.return_value.limit.return_value
+
+    def test_no_running_task_is_cached(self):
+        """Test that 'no running task' is remembered between turns"""
+        self._running_query().execute.return_value.data = []
+
+        self.assertIsNone(self.manager.get_running_task('27821234567', 'trainer'))
+        self.assertIsNone(self.manager.get_running_task('27821234567', 'trainer'))
+        self.assertEqual(self._running_query().execute.call_count, 1)
+
+    def test_create_and_update_write_through(self):
+        """Test that create/update keep the cache current without reads"""
+        self.table.insert.return_value.execute.return_value.data = [dict(RUNNING_TASK)]
+        self.manager.create_task('27821234567', 'trainer', 'create_habit')
+
+        updated = dict(RUNNING_TASK, task_data={'step': 2})
+        self.table.update.return_value.eq.return_value.execute.return_value.data = [updated]
+        self.tracker.update_task('task-1', 'trainer', task_data={'step': 2})
+
+        task = self.manager.get_running_task('27821234567', 'trainer')
+        self.assertEqual(task['task_data'], {'step': 2})
+        self.table.select.assert_not_called()
+
+    def test_complete_task_invalidates(self):
+        """Test that completing the cached task forces the next read to Supabase"""
+        self.table.insert.return_value.execute.return_value.data = [dict(RUNNING_TASK)]
+        self.manager.create_task('27821234567', 'trainer', 'create_habit')
+
+        self.table.update.return_value.eq.return_value.execute.return_value.data = [
+            dict(RUNNING_TASK, task_status='completed')
+        ]
+        self.tracker.complete_task('task-1', 'trainer')
+
+        self.assertEqual(self.cache.get('27821234567', 'trainer'), (False, None))
+
+    def test_shared_backend_visible_across_processes(self):
+        """Test that two caches on the same SQLite file see each other's writes"""
+        path = os.path.join(tempfile.mkdtemp(), 'task_state.db')
+        worker_a = TaskStateCache(SharedTaskStateBackend(path))
+        worker_b = TaskStateCache(SharedTaskStateBackend(path))
+
+        worker_a.apply_task_row('trainer', dict(RUNNING_TASK), created=True)
+        self.assertEqual(worker_b.get('27821234567', 'trainer')[1]['id'], 'task-1')
+
+        worker_b.apply_task_row('trainer', {'id': 'task-1', 'task_status': 'completed'})
+        self.assertEqual(worker_a.get('27821234567', 'trainer'), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests for the bulk trainer dashboard data loader
+"""
+import unittest
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from routes.dashboard import calculate_trainer_stats
+from services.dashboard.trainee_loader import TraineeProgressLoader
+from services.habits.streak_engine import StreakCache, StreakEngine
+
+from fakes import FakeSupabase
+
+
+TODAY = date(2026, 6, 20)
+
+
+def trainer_db(trainee_count, habits_per_trainee=3):
+    """A trainer with `trainee_count` clients, each logging every habit on the last three days"""
+    tables = {'trainer_client_list': [], 'clients': [], 'trainee_habit_assignments': [], 'habit_logs': []}
+    for n in range(trainee_count):
+        client_id = f'c{n}'
+        tables['trainer_client_list'].append(
+            {'trainer_id': 't1', 'client_id': client_id, 'connection_status': 'active'})
+        tables['clients'].append(
+            {'client_id': client_id, 'name': f'Client {n}', 'whatsapp': f'2782{n:07d}', 'email': ''})
+        for h in range(habits_per_trainee):
+            habit_id = f'h{h}'
+            tables['trainee_habit_assignments'].append({
+                'id': f'{client_id}-{habit_id}', 'client_id': client_id, 'habit_id': habit_id,
+                'trainer_id': 't1', 'is_active': True, 'fitness_habits': {'target_value': 2}
+            })
+            for days_ago in range(3):
+                tables['habit_logs'].append({
+                    'id': len(tables['habit_logs']), 'client_id': client_id, 'habit_id': habit_id,
+                    'completed_value': 2, 'log_date': (TODAY - timedelta(days=days_ago)).isoformat()
+                })
+    return FakeSupabase(tables)
+
+
+class TestTraineeProgressLoader(unittest.TestCase):
+    """Test suite for TraineeProgressLoader"""
+
+    def load(self, db):
+        engine = StreakEngine(db, cache=StreakCache())
+        with patch('services.dashboard.trainee_loader.get_streak_engine', lambda _: engine), \
+                patch('services.habits.streak_engine.date') as fake_date:
+            fake_date.today.return_value = TODAY
+            fake_date.fromisoformat = date.fromisoformat
+            return TraineeProgressLoader(db, today=TODAY).load('t1')
+
+    def test_progress_streak_and_last_activity(self):
+        """Test the per-trainee figures computed in memory"""
+        db = trainer_db(2)
+        db.tables['trainee_habit_assignments'][0]['fitness_habits'] = None
+        db.tables['clients'].pop()
+
+        trainees = self.load(db)
+        self.assertEqual(len(trainees), 1)
+        trainee = trainees[0]
+        self.assertEqual(trainee['client_id'], 'c0')
+        self.assertEqual(trainee['habit_count'], 3)
+        # 6 of 60 for two habits, and nothing for the habit whose definition is gone
+        self.assertEqual(trainee['avg_progress'], 6.7)
+        self.assertEqual(trainee['total_streak'], 9)
+        self.assertEqual(trainee['last_activity'], 'Jun 20')
+
+    def test_query_count_does_not_grow_with_trainees(self):
+        """Regression benchmark: a trainer with many trainees costs the same round trips as one with few"""
+        small, large = trainer_db(3), trainer_db(90)
+
+        self.assertEqual(len(self.load(small)), 3)
+        self.assertEqual(len(self.load(large)), 90)
+        self.assertEqual(small.queries, large.queries)
+        self.assertLessEqual(len(large.queries), 6)
+
+    def test_no_trainees(self):
+        """Test that a trainer without trainees costs a single query"""
+        db = trainer_db(0)
+        self.assertEqual(self.load(db), [])
+        self.assertEqual(len(db.queries), 1)
+
+
+class TestTrainerStats(unittest.TestCase):
+    """Test suite for the trainer dashboard statistics"""
+
+    def test_assignment_counts_survive_paging(self):
+        """Test that per-trainee assignment counts are complete when reads span batches and pages"""
+        db = trainer_db(5)
+        trainees = [{'client_id': f'c{n}', 'name': f'Client {n}'} for n in range(5)]
+        with patch('routes.dashboard.CUBE_CLIENT_BATCH', 2), patch('routes.dashboard.CUBE_PAGE_SIZE', 4):
+            stats = calculate_trainer_stats(db, 't1', trainees)
+
+        self.assertEqual([entry['assigned_habits'] for entry in stats['client_habit_breakdown'].values()], [3] * 5)
+        self.assertEqual([entry['total_habits'] for entry in stats['trainee_monthly_progress']], [3] * 5)
+        # One trainer-wide read, then pages of 4, 2 / 4, 2 / 3 for the client batches
+        self.assertEqual(db.queries.count('trainee_habit_assignments'), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Tests for the asynchronous webhook ingestion queue
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+from routes import webhooks as webhooks_module
+from routes.webhooks import webhooks_bp
+from services.webhook_ingestion import WebhookIngestionQueue
+
+
+def make_payload(*messages):
+    """Build a minimal WhatsApp webhook payload from (phone, message_id, text) tuples"""
+    return {
+        'object': 'whatsapp_business_account',
+        'entry': [{
+            'changes': [{
+                'value': {
+                    'messages': [
+                        {'from': phone, 'id': message_id, 'type': 'text', 'text': {'body': text}}
+                        for phone, message_id, text in messages
+                    ]
+                }
+            }]
+        }]
+    }
+
+
+class TestWebhookIngestionQueue(unittest.TestCase):
+    """Test suite for WebhookIngestionQueue"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.tmp_dir, 'journal.jsonl')
+
+    def test_validate_payload(self):
+        """Test payload validation"""
+        self.assertTrue(WebhookIngestionQueue.validate_payload(make_payload())[0])
+        self.assertTrue(WebhookIngestionQueue.validate_payload({'object': 'x'})[0])
+        self.assertFalse(WebhookIngestionQueue.validate_payload(None)[0])
+        self.assertFalse(WebhookIngestionQueue.validate_payload({'entry': 'bad'})[0])
+
+    def test_per_phone_ordering(self):
+        """Test that messages from the same phone are processed in arrival order"""
+        processed = []
+        lock = threading.Lock()
+
+        def handler(message, payload):
+            # Make early messages slower so reordering would show up
+            time.sleep(0.002 * (5 - int(message['id'].split('-')[1]) % 5))
+            with lock:
+                processed.append((message['from'], message['id']))
+
+        ingestion = WebhookIngestionQueue(handler, num_workers=4, journal_path=self.journal_path)
+        for i in range(20):
+            ingestion.submit(make_payload(('2771000000%d' % (i % 3), 'm-%d' % i, 'hi')))
+
+        self.assertTrue(ingestion.join(timeout=5))
+        self.assertEqual(len(processed), 20)
+
+        for phone in {p for p, _ in processed}:
+            ids = [int(m.split('-')[1]) for p, m in processed if p == phone]
+            self.assertEqual(ids, sorted(ids))
+
+        metrics = ingestion.get_metrics()
+        self.assertEqual(metrics['processed'], 20)
+        self.assertEqual(metrics['queue_depth'], 0)
+        self.assertEqual(metrics['processing_time']['count'], 20)
+
+    def test_bounded_queue_rejects_when_full(self):
+        """Test that a saturated shard rejects instead of growing without bound"""
+        release = threading.Event()
+        ingestion = WebhookIngestionQueue(lambda m, p: release.wait(2), num_workers=1,
+                                          max_queue_size=2, journal_path=self.journal_path)
+
+        results = [ingestion.submit(make_payload(('27710000000', 'm-%d' % i, 'hi'))) for i in range(6)]
+        release.set()
+
+        self.assertGreater(sum(r['rejected'] for r in results), 0)
+        self.assertTrue(ingestion.join(timeout=5))
+
+    def test_partially_rejected_payload_is_redelivered(self):
+        """Test that the webhook asks Meta to redeliver when any message in the payload was rejected"""
+        app = Flask(__name__)
+        app.register_blueprint(webhooks_bp)
+        ingestion = Mock()
+        payload = make_payload(('27710000000', 'm-1', 'hi'), ('27710000000', 'm-2', 'there'))
+
+        with patch.object(webhooks_module, 'get_ingestion_queue', return_value=ingestion):
+            ingestion.submit.return_value = {'accepted': 1, 'rejected': 1}
+            self.assertEqual(app.test_client().post('/webhook', json=payload).status_code, 503)
+
+            ingestion.submit.return_value = {'accepted': 2, 'rejected': 0}
+            self.assertEqual(app.test_client().post('/webhook', json=payload).status_code, 200)
+
+    def test_unfinished_events_are_replayed(self):
+        """Test that events persisted without a completion record are replayed on start"""
+        ingestion = WebhookIngestionQueue(lambda m, p: None, journal_path=self.journal_path)
+        ingestion.journal.record_received({
+            'event_id': 'lost-1',
+            'phone': '27710000000',
+            'message': {'id': 'lost-1', 'from': '27710000000'},
+            'payload': {}
+        })
+
+        replayed = []
+        restarted = WebhookIngestionQueue(lambda m, p: replayed.append(m['id']),
+                                          journal_path=self.journal_path)
+        restarted.start()
+
+        self.assertTrue(restarted.join(timeout=5))
+        self.assertEqual(replayed, ['lost-1'])
+        self.assertEqual(restarted.get_metrics()['replayed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Tests for the pooled Graph API transport
+"""
+import unittest
+from unittest.mock import Mock
+
+import requests
+import urllib3
+
+from services.whatsapp import WhatsAppService
+from services.whatsapp_transport import GraphTransport
+
+
+def make_response(status_code, body=None, headers=None):
+    response = Mock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = body if body is not None else {}
+    response.text = str(body)
+    return response
+
+
+class TestGraphTransport(unittest.TestCase):
+    """Test suite for GraphTransport retry policy"""
+
+    def setUp(self):
+        self.sleeps = []
+        self.transport = GraphTransport(max_retries=3, backoff_factor=0.5, sleep=self.sleeps.append)
+        self.transport.session = Mock()
+
+    def test_rate_limit_honours_retry_after(self):
+        """Test that a 429 is retried after the Retry-After delay"""
+        self.transport.session.post.side_effect = [
+            make_response(429, headers={'Retry-After': '2'}),
+            make_response(200, {'messages': [{'id': 'wamid.1'}]})
+        ]
+
+        response = self.transport.post('https://graph.example/messages', json={})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.sleeps, [2.0])
+        self.assertEqual(self.transport.get_stats()['rate_limited'], 1)
+
+    def test_graph_error_codes(self):
+        """Test that throttling/transient error bodies retry and other errors do not"""
+        self.transport.session.post.side_effect = [
+            make_response(400, {'error': {'code': 130429}}),
+            make_response(400, {'error': {'code': 1, 'is_transient': True}}),
+            make_response(200)
+        ]
+        self.assertEqual(self.transport.post('https://graph.example/messages').status_code, 200)
+        self.assertEqual(len(self.sleeps), 2)
+
+        self.transport.session.post.side_effect = [make_response(500), make_response(200)]
+        self.assertEqual(self.transport.post('https://graph.example/messages').status_code, 500)
+
+        self.transport.session.post.side_effect = [make_response(400, {'error': {'code': 131026}})]
+        self.assertEqual(self.transport.post('https://graph.example/messages').status_code, 400)
+
+    def test_retries_exhausted_returns_last_response(self):
+        """Test that the caller sees the final error response"""
+        self.transport.session.post.side_effect = [make_response(503)] * 4
+
+        self.assertEqual(self.transport.post('https://graph.example/messages').status_code, 503)
+        self.assertEqual(self.transport.session.post.call_count, 4)
+        self.assertTrue(all(0 < delay <= 2 for delay in self.sleeps))
+
+    def test_connection_errors(self):
+        """Test that connect failures retry and failures after the request was sent do not"""
+        refused = requests.exceptions.ConnectionError(urllib3.exceptions.MaxRetryError(
+            None, '/messages', urllib3.exceptions.NewConnectionError(None, 'refused')))
+        self.transport.session.post.side_effect = [
+            refused, requests.exceptions.ConnectTimeout('connect timed out'), make_response(200)
+        ]
+        self.assertEqual(self.transport.post('https://graph.example/messages').status_code, 200)
+        self.assertEqual(self.transport.session.post.call_count, 3)
+
+        for error in (requests.exceptions.ReadTimeout('slow'),
+                      requests.exceptions.ConnectionError(urllib3.exceptions.ProtocolError('Connection aborted.'))):
+            self.transport.session.post.reset_mock()
+            self.transport.session.post.side_effect = error
+            with self.assertRaises(type(error)):
+                self.transport.post('https://graph.example/messages')
+            self.assertEqual(self.transport.session.post.call_count, 1)
+
+    def test_service_sends_through_transport(self):
+        """Test that WhatsAppService uses the shared transport"""
+        config = Mock(WHATSAPP_API_URL='https://graph.example/messages', WHATSAPP_API_TOKEN='token',
+                      TIMEZONE='Africa/Johannesburg')
+        transport = Mock()
+        transport.post.return_value = make_response(200, {'messages': [{'id': 'wamid.1'}]})
+        service = WhatsAppService(config, Mock(), Mock(), transport=transport)
+
+        result = service.send_message('0821234567', 'Hello')
+        self.assertEqual(result, {'success': True, 'message_id': 'wamid.1'})
+        self.assertEqual(transport.post.call_args[1]['json']['to'], '27821234567')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""Incremental extraction and schema checks for JSON objects in model output"""
+import json
+from typing import Any, Dict, Optional
+
+
+class MalformedJSON(ValueError):
+    """Raised when model output holds no complete, valid JSON object matching the schema"""
+
+
+class JSONObjectScanner:
+    """
+    Finds the first complete top-level {...} object in text fed in chunks.
+
+    One pass over each character, tracking nesting depth and whether the
+    position is inside a string (honouring escapes), so the closing brace is
+    recognised as soon as it arrives and braces inside strings are ignored.
+    Text before the object is skipped.
+    """
+
+    def __init__(self, max_chars: int = 20000):
+        self.max_chars = max_chars
+        self.chars_seen = 0
+        self.result: Optional[str] = None
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """Consume a chunk; returns the object text once it is complete, else None"""
+        if self.result is not None or not chunk:
+            return self.result
+
+        self.chars_seen += len(chunk)
+        if self.chars_seen > self.max_chars:
+            raise MalformedJSON(f"No complete JSON object in the first {self.max_chars} characters")
+
+        start = 0 if self._depth else None
+        for i, ch in enumerate(chunk):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '{':
+                if self._depth == 0:
+                    start = i
+                self._depth += 1
+            elif self._depth == 0:
+                continue
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    self.result = ''.join(self._parts)
+                    return self.result
+
+        if self._depth:
+            self._parts.append(chunk[start:])
+        return None
+
+    def parse(self) -> Dict:
+        """Decode the completed object"""
+        if self.result is None:
+            raise MalformedJSON("Response ended before a complete JSON object")
+        try:
+            data = json.loads(self.result)
+        except json.JSONDecodeError as e:
+            raise MalformedJSON(f"Invalid JSON object: {e}") from e
+        if not isinstance(data, dict):
+            raise MalformedJSON("Expected a JSON object")
+        return data
+
+
+def parse_json_object(text: str) -> Dict:
+    """First complete JSON object in text (e.g. a non-streamed reply)"""
+    scanner = JSONObjectScanner(max_chars=max(len(text or ''), 1))
+    scanner.feed(text or '')
+    return scanner.parse()
+
+
+def validate_schema(data: Dict, schema: Dict[str, Dict[str, Any]]) -> Dict:
+    """
+    Check data against a flat schema and fill in defaults.
+
+    Each field spec may give 'type' (a type or tuple of types), 'required',
+    'default', and 'min'/'max' for numbers. Fields not in the schema are
+    kept as they are.
+
+    Raises:
+        MalformedJSON: If a required field is missing or a value has the wrong type/range
+    """
+    result = dict(data)
+    for field, spec in schema.items():
+        if result.get(field) is None:
+            if spec.get('required'):
+                raise MalformedJSON(f"Missing required field '{field}'")
+            if 'default' in spec:
+                default = spec['default']
+                result[field] = default.copy() if isinstance(default, (dict, list)) else default
+            continue
+
+        value = result[field]
+        expected = spec.get('type')
+        if expected is not None:
+            types = expected if isinstance(expected, tuple) else (expected,)
+            # bool is an int subclass - only accept it where bool is expected
+            if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+                raise MalformedJSON(f"Field '{field}' has type {type(value).__name__}")
+
+        if 'min' in spec and value < spec['min'] or 'max' in spec and value > spec['max']:
+            raise MalformedJSON(f"Field '{field}' out of range: {value}")
+
+    return result
@@ -0,0 +1,60 @@
+"""Keyset-paginated reads of Supabase (PostgREST) queries"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List
+
+# PostgREST's default max-rows; a larger page would be silently truncated
+DEFAULT_PAGE_SIZE = 1000
+
+
+def iter_pages(build_query: Callable, key: str = 'id', page_size: int = DEFAULT_PAGE_SIZE,
+               prefetch: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Pages of every row a query matches, ordered by a unique `key` column.
+
+    Each page after the first asks for rows with `key` greater than the last
+    one seen, so pages are index range scans rather than growing OFFSETs,
+    and rows updated or deleted mid-scan cannot shift a row past the reader.
+    The scan ends on the first page shorter than `page_size`.
+
+    Args:
+        build_query: Returns a fresh filtered query each call (without order/limit);
+            the selected columns must include `key`
+        prefetch: Fetch the next page on a background thread while the
+            caller works through the current one
+    """
+    def fetch(after):
+        query = build_query()
+        if after is not None:
+            query = query.gt(key, after)
+        return query.order(key).limit(page_size).execute().data or []
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='keyset-prefetch') if prefetch else None
+    try:
+        page = fetch(None)
+        while page:
+            if key not in page[-1]:
+                raise ValueError(f"Keyset column '{key}' is missing from the selected columns")
+            after = page[-1][key]
+            more = len(page) >= page_size
+            upcoming = executor.submit(fetch, after) if executor and more else None
+
+            yield page
+
+            if not more:
+                return
+            page = upcoming.result() if upcoming else fetch(after)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_rows(build_query: Callable, key: str = 'id', page_size: int = DEFAULT_PAGE_SIZE,
+              prefetch: bool = False) -> Iterator[Dict[str, Any]]:
+    """Every row a query matches, with one page in memory at a time (see iter_pages)"""
+    for page in iter_pages(build_query, key, page_size, prefetch):
+        yield from page
+
+
+def fetch_all(build_query: Callable, key: str = 'id', page_size: int = DEFAULT_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """Every row a query matches as a list, read page by page so none are cut off"""
+    return list(iter_rows(build_query, key, page_size))
@@ -0,0 +1,154 @@
+"""Key/value stores shared between worker processes on the same host"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.logger import log_info
+
+
+def _like_prefix(prefix: str) -> str:
+    """LIKE pattern matching keys that start with prefix (used with ESCAPE '\\')"""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+class SQLiteKVStore:
+    """
+    Small JSON key/value store backed by SQLite in WAL mode.
+
+    Every worker process opens the same database file, so writes from one
+    process are visible to the others immediately. Each thread gets its own
+    connection. Entries can carry an absolute expiry time; expired rows are
+    ignored on read and removed by purge_expired(), which uses the index on
+    expires_at rather than scanning the table.
+    """
+
+    def __init__(self, path: str, table: str = 'kv_store'):
+        if not table.replace('_', '').isalnum():
+            raise ValueError(f"Invalid table name: {table}")
+
+        self.path = path
+        self.table = table
+        self._local = threading.local()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {self.table}_expires_at ON {self.table} (expires_at)"
+        )
+        conn.commit()
+        log_info(f"Shared store '{self.table}' opened at {self.path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row is None:
+            return default
+
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return default
+
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        self._connection().execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, default=str), expires_at)
+        )
+
+    def update(self, key: str, func: Callable[[Any], Any], ttl_seconds: Optional[float] = None) -> Any:
+        """
+        Atomically replace a value with func(current_value) and return the new value.
+
+        current_value is None when the key is missing or expired. The write
+        lock is taken before reading, so concurrent updates from other
+        processes are serialised rather than lost.
+        """
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            current = None
+            if row is not None and (row[1] is None or row[1] > time.time()):
+                current = json.loads(row[0])
+
+            value = func(current)
+            expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, default=str), expires_at)
+            )
+            conn.execute('COMMIT')
+            return value
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def keys(self, prefix: str = '') -> List[str]:
+        """Keys of live (non-expired) entries, optionally restricted to a prefix"""
+        rows = self._connection().execute(
+            f"SELECT key FROM {self.table} WHERE key LIKE ? ESCAPE '\\' "
+            "AND (expires_at IS NULL OR expires_at > ?)",
+            (_like_prefix(prefix), time.time())
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def delete(self, key: str) -> bool:
+        cursor = self._connection().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        keys = list(keys)
+        if not keys:
+            return 0
+        cursor = self._connection().executemany(
+            f"DELETE FROM {self.table} WHERE key = ?", [(key,) for key in keys]
+        )
+        return cursor.rowcount
+
+    def delete_prefix(self, prefix: str) -> int:
+        cursor = self._connection().execute(
+            f"DELETE FROM {self.table} WHERE key LIKE ? ESCAPE '\\'", (_like_prefix(prefix),)
+        )
+        return cursor.rowcount
+
+    def purge_expired(self) -> int:
+        """Delete expired rows (index range scan on expires_at)"""
+        cursor = self._connection().execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),)
+        )
+        return cursor.rowcount
+
+    def count(self) -> int:
+        return self._connection().execute(
+            f"SELECT COUNT(*) FROM {self.table} WHERE expires_at IS NULL OR expires_at > ?",
+            (time.time(),)
+        ).fetchone()[0]
+
+    def get_stats(self) -> Dict:
+        return {'backend': 'sqlite', 'path': self.path, 'table': self.table, 'size': self.count()}